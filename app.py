@@ -1,9 +1,14 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, g, render_template, jsonify, request
 import os
 import sys
-from routes import stt_bp, tts_bp, voice_list_bp
+import time
+from routes import stt_bp, stt_batch_bp, tts_bp, s2st_bp, voice_list_bp, profiling_bp
 from utils.kk_speech_model import init_kazakh_model
 from utils.text_translator import init_translator
+from utils.model_warmup import get_model_warmup
+from utils.model_server import get_model_client
+from utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY
+from utils.audio_io import MAX_UPLOAD_BYTES
 
 def _resource_path(relative_path):
     if getattr(sys, 'frozen', False):
@@ -19,9 +24,42 @@ app = Flask(
     static_folder=_resource_path('static')
 )
 
+# Larger requests get 413 before their body is read (VOICEFLOW_MAX_UPLOAD_MB)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
 app.register_blueprint(stt_bp)
+app.register_blueprint(stt_batch_bp)
 app.register_blueprint(tts_bp)
+app.register_blueprint(s2st_bp)
 app.register_blueprint(voice_list_bp)
+app.register_blueprint(profiling_bp)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    # Route templates keep label cardinality bounded (no filenames)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def _finish_request(_exc):
+    HTTP_IN_FLIGHT.dec()
+    # After the decrement, so an idle worker's snapshot does not count its last request as in flight
+    REGISTRY.write_snapshot()
+
+
+@app.errorhandler(413)
+def request_too_large(_error):
+    return jsonify({'error': f'Upload is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit'}), 413
+
 
 @app.route('/')
 def index():
@@ -32,5 +70,32 @@ def index():
 def health():
     return jsonify({'status': 'ok'})
 
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: green only once every model in VOICEFLOW_WARMUP_MODELS is warm"""
+    client = get_model_client()
+    # Behind serve.py the models live in the model server processes
+    status = client.get_warmup_status() if client is not None else get_model_warmup().get_status()
+    status['status'] = 'ready' if status['ready'] else 'warming'
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics, including the model servers' when running behind serve.py"""
+    client = get_model_client()
+    extra = client.get_metrics_snapshots() if client is not None else []
+    return Response(REGISTRY.render(extra), mimetype='text/plain; version=0.0.4')
+
+
+# '__mp_main__' is this file re-run inside a spawned worker (pyttsx3 pool), which must not warm models
+if __name__ not in ('__main__', '__mp_main__') and get_model_client() is None:
+    # Imported by a WSGI server or the desktop app: warm up in the background
+    get_model_warmup().start()
+
 if __name__ == '__main__':
+    # With the reloader on, only the serving child process warms models
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_model_warmup().start()
     app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Benchmark: eager vs TorchScript vs torch.compile inference
+
+Times the Whisper encoder (and full transcribe() calls, which run it once
+per 30 s window) and the Kazakh VITS model on typical utterance lengths in
+each inference mode. Every mode runs in its own process. Optimized modes
+run twice against the same artifact cache: the first process pays the
+trace/compile ('cold'), the second starts from the cached artifacts ('warm').
+
+Usage:
+    python -m benchmarks.bench_inference_modes                     # stand-in models
+    python -m benchmarks.bench_inference_modes --model real        # downloaded models
+    python -m benchmarks.bench_inference_modes --target whisper --modes eager script
+    python -m benchmarks.bench_inference_modes --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Typical clip lengths: a voice command, a sentence, a full 30 s window
+WHISPER_CLIPS = {'5s': 5.0, '12s': 12.0, '30s': 30.0}
+KAZAKH_TEXTS = {
+    'short': 'Сәлеметсіз бе!',
+    'medium': 'Бүгін ауа райы өте жақсы, сондықтан біз саябаққа серуендеуге барамыз.',
+    'long': ('Қазақстан Орталық Азиядағы ең үлкен мемлекет. Оның астанасы Астана қаласы, '
+             'ал ең ірі қаласы Алматы. Елде көптеген ұлттар мен ұлыстар бейбіт өмір сүреді.')
+}
+MODES = ('eager', 'script', 'compile')
+
+
+def _load(target: str, kind: str):
+    if kind == 'standin':
+        from benchmarks.standins import build_kazakh_tts, build_whisper
+        return build_whisper() if target == 'whisper' else build_kazakh_tts()
+
+    from utils.model_manager import get_model_manager
+    manager = get_model_manager()
+    # Load eagerly; the benchmark applies each mode itself
+    manager.inference_modes = {}
+    return manager.load_whisper_model() if target == 'whisper' else manager.load_kazakh_tts_model()
+
+
+def _time_calls(call, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _whisper_cases(model):
+    import numpy as np
+    import torch
+    from whisper.audio import N_FRAMES
+    from utils.decoding_profiles import DEFAULT_PROFILE, decoding_options
+
+    mel = torch.randn(1, model.dims.n_mels, N_FRAMES) * 0.1
+    cases = {'encoder': lambda: model.encoder(mel)}
+    rng = np.random.default_rng(0)
+    for name, seconds in WHISPER_CLIPS.items():
+        audio = (rng.standard_normal(int(seconds * 16000)) * 0.05).astype(np.float32)
+        cases[f'transcribe {name}'] = (
+            lambda audio=audio: model.transcribe(audio, language='en', fp16=False,
+                                                 **decoding_options(DEFAULT_PROFILE)))
+    return cases
+
+
+def _kazakh_cases(loaded):
+    cases = {}
+    for name, text in KAZAKH_TEXTS.items():
+        inputs = loaded['tokenizer'](text, return_tensors='pt')
+        cases[f'tts {name}'] = lambda inputs=inputs: loaded['model'](**inputs).waveform
+    return cases
+
+
+def child_main(args):
+    import torch
+    from utils.optimized_inference import artifact_key, optimize_vits, optimize_whisper
+
+    torch.set_grad_enabled(False)
+    model = _load(args.target, args.kind)
+    cache_dir = Path(args.cache_dir)
+
+    started = time.perf_counter()
+    if args.target == 'whisper':
+        mode = optimize_whisper(model, args.mode, cache_dir, artifact_key('whisper', args.kind, args.mode))
+        cases = _whisper_cases(model)
+    else:
+        mode = optimize_vits(model['model'], args.mode, cache_dir)
+        cases = _kazakh_cases(model)
+
+    # First call of each case includes tracing/compiling (and recompiles for new shapes)
+    first_call = {}
+    for name, call in cases.items():
+        call_started = time.perf_counter()
+        call()
+        first_call[name] = time.perf_counter() - call_started
+    setup_seconds = time.perf_counter() - started
+
+    p50 = {name: _time_calls(call, args.repeats) for name, call in cases.items()}
+    print(json.dumps({'mode': mode, 'setup_seconds': setup_seconds,
+                      'first_call': first_call, 'p50': p50}), flush=True)
+
+
+def _run_child(target: str, mode: str, kind: str, cache_dir: str, repeats: int) -> dict:
+    proc = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_inference_modes', '--child',
+         '--target', target, '--mode', mode, '--kind', kind,
+         '--cache-dir', cache_dir, '--repeats', str(repeats)],
+        cwd=ROOT, env=dict(os.environ, TORCHINDUCTOR_CACHE_DIR=str(Path(cache_dir) / 'inductor')),
+        stdout=subprocess.PIPE, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=['standin', 'real'], default='standin',
+                        help='Stand-in models, or the downloaded Whisper medium and MMS-TTS')
+    parser.add_argument('--target', choices=['whisper', 'kazakh_tts', 'all'], default='all')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--repeats', type=int, default=5, help='Timed calls per case')
+    parser.add_argument('--json', help='Write results to this file')
+    # Internal: worker process arguments
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    parser.add_argument('--kind', default='standin', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    targets = ['whisper', 'kazakh_tts'] if args.target == 'all' else [args.target]
+    modes = ['eager'] + [mode for mode in args.modes if mode != 'eager']
+    results = {'model': args.model, 'targets': {}}
+    for target in targets:
+        runs = {}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for mode in modes:
+                print(f'{target}: {mode}...', flush=True)
+                runs[mode] = _run_child(target, mode, args.model, cache_dir, args.repeats)
+                if mode != 'eager' and runs[mode]['mode'] == mode:
+                    runs[f'{mode} (warm)'] = _run_child(target, mode, args.model, cache_dir, args.repeats)
+        results['targets'][target] = runs
+
+    for target, runs in results['targets'].items():
+        eager = runs['eager']['p50']
+        print(f"\n{target}")
+        print(f"{'mode':<16} {'case':<16} {'first s':>9} {'p50 ms':>9} {'speedup':>8}")
+        for mode, run in runs.items():
+            label = mode if run['mode'] != 'eager' or mode == 'eager' else f'{mode} -> eager'
+            for case, seconds in run['p50'].items():
+                print(f"{label:<16} {case:<16} {run['first_call'][case]:>9.2f} "
+                      f"{seconds * 1000:>9.1f} {eager[case] / seconds:>7.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark: pickle (torch.load) vs memory-mapped safetensors weight loading
+
+Starts several worker processes that each load the same weights and stay
+alive together, then reports per-process load time and memory. With mmap
+loading, weights are page-cache backed, so PSS (proportional set size)
+per worker drops as more workers map the same file.
+
+Usage:
+    python -m benchmarks.bench_weight_loading                      # synthetic 512MB model
+    python -m benchmarks.bench_weight_loading --synthetic-mb 2048 --workers 4
+    python -m benchmarks.bench_weight_loading --model whisper      # real cached checkpoint
+    python -m benchmarks.bench_weight_loading --json results.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+LAYER_WIDTH = 2048
+
+
+def _synthetic_module(layers: int):
+    import torch
+    return torch.nn.Sequential(*[torch.nn.Linear(LAYER_WIDTH, LAYER_WIDTH) for _ in range(layers)])
+
+
+def _load_child(fmt: str, source: str, kind: str, layers: int):
+    import torch
+    from utils.mmap_weights import load_module_tensors, parameters_on_meta, read_metadata
+
+    started = time.perf_counter()
+    if kind == 'synthetic':
+        if fmt == 'pickle':
+            model = _synthetic_module(layers)
+            model.load_state_dict(torch.load(source, map_location='cpu'))
+        else:
+            with parameters_on_meta():
+                model = _synthetic_module(layers)
+            model = load_module_tensors(model, source)
+    else:
+        import whisper
+        if fmt == 'pickle':
+            model = whisper.load_model(source)
+        else:
+            from whisper.model import Whisper, ModelDimensions
+            dims = json.loads(read_metadata(source)['dims'])
+            with parameters_on_meta():
+                model = Whisper(ModelDimensions(**dims))
+            model = load_module_tensors(model, source)
+    load_seconds = time.perf_counter() - started
+
+    # Touch every weight once, as the first inference would
+    with torch.no_grad():
+        for param in model.parameters():
+            param.sum()
+    return model, load_seconds
+
+
+def child_main(args):
+    model, load_seconds = _load_child(args.format, args.source, args.kind, args.layers)
+    print(json.dumps({'load_seconds': load_seconds}), flush=True)
+    # Stay alive (with the model referenced) until the parent has measured every worker
+    sys.stdin.read()
+    del model
+
+
+def _run_workers(fmt: str, source: str, kind: str, layers: int, workers: int) -> dict:
+    procs = []
+    for _ in range(workers):
+        procs.append(subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.bench_weight_loading', '--child',
+             '--format', fmt, '--source', source, '--kind', kind, '--layers', str(layers)],
+            cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        ))
+    results = []
+    for proc in procs:
+        line = proc.stdout.readline()
+        result = json.loads(line)
+        result.update(_proc_memory(proc.pid))
+        results.append(result)
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+
+    summary = {'workers': results}
+    for key in results[0]:
+        summary[f'mean_{key}'] = sum(r[key] for r in results) / len(results)
+    return summary
+
+
+def _proc_memory(pid: int) -> dict:
+    """RSS/PSS/shared/private memory of a process in MB (Linux only)"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                name = parts[0].rstrip(':')
+                if name in ('Rss', 'Pss', 'Shared_Clean', 'Private_Clean', 'Private_Dirty'):
+                    stats[name.lower() + '_mb'] = int(parts[1]) / 1024
+    except OSError:
+        pass
+    return stats
+
+
+def _drop_page_cache_hint(path: str):
+    """Ask the kernel to evict a file from the page cache so cold loads are really cold"""
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def _prepare_synthetic(size_mb: int, workdir: Path):
+    import torch
+    from utils.mmap_weights import save_module_tensors
+
+    layers = max(1, size_mb * 1024 * 1024 // (LAYER_WIDTH * LAYER_WIDTH * 4))
+    model = _synthetic_module(layers)
+    pickle_path = workdir / 'synthetic.pt'
+    mmap_path = workdir / 'synthetic.safetensors'
+    torch.save(model.state_dict(), pickle_path)
+    save_module_tensors(model, mmap_path)
+    return layers, str(pickle_path), str(mmap_path)
+
+
+def _prepare_whisper():
+    import whisper
+    from utils.model_manager import get_model_manager
+    from utils.mmap_weights import save_module_tensors
+
+    manager = get_model_manager()
+    model_path = manager._model_path('whisper')
+    if model_path is None:
+        raise SystemExit('Whisper model not downloaded; run without --model for a synthetic benchmark')
+    mmap_path = manager._mmap_weights_path('whisper', model_path)
+    if not mmap_path.exists():
+        print(f'Converting {model_path.name} once...')
+        model = whisper.load_model(str(model_path))
+        save_module_tensors(model, mmap_path, {'dims': json.dumps(vars(model.dims))})
+        del model
+    return str(model_path), str(mmap_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=['whisper'], help='Benchmark a real cached model')
+    parser.add_argument('--synthetic-mb', type=int, default=512, help='Synthetic model size')
+    parser.add_argument('--workers', type=int, default=3, help='Processes loading at the same time')
+    parser.add_argument('--json', help='Write results to this file')
+    # Internal: worker process arguments
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--format', help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--kind', default='synthetic', help=argparse.SUPPRESS)
+    parser.add_argument('--layers', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            kind, layers = args.model, 0
+            pickle_source, mmap_source = _prepare_whisper()
+        else:
+            kind = 'synthetic'
+            layers, pickle_source, mmap_source = _prepare_synthetic(args.synthetic_mb, Path(tmp))
+
+        results = {'kind': kind, 'workers': args.workers}
+        for fmt, source in (('pickle', pickle_source), ('mmap', mmap_source)):
+            _drop_page_cache_hint(source)
+            results[fmt] = _run_workers(fmt, source, kind, layers, args.workers)
+
+    print(f"\n{'format':<8} {'load s':>8} {'rss MB':>9} {'pss MB':>9} {'private MB':>11}")
+    for fmt in ('pickle', 'mmap'):
+        r = results[fmt]
+        private = r.get('mean_private_clean_mb', 0) + r.get('mean_private_dirty_mb', 0)
+        print(f"{fmt:<8} {r['mean_load_seconds']:>8.2f} {r.get('mean_rss_mb', 0):>9.0f} "
+              f"{r.get('mean_pss_mb', 0):>9.0f} {private:>11.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
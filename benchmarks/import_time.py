@@ -0,0 +1,149 @@
+"""
+Startup import-time report for VoiceFlow
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+aggregates the per-module cost, so slow or newly added imports on the startup
+path show up. Warmup and background preimports are switched off in the child
+so only the import itself is measured.
+
+Usage:
+    python -m benchmarks.import_time                       # report for `import app`
+    python -m benchmarks.import_time --json startup.json   # save a baseline
+    python -m benchmarks.import_time --baseline startup.json --max-regression 20
+    python -m benchmarks.import_time --module desktop_app --top 30
+
+Exits with status 1 when a --forbid module is imported at startup or the
+total import time regresses beyond --max-regression percent of the baseline.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Libraries the routes load lazily; importing any of them at startup is a regression
+DEFAULT_FORBIDDEN = ('torch', 'scipy', 'transformers', 'whisper', 'pyttsx3', 'numpy')
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parse -X importtime output
+
+    Returns:
+        {module: {'self_us': int, 'cumulative_us': int, 'depth': int}}
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.split(':', 1)[1].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        # Nested imports are indented by two spaces per level after one leading space
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules[name.strip()] = {
+            'self_us': self_us,
+            'cumulative_us': cumulative_us,
+            'depth': depth
+        }
+    return modules
+
+
+def measure(module: str, runs: int) -> dict:
+    """Import a module in `runs` fresh interpreters and keep the fastest time per module"""
+    env = dict(os.environ, VOICEFLOW_WARMUP_MODELS='none', VOICEFLOW_PREIMPORT='0')
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            tail = result.stderr.strip().splitlines()[-1:] or ['unknown error']
+            raise SystemExit(f'import {module} failed: {tail[0]}')
+        for name, entry in parse_importtime(result.stderr).items():
+            if name not in best or entry['self_us'] < best[name]['self_us']:
+                best[name] = entry
+    return best
+
+
+def summarize(module: str, modules: dict) -> dict:
+    """Aggregate self time per top-level package and compute the total"""
+    packages = {}
+    for name, entry in modules.items():
+        top = name.split('.')[0]
+        packages[top] = packages.get(top, 0) + entry['self_us']
+    total = modules.get(module, {}).get('cumulative_us') or sum(packages.values())
+    return {
+        'module': module,
+        'python': sys.version.split()[0],
+        'total_ms': round(total / 1000, 2),
+        'packages_ms': {
+            name: round(us / 1000, 2)
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])
+        },
+        'modules': modules
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Return human-readable regression messages (empty when within budget)"""
+    problems = []
+    old_total = baseline.get('total_ms') or 0
+    if old_total and report['total_ms'] > old_total * (1 + max_regression / 100):
+        problems.append(
+            f"total import time {report['total_ms']:.1f}ms exceeds baseline "
+            f"{old_total:.1f}ms by more than {max_regression:.0f}%"
+        )
+    new_packages = set(report['packages_ms']) - set(baseline.get('packages_ms', {}))
+    for name in sorted(new_packages):
+        problems.append(f"new package on the startup path: {name} ({report['packages_ms'][name]:.1f}ms)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to measure; fastest wins')
+    parser.add_argument('--top', type=int, default=15, help='Packages to print')
+    parser.add_argument('--json', help='Write the report to this file')
+    parser.add_argument('--baseline', help='Compare against a report written with --json')
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Allowed total import time growth over the baseline, in percent')
+    parser.add_argument('--forbid', default=','.join(DEFAULT_FORBIDDEN),
+                        help='Comma-separated packages that must not be imported at startup')
+    args = parser.parse_args()
+
+    report = summarize(args.module, measure(args.module, max(1, args.runs)))
+
+    print(f"import {args.module}: {report['total_ms']:.1f}ms")
+    for name, ms in list(report['packages_ms'].items())[:args.top]:
+        print(f"  {name:<30} {ms:>9.1f}ms")
+
+    problems = []
+    forbidden = [name.strip() for name in args.forbid.split(',') if name.strip()]
+    for name in forbidden:
+        if name in report['packages_ms']:
+            problems.append(f"{name} is imported at startup ({report['packages_ms'][name]:.1f}ms)")
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems.extend(compare(report, json.load(f), args.max_regression))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for problem in problems:
+        print(f"✘ {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
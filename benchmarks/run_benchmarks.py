@@ -0,0 +1,462 @@
+"""
+VoiceFlow benchmark suite
+
+Times each pipeline stage on its own, the /stt, /tts and /s2st handlers end to end
+through the Flask test client, and a concurrent mixed load. Results are
+written as JSON so runs on different commits can be compared.
+
+Two modes:
+    standin  Tiny randomly initialized models with the real interfaces
+             (benchmarks/standins.py). Offline, seconds, measures app overhead
+    real     The cached Whisper, NLLB and MMS-TTS models (download them first)
+
+Usage:
+    python -m benchmarks.run_benchmarks                                # stand-ins
+    python -m benchmarks.run_benchmarks --mode real --requests 5
+    python -m benchmarks.run_benchmarks --json bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json --max-regression 20
+    python -m benchmarks.run_benchmarks --concurrency 8 --load-requests 64
+    python -m benchmarks.run_benchmarks --mode real --x2en-audio ru.wav --x2en-reference "Good morning"
+
+Exits with status 1 when a benchmark's p50 regresses beyond --max-regression
+percent of the baseline.
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+SAMPLE_TEXT = "Hello, this is a short sentence to measure speech synthesis."
+SAMPLE_RATE = 16000
+
+
+def make_wav(seconds: float = 3.0, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Mono 16-bit WAV with a voice-like harmonic tone, deterministic"""
+    import numpy as np
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = sum(np.sin(2 * math.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+    signal *= 0.5 + 0.5 * np.sin(2 * math.pi * 3 * t)  # syllable-rate envelope
+    pcm = (signal / np.abs(signal).max() * 0.6 * 32767).astype('<i2')
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def summarize(samples: list, errors: int = 0, wall_seconds: float = None) -> dict:
+    """Latency stats in milliseconds; throughput when the wall time of the run is known"""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+
+    stats = {
+        'count': len(ordered),
+        'errors': errors,
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else None,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'min_ms': ordered[0] * 1000 if ordered else None,
+        'max_ms': ordered[-1] * 1000 if ordered else None
+    }
+    if wall_seconds:
+        stats['wall_seconds'] = wall_seconds
+        stats['throughput_rps'] = len(ordered) / wall_seconds
+    return stats
+
+
+def timed(fn, repeat: int, warmup: int = 1) -> dict:
+    """Run fn warmup + repeat times; the warmup calls are not recorded"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def prepare_environment():
+    """Environment for an in-process app without warmup, profiling or a model server"""
+    os.environ['VOICEFLOW_WARMUP_MODELS'] = 'none'
+    os.environ['VOICEFLOW_PREIMPORT'] = '0'
+    os.environ.pop('VOICEFLOW_MODEL_SERVER', None)
+    os.environ.pop('VOICEFLOW_PROFILING', None)
+
+
+def load_models(mode: str, seed: int) -> dict:
+    """Install stand-ins or load the real models; returns per-model load seconds"""
+    from utils.model_manager import get_model_manager
+
+    manager = get_model_manager()
+    timings = {}
+    if mode == 'standin':
+        from benchmarks import standins
+        builders = {
+            'whisper': lambda: standins.build_whisper(seed),
+            'translator': lambda: standins.StandInTranslator(seed),
+            'kazakh_tts': lambda: standins.build_kazakh_tts(seed)
+        }
+        for key, build in builders.items():
+            started = time.perf_counter()
+            manager.install_model(key, build())
+            timings[key] = time.perf_counter() - started
+        return timings
+
+    missing = [key for key in manager.MODELS if not manager.is_model_downloaded(key)]
+    if missing:
+        raise SystemExit(f"Real mode needs downloaded models; missing: {', '.join(missing)}")
+    loaders = {
+        'whisper': manager.load_whisper_model,
+        'translator': manager.load_translator_model,
+        'kazakh_tts': manager.load_kazakh_tts_model
+    }
+    for key, load in loaders.items():
+        started = time.perf_counter()
+        load()
+        timings[key] = time.perf_counter() - started
+    return timings
+
+
+def bench_stages(wav_bytes: bytes, repeat: int) -> dict:
+    """Each stage called directly, without Flask"""
+    import scipy.io.wavfile
+    from utils.audio_io import decode_audio
+    from utils.decoding_profiles import DECODING_PROFILES, decoding_options
+    from utils.kk_speech_model import synthesize_kazakh_local
+    from utils.model_manager import get_model_manager
+
+    manager = get_model_manager()
+    whisper_model = manager.load_whisper_model()
+    translator = manager.load_translator_model()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='voiceflow-bench-') as tmp:
+        wav_path = os.path.join(tmp, 'input.wav')
+        with open(wav_path, 'wb') as f:
+            f.write(wav_bytes)
+
+        audio = decode_audio(wav_path)
+        results['stt.decode'] = timed(lambda: decode_audio(wav_path), repeat)
+        results['stt.transcribe'] = timed(
+            lambda: whisper_model.transcribe(audio, language='en', fp16=False), repeat)
+        for profile in DECODING_PROFILES:
+            options = decoding_options(profile)
+            results[f'stt.transcribe.{profile}'] = timed(
+                lambda: whisper_model.transcribe(audio, language='en', fp16=False, **options), repeat)
+        results['tts.translate'] = timed(
+            lambda: translator(SAMPLE_TEXT, src_lang='eng_Latn', tgt_lang='kaz_Cyrl'), repeat)
+
+        sampling_rate, waveform = synthesize_kazakh_local(manager, SAMPLE_TEXT)
+        results['tts.synthesize_kazakh'] = timed(lambda: synthesize_kazakh_local(manager, SAMPLE_TEXT), repeat)
+        out_path = os.path.join(tmp, 'output.wav')
+        results['tts.file_write'] = timed(
+            lambda: scipy.io.wavfile.write(out_path, rate=sampling_rate, data=waveform), repeat)
+    return results
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance over reference length, ignoring case and punctuation"""
+    def words(text):
+        return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def bench_speech_translation(audio_bytes: bytes, language: str, repeat: int, reference: str = None) -> dict:
+    """
+    Speech into English two ways: Whisper's translate task in one decode,
+    or transcription followed by NLLB. Quality is word error rate against
+    `reference` when given, otherwise agreement between the two outputs.
+    """
+    from routes.stt_route import WHISPER_LANGUAGES
+    from routes.tts_route import LANGUAGE_CODE
+    from utils.audio_io import decode_audio
+    from utils.model_manager import get_model_manager
+
+    manager = get_model_manager()
+    whisper_model = manager.load_whisper_model()
+    translator = manager.load_translator_model()
+    audio = decode_audio(audio_bytes)
+    whisper_lang = WHISPER_LANGUAGES[language]
+    outputs = {}
+
+    def whisper_translate():
+        outputs['whisper'] = whisper_model.transcribe(audio, language=whisper_lang, task='translate',
+                                                      fp16=False)['text'].strip()
+
+    def transcribe_then_nllb():
+        text = whisper_model.transcribe(audio, language=whisper_lang, fp16=False)['text'].strip()
+        response = translator(text, src_lang=LANGUAGE_CODE[language], tgt_lang='eng_Latn')
+        outputs['nllb'] = response[0]['translation_text']
+
+    results = {
+        'x2en.whisper_translate': timed(whisper_translate, repeat),
+        'x2en.transcribe_nllb': timed(transcribe_then_nllb, repeat)
+    }
+    for name, key in (('x2en.whisper_translate', 'whisper'), ('x2en.transcribe_nllb', 'nllb')):
+        results[name]['text'] = outputs[key]
+        if reference:
+            results[name]['wer'] = word_error_rate(reference, outputs[key])
+    if not reference:
+        results['x2en.whisper_translate']['wer_vs_nllb'] = word_error_rate(outputs['nllb'], outputs['whisper'])
+    return results
+
+
+def _stt_request(client, wav_bytes: bytes):
+    response = client.post('/stt', data={
+        'language': 'english',
+        'audio': (io.BytesIO(wav_bytes), 'bench.wav', 'audio/wav')
+    }, content_type='multipart/form-data')
+    body = response.get_json(silent=True) or {}
+    # The handler reports transcription failures as 200 with a "Recognition error" text
+    return response.status_code == 200 and not body.get('text', '').startswith('Recognition error')
+
+
+def _tts_request(client, _wav_bytes: bytes):
+    response = client.post('/tts', json={
+        'text': SAMPLE_TEXT,
+        'src_language': 'english',
+        'tgt_language': 'kazakh'
+    })
+    body = response.get_json(silent=True) or {}
+    if body.get('audio_filename'):
+        _remove_output(body['audio_filename'])
+    return response.status_code == 200
+
+
+def _s2st_request(client, wav_bytes: bytes):
+    response = client.post('/s2st', data={
+        'src_language': 'english',
+        'tgt_language': 'kazakh',
+        'audio': (io.BytesIO(wav_bytes), 'bench.wav', 'audio/wav')
+    }, content_type='multipart/form-data')
+    if response.status_code != 200:
+        return False
+    # Reading the body runs the streamed translate/synthesize pipeline
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    return bool(events) and events[-1].get('type') == 'done' and not any(e['type'] == 'error' for e in events)
+
+
+def _stt_batch_request(client, wav_bytes: bytes):
+    response = client.post('/stt/batch', data={
+        'language': 'english',
+        'audio': [(io.BytesIO(wav_bytes), f'bench{i}.wav', 'audio/wav') for i in range(STT_BATCH_FILES)]
+    }, content_type='multipart/form-data')
+    if response.status_code != 200:
+        return False
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    return bool(events) and events[-1].get('type') == 'done' and events[-1].get('errors') == 0
+
+
+def _remove_output(filename: str):
+    from utils.audio_storage import get_audio_storage
+
+    try:
+        get_audio_storage().delete(filename)
+    except (OSError, ValueError):
+        pass
+
+
+ENDPOINTS = {'/stt': _stt_request, '/tts': _tts_request, '/s2st': _s2st_request}
+# Timed on their own only, not in the load mix
+STT_BATCH_FILES = 8
+BATCH_ENDPOINTS = {'/stt/batch': _stt_batch_request}
+
+
+def bench_endpoints(app, wav_bytes: bytes, repeat: int) -> dict:
+    """Sequential end-to-end requests through the Flask test client"""
+    results = {}
+    client = app.test_client()
+    for endpoint, send in {**ENDPOINTS, **BATCH_ENDPOINTS}.items():
+        send(client, wav_bytes)
+        samples, errors = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ok = send(client, wav_bytes)
+            samples.append(time.perf_counter() - started)
+            errors += not ok
+        results[f"http{endpoint}"] = summarize(samples, errors)
+    return results
+
+
+def bench_load(app, wav_bytes: bytes, total: int, concurrency: int) -> dict:
+    """Mixed /stt, /tts and /s2st traffic from `concurrency` threads, one test client each"""
+    from threading import local
+
+    clients = local()
+    endpoints = list(ENDPOINTS.items())
+
+    def one(index):
+        if not hasattr(clients, 'client'):
+            clients.client = app.test_client()
+        endpoint, send = endpoints[index % len(endpoints)]
+        started = time.perf_counter()
+        try:
+            ok = send(clients.client, wav_bytes)
+        except Exception:
+            ok = False
+        return endpoint, time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    results = {'load.all': summarize([o[1] for o in outcomes], sum(not o[2] for o in outcomes), wall)}
+    for endpoint in ENDPOINTS:
+        subset = [o for o in outcomes if o[0] == endpoint]
+        results[f"load{endpoint}"] = summarize([o[1] for o in subset], sum(not o[2] for o in subset))
+    results['load.all']['concurrency'] = concurrency
+    return results
+
+
+def environment_info(mode: str, seed: int) -> dict:
+    import numpy
+    import torch
+
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                  text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, timeout=10).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        revision, dirty = None, None
+    return {
+        'mode': mode,
+        'seed': seed,
+        'git_revision': revision,
+        'git_dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'numpy': numpy.__version__
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Return human-readable regression messages (empty when within budget)"""
+    problems = []
+    if baseline.get('environment', {}).get('mode') != report['environment']['mode']:
+        return [f"baseline mode {baseline.get('environment', {}).get('mode')!r} "
+                f"does not match {report['environment']['mode']!r}"]
+    for name, stats in report['results'].items():
+        old = baseline.get('results', {}).get(name, {}).get('p50_ms')
+        new = stats.get('p50_ms')
+        if old and new and new > old * (1 + max_regression / 100):
+            problems.append(f"{name} p50 {new:.1f}ms exceeds baseline {old:.1f}ms by more than {max_regression:.0f}%")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('standin', 'real'), default='standin')
+    parser.add_argument('--requests', type=int, default=10, help='Timed calls per stage and endpoint')
+    parser.add_argument('--load-requests', type=int, default=32, help='Requests in the concurrent load run')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads in the load run (0 skips it)')
+    parser.add_argument('--audio-seconds', type=float, default=3.0, help='Length of the generated STT clip')
+    parser.add_argument('--x2en-audio', help='Non-English speech clip for the speech-to-English comparison')
+    parser.add_argument('--x2en-language', default='russian', choices=('russian', 'kazakh'),
+                        help='Language spoken in --x2en-audio')
+    parser.add_argument('--x2en-reference', help='Reference English translation of --x2en-audio, for WER')
+    parser.add_argument('--torch-threads', type=int, help='torch.set_num_threads for the run')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for stand-in weights')
+    parser.add_argument('--json', help='Write the report to this file')
+    parser.add_argument('--baseline', help='Compare against a report written with --json')
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Allowed p50 growth over the baseline, in percent')
+    args = parser.parse_args()
+
+    prepare_environment()
+    import torch
+    if args.torch_threads:
+        torch.set_num_threads(args.torch_threads)
+
+    load_seconds = load_models(args.mode, args.seed)
+    from app import app
+
+    wav_bytes = make_wav(args.audio_seconds)
+    results = {}
+    results.update(bench_stages(wav_bytes, args.requests))
+    if args.x2en_audio:
+        with open(args.x2en_audio, 'rb') as f:
+            x2en_audio = f.read()
+    else:
+        x2en_audio = wav_bytes  # latency only: the generated tone has no speech to score
+    results.update(bench_speech_translation(x2en_audio, args.x2en_language, args.requests, args.x2en_reference))
+    results.update(bench_endpoints(app, wav_bytes, args.requests))
+    if args.concurrency > 0 and args.load_requests > 0:
+        results.update(bench_load(app, wav_bytes, args.load_requests, args.concurrency))
+
+    report = {
+        'environment': environment_info(args.mode, args.seed),
+        'config': {
+            'requests': args.requests,
+            'load_requests': args.load_requests,
+            'concurrency': args.concurrency,
+            'audio_seconds': args.audio_seconds,
+            'x2en_audio': args.x2en_audio,
+            'x2en_language': args.x2en_language
+        },
+        'model_load_seconds': load_seconds,
+        'results': results
+    }
+
+    print(f"{'benchmark':<26} {'n':>4} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rps':>8}")
+    for name, stats in results.items():
+        rps = f"{stats['throughput_rps']:.1f}" if 'throughput_rps' in stats else ''
+        print(f"{name:<26} {stats['count']:>4} {stats['errors']:>4} {stats['p50_ms'] or 0:>10.1f} "
+              f"{stats['p95_ms'] or 0:>10.1f} {stats['p99_ms'] or 0:>10.1f} {rps:>8}")
+
+    problems = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems.extend(compare(report, json.load(f), args.max_regression))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for problem in problems:
+        print(f"✘ {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
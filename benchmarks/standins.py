@@ -0,0 +1,155 @@
+"""
+Tiny, randomly initialized stand-ins for VoiceFlow's models
+
+Each stand-in exposes the interface the app uses and runs real (small)
+torch compute, so the benchmarks exercise the same code paths offline and in
+seconds. Outputs are meaningless but deterministic for a given seed:
+
+- Whisper: a real whisper.model.Whisper with a scripted decoder head that
+  always decodes the same short sentence (random heads make transcribe() fall
+  back through every temperature and take far longer than a real model)
+- Translator: a tiny M2M100 (NLLB's architecture) behind the pipeline's
+  call signature, with a byte-level tokenizer
+- Kazakh TTS: a tiny transformers VitsModel with a character tokenizer
+"""
+
+from typing import Optional
+
+# Two sentences, so /s2st has something to pipeline; tokens must not repeat
+SCRIPTED_TEXT = " This is a VoiceFlow benchmark sentence. It checks speech recognition latency!"
+
+
+def _seed(seed: int):
+    import random
+    import numpy as np
+    import torch
+
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def build_whisper(seed: int = 0, text: str = SCRIPTED_TEXT):
+    """Whisper with 2-layer, 64-wide encoder/decoder that transcribes any audio to `text`"""
+    import torch
+    from whisper.model import ModelDimensions, TextDecoder, Whisper
+    from whisper.tokenizer import get_tokenizer
+
+    _seed(seed)
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=2,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=2
+    )
+    model = Whisper(dims)
+    with torch.no_grad():
+        for param in model.parameters():
+            param.normal_(0.0, 0.02)
+
+    tokenizer = get_tokenizer(True, num_languages=dims.n_vocab - 51765 - 1, task='transcribe')
+    words = tokenizer.encode(text)
+    if len(set(words)) != len(words):
+        raise ValueError("Scripted text must not repeat tokens")
+
+    # Next token keyed by the current one: <|0.00|>, the sentence, a closing timestamp, <|endoftext|>
+    next_token = torch.full((dims.n_vocab,), tokenizer.eot, dtype=torch.long)
+    end_timestamp = tokenizer.timestamp_begin + 100
+    sequence = [tokenizer.timestamp_begin, *words, end_timestamp, tokenizer.eot]
+    for current, following in zip(sequence, sequence[1:]):
+        next_token[current] = following
+    for start in (tokenizer.transcribe, tokenizer.translate, tokenizer.no_timestamps):
+        next_token[start] = tokenizer.timestamp_begin if start != tokenizer.no_timestamps else words[0]
+
+    class ScriptedTextDecoder(TextDecoder):
+        def forward(self, x, xa, kv_cache=None):
+            logits = super().forward(x, xa, kv_cache)
+            # Keep the real decoder compute, then make the scripted token the clear winner
+            target = next_token[x].unsqueeze(-1)
+            return logits.scatter(-1, target, logits.amax(dim=-1, keepdim=True) + 30.0)
+
+    scripted = ScriptedTextDecoder(dims.n_vocab, dims.n_text_ctx, dims.n_text_state,
+                                   dims.n_text_head, dims.n_text_layer)
+    scripted.load_state_dict(model.decoder.state_dict())
+    model.decoder = scripted
+    return model.eval()
+
+
+class ByteTokenizer:
+    """Byte-level tokenizer: ids 0-2 are pad/bos/eos, bytes start at 3"""
+
+    pad_token_id, bos_token_id, eos_token_id = 0, 1, 2
+    vocab_size = 259
+
+    def encode(self, text: str) -> list:
+        return [3 + b for b in text.encode('utf-8')] + [self.eos_token_id]
+
+    def decode(self, ids) -> str:
+        return bytes(i - 3 for i in ids if 3 <= i < 259).decode('utf-8', errors='replace')
+
+
+class StandInTranslator:
+    """Called like the NLLB pipeline: translator(text, src_lang=..., tgt_lang=...)"""
+
+    LANGUAGE_IDS = {'eng_Latn': 259, 'rus_Cyrl': 260, 'kaz_Cyrl': 261}
+
+    def __init__(self, seed: int = 0):
+        from transformers import M2M100Config, M2M100ForConditionalGeneration
+
+        _seed(seed)
+        self.tokenizer = ByteTokenizer()
+        config = M2M100Config(
+            vocab_size=262, d_model=64, encoder_layers=2, decoder_layers=2,
+            encoder_attention_heads=2, decoder_attention_heads=2,
+            encoder_ffn_dim=128, decoder_ffn_dim=128, max_position_embeddings=1024,
+            pad_token_id=0, bos_token_id=1, eos_token_id=2, decoder_start_token_id=2
+        )
+        self.model = M2M100ForConditionalGeneration(config).eval()
+
+    def __call__(self, text: str, src_lang: str = 'eng_Latn', tgt_lang: str = 'rus_Cyrl', **_kwargs) -> list:
+        import torch
+
+        ids = [self.LANGUAGE_IDS[src_lang]] + self.tokenizer.encode(text)
+        input_ids = torch.tensor([ids])
+        # Output length tracks input length like a real translation; random weights rarely emit EOS early
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                forced_bos_token_id=self.LANGUAGE_IDS[tgt_lang],
+                max_new_tokens=len(ids) + 8,
+                num_beams=1,
+                do_sample=False
+            )
+        return [{'translation_text': self.tokenizer.decode(output[0].tolist())}]
+
+
+class CharTokenizer:
+    """Maps characters to VITS input ids, called like the HF tokenizer"""
+
+    def __init__(self, vocab_size: int):
+        self.vocab_size = vocab_size
+
+    def __call__(self, text: str, return_tensors: Optional[str] = 'pt'):
+        import torch
+
+        ids = [1 + ord(ch) % (self.vocab_size - 1) for ch in text] or [1]
+        input_ids = torch.tensor([ids])
+        return {'input_ids': input_ids, 'attention_mask': torch.ones_like(input_ids)}
+
+
+def build_kazakh_tts(seed: int = 0) -> dict:
+    """{'model', 'tokenizer'} like ModelManager.load_kazakh_tts_model(), with a ~100k-parameter VITS"""
+    from transformers import VitsConfig, VitsModel
+
+    _seed(seed)
+    config = VitsConfig(
+        vocab_size=40, hidden_size=32, num_hidden_layers=2, num_attention_heads=2, ffn_dim=64,
+        flow_size=32, spectrogram_bins=65, upsample_initial_channel=32,
+        upsample_rates=[8, 8, 2, 2], upsample_kernel_sizes=[16, 16, 4, 4],
+        resblock_kernel_sizes=[3], resblock_dilation_sizes=[[1, 3, 5]],
+        prior_encoder_num_flows=2, prior_encoder_num_wavenet_layers=2,
+        posterior_encoder_num_wavenet_layers=2, duration_predictor_num_flows=2,
+        duration_predictor_filter_channels=32, depth_separable_num_layers=2,
+        sampling_rate=16000
+    )
+    return {'model': VitsModel(config).eval(), 'tokenizer': CharTokenizer(config.vocab_size)}
+
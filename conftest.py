@@ -0,0 +1,50 @@
+"""
+Shared test fixtures: the Flask app running on the benchmark stand-in models
+(benchmarks/standins.py), so route tests need no downloads or network
+"""
+
+import io
+import os
+import wave
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    from benchmarks.run_benchmarks import load_models, prepare_environment
+
+    prepare_environment()
+    os.environ['VOICEFLOW_AUDIO_DIR'] = str(tmp_path_factory.mktemp('audio'))
+    load_models('standin', seed=0)
+    from app import app as flask_app
+
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def speech():
+    """speech(seconds, silence=0, as_wav=False): a 16 kHz mono tone as raw PCM16 or WAV bytes"""
+
+    def make(seconds, silence=0.0, as_wav=False):
+        t = np.arange(int(16000 * seconds)) / 16000
+        tone = (0.3 * np.sin(2 * np.pi * 300 * t) * 32767).astype('<i2')
+        pad = np.zeros(int(16000 * silence), '<i2')
+        pcm = np.concatenate([pad, tone, pad]).tobytes()
+        if not as_wav:
+            return pcm
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(pcm)
+        return buffer.getvalue()
+
+    return make
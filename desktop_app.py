@@ -3,11 +3,17 @@ VoiceFlow Desktop Application
 Embeds Flask server in a PyQt5 desktop application with system tray support
 """
 
+import time
+
+# Baseline for the startup report; taken before the Qt imports so their cost counts
+_PROCESS_STARTED = time.perf_counter()
+
 import sys
 import os
+import json
+import multiprocessing
 import threading
 import socket
-import urllib.request
 from pathlib import Path
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QSystemTrayIcon, 
@@ -17,34 +23,112 @@ from PyQt5.QtCore import Qt, QUrl, QTimer, pyqtSignal, QObject
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
 
-# Import Flask app
-from app import app as flask_app
 from utils.model_manager import get_model_manager
+from utils.model_warmup import get_model_warmup
+
+# How long the local server may take to come up before startup is reported as failed
+SERVER_START_TIMEOUT_MS = 15000
+
+# Shown the moment the window opens, while the server and models start behind it
+SHELL_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+body { font-family: -apple-system, 'Segoe UI', sans-serif; margin: 0; height: 100vh; display: flex;
+       align-items: center; justify-content: center; color: white;
+       background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }
+.card { text-align: center; min-width: 320px; }
+h1 { font-weight: 600; margin-bottom: 8px; }
+ul { list-style: none; padding: 0; margin-top: 24px; text-align: left; }
+li { padding: 6px 0; display: flex; justify-content: space-between; gap: 24px; opacity: 0.9; }
+</style></head><body><div class="card">
+<h1>VoiceFlow</h1><div>Starting&hellip;</div><ul id="models"></ul>
+</div><script>
+const LABELS = {whisper: 'Speech recognition', translator: 'Translation', kazakh_tts: 'Kazakh voice'};
+const STATES = {not_loaded: 'Waiting', loading: 'Loading\u2026', warm: 'Ready', failed: 'Failed'};
+window.voiceflowModelState = function(status) {
+    document.getElementById('models').innerHTML = Object.entries(status.models)
+        .filter(([, entry]) => entry.required)
+        .map(([key, entry]) => `<li><span>${LABELS[key] || key}</span><span>${STATES[entry.state] || entry.state}</span></li>`)
+        .join('');
+};
+</script></body></html>"""
+
+
+class StartupTimer:
+    """Records startup milestones, in seconds since the process started"""
+
+    def __init__(self, started: float = _PROCESS_STARTED):
+        self.started = started
+        self.marks = {}
+
+    def mark(self, name: str):
+        """Record a milestone the first time it is reached"""
+        if name not in self.marks:
+            self.marks[name] = round(time.perf_counter() - self.started, 3)
+            print(f"Startup: {name} after {self.marks[name]:.2f}s")
+
+    def save(self, path: Path):
+        """Write the milestones so startup regressions can be compared across versions"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({'recorded_at': time.time(), 'milestones': self.marks}, f, indent=2)
+        except OSError as exc:
+            print(f"Could not write startup report: {exc}")
+
+
+class StartupSignals(QObject):
+    """Carries server and warmup events from background threads to the UI thread"""
+    server_ready = pyqtSignal()
+    server_failed = pyqtSignal(str)
+    warmup_status = pyqtSignal(object)  # ModelWarmup.get_status() dict
 
 
 class FlaskThread(threading.Thread):
     """Thread to run Flask server in background"""
     
-    def __init__(self, host='127.0.0.1', port=5000):
+    def __init__(self, host='127.0.0.1', port=5000, on_ready=None, on_error=None):
         super().__init__(daemon=True)
         self.host = host
         self.port = port
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.server = None
         
     def run(self):
         """Start Flask server"""
+        try:
+            # Imported here so the Flask app and its routes load off the UI thread
+            from app import app as flask_app
+            from werkzeug.serving import make_server
+
+            # Binding first tells the UI the moment requests can be served, without polling /health
+            self.server = make_server(self.host, self.port, flask_app, threaded=True)
+        except Exception as exc:
+            print(f"Flask server failed to start: {exc}")
+            if self.on_error:
+                self.on_error(str(exc))
+            return
+
         print(f"Starting Flask server on {self.host}:{self.port}")
-        flask_app.run(
-            host=self.host,
-            port=self.port,
-            debug=False,  # Disable debug in production
-            use_reloader=False  # Important: disable reloader in thread
-        )
+        if self.on_ready:
+            self.on_ready()
+        self.server.serve_forever()
 
 
 class ModelDownloadSignals(QObject):
     """Signals for model download progress"""
-    progress = pyqtSignal(str, int, int, str)  # model_key, current, total, message
+    progress = pyqtSignal(str, object, object, str)  # model_key, current_bytes, total_bytes, message
+    telemetry = pyqtSignal(str, object)  # model_key, DownloadProgress.snapshot() dict
     finished = pyqtSignal(str, bool)  # model_key, success
+    status = pyqtSignal(object)  # ModelManager.get_download_status() dict
+
+
+def _format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
 
 
 class ModelDownloadWindow(QWidget):
@@ -57,6 +141,8 @@ class ModelDownloadWindow(QWidget):
         
         self.model_manager = get_model_manager()
         self.signals = ModelDownloadSignals()
+        self._downloading = set()
+        self._announce_when_done = False
         
         self._setup_ui()
         self._check_model_status()
@@ -83,30 +169,39 @@ class ModelDownloadWindow(QWidget):
         layout.addWidget(QLabel("\n1. OpenAI Whisper (Speech-to-Text) - ~2GB"))
         self.whisper_progress = QProgressBar()
         self.whisper_status = QLabel("Checking...")
+        self.whisper_detail = QLabel("")
+        self.whisper_detail.setStyleSheet("color: #888; font-size: 11px;")
         self.whisper_btn = QPushButton("Download")
         self.whisper_btn.clicked.connect(lambda: self._download_model('whisper'))
         layout.addWidget(self.whisper_progress)
         layout.addWidget(self.whisper_status)
+        layout.addWidget(self.whisper_detail)
         layout.addWidget(self.whisper_btn)
         
         # Model 2: Kazakh TTS
         layout.addWidget(QLabel("\n2. Kazakh TTS (Text-to-Speech) - ~273MB"))
         self.kazakh_progress = QProgressBar()
         self.kazakh_status = QLabel("Checking...")
+        self.kazakh_detail = QLabel("")
+        self.kazakh_detail.setStyleSheet("color: #888; font-size: 11px;")
         self.kazakh_btn = QPushButton("Download")
         self.kazakh_btn.clicked.connect(lambda: self._download_model('kazakh_tts'))
         layout.addWidget(self.kazakh_progress)
         layout.addWidget(self.kazakh_status)
+        layout.addWidget(self.kazakh_detail)
         layout.addWidget(self.kazakh_btn)
         
         # Model 3: Translator
         layout.addWidget(QLabel("\n3. NLLB Translator - ~800MB"))
         self.translator_progress = QProgressBar()
         self.translator_status = QLabel("Checking...")
+        self.translator_detail = QLabel("")
+        self.translator_detail.setStyleSheet("color: #888; font-size: 11px;")
         self.translator_btn = QPushButton("Download")
         self.translator_btn.clicked.connect(lambda: self._download_model('translator'))
         layout.addWidget(self.translator_progress)
         layout.addWidget(self.translator_status)
+        layout.addWidget(self.translator_detail)
         layout.addWidget(self.translator_btn)
         
         # Download All button
@@ -129,21 +224,40 @@ class ModelDownloadWindow(QWidget):
         
         # Connect signals
         self.signals.progress.connect(self._update_progress)
+        self.signals.telemetry.connect(self._update_telemetry)
         self.signals.finished.connect(self._download_finished)
+        self.signals.status.connect(self._apply_model_status)
         
     def _check_model_status(self):
-        """Check which models are already downloaded"""
-        status = self.model_manager.get_download_status()
-        
-        # Update UI for each model
-        self._update_model_status('whisper', status['whisper']['downloaded'])
-        self._update_model_status('kazakh_tts', status['kazakh_tts']['downloaded'])
-        self._update_model_status('translator', status['translator']['downloaded'])
-        
-        # Enable continue if all downloaded
-        if all(s['downloaded'] for s in status.values()):
-            self.continue_btn.setEnabled(True)
-            self.download_all_btn.setEnabled(False)
+        """Check which models are already downloaded, off the UI thread"""
+        # Models the manifest does not know yet are looked up in the cache,
+        # which globs and stats multi-GB files; the window stays responsive meanwhile
+        self.download_all_btn.setEnabled(False)
+        for key in self.model_manager.MODELS:
+            if key not in self._downloading:
+                self._get_model_widgets(key)['btn'].setEnabled(False)
+
+        def check_thread():
+            self.signals.status.emit(self.model_manager.get_download_status())
+
+        threading.Thread(target=check_thread, daemon=True).start()
+
+    def _apply_model_status(self, status):
+        """Show download status (called from signal)"""
+        for key, entry in status.items():
+            if key not in self._downloading:
+                self._update_model_status(key, entry['downloaded'])
+
+        all_downloaded = all(s['downloaded'] for s in status.values())
+        self.continue_btn.setEnabled(all_downloaded)
+        self.download_all_btn.setEnabled(not all_downloaded and not self._downloading)
+        if all_downloaded and self._announce_when_done:
+            self._announce_when_done = False
+            QMessageBox.information(
+                self,
+                "Success",
+                "All models downloaded successfully!\nYou can now use the app offline."
+            )
     
     def _update_model_status(self, model_key, downloaded):
         """Update UI for model download status"""
@@ -167,53 +281,62 @@ class ModelDownloadWindow(QWidget):
             return {
                 'progress': self.whisper_progress,
                 'status': self.whisper_status,
+                'detail': self.whisper_detail,
                 'btn': self.whisper_btn
             }
         elif model_key == 'kazakh_tts':
             return {
                 'progress': self.kazakh_progress,
                 'status': self.kazakh_status,
+                'detail': self.kazakh_detail,
                 'btn': self.kazakh_btn
             }
         elif model_key == 'translator':
             return {
                 'progress': self.translator_progress,
                 'status': self.translator_status,
+                'detail': self.translator_detail,
                 'btn': self.translator_btn
             }
     
     def _download_model(self, model_key):
         """Download a single model in background thread"""
+        if model_key in self._downloading:
+            return
+        self._downloading.add(model_key)
+        self.download_all_btn.setEnabled(False)
         widgets = self._get_model_widgets(model_key)
         widgets['btn'].setEnabled(False)
         widgets['btn'].setText("Downloading...")
         widgets['status'].setText("Preparing download...")
+        widgets['status'].setStyleSheet("color: #666;")
+        widgets['detail'].setText("")
         
         def progress_callback(current, total, message):
             self.signals.progress.emit(model_key, current, total, message)
+
+        def telemetry_callback(snapshot):
+            self.signals.telemetry.emit(model_key, snapshot)
         
         def download_thread():
-            success = self.model_manager.download_model(model_key, progress_callback)
+            success = self.model_manager.download_model(model_key, progress_callback, telemetry_callback)
             self.signals.finished.emit(model_key, success)
         
         thread = threading.Thread(target=download_thread, daemon=True)
         thread.start()
     
     def _download_all_models(self):
-        """Download all models sequentially"""
+        """Download all missing models at once; they share the connections equally"""
         self.download_all_btn.setEnabled(False)
-        
-        # Check which models need downloading
-        status = self.model_manager.get_download_status()
-        models_to_download = [k for k, v in status.items() if not v['downloaded']]
-        
-        if not models_to_download:
-            QMessageBox.information(self, "Info", "All models are already downloaded!")
-            self.continue_btn.setEnabled(True)
-            return
-        
-        # Download first model (chain will continue in _download_finished)
-        self._download_model(models_to_download[0])
+        self._announce_when_done = True
+
+        # Buttons are enabled only for models the last status check found missing
+        models_to_download = [
+            key for key in self.model_manager.MODELS
+            if self._get_model_widgets(key)['btn'].isEnabled()
+        ]
+        for model_key in models_to_download:
+            self._download_model(model_key)
     
     def _update_progress(self, model_key, current, total, message):
         """Update progress bar and status (called from signal)"""
@@ -224,38 +347,47 @@ class ModelDownloadWindow(QWidget):
             widgets['progress'].setValue(progress_pct)
         
         widgets['status'].setText(message)
+
+    def _update_telemetry(self, model_key, snapshot):
+        """Show rate, ETA and file progress (called from signal)"""
+        files = snapshot['files'].values()
+        done_files = sum(1 for entry in files if entry['state'] == 'done')
+        verifying = sum(1 for entry in files if entry['state'] == 'verifying')
+        failed = sum(1 for entry in files if entry['state'] == 'failed')
+        parts = [
+            f"{snapshot['rate_bytes_per_sec'] / 1e6:.1f} MB/s",
+            f"ETA {_format_eta(snapshot['eta_seconds'])}",
+            f"{done_files}/{len(files)} files"
+        ]
+        if verifying:
+            parts.append(f"verifying {verifying}")
+        if failed:
+            parts.append(f"{failed} failed")
+        self._get_model_widgets(model_key)['detail'].setText(" · ".join(parts))
     
     def _download_finished(self, model_key, success):
         """Handle download completion (called from signal)"""
         widgets = self._get_model_widgets(model_key)
+        self._downloading.discard(model_key)
         
         if success:
             widgets['status'].setText("✓ Downloaded")
             widgets['status'].setStyleSheet("color: green; font-weight: bold;")
             widgets['btn'].setText("Downloaded")
             widgets['progress'].setValue(100)
+            widgets['detail'].setText("")
             
-            # Check if all models are now downloaded
-            status = self.model_manager.get_download_status()
-            if all(s['downloaded'] for s in status.values()):
-                self.continue_btn.setEnabled(True)
-                self.download_all_btn.setEnabled(False)
-                QMessageBox.information(
-                    self,
-                    "Success",
-                    "All models downloaded successfully!\nYou can now use the app offline."
-                )
-            else:
-                # Continue downloading next model if using "Download All"
-                models_to_download = [k for k, v in status.items() if not v['downloaded']]
-                if models_to_download and not self.download_all_btn.isEnabled():
-                    QTimer.singleShot(500, lambda: self._download_model(models_to_download[0]))
+            if not self._downloading:
+                # Re-check off the UI thread; announces success once everything is present
+                self._check_model_status()
         else:
             widgets['status'].setText("Download failed")
             widgets['status'].setStyleSheet("color: red;")
             widgets['btn'].setEnabled(True)
             widgets['btn'].setText("Retry")
-            self.download_all_btn.setEnabled(True)
+            self._announce_when_done = False
+            if not self._downloading:
+                self.download_all_btn.setEnabled(True)
             
             QMessageBox.warning(
                 self,
@@ -283,24 +415,41 @@ class VoiceFlowDesktop(QMainWindow):
         self.host = '127.0.0.1'
         self.url = f'http://{self.host}:{self.port}'
         
-        # Setup WebView
+        self.startup = StartupTimer()
+        self.startup_report_path = get_model_manager().cache_dir / 'desktop_startup.json'
+        self._server_failed = False
+        self._warmup_status = None
+
+        # Setup WebView with the shell page; it paints before Flask or any model has loaded
         self.browser = QWebEngineView()
         self.browser.setPage(VoiceFlowWebPage(self.browser))
+        self.browser.loadFinished.connect(self._page_loaded)
+        self.browser.setHtml(SHELL_HTML)
         self.setCentralWidget(self.browser)
         
         # Setup system tray
         self._setup_system_tray()
-        
-        # Start Flask server
-        self.flask_thread = FlaskThread(self.host, self.port)
+
+        self.signals = StartupSignals()
+        self.signals.server_ready.connect(self._server_ready)
+        self.signals.server_failed.connect(self._server_start_failed)
+        self.signals.warmup_status.connect(self._warmup_changed)
+
+        # Model warmup and the Flask server start side by side; neither waits for the other
+        warmup = get_model_warmup()
+        warmup.add_listener(self.signals.warmup_status.emit)
+        warmup.start()
+        self.flask_thread = FlaskThread(
+            self.host, self.port,
+            on_ready=self.signals.server_ready.emit,
+            on_error=self.signals.server_failed.emit
+        )
         self.flask_thread.start()
+        QTimer.singleShot(SERVER_START_TIMEOUT_MS, self._check_server_started)
 
-        # Wait for server to start, then load page
-        self._startup_attempts = 0
-        self._startup_timer = QTimer(self)
-        self._startup_timer.setInterval(300)
-        self._startup_timer.timeout.connect(self._wait_for_server)
-        self._startup_timer.start()
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.startup.mark('window_shown')
         
     def _find_free_port(self, start_port=5000, max_attempts=10):
         """Find an available port"""
@@ -355,29 +504,51 @@ class VoiceFlowDesktop(QMainWindow):
         print(f"Loading app at {self.url}")
         self.browser.load(QUrl(self.url))
 
-    def _wait_for_server(self):
-        """Poll Flask health endpoint before loading UI"""
-        self._startup_attempts += 1
-        if self._startup_attempts > 40:
-            self._startup_timer.stop()
-            QMessageBox.critical(
-                self,
-                'Server Error',
-                'VoiceFlow failed to start the local server.\n'
-                'Please restart the app. If the issue persists, rebuild with console=True to see errors.'
-            )
-            return
+    def _server_ready(self):
+        self.startup.mark('server_ready')
+        self._load_app()
 
-        try:
-            health_url = f"http://{self.host}:{self.port}/health"
-            with urllib.request.urlopen(health_url, timeout=0.5) as response:
-                if response.status != 200:
-                    return
-        except Exception:
+    def _server_start_failed(self, error=None):
+        self._server_failed = True
+        QMessageBox.critical(
+            self,
+            'Server Error',
+            'VoiceFlow failed to start the local server.\n'
+            + (f'{error}\n' if error else '')
+            + 'Please restart the app. If the issue persists, rebuild with console=True to see errors.'
+        )
+
+    def _check_server_started(self):
+        if 'server_ready' not in self.startup.marks and not self._server_failed:
+            self._server_start_failed()
+
+    def _page_loaded(self, ok):
+        """Shell or app page finished loading: hand it the current model state"""
+        if not ok:
             return
+        if self.browser.url().toString().startswith(self.url):
+            # The real UI is usable from here; features still gated on their models show as loading
+            self.startup.mark('interactive')
+            self.startup.save(self.startup_report_path)
+        else:
+            self.startup.mark('shell_loaded')
+        self._push_model_state(self._warmup_status or get_model_warmup().get_status())
 
-        self._startup_timer.stop()
-        self._load_app()
+    def _warmup_changed(self, status):
+        """Warmup progress (UI thread): record milestones and stream the state into the page"""
+        self._warmup_status = status
+        for key, entry in status['models'].items():
+            if entry['required'] and entry['state'] == 'warm':
+                self.startup.mark(f'{key}_warm')
+        if status['ready']:
+            self.startup.mark('models_ready')
+            self.startup.save(self.startup_report_path)
+        self._push_model_state(status)
+
+    def _push_model_state(self, status):
+        self.browser.page().runJavaScript(
+            f"window.voiceflowModelState && window.voiceflowModelState({json.dumps(status)});"
+        )
     
     def _quit_app(self):
         """Quit application"""
@@ -425,6 +596,10 @@ class VoiceFlowWebPage(QWebEnginePage):
 
 def main():
     """Main entry point for desktop app"""
+    # Warm every model in the background, all at once, rather than on the first request
+    os.environ.setdefault('VOICEFLOW_WARMUP_MODELS', 'all')
+    os.environ.setdefault('VOICEFLOW_WARMUP_CONCURRENCY', str(len(get_model_manager().MODELS)))
+
     app = QApplication(sys.argv)
     app.setApplicationName("VoiceFlow")
     
@@ -475,4 +650,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # The frozen build re-runs this executable for pyttsx3 worker processes
+    multiprocessing.freeze_support()
     main()
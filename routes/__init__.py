@@ -1,3 +1,6 @@
 from .tts_route import tts_bp
 from .stt_route import stt_bp
-from .voice_list import voice_list_bp
\ No newline at end of file
+from .voice_list import voice_list_bp
+from .profiling_route import profiling_bp
+from .s2st_route import s2st_bp
+from .stt_batch_route import stt_batch_bp
@@ -0,0 +1,93 @@
+from flask import Blueprint, Response, g, jsonify, request, send_file
+from utils.profiling import PROFILE_MODES, get_request_profiler, requested_mode
+
+# Endpoints that take part in random sampling (VOICEFLOW_PROFILE_SAMPLE_RATE)
+SAMPLED_ENDPOINTS = ('/tts', '/stt', '/s2st')
+
+profiling_bp = Blueprint("profiling", __name__)
+
+
+@profiling_bp.before_app_request
+def start_profile():
+    profiler = get_request_profiler()
+    if not profiler.config.enabled or request.path.startswith('/profiles'):
+        return
+    # The header carries a mode ('sample'/'trace') or, when VOICEFLOW_PROFILING_TOKEN is set, the token
+    header = request.headers.get('X-VoiceFlow-Profile')
+    # ?profile= only opts in with a mode: other values are not meant for the profiler
+    requested = requested_mode(request.args.get('profile')) or (
+        header if header in PROFILE_MODES else header and 'sample')
+    mode = profiler.wants_profile(
+        requested,
+        header or request.args.get('profile_token'),
+        request.path in SAMPLED_ENDPOINTS
+    )
+    if mode:
+        g.profile_session = profiler.begin(mode, f"{request.method} {request.path}")
+
+
+@profiling_bp.after_app_request
+def finish_profile(response):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        profiler = get_request_profiler()
+        response.headers['X-VoiceFlow-Profile-Id'] = session.id
+        response.headers['X-VoiceFlow-Profile-Url'] = f"/profiles/{session.id}"
+        if response.is_streamed:
+            # Streamed bodies (/s2st, /stt/batch) do their work after this hook; the
+            # server iterates them on the same thread, so the session keeps sampling it
+            response.call_on_close(lambda: profiler.end(session))
+        else:
+            profiler.end(session)
+    return response
+
+
+@profiling_bp.teardown_app_request
+def abandon_profile(_exc):
+    # after_request is skipped for unhandled errors; still stop the sampler and free the slot
+    session = g.pop('profile_session', None)
+    if session is not None:
+        get_request_profiler().end(session)
+
+
+def _profile_access_error(profiler):
+    """Error response when profiles are off or the request lacks VOICEFLOW_PROFILING_TOKEN, else None"""
+    if not profiler.config.enabled:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    token = request.headers.get('X-VoiceFlow-Profile') or request.args.get('profile_token')
+    if not profiler.authorized(token):
+        return jsonify({'error': 'Profiling token required'}), 403
+    return None
+
+
+@profiling_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    profiler = get_request_profiler()
+    error = _profile_access_error(profiler)
+    if error:
+        return error
+    return jsonify({'profiles': profiler.store.list()})
+
+
+@profiling_bp.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Profile JSON; ?format=folded returns flame-graph input, ?format=pstats the cProfile dump"""
+    profiler = get_request_profiler()
+    error = _profile_access_error(profiler)
+    if error:
+        return error
+    profile = profiler.store.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+
+    output = request.args.get('format', 'json')
+    if output == 'folded':
+        if 'folded' not in profile:
+            return jsonify({'error': 'Profile has no stack samples (recorded in trace mode)'}), 404
+        return Response(profile['folded'], mimetype='text/plain')
+    if output == 'pstats':
+        path = profiler.store.pstats_path(profile_id)
+        if path is None:
+            return jsonify({'error': 'Profile has no pstats data (recorded in sample mode)'}), 404
+        return send_file(path, as_attachment=True, download_name=f"{profile_id}.pstats")
+    return jsonify(profile)
@@ -0,0 +1,161 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+import base64
+import json
+import queue
+import threading
+import time
+from utils.audio_io import MAX_UPLOAD_BYTES, AudioLimitExceeded, UnsupportedAudioFormat
+from utils.metrics import record_error
+from utils.speech_synthesis import synthesize_wav
+from utils.text_translator import split_sentences, translate
+from .stt_route import (SPEECH_TRANSLATION, SPEECH_TRANSLATION_MODES, WHISPER_LANGUAGES, decode_upload,
+                        check_profile, ensure_ffmpeg_available, get_whisper_model, open_upload, transcribe,
+                        upload_too_large, whisper_task)
+from .tts_route import LANGUAGE_CODE
+
+s2st_bp = Blueprint("s2st_route", __name__)
+
+
+def _line(payload):
+    return json.dumps(payload, ensure_ascii=False) + '\n'
+
+
+def _translate_sentences(sentences, src_lang, tgt_lang, results, cancelled):
+    """Translate sentences in order, handing each to the synthesis loop as soon as it is done"""
+    for index, sentence in enumerate(sentences):
+        if cancelled.is_set():
+            break
+        try:
+            translated = translate(sentence, src_lang, tgt_lang, route='s2st')
+        except Exception as translate_error:
+            # Same fallback as /tts: speak the source text
+            record_error('translate', translate_error)
+            translated = sentence
+        results.put((index, sentence, translated))
+    results.put(None)
+
+
+@s2st_bp.route('/s2st', methods=['POST'])
+def speech_to_speech():
+    """
+    Speech-to-speech translation in one request
+
+    Takes the same upload as /stt (fields: src_language, tgt_language,
+    gender, translation, decoding_profile), transcribes it, then translates and synthesizes it
+    sentence by sentence. Speech into English is translated by Whisper in
+    the same decode unless translation=nllb. Translation of the next sentence runs while the current one
+    is synthesized. The response is NDJSON: a 'transcript' line, one
+    'audio' line per sentence (base64 WAV) as soon as it is ready, then 'done'.
+    """
+    started = time.perf_counter()
+    try:
+        if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+            return upload_too_large()
+
+        try:
+            upload, suffix, params = open_upload('s2st')
+        except UnsupportedAudioFormat as format_error:
+            return jsonify({'error': str(format_error)}), 415
+        src_language = params.get('src_language', 'english')
+        tgt_language = params.get('tgt_language', 'english')
+        gender_preference = params.get('gender', 'any').lower()
+
+        if upload is None:
+            return jsonify({'error': 'No audio file received'}), 400
+        if src_language not in WHISPER_LANGUAGES or tgt_language not in LANGUAGE_CODE:
+            return jsonify({'error': 'Unsupported language selection'}), 400
+        mode = params.get('translation') or SPEECH_TRANSLATION
+        if mode not in SPEECH_TRANSLATION_MODES:
+            return jsonify({'error': f'translation must be one of {", ".join(SPEECH_TRANSLATION_MODES)}'}), 400
+        task = whisper_task(src_language, tgt_language, mode)
+        try:
+            profile = check_profile(params.get('decoding_profile'))
+        except ValueError as profile_error:
+            return jsonify({'error': str(profile_error)}), 400
+
+        try:
+            model = get_whisper_model()
+            ensure_ffmpeg_available()
+        except Exception as model_error:
+            return jsonify({'error': f'Speech recognition unavailable: {str(model_error)}'}), 503
+
+        try:
+            audio = decode_upload(upload, suffix, route='s2st')
+        except AudioLimitExceeded as limit_error:
+            record_error('s2st', limit_error)
+            return upload_too_large(str(limit_error))
+        except RuntimeError as decode_error:
+            record_error('s2st', decode_error)
+            return jsonify({'error': f'Could not decode audio: {str(decode_error)}'}), 400
+        if audio is None:
+            return jsonify({'error': 'Audio recording too short. Please record for at least 2-3 seconds.'}), 400
+
+        result = transcribe(model, audio, WHISPER_LANGUAGES[src_language], route='s2st', task=task,
+                            profile=profile)
+        text = result['text'].strip()
+        # Whisper already produced English, so the sentences skip NLLB
+        text_language = 'english' if task == 'translate' else src_language
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        record_error('s2st', e)
+        return jsonify({'error': f'S2ST Error: {str(e)}'}), 500
+
+    sentences = split_sentences(text)
+
+    def generate():
+        yield _line({
+            'type': 'transcript',
+            'text': text,
+            'language': text_language,
+            'translated_by': 'whisper' if task == 'translate' else None,
+            'decoding_profile': result['decoding_profile'],
+            'sentences': len(sentences)
+        })
+
+        results = queue.Queue()
+        cancelled = threading.Event()
+        translator_thread = threading.Thread(
+            target=_translate_sentences,
+            args=(sentences, LANGUAGE_CODE[text_language], LANGUAGE_CODE[tgt_language], results, cancelled),
+            name='s2st-translate',
+            daemon=True
+        )
+        translator_thread.start()
+
+        translated_parts = []
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                index, sentence, translated = item
+                translated_parts.append(translated)
+                try:
+                    wav, synthesis = synthesize_wav(translated, tgt_language, gender_preference, route='s2st')
+                except Exception as tts_error:
+                    record_error('s2st', tts_error)
+                    yield _line({'type': 'error', 'index': index, 'error': f'TTS Error: {str(tts_error)}'})
+                    continue
+                yield _line({
+                    'type': 'audio',
+                    'index': index,
+                    'text': sentence,
+                    'translated_text': translated,
+                    'voice_used': synthesis['voice_used'],
+                    'mimetype': 'audio/wav',
+                    'audio': base64.b64encode(wav).decode('ascii')
+                })
+            yield _line({
+                'type': 'done',
+                'translated_text': ' '.join(translated_parts),
+                'language_selected': LANGUAGE_CODE[tgt_language],
+                'elapsed_seconds': round(time.perf_counter() - started, 3)
+            })
+        finally:
+            # Client went away or synthesis failed hard: stop translating the rest
+            cancelled.set()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,345 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+import io
+import json
+import os
+import queue
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_io import (WHISPER_SAMPLE_RATE, MAX_UPLOAD_BYTES, PCM_SUFFIX, UnsupportedAudioFormat,
+                            check_pcm_format, iter_chunks, trim_silence)
+from utils.decoding_profiles import check_profile, choose_profile
+from utils.metrics import record_error, stage
+from utils.text_translator import translate
+from .stt_route import (SPEECH_TRANSLATION, SPEECH_TRANSLATION_MODES, WHISPER_LANGUAGES, _upload_suffix,
+                        decode_upload, ensure_ffmpeg_available, get_whisper_model, supports_batching,
+                        transcribe, transcribe_batch, upload_too_large, whisper_task)
+from .tts_route import LANGUAGE_CODE
+
+stt_batch_bp = Blueprint("stt_batch_route", __name__)
+
+# Limit for a whole batch request; each file is still held to MAX_UPLOAD_BYTES and MAX_AUDIO_SECONDS
+MAX_BATCH_BYTES = int(float(os.environ.get('VOICEFLOW_MAX_BATCH_MB', '500')) * 1024 * 1024)
+MAX_BATCH_FILES = int(os.environ.get('VOICEFLOW_MAX_BATCH_FILES', '200'))
+# ffmpeg processes decoding at once
+DECODE_WORKERS = int(os.environ.get('VOICEFLOW_BATCH_DECODE_WORKERS', str(os.cpu_count() or 1)))
+# Clips per batched Whisper pass
+WHISPER_BATCH_SIZE = int(os.environ.get('VOICEFLOW_WHISPER_BATCH_SIZE', '8'))
+
+# Clips up to one Whisper window go through transcribe_batch(); longer ones through transcribe()
+BATCH_CLIP_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+ZIP_MIMETYPES = ('application/zip', 'application/x-zip-compressed')
+
+
+class _BatchFile:
+    """One file of a batch: how to open it, or why it was rejected before decoding"""
+
+    def __init__(self, filename, suffix='', opener=None, error=None):
+        self.filename = filename
+        self.suffix = suffix
+        self.opener = opener
+        self.error = error
+
+
+def _line(payload):
+    return json.dumps(payload, ensure_ascii=False) + '\n'
+
+
+def _is_zip(filename, mimetype):
+    return mimetype in ZIP_MIMETYPES or (filename or '').lower().endswith('.zip')
+
+
+def _zip_files(fileobj):
+    """
+    List the audio files in a ZIP archive; members are decompressed only when decoded
+
+    Raises:
+        ValueError: Not a ZIP archive
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError('Not a valid ZIP archive')
+    files = []
+    for info in archive.infolist():
+        basename = os.path.basename(info.filename)
+        # Skip folders and the metadata macOS and editors add to archives
+        if info.is_dir() or info.filename.startswith('__MACOSX/') or basename.startswith('.'):
+            continue
+        if info.file_size > MAX_UPLOAD_BYTES:
+            files.append(_BatchFile(info.filename, error=(
+                f'File is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit')))
+            continue
+        files.append(_BatchFile(info.filename, _upload_suffix(info.filename, None),
+                                opener=lambda info=info: archive.open(info)))
+    return files
+
+
+def _collect_files(owned):
+    """
+    Find the files of a batch request without decoding them
+
+    Accepts a multipart form with any number of files (ZIP archives among
+    them are expanded), or a ZIP archive as the raw request body.
+
+    Args:
+        owned: Collects the file objects the batch has to close itself
+
+    Returns:
+        (list of _BatchFile, params holding the other fields)
+
+    Raises:
+        ValueError: A ZIP archive could not be read
+    """
+    if request.mimetype in ZIP_MIMETYPES:
+        # zipfile needs to seek, so the body is spooled to disk in chunks
+        spool = tempfile.TemporaryFile()
+        owned.append(spool)
+        with stage('stt_batch', 'upload_read'):
+            for chunk in iter_chunks(request.stream):
+                spool.write(chunk)
+        return _zip_files(spool), request.args
+
+    with stage('stt_batch', 'upload_read'):
+        uploads = [upload for key in request.files for upload in request.files.getlist(key)]
+    files = []
+    for upload in uploads:
+        # The request closes its files once the view returns, before the response
+        # has streamed, so the batch takes the upload streams over
+        stream = upload.stream
+        upload.stream = io.BytesIO()
+        owned.append(stream)
+        if _is_zip(upload.filename, upload.mimetype):
+            files.extend(_zip_files(stream))
+            continue
+        filename = upload.filename or f'file{len(files) + 1}'
+        suffix = _upload_suffix(upload.filename, upload.mimetype)
+        try:
+            if suffix == PCM_SUFFIX:
+                check_pcm_format(upload.mimetype_params)
+        except UnsupportedAudioFormat as format_error:
+            files.append(_BatchFile(filename, error=str(format_error)))
+            continue
+        files.append(_BatchFile(filename, suffix, opener=lambda stream=stream: stream))
+    return files, request.form
+
+
+def _close_all(file_objects):
+    for file_object in file_objects:
+        file_object.close()
+
+
+def _decode_file(index, batch_file, decoded):
+    """Decode and trim one file on a decode thread, then queue (index, audio seconds, speech, error)"""
+    try:
+        stream = batch_file.opener()
+        try:
+            audio = decode_upload(stream, batch_file.suffix, route='stt_batch')
+        finally:
+            stream.close()
+        if audio is None:
+            raise ValueError('Audio too short to hold speech')
+        with stage('stt_batch', 'vad'):
+            speech = trim_silence(audio)
+        decoded.put((index, len(audio) / WHISPER_SAMPLE_RATE, speech, None))
+    except Exception as exc:
+        record_error('stt_batch', exc)
+        decoded.put((index, None, None, str(exc)))
+
+
+def _transcribe_files(files, model, language, tgt_language, task, requested_profile, started):
+    """
+    Generator behind /stt/batch: decode in parallel, transcribe in batches, yield NDJSON lines
+
+    Every time Whisper is free it takes all clips decoded so far, so batches
+    grow when decoding runs ahead of transcription.
+    """
+    from utils.model_server import RemoteWhisperModel
+
+    whisper_lang = WHISPER_LANGUAGES[language]
+    # The model server only offers single-clip transcribe
+    can_batch = not isinstance(model, RemoteWhisperModel)
+
+    def finish(index, text, audio_seconds, speech_seconds, profile, batched):
+        payload = {
+            'type': 'result',
+            'index': index,
+            'filename': files[index].filename,
+            'text': text,
+            'duration_seconds': round(audio_seconds, 2),
+            'speech_seconds': round(speech_seconds, 2),
+            'decoding_profile': profile,
+            'batched': batched
+        }
+        if text and tgt_language != language:
+            if task == 'transcribe':
+                payload['text'] = translate(text, LANGUAGE_CODE[language], LANGUAGE_CODE[tgt_language],
+                                            route='stt_batch')
+            payload.update(language=tgt_language, translated_by='whisper' if task == 'translate' else 'nllb')
+        return _line(payload)
+
+    def transcribe_one(index, audio_seconds, speech, profile):
+        result = transcribe(model, speech, whisper_lang, route='stt_batch', task=task, profile=profile)
+        return finish(index, result['text'].strip(), audio_seconds, len(speech) / WHISPER_SAMPLE_RATE,
+                      result['decoding_profile'], False)
+
+    decoded = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=max(1, DECODE_WORKERS), thread_name_prefix='stt-batch-decode')
+    errors = 0
+    try:
+        yield _line({'type': 'accepted', 'files': len(files)})
+        for index, batch_file in enumerate(files):
+            if batch_file.error:
+                decoded.put((index, None, None, batch_file.error))
+            else:
+                executor.submit(_decode_file, index, batch_file, decoded)
+
+        remaining = len(files)
+        while remaining:
+            ready = [decoded.get()]
+            while True:
+                try:
+                    ready.append(decoded.get_nowait())
+                except queue.Empty:
+                    break
+            remaining -= len(ready)
+
+            # Clips for batched decoding, grouped by the profile picked for each
+            groups = {}
+            for index, audio_seconds, speech, error in ready:
+                if error:
+                    errors += 1
+                    yield _line({'type': 'error', 'index': index, 'filename': files[index].filename,
+                                 'error': error})
+                    continue
+                speech_seconds = len(speech) / WHISPER_SAMPLE_RATE
+                if not len(speech):
+                    yield finish(index, '', audio_seconds, 0.0, None, False)
+                    continue
+                try:
+                    if can_batch and len(speech) <= BATCH_CLIP_SAMPLES:
+                        profile, _reason = choose_profile(requested_profile, speech_seconds)
+                        if supports_batching(profile):
+                            groups.setdefault(profile, []).append((index, audio_seconds, speech))
+                            continue
+                        yield transcribe_one(index, audio_seconds, speech, profile)
+                    else:
+                        yield transcribe_one(index, audio_seconds, speech, requested_profile)
+                except Exception as exc:
+                    record_error('stt_batch', exc)
+                    errors += 1
+                    yield _line({'type': 'error', 'index': index, 'filename': files[index].filename,
+                                 'error': f'Recognition error: {str(exc)}'})
+
+            for profile, clips in groups.items():
+                for start in range(0, len(clips), max(1, WHISPER_BATCH_SIZE)):
+                    batch = clips[start:start + max(1, WHISPER_BATCH_SIZE)]
+                    try:
+                        texts = transcribe_batch(model, [speech for _, _, speech in batch], whisper_lang,
+                                                 profile, route='stt_batch', task=task)
+                    except Exception as exc:
+                        record_error('stt_batch', exc)
+                        texts = [None] * len(batch)
+                    for (index, audio_seconds, speech), text in zip(batch, texts):
+                        try:
+                            if text is None:
+                                # Low confidence: whisper's temperature fallback, on this clip alone
+                                yield transcribe_one(index, audio_seconds, speech, profile)
+                            else:
+                                yield finish(index, text, audio_seconds, len(speech) / WHISPER_SAMPLE_RATE,
+                                             profile, True)
+                        except Exception as exc:
+                            record_error('stt_batch', exc)
+                            errors += 1
+                            yield _line({'type': 'error', 'index': index, 'filename': files[index].filename,
+                                         'error': f'Recognition error: {str(exc)}'})
+
+        yield _line({
+            'type': 'done',
+            'files': len(files),
+            'errors': errors,
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        })
+    finally:
+        # Client went away: drop decodes that have not started
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@stt_batch_bp.route('/stt/batch', methods=['POST'])
+def speech_to_text_batch():
+    """
+    Transcribe many files in one request
+
+    Takes a multipart form with any number of audio files and/or ZIP
+    archives, or a ZIP archive as the raw body (Content-Type
+    application/zip, fields in the query). Fields as for /stt: language,
+    tgt_language, translation, decoding_profile. Files are decoded in parallel,
+    leading and trailing silence is trimmed, and clips up to 30 s are
+    transcribed in batches. The response is NDJSON: 'accepted', then one
+    'result' or 'error' line per file in completion order, then 'done'.
+    """
+    started = time.perf_counter()
+    owned = []
+    try:
+        # Batches get their own size limit instead of the single-upload one
+        request.max_content_length = MAX_BATCH_BYTES
+        if request.content_length is not None and request.content_length > MAX_BATCH_BYTES:
+            return upload_too_large(f'Batch is larger than the {MAX_BATCH_BYTES // (1024 * 1024)} MB limit')
+
+        try:
+            files, params = _collect_files(owned)
+        except ValueError as archive_error:
+            return jsonify({'error': str(archive_error)}), 400
+        if not files:
+            return jsonify({'error': 'No audio files received'}), 400
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'A batch can hold at most {MAX_BATCH_FILES} files'}), 400
+
+        language = params.get('language', 'english')
+        if language not in WHISPER_LANGUAGES:
+            return jsonify({'error': 'Unsupported language'}), 400
+        tgt_language = params.get('tgt_language') or language
+        if tgt_language not in (language, 'english'):
+            return jsonify({'error': 'STT can only translate to English; use /s2st for other languages'}), 400
+        mode = params.get('translation') or SPEECH_TRANSLATION
+        if mode not in SPEECH_TRANSLATION_MODES:
+            return jsonify({'error': f'translation must be one of {", ".join(SPEECH_TRANSLATION_MODES)}'}), 400
+        task = whisper_task(language, tgt_language, mode)
+        try:
+            profile = check_profile(params.get('decoding_profile'))
+        except ValueError as profile_error:
+            return jsonify({'error': str(profile_error)}), 400
+
+        try:
+            model = get_whisper_model()
+        except Exception as model_error:
+            return jsonify({
+                'error': f'Whisper model unavailable: {str(model_error)}. Please download models first.'
+            }), 503
+        try:
+            ensure_ffmpeg_available()
+        except Exception as ffmpeg_error:
+            return jsonify({
+                'error': f'ffmpeg missing: {str(ffmpeg_error)}. Please rebuild with bundled ffmpeg.'
+            }), 503
+
+        def generate(owned):
+            try:
+                yield from _transcribe_files(files, model, language, tgt_language, task, profile, started)
+            finally:
+                _close_all(owned)
+
+        response = Response(stream_with_context(generate(owned)), mimetype='application/x-ndjson')
+        owned = []  # closed by the stream from here on
+        return response
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        record_error('stt_batch', e)
+        return jsonify({'error': f'STT Error: {str(e)}'}), 500
+    finally:
+        _close_all(owned)
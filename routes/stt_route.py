@@ -1,10 +1,17 @@
 from flask import Blueprint, request, jsonify
-import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+import itertools
 import os
+from contextlib import nullcontext
 from utils.model_manager import get_model_manager
-
-# Whisper model loaded on-demand (lazy loading)
-whisper_model = None
+from utils.audio_io import (WHISPER_SAMPLE_RATE, MAX_AUDIO_SECONDS, MAX_UPLOAD_BYTES, PCM_MIMETYPE, PCM_SUFFIX,
+                            AudioLimitExceeded, UnsupportedAudioFormat, check_pcm_format,
+                            decode_audio_stream, iter_chunks)
+from utils.decoding_profiles import check_profile, choose_profile, decoding_options
+from utils.metrics import inference, record_error, stage
+from utils.profiling import profile_ops
+from utils.text_translator import translate
+from .tts_route import LANGUAGE_CODE
 
 _ffmpeg_ready = False
 
@@ -27,14 +34,147 @@ def ensure_ffmpeg_available():
         raise RuntimeError(f"ffmpeg not available: {exc}")
 
 def get_whisper_model():
-    """Get Whisper model, loading it if needed"""
-    global whisper_model
-    if whisper_model is None:
-        print("Loading Whisper model...")
-        manager = get_model_manager()
-        whisper_model = manager.load_whisper_model()
-        print("Whisper model loaded successfully!")
-    return whisper_model
+    """Get Whisper model, loading it if needed (single-flight via ModelManager)"""
+    from utils.model_server import RemoteWhisperModel, get_model_client
+
+    client = get_model_client()
+    if client is not None and client.serves('whisper'):
+        # Audio is decoded here; only inference runs in the model server
+        return RemoteWhisperModel(client)
+    manager = get_model_manager()
+    return manager.load_whisper_model()
+
+
+# How speech in another language becomes English text: 'whisper' translates in the
+# same decode (no NLLB load or pass), 'nllb' transcribes and then translates the text
+SPEECH_TRANSLATION_MODES = ('whisper', 'nllb')
+SPEECH_TRANSLATION = os.environ.get('VOICEFLOW_SPEECH_TRANSLATION', 'whisper').strip().lower()
+
+
+def whisper_task(src_language, tgt_language, mode=None):
+    """
+    Pick the Whisper task for a request
+
+    Whisper can only translate into English, so every other target
+    still goes through transcription and NLLB.
+
+    Args:
+        src_language: Spoken language ('english', 'russian', 'kazakh')
+        tgt_language: Wanted text language, or None for a plain transcript
+        mode: 'whisper' or 'nllb'; defaults to VOICEFLOW_SPEECH_TRANSLATION
+
+    Returns:
+        'translate' or 'transcribe'
+    """
+    if tgt_language == 'english' and src_language != 'english' and (mode or SPEECH_TRANSLATION) == 'whisper':
+        return 'translate'
+    return 'transcribe'
+
+
+def transcribe(model, audio, language, route='stt', task='transcribe', profile=None):
+    """
+    Run Whisper on decoded audio; local models run one request at a time
+
+    Args:
+        profile: Decoding profile name from the request, or None to let
+            choose_profile() pick one from the clip length and current load
+
+    Returns:
+        whisper's result dict, plus 'decoding_profile'
+    """
+    from utils.model_server import RemoteWhisperModel
+
+    profile, reason = choose_profile(profile, len(audio) / WHISPER_SAMPLE_RATE)
+    # The model server queues requests and tracks its models itself
+    if isinstance(model, RemoteWhisperModel):
+        lock = in_use = nullcontext()
+    else:
+        lock = get_model_manager().whisper_lock
+        in_use = get_model_manager().model_in_use('whisper')
+    # Kept apart from the NLLB 'translate' stage so the two paths can be compared
+    stage_name = 'speech_translate' if task == 'translate' else 'transcribe'
+    with stage(route, stage_name), inference('whisper'), profile_ops(f'whisper.{task}'), in_use, lock:
+        result = model.transcribe(
+            audio,
+            language=language,
+            task=task,
+            fp16=False,  # Better compatibility
+            **decoding_options(profile)
+        )
+    result['decoding_profile'] = profile
+    return result
+
+
+def supports_batching(profile):
+    """
+    Whether transcribe_batch() can run a profile
+
+    whisper.decode() only repeats the text tokens per beam, not the audio
+    features, so beam search is broken for batches of more than one clip.
+    """
+    return decoding_options(profile)['beam_size'] is None
+
+
+def transcribe_batch(model, clips, language, profile, route='stt', task='transcribe'):
+    """
+    Decode several clips of at most 30 s in one batched Whisper pass
+
+    Runs the profile's first temperature only, greedily (see
+    supports_batching()). Clips whose result would trigger transcribe()'s
+    temperature fallback come back as None, so the caller can send them
+    through transcribe() one by one.
+
+    Args:
+        model: Local whisper model (not RemoteWhisperModel)
+        clips: 16 kHz float32 arrays, none longer than whisper.audio.N_SAMPLES
+        profile: Decoding profile name, applied to every clip
+
+    Returns:
+        List with the text of each clip ('' for no speech), or None where fallback is needed
+    """
+    import numpy as np
+    import torch
+    import whisper
+    from whisper.audio import log_mel_spectrogram, pad_or_trim
+
+    if not supports_batching(profile):
+        raise ValueError(f"Decoding profile {profile!r} uses beam search, which cannot be batched")
+    options = decoding_options(profile)
+    temperatures = options['temperature'] if isinstance(options['temperature'], (list, tuple)) \
+        else (options['temperature'],)
+    temperature = temperatures[0]
+    decode_options = whisper.DecodingOptions(
+        task=task,
+        language=language,
+        temperature=temperature,
+        without_timestamps=True,
+        fp16=False
+    )
+
+    mel = torch.stack([
+        log_mel_spectrogram(pad_or_trim(torch.from_numpy(np.ascontiguousarray(clip))), model.dims.n_mels)
+        for clip in clips
+    ]).to(model.device)
+    stage_name = 'speech_translate' if task == 'translate' else 'transcribe'
+    manager = get_model_manager()
+    with stage(route, stage_name), inference('whisper'), profile_ops(f'whisper.{task}.batch'), \
+            manager.model_in_use('whisper'), manager.whisper_lock:
+        results = whisper.decode(model, mel, decode_options)
+
+    texts = []
+    can_fall_back = len(temperatures) > 1
+    for result in results:
+        low_confidence = (options['logprob_threshold'] is not None
+                          and result.avg_logprob < options['logprob_threshold'])
+        if (options['no_speech_threshold'] is not None and low_confidence
+                and result.no_speech_prob > options['no_speech_threshold']):
+            texts.append('')
+        elif can_fall_back and (low_confidence or result.compression_ratio > options['compression_ratio_threshold']):
+            texts.append(None)
+        else:
+            texts.append(result.text.strip())
+    return texts
+
 
 WHISPER_LANGUAGES = {
     'english': 'en',
@@ -42,87 +182,189 @@ WHISPER_LANGUAGES = {
     'kazakh': 'kk'
 }
 
+# Reduced minimum for Whisper
+MIN_AUDIO_BYTES = 1000
+
 stt_bp = Blueprint("stt_route", __name__)
 
+def upload_too_large(message=None):
+    message = message or f'Upload is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit'
+    return jsonify({'error': message}), 413
+
+
+def _upload_suffix(filename, mime_type):
+    """Audio suffix from the filename or mimetype"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext:
+        return ext
+    mime_type = (mime_type or '').lower()
+    if mime_type == PCM_MIMETYPE:
+        return PCM_SUFFIX
+    if 'wav' in mime_type:
+        return '.wav'
+    if 'ogg' in mime_type:
+        return '.ogg'
+    if 'mp4' in mime_type or 'm4a' in mime_type:
+        return '.m4a'
+    return '.webm'
+
+
+def open_upload(route='stt'):
+    """
+    Find the audio in the current request without reading it
+
+    Accepts a multipart form with an 'audio' file, or the raw audio as the
+    request body (Content-Type audio/*) with the other fields in the query.
+    Content-Type audio/pcm;rate=16000 marks raw 16 kHz mono PCM16, which is
+    used as-is instead of going through ffmpeg.
+
+    Returns:
+        (file-like stream or None, suffix, params holding the other fields)
+
+    Raises:
+        UnsupportedAudioFormat: audio/pcm at another rate or channel count
+    """
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        # Raw body: decoded straight off the socket, never buffered
+        suffix = _upload_suffix(request.args.get('filename'), request.mimetype)
+        if suffix == PCM_SUFFIX:
+            check_pcm_format(request.mimetype_params)
+        return request.stream, suffix, request.args
+
+    # Multipart: werkzeug spools files above 500 KB to disk while parsing
+    with stage(route, 'upload_read'):
+        audio_file = request.files.get('audio')
+    if not audio_file:
+        return None, '', request.form
+    suffix = _upload_suffix(audio_file.filename, audio_file.mimetype)
+    if suffix == PCM_SUFFIX:
+        check_pcm_format(audio_file.mimetype_params)
+    return audio_file.stream, suffix, request.form
+
+
+def decode_upload(upload, suffix, route='stt'):
+    """
+    Stream an upload through ffmpeg in bounded chunks; the limits stop it part-way
+
+    Returns:
+        16 kHz float32 audio, or None when the upload is too short to hold speech
+
+    Raises:
+        AudioLimitExceeded: Upload size or audio duration over the limits
+        RuntimeError: ffmpeg could not decode the upload
+    """
+    # Only the first chunk is read up front, to reject empty recordings early
+    head = upload.read(MIN_AUDIO_BYTES)
+    if len(head) < MIN_AUDIO_BYTES:
+        return None
+    with stage(route, 'decode'):
+        return decode_audio_stream(
+            itertools.chain([head], iter_chunks(upload)),
+            max_seconds=MAX_AUDIO_SECONDS,
+            max_bytes=MAX_UPLOAD_BYTES,
+            suffix=suffix
+        )
+
+
 @stt_bp.route('/stt', methods=['POST'])
 def speech_to_text():
+    """
+    Transcribe an upload: multipart form with an 'audio' file, or the raw
+    audio as the request body (Content-Type audio/*, ?language=...).
+    audio/pcm;rate=16000 bodies skip ffmpeg.
+
+    With tgt_language=english the text comes back in English (Whisper's own
+    translation, or NLLB with translation=nllb). decoding_profile=fast|balanced|accurate
+    picks the Whisper decoding profile; by default it follows clip length and load.
+    """
     try:
-        audio_file = request.files.get('audio')
-        language = request.form.get('language', 'english')
-        
-        if not audio_file:
+        # Checked before any of the body is read; MAX_CONTENT_LENGTH also cuts off chunked uploads
+        if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+            return upload_too_large()
+
+        try:
+            upload, suffix, params = open_upload()
+        except UnsupportedAudioFormat as format_error:
+            return jsonify({'error': str(format_error)}), 415
+        language = params.get('language', 'english')
+        if upload is None:
             return jsonify({'error': 'No audio file received'}), 400
-        
+
         if language not in WHISPER_LANGUAGES:
             return jsonify({'error': 'Unsupported language'}), 400
-        
-        # Check audio file size
-        audio_data = audio_file.read()
-        audio_size = len(audio_data)
-        
-        if audio_size < 1000:  # Reduced minimum for Whisper
+
+        tgt_language = params.get('tgt_language') or language
+        if tgt_language not in (language, 'english'):
+            return jsonify({'error': 'STT can only translate to English; use /s2st for other languages'}), 400
+        mode = params.get('translation') or SPEECH_TRANSLATION
+        if mode not in SPEECH_TRANSLATION_MODES:
+            return jsonify({'error': f'translation must be one of {", ".join(SPEECH_TRANSLATION_MODES)}'}), 400
+        task = whisper_task(language, tgt_language, mode)
+        try:
+            profile = check_profile(params.get('decoding_profile'))
+        except ValueError as profile_error:
+            return jsonify({'error': str(profile_error)}), 400
+
+        # Use Whisper to transcribe audio
+        whisper_lang = WHISPER_LANGUAGES[language]
+
+        # Get Whisper model (loads if not already loaded)
+        try:
+            model = get_whisper_model()
+        except Exception as model_error:
+            return jsonify({
+                'error': f'Whisper model unavailable: {str(model_error)}. Please download models first.'
+            }), 503
+
+        try:
+            ensure_ffmpeg_available()
+        except Exception as ffmpeg_error:
+            return jsonify({
+                'error': f'ffmpeg missing: {str(ffmpeg_error)}. Please rebuild with bundled ffmpeg.'
+            }), 503
+
+        try:
+            audio = decode_upload(upload, suffix)
+        except AudioLimitExceeded as limit_error:
+            record_error('stt', limit_error)
+            return upload_too_large(str(limit_error))
+        except RuntimeError as decode_error:
+            record_error('stt', decode_error)
+            return jsonify({'success': True, 'text': f"Recognition error: {str(decode_error)}"})
+
+        if audio is None:
             return jsonify({'error': f'Audio recording too short. Please record for at least 2-3 seconds.'}), 400
-        
-        # Determine audio suffix from filename or mimetype
-        mime_type = (audio_file.mimetype or '').lower()
-        filename = audio_file.filename or ''
-        ext = os.path.splitext(filename)[1].lower()
-        if not ext:
-            if 'wav' in mime_type:
-                ext = '.wav'
-            elif 'ogg' in mime_type:
-                ext = '.ogg'
-            else:
-                ext = '.webm'
-
-        # Save audio to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            temp_path = temp_file.name
-            temp_file.write(audio_data)
-            
+
+        translated_by = None
+        profile_used = None
         try:
-            # Use Whisper to transcribe audio
-            whisper_lang = WHISPER_LANGUAGES[language]
-            
-            # Get Whisper model (loads if not already loaded)
-            try:
-                model = get_whisper_model()
-            except Exception as model_error:
-                return jsonify({
-                    'error': f'Whisper model unavailable: {str(model_error)}. Please download models first.'
-                }), 503
-            
-            # Transcribe with Whisper (handles WebM format directly)
-            try:
-                ensure_ffmpeg_available()
-            except Exception as ffmpeg_error:
-                return jsonify({
-                    'error': f'ffmpeg missing: {str(ffmpeg_error)}. Please rebuild with bundled ffmpeg.'
-                }), 503
-
-            result = model.transcribe(
-                temp_path, 
-                language=whisper_lang,
-                fp16=False  # Better compatibility
-            )
-            
+            result = transcribe(model, audio, whisper_lang, task=task, profile=profile)
+            profile_used = result['decoding_profile']
+
             text = result["text"].strip()
-            
+
             if not text:
                 text = "No speech detected. Please speak clearly."
-            
+            elif tgt_language != language:
+                if task == 'translate':
+                    translated_by = 'whisper'
+                else:
+                    text = translate(text, LANGUAGE_CODE[language], LANGUAGE_CODE[tgt_language], route='stt')
+                    translated_by = 'nllb'
+
         except Exception as e:
+            record_error('stt', e)
             text = f"Recognition error: {str(e)}"
-        
-        finally:
-            # Clean up temp file
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except:
-                pass
-        
-        return jsonify({'success': True, 'text': text})
-        
+
+        response_data = {'success': True, 'text': text}
+        if profile_used:
+            response_data['decoding_profile'] = profile_used
+        if translated_by:
+            response_data.update(language=tgt_language, translated_by=translated_by)
+        return jsonify(response_data)
+
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        return jsonify({'error': f'STT Error: {str(e)}'}), 500
\ No newline at end of file
+        record_error('stt', e)
+        return jsonify({'error': f'STT Error: {str(e)}'}), 500
@@ -1,17 +1,14 @@
-from flask import Blueprint, request, jsonify, send_from_directory, url_for
-import pyttsx3
+from flask import Blueprint, request, jsonify, send_file, url_for
+import io
 import os
-import torch
-import scipy.io.wavfile
+import re
 import uuid
 from datetime import datetime
-from utils.text_translator import init_translator
-from utils.kk_speech_model import init_kk_tokenizer, init_kk_model
-from utils.detect_voice import detect_voice_gender
-
-# Create audio output directory if it doesn't exist
-AUDIO_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'audio')
-os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
+from utils.audio_storage import check_name, get_audio_storage
+from utils.resample import check_output_format, convert_wav, wav_format
+from utils.text_translator import translate
+from utils.speech_synthesis import synthesize_to_file
+from utils.metrics import record_error, stage
 
 LANGUAGE_CODE = {
     "english": "eng_Latn",
@@ -22,20 +19,112 @@ LANGUAGE_CODE = {
 tts_bp = Blueprint("tts_route", __name__)
 
 
+def _stored_audio_path(filename):
+    """Local copy of a clip from the audio storage (fetched from shared storage if needed), or None"""
+    try:
+        with stage('tts', 'fetch'):
+            return get_audio_storage().local_path(filename)
+    except ValueError:
+        return None
+
+
+# What _variant_name() appends to a clip's stem
+_VARIANT_SUFFIX = re.compile(r'_(\d+hz|\d+ch)$')
+
+
+def _variant_name(filename, sample_rate, channels):
+    """Storage name for a clip converted to another rate and/or channel count"""
+    stem, ext = os.path.splitext(filename)
+    if sample_rate is not None:
+        stem += f"_{sample_rate}hz"
+    if channels is not None:
+        stem += f"_{channels}ch"
+    return stem + ext
+
+
+def _store_variant(storage, filename, sample_rate, channels):
+    """Resample a stored clip and store the result next to it; returns the variant's name"""
+    variant = _variant_name(filename, sample_rate, channels)
+    with storage.local_copy(filename) as source_path:
+        if source_path is None:
+            raise FileNotFoundError(f'{filename} is no longer in the audio storage')
+        with stage('tts', 'resample'):
+            wav = convert_wav(source_path, sample_rate, channels)
+    staging_path = storage.staging_path(variant)
+    # Written aside and renamed, so a concurrent reader never sees half a file
+    tmp_path = os.path.join(os.path.dirname(staging_path), f".resample-{uuid.uuid4().hex[:8]}")
+    try:
+        with stage('tts', 'file_write'):
+            with open(tmp_path, 'wb') as f:
+                f.write(wav)
+        os.replace(tmp_path, staging_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    with stage('tts', 'store'):
+        storage.commit(variant)
+    return variant
+
+
+def _is_variant(filename):
+    """Whether a clip name is one _variant_name() made"""
+    return bool(_VARIANT_SUFFIX.search(os.path.splitext(filename)[0]))
+
+
+def _requested_audio(filename):
+    """
+    Clip for /audio and /download: the stored file, or the clip converted in
+    memory when the query asks for ?sample_rate= and/or ?channels=.
+    Conversions made here are not stored, so GET requests cannot fill the
+    audio storage.
+
+    Returns:
+        (path or file object, name), or (None, name) if the clip does not exist
+
+    Raises:
+        ValueError: Invalid sample_rate or channels, or the clip is already converted
+    """
+    sample_rate, channels = check_output_format(request.args.get('sample_rate'), request.args.get('channels'))
+    if sample_rate is None and channels is None:
+        return _stored_audio_path(filename), filename
+    try:
+        check_name(filename)
+    except ValueError:
+        return None, filename
+    # Converting a converted clip again would stack resampling losses
+    if _is_variant(filename):
+        raise ValueError('This clip is already converted; request the format from the original clip')
+    # Held in the cache until converted, so trimming cannot remove it mid-read
+    with get_audio_storage().local_copy(filename) as audio_path:
+        if audio_path is None:
+            return None, filename
+        with stage('tts', 'resample'):
+            wav = convert_wav(audio_path, sample_rate, channels)
+    return io.BytesIO(wav), _variant_name(filename, sample_rate, channels)
+
+
 @tts_bp.route('/audio/<path:filename>', methods=['GET'])
 def get_audio(filename):
-    audio_path = os.path.join(AUDIO_OUTPUT_DIR, filename)
-    if not os.path.isfile(audio_path):
+    try:
+        audio_path, _name = _requested_audio(filename)
+    except ValueError as format_error:
+        return jsonify({'error': str(format_error)}), 400
+    if audio_path is None:
         return jsonify({'error': 'Audio file not found'}), 404
-    return send_from_directory(AUDIO_OUTPUT_DIR, filename)
+    with stage('tts', 'serve'):
+        return send_file(audio_path, mimetype='audio/wav', conditional=True)
 
 
 @tts_bp.route('/download/<path:filename>', methods=['GET'])
 def download_audio(filename):
-    audio_path = os.path.join(AUDIO_OUTPUT_DIR, filename)
-    if not os.path.isfile(audio_path):
+    try:
+        audio_path, name = _requested_audio(filename)
+    except ValueError as format_error:
+        return jsonify({'error': str(format_error)}), 400
+    if audio_path is None:
         return jsonify({'error': 'Audio file not found'}), 404
-    return send_from_directory(AUDIO_OUTPUT_DIR, filename, as_attachment=True, download_name=filename)
+    with stage('tts', 'serve'):
+        return send_file(audio_path, mimetype='audio/wav', as_attachment=True, download_name=name)
 
 @tts_bp.route('/tts', methods=['POST'])
 def text_to_speech():
@@ -51,143 +140,78 @@ def text_to_speech():
             return jsonify({'error': 'Text cannot be empty'}), 400
         if src_language not in LANGUAGE_CODE or tgt_language not in LANGUAGE_CODE:
             return jsonify({'error': 'Unsupported language selection'}), 400
+        # Output format, e.g. 8000 Hz mono for telephony; by default the synthesizer's own
+        try:
+            sample_rate, channels = check_output_format(data.get('sample_rate'), data.get('channels'))
+        except ValueError as format_error:
+            return jsonify({'error': str(format_error)}), 400
         
         # Translate text to selected LANGUAGE_CODE[tgt_language]
         try:
-            if LANGUAGE_CODE[tgt_language] == LANGUAGE_CODE[src_language]:
-                translated_text = text
-            else:
-                translator = init_translator()
-                response = translator(text, src_lang=LANGUAGE_CODE[src_language], tgt_lang=LANGUAGE_CODE[tgt_language])
-                translated_text = response[0]["translation_text"]
-        except:
+            translated_text = translate(text, LANGUAGE_CODE[src_language], LANGUAGE_CODE[tgt_language])
+        except Exception as translate_error:
+            record_error('translate', translate_error)
             translated_text = text
-        
-        # Create new TTS engine for each request
+
+        # Generate unique filename
+        filename = f"tts_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
+        storage = get_audio_storage()
+        audio_file_path = storage.staging_path(filename)
+
+        # Kazakh uses the MMS-TTS model, other languages the pyttsx3 worker pool
         try:
-            if LANGUAGE_CODE[tgt_language] == 'kazakh':
-                # Use Kazakh TTS model
-                try:
-                    # Tokenize the translated text
-                    kazakh_tts_tokenizer = init_kk_tokenizer()
-                    inputs = kazakh_tts_tokenizer(translated_text, return_tensors="pt")
-                    
-                    # Generate speech
-                    with torch.no_grad():
-                        kazakh_tts_model = init_kk_model()
-                        output = kazakh_tts_model(**inputs).waveform
-                    
-                    # Generate unique filename
-                    filename = f"tts_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-                    audio_file_path = os.path.join(AUDIO_OUTPUT_DIR, filename)
-                    
-                    # Save to file
-                    scipy.io.wavfile.write(
-                        audio_file_path, 
-                        rate=kazakh_tts_model.config.sampling_rate, 
-                        data=output.cpu().numpy().squeeze()
-                    )
-
-                    if not os.path.exists(audio_file_path):
-                        return jsonify({'error': 'Failed to save audio file'}), 500
-                    
-                    return jsonify({
-                        'success': True, 
-                        'message': 'Speech generated successfully',
-                        'translated_text': translated_text,
-                        'voice_used': 'Kazakh MMS-TTS Model',
-                        'gender_used': gender_preference,
-                        'language_selected': LANGUAGE_CODE[tgt_language],
-                        'audio_url': url_for('tts_route.get_audio', filename=filename),
-                        'download_url': url_for('tts_route.download_audio', filename=filename),
-                        'audio_filename': filename
-                    })
-                except Exception as kaz_error:
-                    return jsonify({'error': f'Kazakh TTS Error: {str(kaz_error)}'}), 500
-
-            print(f"Initializing TTS engine for language: {tgt_language}")
-            engine = pyttsx3.init()
-            engine.setProperty('volume', 1.0)
-            
-            voices = engine.getProperty('voices')
-            selected_voice = None
-            gender_found = False
-            
-            # Select voice based on tgt_language and gender
-            if voices:
-                selected_voice = voices[0]  # Default English
-                
-                if LANGUAGE_CODE[tgt_language] == 'russian':
-                    # Look for Russian voice with gender preference
-                    matching_voices = []
-                    for voice in voices:
-                        if 'ru' in voice.id.lower() or 'russian' in voice.name.lower():
-                            matching_voices.append(voice)
-                    
-                    if matching_voices:
-                        selected_voice = matching_voices[0]
-                        # Try to match gender preference
-                        if gender_preference != 'any':
-                            for voice in matching_voices:
-                                voice_gender = detect_voice_gender(voice)
-                                if voice_gender == gender_preference:
-                                    selected_voice = voice
-                                    gender_found = True
-                                    break
-                    elif len(voices) > 1:
-                        selected_voice = voices[1]
-                
-                elif LANGUAGE_CODE[tgt_language] == 'english':
-                    # Filter English voices by gender
-                    if gender_preference != 'any':
-                        for voice in voices:
-                            voice_gender = detect_voice_gender(voice)
-                            if voice_gender == gender_preference:
-                                selected_voice = voice
-                                gender_found = True
-                                break
-                
-                engine.setProperty('voice', selected_voice.id)
-            
-            engine.setProperty('rate', 150)
-            
-            # Generate unique filename
-            filename = f"tts_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-            audio_file_path = os.path.join(AUDIO_OUTPUT_DIR, filename)
-            
-            # Save to file using pyttsx3
-            engine.save_to_file(translated_text, audio_file_path)
-            engine.runAndWait()
-
-            if not os.path.exists(audio_file_path):
-                return jsonify({'error': 'Failed to save audio file'}), 500
-            
-            # Clean up engine properly
-            try:
-                engine.stop()
-            except:
-                pass
-            del engine
-            
-            # Add warning if requested gender not found
-            response_data = {
-                'success': True, 
-                'message': 'Speech generated successfully',
-                'translated_text': translated_text,
-                'voice_used': selected_voice.name if voices else 'Default Voice',
-                'gender_used': gender_preference,
-                'language_selected': LANGUAGE_CODE[tgt_language],
-                'audio_url': url_for('tts_route.get_audio', filename=filename),
-                'download_url': url_for('tts_route.download_audio', filename=filename),
-                'audio_filename': filename
-            }
-            
-            if gender_preference != 'any' and not gender_found:
-                response_data['warning'] = f'No {gender_preference} voice available. Used default voice instead.'
-            
-            return jsonify(response_data)
+            synthesis = synthesize_to_file(translated_text, tgt_language, audio_file_path, gender_preference)
+        except TimeoutError as busy_error:
+            # Every synthesizer stayed busy: the client can retry later
+            record_error('tts', busy_error)
+            return jsonify({'error': f'TTS Engine Busy: {str(busy_error)}'}), 503
         except Exception as tts_error:
-            return jsonify({'error': f'TTS Engine Error: {str(tts_error)}'}), 500
-        
+            record_error('tts', tts_error)
+            prefix = 'Kazakh TTS Error' if tgt_language == 'kazakh' else 'TTS Engine Error'
+            return jsonify({'error': f'{prefix}: {str(tts_error)}'}), 500
+
+        if not os.path.exists(audio_file_path):
+            return jsonify({'error': 'Failed to save audio file'}), 500
+        output_rate, output_channels = wav_format(audio_file_path)
+
+        # Shared storage: upload so any node can serve the clip
+        try:
+            with stage('tts', 'store'):
+                storage.commit(filename)
+        except Exception as store_error:
+            record_error('tts', store_error)
+            return jsonify({'error': f'Failed to store audio file: {str(store_error)}'}), 500
+
+        # The synthesized clip is kept as well, so other formats are converted from the original
+        if sample_rate is not None or channels is not None:
+            try:
+                filename = _store_variant(storage, filename, sample_rate, channels)
+            except Exception as resample_error:
+                record_error('tts', resample_error)
+                return jsonify({'error': f'Failed to convert audio: {str(resample_error)}'}), 500
+            output_rate, output_channels = sample_rate or output_rate, channels or output_channels
+
+        response_data = {
+            'success': True,
+            'message': 'Speech generated successfully',
+            'translated_text': translated_text,
+            'voice_used': synthesis['voice_used'],
+            'gender_used': gender_preference,
+            'language_selected': LANGUAGE_CODE[tgt_language],
+            'audio_url': storage.url(filename) or url_for('tts_route.get_audio', filename=filename),
+            'download_url': (storage.url(filename, download=True)
+                             or url_for('tts_route.download_audio', filename=filename)),
+            'audio_filename': filename,
+            'sample_rate': output_rate,
+            'channels': output_channels
+        }
+
+        # Add warning if requested gender not found
+        if gender_preference != 'any' and not synthesis['gender_found']:
+            response_data['warning'] = f'No {gender_preference} voice available. Used default voice instead.'
+
+        return jsonify(response_data)
+
     except Exception as e:
+        record_error('tts', e)
         return jsonify({'error': f'Request Error: {str(e)}'}), 500
\ No newline at end of file
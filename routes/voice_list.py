@@ -1,5 +1,4 @@
 from flask import Blueprint, jsonify
-import pyttsx3
 
 voice_list_bp = Blueprint("voices", __name__)
 
@@ -7,6 +6,8 @@ voice_list_bp = Blueprint("voices", __name__)
 def list_voices():
     """Debug endpoint to list all available voices"""
     try:
+        import pyttsx3
+
         engine = pyttsx3.init()
         voices = engine.getProperty('voices')
         
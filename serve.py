@@ -0,0 +1,158 @@
+"""
+VoiceFlow production server
+Starts one or more model-server processes that own the loaded models, then
+several lightweight HTTP worker processes that talk to them over local IPC.
+HTTP concurrency scales without duplicating multi-GB models per worker.
+
+Usage:
+    python serve.py                                      # 1 model server, 4 HTTP workers on :5000
+    python serve.py --workers 8 --threads 4 --port 8000
+    python serve.py --model-groups whisper translator,kazakh_tts   # one model server per group
+    python serve.py --model-server-only --address 127.0.0.1:6001   # model server alone (set the authkey env)
+
+HTTP workers run under gunicorn when installed, otherwise waitress
+(one multi-threaded process), otherwise Flask's threaded server.
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import secrets
+import signal
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.model_server import (ModelClient, check_concurrency, format_address, parse_address,
+                                parse_server_routes, run_model_server)
+from utils.model_manager import ModelManager
+from utils.model_warmup import parse_warmup_models
+
+
+def _start_model_servers(groups, host, base_port, authkey, concurrency):
+    """Spawn one model-server process per model group; returns (processes, VOICEFLOW_MODEL_SERVER value)"""
+    ctx = multiprocessing.get_context('spawn')
+    warmup_env = os.environ.get('VOICEFLOW_WARMUP_MODELS')
+    warmup_models = parse_warmup_models(warmup_env) if warmup_env is not None else None
+
+    processes = []
+    entries = []
+    for index, models in enumerate(groups):
+        address = (host, base_port + index)
+        process = ctx.Process(
+            target=run_model_server,
+            args=(address, authkey, models, warmup_models, concurrency),
+            name=f"voiceflow-models-{index}",
+            daemon=False
+        )
+        process.start()
+        processes.append(process)
+        prefix = '+'.join(models) + '@' if len(groups) > 1 else ''
+        entries.append(prefix + format_address(address))
+    return processes, ','.join(entries)
+
+
+def _wait_for_model_servers(spec, authkey, timeout=60.0):
+    client = ModelClient(parse_server_routes(spec), authkey)
+    deadline = time.monotonic() + timeout
+    while True:
+        statuses = client.get_status()
+        if all('error' not in status for status in statuses.values()):
+            return
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Model servers did not start: {statuses}")
+        time.sleep(0.2)
+
+
+def _http_command(host, port, workers, threads):
+    """Pick the best available WSGI server"""
+    if os.name == 'posix' and importlib.util.find_spec('gunicorn'):
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                '--bind', f'{host}:{port}', '--timeout', '300', 'app:app']
+    if importlib.util.find_spec('waitress'):
+        print("gunicorn not available: serving with waitress in a single process")
+        return [sys.executable, '-m', 'waitress', f'--listen={host}:{port}',
+                f'--threads={workers * threads}', 'app:app']
+    print("Neither gunicorn nor waitress is installed: falling back to Flask's threaded server")
+    return [sys.executable, '-c',
+            f"from app import app; app.run(host={host!r}, port={port}, threaded=True)"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP bind address')
+    parser.add_argument('--port', type=int, default=5000, help='HTTP port')
+    parser.add_argument('--workers', type=int, default=4, help='HTTP worker processes')
+    parser.add_argument('--threads', type=int, default=2, help='Threads per HTTP worker')
+    parser.add_argument('--model-port', type=int, default=6001, help='First model-server port')
+    parser.add_argument('--model-groups', nargs='+',
+                        help='Comma-separated model keys per model server (default: one server with all models)')
+    parser.add_argument('--model-concurrency', type=int, default=1,
+                        help='Concurrent inference calls per model inside a model server')
+    parser.add_argument('--model-server-only', action='store_true',
+                        help='Run a single model server in the foreground (uses VOICEFLOW_MODEL_SERVER_AUTHKEY)')
+    parser.add_argument('--address', default='127.0.0.1:6001', help='Address for --model-server-only')
+    parser.add_argument('--models', help='Comma-separated models for --model-server-only (default: all)')
+    args = parser.parse_args()
+
+    if args.model_server_only:
+        authkey = os.environ.get('VOICEFLOW_MODEL_SERVER_AUTHKEY')
+        if not authkey:
+            parser.error('VOICEFLOW_MODEL_SERVER_AUTHKEY must be set (hex)')
+        models = [m.strip() for m in args.models.split(',')] if args.models else None
+        try:
+            check_concurrency(models or ModelManager.MODELS, args.model_concurrency)
+        except ValueError as exc:
+            parser.error(str(exc))
+        run_model_server(parse_address(args.address), bytes.fromhex(authkey), models,
+                         concurrency=args.model_concurrency)
+        return
+
+    groups = [[m.strip() for m in group.split(',') if m.strip()] for group in (args.model_groups or [])]
+    if not groups:
+        groups = [None]
+    try:
+        for models in groups:
+            check_concurrency(models or ModelManager.MODELS, args.model_concurrency)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    authkey = secrets.token_bytes(32)
+    model_servers, spec = _start_model_servers(groups, '127.0.0.1', args.model_port, authkey,
+                                               args.model_concurrency)
+    http = None
+    metrics_dir = None
+    try:
+        _wait_for_model_servers(spec, authkey)
+        # Workers share metrics through snapshot files so /metrics on any of them shows totals
+        metrics_dir = os.environ.get('VOICEFLOW_METRICS_DIR') or tempfile.mkdtemp(prefix='voiceflow-metrics-')
+        env = dict(os.environ,
+                   VOICEFLOW_MODEL_SERVER=spec,
+                   VOICEFLOW_MODEL_SERVER_AUTHKEY=authkey.hex(),
+                   VOICEFLOW_METRICS_DIR=metrics_dir,
+                   VOICEFLOW_PREIMPORT='0')
+        command = _http_command(args.host, args.port, args.workers, args.threads)
+        print(f"Starting HTTP workers on {args.host}:{args.port} (model servers: {spec})")
+        http = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        signal.signal(signal.SIGTERM, lambda *_: http.terminate())
+        http.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if http is not None and http.poll() is None:
+            http.terminate()
+            http.wait(timeout=10)
+        for process in model_servers:
+            process.terminate()
+        for process in model_servers:
+            process.join(timeout=10)
+        if metrics_dir and not os.environ.get('VOICEFLOW_METRICS_DIR'):
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+// AudioWorklet that turns microphone input into 16 kHz mono PCM16 frames for /stt.
+// Runs on the audio rendering thread; `sampleRate` is the AudioContext's rate (usually 48000).
+
+const TARGET_RATE = 16000;
+const FRAME_SAMPLES = 1600; // 100 ms per message
+
+class PCM16Downsampler extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.ratio = sampleRate / TARGET_RATE;
+        // Each output sample averages the input samples in its window (box low-pass before decimating)
+        this.windowPosition = 0;
+        this.windowSum = 0;
+        this.windowCount = 0;
+        this.frame = new Int16Array(FRAME_SAMPLES);
+        this.frameLength = 0;
+        this.running = true;
+        this.port.onmessage = (event) => {
+            if (event.data === 'flush') {
+                this.postFrame();
+                this.running = false;
+                this.port.postMessage('flushed');
+            }
+        };
+    }
+
+    postFrame() {
+        if (!this.frameLength) return;
+        const samples = this.frame.slice(0, this.frameLength);
+        this.port.postMessage(samples.buffer, [samples.buffer]);
+        this.frameLength = 0;
+    }
+
+    pushSample(value) {
+        const clamped = Math.max(-1, Math.min(1, value));
+        this.frame[this.frameLength++] = clamped < 0 ? clamped * 0x8000 : clamped * 0x7fff;
+        if (this.frameLength === FRAME_SAMPLES) this.postFrame();
+    }
+
+    process(inputs) {
+        const channels = inputs[0];
+        if (!this.running) return false;
+        if (!channels || !channels.length) return true;
+
+        const length = channels[0].length;
+        for (let i = 0; i < length; i++) {
+            let mono = 0;
+            for (let c = 0; c < channels.length; c++) mono += channels[c][i];
+            this.windowSum += mono / channels.length;
+            this.windowCount++;
+            this.windowPosition++;
+            if (this.windowPosition >= this.ratio) {
+                this.windowPosition -= this.ratio;
+                this.pushSample(this.windowSum / this.windowCount);
+                this.windowSum = 0;
+                this.windowCount = 0;
+            }
+        }
+        return true;
+    }
+}
+
+registerProcessor('pcm16-downsampler', PCM16Downsampler);
@@ -1,11 +1,12 @@
 // Global variables
 let mediaRecorder;
+let pcmRecorder = null;
 let audioChunks = [];
 let isRecording = false;
 let recordingTimer;
 let recordingStartTime;
-let ttsHistory = JSON.parse(localStorage.getItem('ttsHistory')) || [];
-let sttHistory = JSON.parse(localStorage.getItem('sttHistory')) || [];
+let ttsHistory = [];
+let sttHistory = [];
 
 // DOM elements
 const ttsSection = document.getElementById('tts-section');
@@ -22,6 +23,20 @@ const clearHistoryBtn = document.getElementById('clear-history-btn');
 const ttsHistoryContent = document.getElementById('tts-history');
 const sttHistoryContent = document.getElementById('stt-history');
 
+// Model warm state from /health/ready: features unlock as their models become ready
+let modelState = {};
+let modelStatePushed = false;
+const MODEL_LABELS = {
+    whisper: 'Speech recognition',
+    translator: 'Translation',
+    kazakh_tts: 'Kazakh voice'
+};
+
+// Recordings are captured as raw 16 kHz PCM, which the server uses without ffmpeg.
+// Set localStorage.sttUploadMode = 'compressed' to upload MediaRecorder's Opus instead (~8x smaller)
+const PCM_MIMETYPE = 'audio/pcm;rate=16000';
+const STT_UPLOAD_MODE = localStorage.getItem('sttUploadMode') || 'pcm';
+
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
     setupModeButtons();
@@ -30,8 +45,57 @@ document.addEventListener('DOMContentLoaded', function() {
     setupHistory();
     setupUIEnhancements();
     loadHistory();
+    watchModelState();
 });
 
+// The desktop app pushes warmup changes here; browsers poll instead
+window.voiceflowModelState = function(status) {
+    modelStatePushed = true;
+    applyModelState(status);
+};
+
+async function watchModelState() {
+    if (modelStatePushed) return;
+    try {
+        const response = await fetch('/health/ready');
+        if (applyModelState(await response.json())) return;
+    } catch (error) {
+        // Server not answering yet; try again
+    }
+    setTimeout(watchModelState, 1000);
+}
+
+function applyModelState(status) {
+    modelState = status.models || {};
+    refreshModelGates();
+    return Boolean(status.ready);
+}
+
+function refreshModelGates() {
+    startRecordingBtn.classList.toggle('model-loading', missingModels(['whisper']).length > 0);
+    speakBtn.classList.toggle('model-loading', missingModels(ttsModels()).length > 0);
+}
+
+function missingModels(keys) {
+    // Models outside the warmup list load on first use, and failed ones report their own error
+    return keys.filter(key => {
+        const entry = modelState[key];
+        return entry && entry.required && (entry.state === 'loading' || entry.state === 'not_loaded');
+    });
+}
+
+function ttsModels() {
+    const srcLanguage = document.getElementById('tts-src-language').value;
+    const tgtLanguage = document.getElementById('tts-language').value;
+    const keys = srcLanguage !== tgtLanguage ? ['translator'] : [];
+    if (tgtLanguage === 'kazakh') keys.push('kazakh_tts');
+    return keys;
+}
+
+function modelsLoadingMessage(keys) {
+    return keys.map(key => MODEL_LABELS[key]).join(' and ') + ' still loading. Please try again in a moment.';
+}
+
 // Mode switching
 function setupModeButtons() {
     ttsModeBtn.addEventListener('click', function() {
@@ -64,6 +128,10 @@ function setActiveButton(activeBtn) {
 
 // Text to Speech functionality
 function setupTTS() {
+    // Which models "Speak" needs depends on the language pair
+    document.getElementById('tts-src-language').addEventListener('change', refreshModelGates);
+    document.getElementById('tts-language').addEventListener('change', refreshModelGates);
+
     speakBtn.addEventListener('click', function() {
         const text = document.getElementById('tts-text').value.trim();
         const srcLanguage = document.getElementById('tts-src-language').value;
@@ -74,6 +142,12 @@ function setupTTS() {
             return;
         }
 
+        const loading = missingModels(ttsModels());
+        if (loading.length) {
+            showStatus(ttsStatus, modelsLoadingMessage(loading), 'info');
+            return;
+        }
+
         speakText(text, srcLanguage, tgtLanguage);
     });
 }
@@ -206,6 +280,11 @@ function setupSTT() {
 }
 
 async function startRecording() {
+    const loading = missingModels(['whisper']);
+    if (loading.length) {
+        showStatus(recordingStatus, modelsLoadingMessage(loading), 'info');
+        return;
+    }
     try {
         updateMicStatus('Requesting microphone permission...', 'info');
         const stream = await navigator.mediaDevices.getUserMedia({ 
@@ -221,37 +300,18 @@ async function startRecording() {
                 googHighpassFilter: true
             }
         });
-        
-        // Select best available audio format for Whisper
-        let options = {};
-        const preferredTypes = [
-            'audio/webm;codecs=opus',
-            'audio/webm',
-            'audio/ogg;codecs=opus',
-            'audio/ogg',
-            'audio/wav'
-        ];
-        for (const type of preferredTypes) {
-            if (MediaRecorder.isTypeSupported(type)) {
-                options.mimeType = type;
-                break;
+
+        pcmRecorder = null;
+        if (STT_UPLOAD_MODE === 'pcm' && window.AudioWorkletNode) {
+            try {
+                pcmRecorder = await startPcmRecorder(stream);
+            } catch (error) {
+                console.warn('PCM capture unavailable, recording compressed audio instead:', error);
             }
         }
-        
-        mediaRecorder = new MediaRecorder(stream, options);
-        audioChunks = [];
-        
-        mediaRecorder.ondataavailable = function(event) {
-            audioChunks.push(event.data);
-        };
-        
-        mediaRecorder.onstop = function() {
-            const mimeType = mediaRecorder.mimeType || 'audio/wav';
-            const audioBlob = new Blob(audioChunks, { type: mimeType });
-            sendAudioForRecognition(audioBlob);
-        };
-        
-        mediaRecorder.start();
+        if (!pcmRecorder) {
+            startMediaRecorder(stream);
+        }
         isRecording = true;
         
         // Update UI
@@ -281,10 +341,86 @@ async function startRecording() {
     }
 }
 
+function startMediaRecorder(stream) {
+    // Select best available audio format for Whisper
+    let options = {};
+    const preferredTypes = [
+        'audio/webm;codecs=opus',
+        'audio/webm',
+        'audio/ogg;codecs=opus',
+        'audio/ogg',
+        'audio/wav'
+    ];
+    for (const type of preferredTypes) {
+        if (MediaRecorder.isTypeSupported(type)) {
+            options.mimeType = type;
+            break;
+        }
+    }
+
+    mediaRecorder = new MediaRecorder(stream, options);
+    audioChunks = [];
+
+    mediaRecorder.ondataavailable = function(event) {
+        audioChunks.push(event.data);
+    };
+
+    mediaRecorder.onstop = function() {
+        const mimeType = mediaRecorder.mimeType || 'audio/wav';
+        const audioBlob = new Blob(audioChunks, { type: mimeType });
+        sendAudioForRecognition(audioBlob);
+    };
+
+    mediaRecorder.start();
+}
+
+// Capture through an AudioWorklet that downsamples to 16 kHz mono PCM16 (static/pcm-recorder-worklet.js)
+async function startPcmRecorder(stream) {
+    const context = new AudioContext();
+    await context.audioWorklet.addModule('/static/pcm-recorder-worklet.js');
+    const source = context.createMediaStreamSource(stream);
+    const node = new AudioWorkletNode(context, 'pcm16-downsampler');
+    const frames = [];
+    let flushed;
+    const done = new Promise(resolve => { flushed = resolve; });
+
+    node.port.onmessage = function(event) {
+        if (event.data === 'flushed') {
+            flushed();
+        } else {
+            frames.push(event.data);
+        }
+    };
+    source.connect(node);
+    // The node outputs silence; connecting it keeps the graph pulling audio through it
+    node.connect(context.destination);
+
+    return {
+        stream: stream,
+        async stop() {
+            node.port.postMessage('flush');
+            await done;
+            source.disconnect();
+            node.disconnect();
+            await context.close();
+            return new Blob(frames, { type: PCM_MIMETYPE });
+        }
+    };
+}
+
 function stopRecording() {
-    if (mediaRecorder && isRecording) {
-        mediaRecorder.stop();
-        mediaRecorder.stream.getTracks().forEach(track => track.stop());
+    if (isRecording && (pcmRecorder || mediaRecorder)) {
+        if (pcmRecorder) {
+            const recorder = pcmRecorder;
+            pcmRecorder = null;
+            recorder.stop().then(function(audioBlob) {
+                recorder.stream.getTracks().forEach(track => track.stop());
+                sendAudioForRecognition(audioBlob);
+            });
+        } else {
+            mediaRecorder.stop();
+            mediaRecorder.stream.getTracks().forEach(track => track.stop());
+        }
         isRecording = false;
         
         // Update UI
@@ -305,21 +441,31 @@ function stopRecording() {
 async function sendAudioForRecognition(audioBlob) {
     try {
         const language = document.getElementById('stt-language').value;
-        const formData = new FormData();
         const mimeType = audioBlob.type || '';
-        let ext = 'webm';
-        if (mimeType.includes('wav')) {
-            ext = 'wav';
-        } else if (mimeType.includes('ogg')) {
-            ext = 'ogg';
-        }
-        formData.append('audio', audioBlob, `recording.${ext}`);
-        formData.append('language', language);
+        let response;
+        if (mimeType.startsWith('audio/pcm')) {
+            // Raw body, no multipart: the server reads the samples straight off the request
+            response = await fetch(`/stt?language=${encodeURIComponent(language)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': mimeType },
+                body: audioBlob
+            });
+        } else {
+            const formData = new FormData();
+            let ext = 'webm';
+            if (mimeType.includes('wav')) {
+                ext = 'wav';
+            } else if (mimeType.includes('ogg')) {
+                ext = 'ogg';
+            }
+            formData.append('audio', audioBlob, `recording.${ext}`);
+            formData.append('language', language);
 
-        const response = await fetch('/stt', {
-            method: 'POST',
-            body: formData
-        });
+            response = await fetch('/stt', {
+                method: 'POST',
+                body: formData
+            });
+        }
 
         const data = await response.json();
 
@@ -379,167 +525,286 @@ function setupHistory() {
         if (confirm('Are you sure you want to clear all history?')) {
             ttsHistory = [];
             sttHistory = [];
-            localStorage.removeItem('ttsHistory');
-            localStorage.removeItem('sttHistory');
-            loadHistory();
+            historyStore.clear();
+            renderHistory('tts');
+            renderHistory('stt');
         }
     });
+
+    // One delegated listener per list instead of one per button; items are found by id
+    ttsHistoryContent.addEventListener('click', event => handleHistoryClick('tts', event));
+    sttHistoryContent.addEventListener('click', event => handleHistoryClick('stt', event));
+}
+
+// History lives in IndexedDB; writes are queued and committed together in one transaction
+const historyStore = {
+    db: null,
+    pending: { tts: new Map(), stt: new Map() },  // id -> item to put, or null to delete
+    flushTimer: null,
+
+    open() {
+        return new Promise((resolve) => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open('voiceflow-history', 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore('tts', { keyPath: 'id' });
+                request.result.createObjectStore('stt', { keyPath: 'id' });
+            };
+            request.onsuccess = () => {
+                this.db = request.result;
+                resolve(this.db);
+            };
+            request.onerror = () => {
+                console.warn('IndexedDB unavailable, history is kept in localStorage:', request.error);
+                resolve(null);
+            };
+        });
+    },
+
+    async load(type) {
+        if (!this.db) {
+            return JSON.parse(localStorage.getItem(`${type}History`)) || [];
+        }
+        // One-time move of history saved by earlier versions
+        const legacy = localStorage.getItem(`${type}History`);
+        if (legacy) {
+            JSON.parse(legacy).reverse().forEach(item => this.put(type, withHistoryId(item)));
+            localStorage.removeItem(`${type}History`);
+            await this.flush();
+        }
+        return new Promise((resolve) => {
+            const request = this.db.transaction(type).objectStore(type).getAll();
+            request.onsuccess = () => resolve(request.result.sort((a, b) => b.id - a.id));
+            request.onerror = () => resolve([]);
+        });
+    },
+
+    put(type, item) {
+        this.pending[type].set(item.id, item);
+        this.scheduleFlush();
+    },
+
+    delete(type, id) {
+        this.pending[type].set(id, null);
+        this.scheduleFlush();
+    },
+
+    clear() {
+        this.pending.tts.clear();
+        this.pending.stt.clear();
+        localStorage.removeItem('ttsHistory');
+        localStorage.removeItem('sttHistory');
+        if (this.db) {
+            const transaction = this.db.transaction(['tts', 'stt'], 'readwrite');
+            transaction.objectStore('tts').clear();
+            transaction.objectStore('stt').clear();
+        }
+    },
+
+    scheduleFlush() {
+        if (!this.flushTimer) {
+            this.flushTimer = setTimeout(() => this.flush(), 500);
+        }
+    },
+
+    flush() {
+        clearTimeout(this.flushTimer);
+        this.flushTimer = null;
+        if (!this.db) {
+            // No IndexedDB: fall back to one localStorage write per batch
+            localStorage.setItem('ttsHistory', JSON.stringify(ttsHistory));
+            localStorage.setItem('sttHistory', JSON.stringify(sttHistory));
+            this.pending.tts.clear();
+            this.pending.stt.clear();
+            return Promise.resolve();
+        }
+        const types = ['tts', 'stt'].filter(type => this.pending[type].size);
+        if (!types.length) return Promise.resolve();
+        return new Promise((resolve) => {
+            const transaction = this.db.transaction(types, 'readwrite');
+            types.forEach(type => {
+                const store = transaction.objectStore(type);
+                this.pending[type].forEach((item, id) => item ? store.put(item) : store.delete(id));
+                this.pending[type].clear();
+            });
+            transaction.oncomplete = resolve;
+            transaction.onerror = () => {
+                console.error('Failed to save history:', transaction.error);
+                resolve();
+            };
+        });
+    }
+};
+
+// Don't lose the last queued writes when the page closes
+window.addEventListener('pagehide', () => historyStore.flush());
+
+let lastHistoryId = 0;
+
+function withHistoryId(item) {
+    // Time-ordered and unique, so newest-first order survives reloads
+    lastHistoryId = Math.max(Date.now(), lastHistoryId + 1);
+    return Object.assign({ id: lastHistoryId }, item);
+}
+
+function historyList(type) {
+    return type === 'tts' ? ttsHistory : sttHistory;
+}
+
+function historyContainer(type) {
+    return type === 'tts' ? ttsHistoryContent : sttHistoryContent;
 }
 
 function addToTTSHistory(item) {
-    ttsHistory.unshift(item); // Add to beginning
-    if (ttsHistory.length > 50) ttsHistory.pop(); // Keep only last 50
-    localStorage.setItem('ttsHistory', JSON.stringify(ttsHistory));
-    loadTTSHistory();
+    addToHistory('tts', item);
 }
 
 function addToSTTHistory(item) {
-    sttHistory.unshift(item); // Add to beginning
-    if (sttHistory.length > 50) sttHistory.pop(); // Keep only last 50
-    localStorage.setItem('sttHistory', JSON.stringify(sttHistory));
-    loadSTTHistory();
+    addToHistory('stt', item);
 }
 
-function loadHistory() {
-    loadTTSHistory();
-    loadSTTHistory();
+const HISTORY_LIMIT = 50;
+
+function addToHistory(type, item) {
+    item = withHistoryId(item);
+    const list = historyList(type);
+    const container = historyContainer(type);
+    list.unshift(item); // Add to beginning
+    historyStore.put(type, item);
+
+    // Only the new node is built; the rest of the list is left alone
+    if (list.length === 1) container.innerHTML = '';
+    container.prepend(renderHistoryItem(type, item));
+    while (list.length > HISTORY_LIMIT) { // Keep only last 50
+        historyStore.delete(type, list.pop().id);
+        container.lastElementChild.remove();
+    }
 }
 
-function loadTTSHistory() {
-    ttsHistoryContent.innerHTML = '';
-    
-    if (ttsHistory.length === 0) {
-        ttsHistoryContent.innerHTML = '<p style="text-align: center; color: #6c757d; padding: 20px;">No TTS history yet</p>';
+async function loadHistory() {
+    await historyStore.open();
+    // Keep anything added while the database was opening
+    const merge = (current, stored) => current.concat(stored.filter(item => !current.some(c => c.id === item.id)));
+    ttsHistory = merge(ttsHistory, await historyStore.load('tts'));
+    sttHistory = merge(sttHistory, await historyStore.load('stt'));
+    ttsHistory.concat(sttHistory).forEach(item => { lastHistoryId = Math.max(lastHistoryId, item.id || 0); });
+    renderHistory('tts');
+    renderHistory('stt');
+}
+
+function renderHistory(type) {
+    const list = historyList(type);
+    const container = historyContainer(type);
+    if (list.length === 0) {
+        container.innerHTML = `<p style="text-align: center; color: #6c757d; padding: 20px;">No ${type.toUpperCase()} history yet</p>`;
         return;
     }
-    
-    ttsHistory.forEach((item, index) => {
-        const historyItem = document.createElement('div');
-        historyItem.className = 'history-item';
-        const langDisplay = item.srcLanguage && item.tgtLanguage ? `${item.srcLanguage} → ${item.tgtLanguage}` : (item.language || 'N/A');
-        
-        let audioButtons = '';
-        if (item.audioUrl && item.audioFilename) {
-            audioButtons = `
-                <div class="history-audio-player">
-                    <audio controls src="${item.audioUrl}"></audio>
-                </div>
-                <div class="history-audio-actions">
-                    <button class="play-history-audio-btn" data-audio-url="${item.audioUrl}" data-audio-filename="${item.audioFilename}" title="Play audio">
-                        <i class="fas fa-play"></i> Preview
-                    </button>
-                    <button class="download-history-audio-btn" data-audio-url="${item.audioUrl}" data-download-url="${item.downloadUrl || ''}" data-audio-filename="${item.audioFilename}" title="Download audio">
-                        <i class="fas fa-download"></i>
-                    </button>
-                </div>
-            `;
-        }
-        
+    const fragment = document.createDocumentFragment();
+    list.forEach(item => fragment.appendChild(renderHistoryItem(type, item)));
+    container.replaceChildren(fragment);
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+function renderHistoryItem(type, item) {
+    const historyItem = document.createElement('div');
+    historyItem.className = 'history-item';
+    historyItem.dataset.id = item.id;
+
+    if (type === 'stt') {
         historyItem.innerHTML = `
-            <button class="copy-history-btn" data-index="${index}" data-type="tts" title="Copy text">
+            <button class="copy-history-btn" title="Copy text">
                 <i class="fas fa-copy"></i> Copy
             </button>
             <div class="history-item-header">
-                <span class="history-time">${item.timestamp}</span>
-                <span class="history-language">${langDisplay}</span>
+                <span class="history-time">${escapeHtml(item.timestamp)}</span>
+                <span class="history-language">${escapeHtml(item.language)}</span>
             </div>
             <div class="history-text">
-                <strong>Original:</strong> ${item.originalText}<br>
-                ${item.translatedText !== item.originalText ? `<strong>Translated:</strong> ${item.translatedText}<br>` : ''}
-                <small><strong>Voice:</strong> ${item.voice}${item.gender ? ` (${item.gender})` : ''}</small>
+                <strong>Recognized:</strong> ${escapeHtml(item.recognizedText)}
             </div>
-            ${audioButtons}
         `;
-        ttsHistoryContent.appendChild(historyItem);
-    });
-    
-    // Add copy functionality to history items
-    document.querySelectorAll('.copy-history-btn[data-type="tts"]').forEach(btn => {
-        btn.addEventListener('click', async function() {
-            const index = this.dataset.index;
-            const item = ttsHistory[index];
-            const textToCopy = item.translatedText || item.originalText;
-            
-            try {
-                await navigator.clipboard.writeText(textToCopy);
-                this.classList.add('copied');
-                this.innerHTML = '<i class="fas fa-check"></i> Copied';
-                setTimeout(() => {
-                    this.classList.remove('copied');
-                    this.innerHTML = '<i class="fas fa-copy"></i> Copy';
-                }, 2000);
-            } catch (err) {
-                console.error('Failed to copy text:', err);
-            }
-        });
-    });
-    
-    // Add play functionality to history items
-    document.querySelectorAll('.play-history-audio-btn').forEach(btn => {
-        btn.addEventListener('click', function() {
-            const audioUrl = this.dataset.audioUrl;
-            const audioFilename = this.dataset.audioFilename;
-            showAudioPreview(audioUrl, audioFilename);
-        });
-    });
-    
-    // Add download functionality to history items
-    document.querySelectorAll('.download-history-audio-btn').forEach(btn => {
-        btn.addEventListener('click', function() {
-            const audioUrl = this.dataset.audioUrl;
-            const downloadUrl = this.dataset.downloadUrl || '';
-            const audioFilename = this.dataset.audioFilename;
-            downloadAudio(downloadUrl || audioUrl, audioFilename);
-        });
-    });
-}
-
-function loadSTTHistory() {
-    sttHistoryContent.innerHTML = '';
-    
-    if (sttHistory.length === 0) {
-        sttHistoryContent.innerHTML = '<p style="text-align: center; color: #6c757d; padding: 20px;">No STT history yet</p>';
-        return;
+        return historyItem;
     }
-    
-    sttHistory.forEach((item, index) => {
-        const historyItem = document.createElement('div');
-        historyItem.className = 'history-item';
-        historyItem.innerHTML = `
-            <button class="copy-history-btn" data-index="${index}" data-type="stt" title="Copy text">
-                <i class="fas fa-copy"></i> Copy
-            </button>
-            <div class="history-item-header">
-                <span class="history-time">${item.timestamp}</span>
-                <span class="history-language">${item.language}</span>
+
+    const langDisplay = item.srcLanguage && item.tgtLanguage ? `${item.srcLanguage} → ${item.tgtLanguage}` : (item.language || 'N/A');
+
+    let audioButtons = '';
+    if (item.audioUrl && item.audioFilename) {
+        // No <audio> until the user presses play, so loading history fetches no audio
+        audioButtons = `
+            <div class="history-audio-player">
+                <button class="load-history-audio-btn" title="Play here">
+                    <i class="fas fa-play"></i> Play
+                </button>
             </div>
-            <div class="history-text">
-                <strong>Recognized:</strong> ${item.recognizedText}
+            <div class="history-audio-actions">
+                <button class="play-history-audio-btn" title="Play audio">
+                    <i class="fas fa-play"></i> Preview
+                </button>
+                <button class="download-history-audio-btn" title="Download audio">
+                    <i class="fas fa-download"></i>
+                </button>
             </div>
         `;
-        sttHistoryContent.appendChild(historyItem);
-    });
-    
-    // Add copy functionality to history items
-    document.querySelectorAll('.copy-history-btn[data-type="stt"]').forEach(btn => {
-        btn.addEventListener('click', async function() {
-            const index = this.dataset.index;
-            const item = sttHistory[index];
-            const textToCopy = item.recognizedText;
-            
-            try {
-                await navigator.clipboard.writeText(textToCopy);
-                this.classList.add('copied');
-                this.innerHTML = '<i class="fas fa-check"></i> Copied';
-                setTimeout(() => {
-                    this.classList.remove('copied');
-                    this.innerHTML = '<i class="fas fa-copy"></i> Copy';
-                }, 2000);
-            } catch (err) {
-                console.error('Failed to copy:', err);
-            }
-        });
-    });
+    }
+
+    historyItem.innerHTML = `
+        <button class="copy-history-btn" title="Copy text">
+            <i class="fas fa-copy"></i> Copy
+        </button>
+        <div class="history-item-header">
+            <span class="history-time">${escapeHtml(item.timestamp)}</span>
+            <span class="history-language">${escapeHtml(langDisplay)}</span>
+        </div>
+        <div class="history-text">
+            <strong>Original:</strong> ${escapeHtml(item.originalText)}<br>
+            ${item.translatedText !== item.originalText ? `<strong>Translated:</strong> ${escapeHtml(item.translatedText)}<br>` : ''}
+            <small><strong>Voice:</strong> ${escapeHtml(item.voice)}${item.gender ? ` (${escapeHtml(item.gender)})` : ''}</small>
+        </div>
+        ${audioButtons}
+    `;
+    return historyItem;
+}
+
+async function handleHistoryClick(type, event) {
+    const button = event.target.closest('button');
+    const historyItem = event.target.closest('.history-item');
+    if (!button || !historyItem) return;
+    const item = historyList(type).find(entry => String(entry.id) === historyItem.dataset.id);
+    if (!item) return;
+
+    if (button.classList.contains('copy-history-btn')) {
+        const textToCopy = type === 'tts' ? (item.translatedText || item.originalText) : item.recognizedText;
+        try {
+            await navigator.clipboard.writeText(textToCopy);
+            button.classList.add('copied');
+            button.innerHTML = '<i class="fas fa-check"></i> Copied';
+            setTimeout(() => {
+                button.classList.remove('copied');
+                button.innerHTML = '<i class="fas fa-copy"></i> Copy';
+            }, 2000);
+        } catch (err) {
+            console.error('Failed to copy text:', err);
+        }
+    } else if (button.classList.contains('load-history-audio-btn')) {
+        const audio = document.createElement('audio');
+        audio.controls = true;
+        audio.src = item.audioUrl;
+        button.replaceWith(audio);
+        audio.play().catch(err => console.error('Failed to play audio:', err));
+    } else if (button.classList.contains('play-history-audio-btn')) {
+        showAudioPreview(item.audioUrl, item.audioFilename);
+    } else if (button.classList.contains('download-history-audio-btn')) {
+        downloadAudio(item.downloadUrl || item.audioUrl, item.audioFilename);
+    }
 }
 
 // UI Enhancement Functions
@@ -0,0 +1,138 @@
+"""
+Tests for streamed upload decoding: upload size and duration limits, the raw
+PCM path that skips ffmpeg, and how /stt reports each
+Run with: python -m pytest test_audio_io.py
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from routes import stt_route
+from utils.audio_io import (AudioLimitExceeded, UnsupportedAudioFormat, check_pcm_format, decode_audio,
+                            decode_audio_stream, decode_pcm16_stream, iter_chunks, trim_silence)
+
+PCM = 'audio/pcm;rate=16000'
+
+
+def _chunks(data, size=4096):
+    return iter_chunks(io.BytesIO(data), size)
+
+
+def test_pcm_stream_matches_samples():
+    samples = np.array([0, 16384, -32768, 32767], '<i2')
+
+    audio = decode_pcm16_stream(_chunks(samples.tobytes() + b'\x01', size=3))
+
+    assert audio.dtype == np.float32
+    assert np.allclose(audio, [0, 0.5, -1, 32767 / 32768])
+
+
+def test_pcm_stream_limits(speech):
+    pcm = speech(3)
+
+    assert len(decode_pcm16_stream(_chunks(pcm), max_seconds=3, max_bytes=len(pcm))) == 3 * 16000
+    with pytest.raises(AudioLimitExceeded, match='longer than the 2s limit'):
+        decode_pcm16_stream(_chunks(pcm), max_seconds=2)
+    with pytest.raises(AudioLimitExceeded, match='larger than'):
+        decode_pcm16_stream(_chunks(pcm), max_bytes=len(pcm) - 1)
+
+
+def test_pcm_suffix_skips_ffmpeg(speech, monkeypatch):
+    def no_ffmpeg(*args, **kwargs):
+        raise AssertionError('ffmpeg started for raw PCM')
+
+    monkeypatch.setattr('utils.audio_io.subprocess.Popen', no_ffmpeg)
+    monkeypatch.setattr('utils.audio_io.subprocess.run', no_ffmpeg)
+
+    assert len(decode_audio_stream(_chunks(speech(1)), suffix='.pcm')) == 16000
+
+
+def test_check_pcm_format():
+    check_pcm_format({'rate': '16000'})
+    check_pcm_format({})
+    for params in ({'rate': '8000'}, {'rate': '16000', 'channels': '2'}):
+        with pytest.raises(UnsupportedAudioFormat):
+            check_pcm_format(params)
+
+
+def test_streamed_decode_matches_whole_file(speech):
+    wav = speech(2, as_wav=True)
+
+    streamed = decode_audio_stream(_chunks(wav), suffix='.wav')
+
+    assert np.array_equal(streamed, decode_audio(wav))
+    assert len(streamed) == 2 * 16000
+
+
+def test_seekable_formats_are_spooled(speech):
+    # The suffix decides the path; ffmpeg still probes the content itself
+    assert len(decode_audio_stream(_chunks(speech(2, as_wav=True)), suffix='.m4a')) == 2 * 16000
+
+
+def test_streamed_decode_limits(speech):
+    wav = speech(3, as_wav=True)
+
+    with pytest.raises(AudioLimitExceeded, match='longer than the 1s limit'):
+        decode_audio_stream(_chunks(wav), max_seconds=1, suffix='.wav')
+    with pytest.raises(AudioLimitExceeded, match='larger than'):
+        decode_audio_stream(_chunks(wav), max_bytes=len(wav) // 2, suffix='.wav')
+
+
+def test_undecodable_upload():
+    with pytest.raises(RuntimeError, match='Failed to decode audio'):
+        decode_audio_stream(_chunks(b'\x00garbage' * 500), suffix='.webm')
+
+
+def test_trim_silence(speech):
+    pcm = np.frombuffer(speech(1, silence=2), '<i2').astype(np.float32) / 32768
+
+    trimmed = trim_silence(pcm)
+
+    assert 1.0 <= len(trimmed) / 16000 <= 1.5
+    assert len(trim_silence(np.zeros(16000, np.float32))) == 0
+
+
+def test_stt_rejects_audio_over_duration_limit(client, speech, monkeypatch):
+    monkeypatch.setattr(stt_route, 'MAX_AUDIO_SECONDS', 2)
+
+    response = client.post('/stt?language=english', data=speech(3), content_type=PCM)
+
+    assert response.status_code == 413
+    assert '2s limit' in response.json['error']
+
+
+def test_stt_rejects_declared_size_before_reading(client, speech, monkeypatch):
+    monkeypatch.setattr(stt_route, 'MAX_UPLOAD_BYTES', 10_000)
+
+    response = client.post('/stt?language=english', data=speech(1), content_type=PCM)
+
+    assert response.status_code == 413
+    assert 'larger than' in response.json['error']
+
+
+def test_stt_raw_pcm_and_multipart_pcm(client, speech):
+    raw = client.post('/stt?language=english', data=speech(3), content_type=PCM)
+    form = client.post('/stt', data={
+        'language': 'english',
+        'audio': (io.BytesIO(speech(3)), 'recording', PCM)
+    }, content_type='multipart/form-data')
+
+    assert raw.status_code == 200 and raw.json['success']
+    assert form.status_code == 200
+    assert form.json['text'] == raw.json['text']
+
+
+@pytest.mark.parametrize('content_type', ['audio/pcm;rate=8000', 'audio/pcm;rate=16000;channels=2'])
+def test_stt_rejects_other_pcm_formats(client, speech, content_type):
+    response = client.post('/stt?language=english', data=speech(3), content_type=content_type)
+
+    assert response.status_code == 415
+
+
+def test_stt_rejects_tiny_uploads(client):
+    response = client.post('/stt?language=english', data=b'\x00' * 100, content_type=PCM)
+
+    assert response.status_code == 400
+    assert 'too short' in response.json['error']
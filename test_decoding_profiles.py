@@ -0,0 +1,92 @@
+"""
+Tests for picking a Whisper decoding profile per request
+Run with: python -m pytest test_decoding_profiles.py
+"""
+
+import pytest
+
+from utils import decoding_profiles
+from utils.decoding_profiles import PROFILE_CHOICES, check_profile, choose_profile, decoding_options
+from utils.metrics import MODEL_IN_FLIGHT
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    # The module defaults come from the environment; pin them for the tests
+    monkeypatch.setattr(decoding_profiles, 'DEFAULT_PROFILE', 'balanced')
+    monkeypatch.setattr(decoding_profiles, 'LOAD_PROFILE', 'fast')
+    monkeypatch.setattr(decoding_profiles, 'LOAD_THRESHOLD', 2)
+    monkeypatch.setattr(decoding_profiles, 'SHORT_AUDIO_SECONDS', 4.0)
+    return monkeypatch
+
+
+@pytest.fixture
+def busy():
+    """Mark Whisper as having `count` requests in flight"""
+    added = []
+
+    def set_in_flight(count):
+        MODEL_IN_FLIGHT.inc(count, model='whisper')
+        added.append(count)
+
+    yield set_in_flight
+    MODEL_IN_FLIGHT.dec(sum(added), model='whisper')
+
+
+def test_default_profile_for_normal_clips():
+    assert choose_profile(None, 30.0) == ('balanced', 'default')
+
+
+def test_short_clips_take_the_greedy_path():
+    assert choose_profile(None, 4.0) == ('fast', 'short_audio')
+    assert choose_profile(None, 4.1) == ('balanced', 'default')
+
+
+def test_short_audio_rule_can_be_disabled(settings):
+    settings.setattr(decoding_profiles, 'SHORT_AUDIO_SECONDS', 0)
+
+    assert choose_profile(None, 1.0) == ('balanced', 'default')
+
+
+def test_load_switches_the_default(busy):
+    busy(1)
+    assert choose_profile(None, 30.0) == ('balanced', 'default')
+    busy(1)
+    assert choose_profile(None, 30.0) == ('fast', 'load')
+
+
+def test_load_rule_can_be_disabled(settings, busy):
+    settings.setattr(decoding_profiles, 'LOAD_THRESHOLD', 0)
+    busy(5)
+
+    assert choose_profile(None, 30.0) == ('balanced', 'default')
+
+
+def test_requested_profile_always_wins(busy):
+    busy(5)
+
+    assert choose_profile('Accurate ', 1.0) == ('accurate', 'requested')
+    assert choose_profile('', 30.0) == ('fast', 'load')
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match='fast, balanced, accurate'):
+        choose_profile('turbo', 30.0)
+    assert check_profile(None) is None
+
+
+def test_choices_are_counted():
+    key = ('fast', 'short_audio')
+    before = PROFILE_CHOICES._values.get(key, 0.0)
+
+    choose_profile(None, 1.0)
+
+    assert PROFILE_CHOICES._values[key] == before + 1
+
+
+def test_decoding_options_are_copies():
+    options = decoding_options('accurate')
+    options['beam_size'] = 1
+
+    assert decoding_options('accurate')['beam_size'] == 5
+    assert decoding_options('fast')['temperature'] == 0.0
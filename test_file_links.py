@@ -0,0 +1,164 @@
+"""
+Tests for placing bundled models in the cache: link_tree's strategy fallback
+order and bootstrap in linked and 'direct' modes
+Run with: python -m pytest test_file_links.py
+"""
+
+import os
+from unittest import mock
+
+import pytest
+
+from utils import file_links
+from utils.file_links import link_tree
+from utils.model_manager import ModelManager
+from utils.model_residency import ModelResidencyManager
+
+
+def _tree(root, files):
+    for rel, data in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(data)
+    return root
+
+
+@pytest.fixture
+def strategies(monkeypatch):
+    """Replace the link strategies: failing(names) makes those raise; returns the call log"""
+    calls = []
+
+    def install(failing=()):
+        for name, real in list(file_links._STRATEGIES.items()):
+            def strategy(src, dst, name=name, real=real):
+                calls.append(name)
+                if name in failing:
+                    raise OSError(f'{name} not supported here')
+                real(src, dst)
+            monkeypatch.setitem(file_links._STRATEGIES, name, strategy)
+        return calls
+
+    return install
+
+
+def test_auto_falls_back_in_order_and_remembers_failures(tmp_path, strategies):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a', 'sub/b.bin': b'bb', 'sub/c.bin': b'ccc'})
+    calls = strategies(failing=('reflink', 'hardlink'))
+
+    counts = link_tree(src, tmp_path / 'dst')
+
+    assert counts == {'symlink': 3}
+    # Each unavailable strategy is tried once, not once per file
+    assert calls == ['reflink', 'hardlink', 'symlink', 'symlink', 'symlink']
+    assert (tmp_path / 'dst' / 'sub' / 'b.bin').read_bytes() == b'bb'
+
+
+def test_copy_is_the_last_resort(tmp_path, strategies):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a'})
+    calls = strategies(failing=('reflink', 'hardlink', 'symlink'))
+
+    assert link_tree(src, tmp_path / 'dst') == {'copy': 1}
+    assert calls == ['reflink', 'hardlink', 'symlink', 'copy']
+    assert not (tmp_path / 'dst' / 'a.bin').is_symlink()
+
+
+def test_explicit_mode_only_falls_back_to_copy(tmp_path, strategies):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a', 'b.bin': b'b'})
+    calls = strategies(failing=('hardlink',))
+
+    assert link_tree(src, tmp_path / 'dst', mode='hardlink') == {'copy': 2}
+    assert calls == ['hardlink', 'copy', 'copy']
+
+
+def test_copy_failure_is_raised(tmp_path, strategies):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a'})
+    strategies(failing=('copy',))
+
+    with pytest.raises(OSError):
+        link_tree(src, tmp_path / 'dst', mode='copy')
+
+
+def test_unknown_mode(tmp_path):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a'})
+
+    with pytest.raises(ValueError):
+        link_tree(src, tmp_path / 'dst', mode='teleport')
+
+
+def test_hardlinks_share_data(tmp_path):
+    src = _tree(tmp_path / 'src', {'a.bin': b'a'})
+
+    assert link_tree(src, tmp_path / 'dst', mode='hardlink') == {'hardlink': 1}
+    assert os.path.samefile(src / 'a.bin', tmp_path / 'dst' / 'a.bin')
+
+
+def test_existing_files_are_kept_or_replaced_by_size(tmp_path):
+    src = _tree(tmp_path / 'src', {'same.bin': b'1234', 'changed.bin': b'new data'})
+    dst = _tree(tmp_path / 'dst', {'same.bin': b'abcd', 'changed.bin': b'old'})
+
+    counts = link_tree(src, dst, mode='copy')
+
+    assert counts == {'skipped': 1, 'copy': 1}
+    assert (dst / 'same.bin').read_bytes() == b'abcd'
+    assert (dst / 'changed.bin').read_bytes() == b'new data'
+
+
+def test_symlinked_sources_link_to_their_target(tmp_path):
+    # HuggingFace snapshots are symlinks into a blobs folder
+    src = _tree(tmp_path / 'src', {'blobs/0a1b': b'weights'})
+    (src / 'snapshots' / 'rev').mkdir(parents=True)
+    (src / 'snapshots' / 'rev' / 'model.bin').symlink_to(src / 'blobs' / '0a1b')
+
+    link_tree(src, tmp_path / 'dst', mode='symlink')
+
+    placed = tmp_path / 'dst' / 'snapshots' / 'rev' / 'model.bin'
+    assert os.readlink(placed) == str((src / 'blobs' / '0a1b').resolve())
+
+
+def test_missing_source_places_nothing(tmp_path):
+    assert link_tree(tmp_path / 'absent', tmp_path / 'dst') == {}
+    assert not (tmp_path / 'dst').exists()
+
+
+def _bundle(root):
+    """A bundled_models folder holding the Kazakh TTS snapshot"""
+    model_dir = root / 'huggingface' / f"models--{ModelManager.MODELS['kazakh_tts']['model_id'].replace('/', '--')}"
+    _tree(model_dir, {'snapshots/rev/config.json': b'{}', 'snapshots/rev/model.safetensors': b'weights'})
+    (model_dir / 'refs').mkdir()
+    (model_dir / 'refs' / 'main').write_text('rev')
+    return root
+
+
+def _manager(tmp_path, monkeypatch, mode):
+    monkeypatch.setenv('VOICEFLOW_BOOTSTRAP_MODE', mode)
+    manager = ModelManager(cache_dir=str(tmp_path / 'cache'), residency=ModelResidencyManager())
+    monkeypatch.setattr(manager, 'get_bundled_models_dir', lambda: tmp_path / 'bundle')
+    return manager
+
+
+def test_bootstrap_links_bundle_into_cache(tmp_path, monkeypatch):
+    bundle = _bundle(tmp_path / 'bundle')
+    with mock.patch.dict(os.environ):
+        manager = _manager(tmp_path, monkeypatch, 'hardlink')
+
+        assert manager.bootstrap_bundled_models()
+
+        entry = manager.manifest.get('kazakh_tts')
+        assert entry['source'] == 'bootstrap'
+        assert entry['path'].startswith(str(manager.cache_dir))
+        weights = os.path.join(entry['path'], 'model.safetensors')
+        assert os.path.samefile(weights, next(bundle.rglob('model.safetensors')))
+
+
+def test_direct_mode_uses_bundle_in_place(tmp_path, monkeypatch):
+    bundle = _bundle(tmp_path / 'bundle')
+    with mock.patch.dict(os.environ):
+        manager = _manager(tmp_path, monkeypatch, 'direct')
+
+        assert manager.bootstrap_bundled_models()
+
+        entry = manager.manifest.get('kazakh_tts')
+        assert entry['source'] == 'bundled'
+        assert entry['path'].startswith(str(bundle.resolve()))
+        assert not (manager.cache_dir / 'huggingface' / 'models--facebook--mms-tts-kaz').exists()
+        assert manager.is_model_downloaded('kazakh_tts')
+        assert not manager.is_model_downloaded('translator')
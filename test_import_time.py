@@ -0,0 +1,68 @@
+"""
+Tests for deferred imports: `import app` stays free of the heavy libraries,
+and the import-time report parses and compares -X importtime output
+Run with: python -m pytest test_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import DEFAULT_FORBIDDEN, ROOT, compare, parse_importtime, summarize
+from utils import model_warmup
+from utils.model_warmup import ModelWarmup
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:       300 |        900 |   flask
+import time:       600 |        600 |     flask.app
+import time:       200 |       1200 | app
+"""
+
+
+def test_app_imports_without_heavy_libraries():
+    env = dict(os.environ, VOICEFLOW_WARMUP_MODELS='none', VOICEFLOW_PREIMPORT='0')
+    env.pop('VOICEFLOW_MODEL_SERVER', None)
+    code = ('import sys, app; '
+            f'print(",".join(name for name in {DEFAULT_FORBIDDEN!r} if name in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_parse_importtime():
+    modules = parse_importtime(IMPORTTIME)
+
+    assert modules['flask.app'] == {'self_us': 600, 'cumulative_us': 600, 'depth': 2}
+    assert modules['app'] == {'self_us': 200, 'cumulative_us': 1200, 'depth': 0}
+    assert 'imported package' not in modules
+
+
+def test_summarize_groups_by_package():
+    report = summarize('app', parse_importtime(IMPORTTIME))
+
+    assert report['total_ms'] == 1.2
+    assert report['packages_ms'] == {'flask': 0.9, 'app': 0.2, '_io': 0.1}
+    assert list(report['packages_ms']) == ['flask', 'app', '_io']
+
+
+def test_compare_flags_regressions_and_new_packages():
+    baseline = {'total_ms': 100.0, 'packages_ms': {'flask': 50.0}}
+
+    assert compare({'total_ms': 120.0, 'packages_ms': {'flask': 60.0}}, baseline, 25) == []
+    problems = compare({'total_ms': 130.0, 'packages_ms': {'flask': 60.0, 'torch': 70.0}}, baseline, 25)
+    assert len(problems) == 2
+    assert 'exceeds baseline' in problems[0]
+    assert 'torch' in problems[1]
+
+
+def test_warmup_preimports_in_the_background(monkeypatch):
+    monkeypatch.setattr(model_warmup, 'PREIMPORT_MODULES', ('json', 'no_such_module_here'))
+    warmup = ModelWarmup([], manager=object(), preimport=True)
+
+    warmup.run()
+
+    assert list(warmup.preimport_seconds) == ['json']
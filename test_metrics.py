@@ -0,0 +1,153 @@
+"""
+Tests for the metrics registry: Prometheus text exposition and merging
+snapshots from several processes
+Run with: python -m pytest test_metrics.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from utils.metrics import Registry, merge_snapshots, render_snapshot
+
+
+def _write_peer(directory, pid, registry):
+    with open(os.path.join(directory, f"{pid}.json"), 'w') as f:
+        json.dump(registry.snapshot(), f)
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_exposition_format():
+    registry = Registry()
+    requests = registry.counter('app_requests_total', 'Requests', ['route', 'status'])
+    in_flight = registry.gauge('app_in_flight', 'Requests in flight')
+    latency = registry.histogram('app_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    requests.inc(route='/stt', status='200')
+    requests.inc(2, route='/stt', status='200')
+    in_flight.set(1.5)
+    latency.observe(0.05, route='/stt')
+    latency.observe(0.5, route='/stt')
+    latency.observe(7, route='/stt')
+
+    assert registry.render() == '\n'.join([
+        '# HELP app_in_flight Requests in flight',
+        '# TYPE app_in_flight gauge',
+        'app_in_flight 1.5',
+        '# HELP app_requests_total Requests',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{route="/stt",status="200"} 3',
+        '# HELP app_seconds Latency',
+        '# TYPE app_seconds histogram',
+        'app_seconds_bucket{route="/stt",le="0.1"} 1',
+        'app_seconds_bucket{route="/stt",le="1"} 2',
+        'app_seconds_bucket{route="/stt",le="+Inf"} 3',
+        'app_seconds_sum{route="/stt"} 7.55',
+        'app_seconds_count{route="/stt"} 3',
+    ]) + '\n'
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('errors_total', 'Errors', ['type']).inc(type='say "hi"\\\n')
+
+    assert 'errors_total{type="say \\"hi\\"\\\\\\n"} 1' in registry.render()
+
+
+def test_gauge_tracks_in_progress_blocks():
+    gauge = Registry().gauge('busy', 'Busy', ['model'])
+
+    with gauge.track_inprogress(model='whisper'):
+        with gauge.track_inprogress(model='whisper'):
+            assert gauge.value(model='whisper') == 2
+    assert gauge.value(model='whisper') == 0
+
+
+def test_collectors_are_merged_and_failures_skipped():
+    registry = Registry()
+    registry.add_collector(lambda: {'queue_depth': {
+        'type': 'gauge', 'help': 'Queue', 'labelnames': ['model'], 'values': [[['whisper'], 2]]}})
+    registry.add_collector(lambda: 1 / 0)
+
+    assert 'queue_depth{model="whisper"} 2' in registry.render()
+
+
+def test_merge_sums_by_label_set():
+    first, second = Registry(), Registry()
+    for registry, count, seconds in ((first, 1, 0.2), (second, 2, 3.0)):
+        registry.counter('calls_total', 'Calls', ['model']).inc(count, model='whisper')
+        registry.histogram('call_seconds', 'Seconds', buckets=(1.0,)).observe(seconds)
+    second.counter('calls_total', 'Calls', ['model']).inc(model='translator')
+
+    merged = merge_snapshots([first.snapshot(), second.snapshot()])
+
+    assert sorted(merged['calls_total']['values']) == [[['translator'], 1.0], [['whisper'], 3.0]]
+    assert merged['call_seconds']['values'] == [[[], [[1, 1], 3.2, 2]]]
+    text = render_snapshot(merged)
+    assert 'call_seconds_bucket{le="1"} 1' in text
+    assert 'call_seconds_bucket{le="+Inf"} 2' in text
+
+
+def test_render_includes_live_peers_only(tmp_path):
+    registry = Registry(str(tmp_path))
+    registry.counter('requests_total', 'Requests').inc()
+
+    peer = Registry()
+    peer.counter('requests_total', 'Requests').inc(4)
+    _write_peer(tmp_path, os.getppid(), peer)
+    dead = _dead_pid()
+    _write_peer(tmp_path, dead, peer)
+    # This process's own file is stale next to its live values
+    _write_peer(tmp_path, os.getpid(), peer)
+
+    assert 'requests_total 5' in registry.render()
+    assert not (tmp_path / f"{dead}.json").exists()
+
+
+def test_extra_snapshots_are_merged():
+    registry = Registry()
+    registry.counter('requests_total', 'Requests').inc()
+    model_server = Registry()
+    model_server.counter('requests_total', 'Requests').inc(2)
+
+    assert 'requests_total 3' in registry.render([model_server.snapshot()])
+
+
+def test_write_snapshot_is_rate_limited_with_a_trailing_write(tmp_path):
+    registry = Registry(str(tmp_path))
+    in_flight = registry.gauge('in_flight', 'In flight')
+    path = tmp_path / f"{os.getpid()}.json"
+
+    in_flight.inc()
+    registry.write_snapshot(min_interval=0.2)
+    assert json.loads(path.read_text())['in_flight']['values'] == [[[], 1.0]]
+
+    in_flight.dec()
+    registry.write_snapshot(min_interval=0.2)
+    assert json.loads(path.read_text())['in_flight']['values'] == [[[], 1.0]]
+
+    # The skipped write is made up once the interval has passed
+    for _ in range(100):
+        time.sleep(0.02)
+        if json.loads(path.read_text())['in_flight']['values'] == [[[], 0.0]]:
+            break
+    assert json.loads(path.read_text())['in_flight']['values'] == [[[], 0.0]]
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_metrics_endpoint(client, speech):
+    client.post('/stt?language=english', data=speech(3), content_type='audio/pcm;rate=16000')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE voiceflow_stage_seconds histogram' in text
+    assert 'stage="transcribe"' in text
@@ -0,0 +1,172 @@
+"""
+Tests for memory-mapped safetensors weights: save/load round trip with tied
+weights, sparse and non-persistent buffers, and mixed dtypes
+Run with: python -m pytest test_mmap_weights.py
+"""
+
+import pytest
+import torch
+
+from utils.mmap_weights import (conversion_lock, convert_in_background, load_module_tensors, parameters_on_meta,
+                                read_metadata, save_module_tensors)
+
+
+class TiedNet(torch.nn.Module):
+    """Small stand-in with the tensor kinds the real models have"""
+
+    def __init__(self):
+        super().__init__()
+        self.embed = torch.nn.Embedding(10, 4)
+        self.head = torch.nn.Linear(4, 10, bias=False)
+        self.head.weight = self.embed.weight  # Tied, like whisper's decoder
+        self.norm = torch.nn.LayerNorm(4).half()
+        self.register_buffer('steps', torch.arange(3, dtype=torch.int64))
+        self.register_buffer('flags', torch.tensor([True, False, True]))
+        # Whisper keeps its alignment heads as a sparse, non-persistent buffer
+        self.register_buffer('heads', torch.eye(4, dtype=torch.bool).to_sparse(), persistent=False)
+
+
+def _round_trip(tmp_path, metadata=None):
+    torch.manual_seed(0)
+    original = TiedNet()
+    path = tmp_path / 'net.safetensors'
+    save_module_tensors(original, path, metadata)
+    with parameters_on_meta():
+        skeleton = TiedNet()
+    return original, load_module_tensors(skeleton, path), path
+
+
+def test_round_trip_restores_every_tensor(tmp_path):
+    original, loaded, _path = _round_trip(tmp_path)
+
+    expected = dict(original.named_parameters(remove_duplicate=False))
+    expected.update(original.named_buffers(remove_duplicate=False))
+    restored = dict(loaded.named_parameters(remove_duplicate=False))
+    restored.update(loaded.named_buffers(remove_duplicate=False))
+    assert restored.keys() == expected.keys()
+    for name, tensor in expected.items():
+        got = restored[name]
+        assert got.dtype == tensor.dtype, name
+        assert not got.is_meta, name
+        assert torch.equal(got.to_dense(), tensor.to_dense()), name
+    assert not loaded.training
+
+
+def test_skeleton_parameters_start_on_meta():
+    with parameters_on_meta():
+        skeleton = TiedNet()
+
+    assert all(param.is_meta for param in skeleton.parameters())
+    # Buffers computed in __init__ stay real
+    assert not skeleton.steps.is_meta
+    assert skeleton.heads.is_sparse
+
+
+def test_tied_weights_share_one_mapping(tmp_path):
+    _original, loaded, _path = _round_trip(tmp_path)
+
+    assert loaded.head.weight.data_ptr() == loaded.embed.weight.data_ptr()
+    assert isinstance(loaded.head.weight, torch.nn.Parameter)
+    assert not loaded.head.weight.requires_grad
+
+
+def test_sparse_buffer_comes_back_sparse(tmp_path):
+    _original, loaded, _path = _round_trip(tmp_path)
+
+    assert loaded.heads.is_sparse
+    assert torch.equal(loaded.heads.to_dense(), torch.eye(4, dtype=torch.bool))
+
+
+def test_tensors_are_aligned_views(tmp_path):
+    _original, loaded, _path = _round_trip(tmp_path)
+
+    for name, tensor in list(loaded.named_parameters()) + [('steps', loaded.steps), ('flags', loaded.flags)]:
+        assert tensor.data_ptr() % tensor.element_size() == 0, name
+
+
+def test_writes_stay_private_to_the_process(tmp_path):
+    original, loaded, path = _round_trip(tmp_path)
+
+    with torch.no_grad():
+        loaded.embed.weight.add_(1)
+    with parameters_on_meta():
+        again = load_module_tensors(TiedNet(), path)
+
+    assert torch.equal(again.embed.weight, original.embed.weight)
+
+
+def test_metadata_is_kept(tmp_path):
+    _original, _loaded, path = _round_trip(tmp_path, {'source': 'medium.pt'})
+
+    metadata = read_metadata(path)
+    assert metadata['source'] == 'medium.pt'
+    assert 'head.weight' in metadata['voiceflow.aliases']
+
+
+def test_missing_tensor_is_reported(tmp_path):
+    _original, _loaded, path = _round_trip(tmp_path)
+
+    with parameters_on_meta():
+        bigger = TiedNet()
+        bigger.extra = torch.nn.Linear(2, 2)
+
+    with pytest.raises(ValueError, match='extra.weight'):
+        load_module_tensors(bigger, path)
+
+
+def test_concurrent_saves_to_one_path(tmp_path):
+    import threading
+
+    torch.manual_seed(0)
+    original = TiedNet()
+    path = tmp_path / 'net.safetensors'
+    errors = []
+
+    def save():
+        try:
+            for _ in range(5):
+                save_module_tensors(original, path)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ['net.safetensors']
+    with parameters_on_meta():
+        loaded = load_module_tensors(TiedNet(), path)
+    assert torch.equal(loaded.embed.weight, original.embed.weight)
+
+
+def test_only_one_converter_writes(tmp_path):
+    pytest.importorskip('fcntl')
+    path = tmp_path / 'net-abc.safetensors'
+
+    with conversion_lock(path) as acquired:
+        assert acquired
+        # Another worker converting the same model backs off
+        convert_in_background(TiedNet(), path).join()
+        assert not path.exists()
+
+    convert_in_background(TiedNet(), path).join()
+    assert path.exists()
+    written = path.stat().st_mtime_ns
+
+    # Already converted: nothing is rewritten
+    convert_in_background(TiedNet(), path).join()
+    assert path.stat().st_mtime_ns == written
+
+
+def test_conversion_replaces_older_checkpoints(tmp_path):
+    stale = tmp_path / 'net-old.safetensors'
+    stale.write_bytes(b'stale')
+    path = tmp_path / 'net-new.safetensors'
+
+    convert_in_background(TiedNet(), path).join()
+
+    assert path.exists()
+    assert not stale.exists()
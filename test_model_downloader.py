@@ -0,0 +1,171 @@
+"""
+Tests for the resumable model downloader, against a local HTTP server
+Run with: python -m pytest test_model_downloader.py
+"""
+
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.model_downloader import DownloadError, ModelDownloader
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+SHA256 = hashlib.sha256(DATA).hexdigest()
+SEGMENT = 1024
+
+
+class FileServer:
+    """Serves DATA at /model.bin; records the Range header of every GET"""
+
+    def __init__(self, honor_ranges=True, advertise_ranges=True):
+        self.honor_ranges = honor_ranges
+        self.advertise_ranges = advertise_ranges
+        self.ranges = []
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _headers(self, status, length):
+                self.send_response(status)
+                self.send_header('Content-Length', str(length))
+                if server.advertise_ranges:
+                    self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+
+            def do_HEAD(self):
+                self._headers(200, len(DATA))
+
+            def do_GET(self):
+                header = self.headers.get('Range')
+                with server._lock:
+                    server.ranges.append(header)
+                match = re.match(r'bytes=(\d+)-(\d*)$', header or '')
+                if match and server.honor_ranges:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(DATA) - 1
+                    body = DATA[start:end + 1]
+                    self._headers(206, len(body))
+                else:
+                    body = DATA
+                    self._headers(200, len(body))
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/model.bin"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**options):
+        server = FileServer(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def _downloader(**options):
+    options.setdefault('segment_size', SEGMENT)
+    return ModelDownloader(max_workers=4, chunk_size=256, timeout=5, **options)
+
+
+def _write_partial(dest, segments, size=len(DATA)):
+    """Leave a .part/.part.json pair as an interrupted download would"""
+    part = bytearray(size)
+    for start, _end, done in segments:
+        part[start:start + done] = DATA[start:start + done]
+    dest.with_name(dest.name + '.part').write_bytes(bytes(part))
+    dest.with_name(dest.name + '.part.json').write_text(json.dumps({'size': size, 'segments': segments}))
+
+
+def test_parallel_ranged_segments(tmp_path, serve):
+    server = serve()
+    dest = tmp_path / 'model.bin'
+
+    _downloader().download([{'url': server.url, 'dest': dest, 'sha256': SHA256}])
+
+    assert dest.read_bytes() == DATA
+    expected = {f"bytes={start}-{min(start + SEGMENT, len(DATA)) - 1}" for start in range(0, len(DATA), SEGMENT)}
+    assert set(server.ranges) == expected
+    assert not (tmp_path / 'model.bin.part').exists()
+    assert not (tmp_path / 'model.bin.part.json').exists()
+
+
+def test_resume_from_partial_download(tmp_path, serve):
+    server = serve()
+    dest = tmp_path / 'model.bin'
+    segments = [[start, min(start + SEGMENT, len(DATA)) - 1, 0] for start in range(0, len(DATA), SEGMENT)]
+    segments[0][2] = SEGMENT        # finished
+    segments[1][2] = 300            # half done
+    _write_partial(dest, segments)
+
+    _downloader().download([{'url': server.url, 'dest': dest, 'sha256': SHA256}])
+
+    assert dest.read_bytes() == DATA
+    assert f"bytes={SEGMENT + 300}-{2 * SEGMENT - 1}" in server.ranges
+    assert not any(r.startswith('bytes=0-') for r in server.ranges)
+    assert server.bytes_sent == len(DATA) - SEGMENT - 300
+
+
+def test_server_ignoring_range_restarts_single_segment(tmp_path, serve):
+    server = serve(honor_ranges=False, advertise_ranges=False)
+    dest = tmp_path / 'model.bin'
+    # One whole-file segment, interrupted part-way
+    _write_partial(dest, [[0, len(DATA) - 1, 4000]])
+
+    _downloader().download([{'url': server.url, 'dest': dest, 'size': len(DATA), 'sha256': SHA256}])
+
+    assert dest.read_bytes() == DATA
+    assert server.ranges == [f"bytes=4000-{len(DATA) - 1}"]
+
+
+def test_server_ignoring_range_fails_segmented_download(tmp_path, serve):
+    # Advertises ranges on HEAD but answers every GET with the whole file
+    server = serve(honor_ranges=False, advertise_ranges=True)
+    dest = tmp_path / 'model.bin'
+
+    with pytest.raises(DownloadError, match='range'):
+        _downloader(retries=0).download([{'url': server.url, 'dest': dest, 'sha256': SHA256}])
+    assert not dest.exists()
+
+
+def test_checksum_mismatch_deletes_partial(tmp_path, serve):
+    server = serve()
+    dest = tmp_path / 'model.bin'
+
+    with pytest.raises(DownloadError, match='Checksum mismatch'):
+        _downloader().download([{'url': server.url, 'dest': dest, 'sha256': '0' * 64}])
+
+    assert not dest.exists()
+    assert not (tmp_path / 'model.bin.part').exists()
+    assert not (tmp_path / 'model.bin.part.json').exists()
+
+
+def test_git_sha1_verification(tmp_path, serve):
+    server = serve()
+    dest = tmp_path / 'config.json'
+    blob_id = hashlib.sha1(f"blob {len(DATA)}\0".encode() + DATA).hexdigest()
+
+    _downloader(segment_size=len(DATA)).download([{'url': server.url, 'dest': dest, 'git_sha1': blob_id}])
+
+    assert dest.read_bytes() == DATA
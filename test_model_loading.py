@@ -0,0 +1,162 @@
+"""
+Tests for ModelManager's single-flight model loading
+Run with: python -m pytest test_model_loading.py
+"""
+
+import os
+import threading
+from unittest import mock
+
+import pytest
+
+from utils.model_manager import ModelManager
+from utils.model_residency import ModelResidencyManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    # ModelManager points the HuggingFace and Whisper caches at its directory through os.environ
+    with mock.patch.dict(os.environ):
+        yield ModelManager(cache_dir=str(tmp_path), residency=ModelResidencyManager())
+
+
+def _in_threads(count, target):
+    """Run target in `count` threads; returns their results or exceptions"""
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _join(threads):
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive(), 'a caller is still waiting'
+
+
+def _wait_for_waiters(manager, model_key, count):
+    for _ in range(500):
+        if manager.get_load_stats().get(model_key, {}).get('waiters') == count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f'{count} waiters never arrived')
+
+
+def test_concurrent_callers_share_one_load(manager):
+    release = threading.Event()
+    calls = []
+    model = object()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return model
+
+    threads, results = _in_threads(8, lambda: manager._load_once('translator', loader))
+    _wait_for_waiters(manager, 'translator', 7)
+    assert manager.get_load_stats()['translator']['loading']
+    release.set()
+    _join(threads)
+
+    assert calls == [1]
+    assert all(result is model for result in results)
+    assert manager._load_once('translator', loader) is model
+    stats = manager.get_load_stats()['translator']
+    assert (stats['loads'], stats['waiters'], stats['hits'], stats['loading']) == (1, 7, 1, False)
+
+
+def test_failed_load_reaches_waiters_and_is_not_cached(manager):
+    release = threading.Event()
+    attempts = []
+
+    def failing_loader():
+        attempts.append(1)
+        release.wait(5)
+        raise RuntimeError('weights missing')
+
+    threads, results = _in_threads(4, lambda: manager._load_once('whisper', failing_loader))
+    _wait_for_waiters(manager, 'whisper', 3)
+    release.set()
+    _join(threads)
+
+    assert attempts == [1]
+    assert all(isinstance(result, RuntimeError) and str(result) == 'weights missing' for result in results)
+    assert not manager.is_model_loaded('whisper')
+    stats = manager.get_load_stats()['whisper']
+    assert (stats['failures'], stats['last_error'], stats['loading']) == (1, 'weights missing', False)
+
+    # The next call tries again
+    model = object()
+    assert manager._load_once('whisper', lambda: model) is model
+    assert manager.get_load_stats()['whisper']['last_error'] is None
+
+
+def test_failed_eviction_releases_waiters(manager):
+    manager.residency.memory_budget_bytes = 100
+    manager.install_model('kazakh_tts', object())
+    manager.residency.record_loaded('kazakh_tts', object(), fallback_bytes=100)
+    release = threading.Event()
+
+    def failing_unload(model_key, reason=None):
+        release.wait(5)
+        raise OSError('cannot release memory')
+
+    loader = mock.Mock(return_value=object())
+    with mock.patch.object(manager, 'unload_model', side_effect=failing_unload):
+        threads, results = _in_threads(3, lambda: manager._load_once('translator', loader))
+        _wait_for_waiters(manager, 'translator', 2)
+        release.set()
+        _join(threads)
+
+    assert all(isinstance(result, OSError) for result in results)
+    loader.assert_not_called()
+    assert 'translator' not in manager._pending_loads
+
+    # With eviction working again the load goes ahead and evicts the LRU model
+    assert manager._load_once('translator', loader) is loader.return_value
+    assert not manager.is_model_loaded('kazakh_tts')
+    assert manager.get_residency_status()['evictions'] == {'lru': 1}
+
+
+def test_unloaded_model_is_loaded_again(manager):
+    loader = mock.Mock(side_effect=lambda: object())
+
+    first = manager._load_once('kazakh_tts', loader)
+    manager.unload_model('kazakh_tts', reason='idle')
+    second = manager._load_once('kazakh_tts', loader)
+
+    assert loader.call_count == 2
+    assert first is not second
+    assert manager.get_load_stats()['kazakh_tts']['loads'] == 2
+
+
+def test_model_in_use_is_not_unloaded(manager):
+    loader = mock.Mock(side_effect=lambda: object())
+    model = manager._load_once('whisper', loader)
+
+    with manager.model_in_use('whisper'):
+        manager.unload_model('whisper', reason='idle')
+        manager.unload_model('whisper', reason='lru')
+        assert manager._load_once('whisper', loader) is model
+
+    manager.unload_model('whisper', reason='idle')
+    assert not manager.is_model_loaded('whisper')
+    assert manager.get_residency_status()['evictions'] == {'idle': 1}
+    assert loader.call_count == 1
+
+
+def test_explicit_unload_ignores_in_use(manager):
+    manager._load_once('whisper', lambda: object())
+
+    with manager.model_in_use('whisper'):
+        manager.unload_model('whisper')
+
+    assert not manager.is_model_loaded('whisper')
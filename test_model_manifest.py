@@ -0,0 +1,141 @@
+"""
+Tests for the persistent model manifest: round trips through disk, status
+lookups answered from it, and verification flagging changed files
+Run with: python -m pytest test_model_manifest.py
+"""
+
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from utils.model_manager import ModelManager
+from utils.model_manifest import MANIFEST_VERSION, ModelManifest, scan_model_files, sha256_file
+from utils.model_residency import ModelResidencyManager
+
+KAZAKH_ID = ModelManager.MODELS['kazakh_tts']['model_id']
+
+
+@pytest.fixture
+def manager(tmp_path):
+    # ModelManager points the HuggingFace and Whisper caches at its directory through os.environ
+    with mock.patch.dict(os.environ):
+        yield ModelManager(cache_dir=str(tmp_path / 'cache'), residency=ModelResidencyManager())
+
+
+def _hf_snapshot(manager, model_id=KAZAKH_ID, files=None):
+    """Lay out a HuggingFace cache snapshot the way huggingface_hub does"""
+    model_dir = manager.cache_dir / 'huggingface' / f"models--{model_id.replace('/', '--')}"
+    snapshot = model_dir / 'snapshots' / 'abc123'
+    for rel, data in (files or {'config.json': b'{}', 'model.safetensors': b'weights' * 100}).items():
+        (snapshot / rel).parent.mkdir(parents=True, exist_ok=True)
+        (snapshot / rel).write_bytes(data)
+    (model_dir / 'refs').mkdir(parents=True, exist_ok=True)
+    (model_dir / 'refs' / 'main').write_text('abc123')
+    return snapshot
+
+
+def test_scan_model_files(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.bin').write_bytes(b'aaaa')
+    (tmp_path / 'sub' / 'b.json').write_bytes(b'{}')
+
+    assert scan_model_files(tmp_path) == {
+        'a.bin': {'size': 4, 'sha256': None},
+        'sub/b.json': {'size': 2, 'sha256': None}
+    }
+    hashed = scan_model_files(tmp_path, hash_files=True, known_sha256={'a.bin': 'known'})
+    assert hashed['a.bin']['sha256'] == 'known'
+    assert hashed['sub/b.json']['sha256'] == sha256_file(tmp_path / 'sub' / 'b.json')
+    assert scan_model_files(tmp_path / 'a.bin') == {'a.bin': {'size': 4, 'sha256': None}}
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / 'manifest.json'
+    files = {'model.bin': {'size': 10, 'sha256': 'ff'}}
+    entry = ModelManifest(path).record('whisper', 'medium', tmp_path / 'medium.pt', files, 'download')
+
+    reopened = ModelManifest(path)
+    assert reopened.get('whisper') == entry
+    assert entry['size_bytes'] == 10
+    assert entry['hashed']
+    assert entry['source'] == 'download'
+    assert not list(tmp_path.glob('*.tmp'))
+
+    reopened.mark_invalid('whisper', 'model.bin changed or missing')
+    assert ModelManifest(path).get('whisper')['invalid'] == 'model.bin changed or missing'
+    reopened.remove('whisper')
+    assert ModelManifest(path).get('whisper') is None
+
+
+@pytest.mark.parametrize('content', ['{not json', json.dumps({'version': MANIFEST_VERSION + 1, 'models': {
+    'whisper': {'path': '/elsewhere'}}})], ids=['corrupt', 'other-version'])
+def test_unusable_manifest_is_ignored(tmp_path, content):
+    path = tmp_path / 'manifest.json'
+    path.write_text(content)
+
+    assert ModelManifest(path).get('whisper') is None
+
+
+def test_status_is_answered_from_the_manifest(manager):
+    snapshot = _hf_snapshot(manager)
+
+    assert manager.is_model_downloaded('kazakh_tts')
+    entry = manager.manifest.get('kazakh_tts')
+    assert entry['path'] == str(snapshot)
+    assert entry['source'] == 'scan'
+
+    # A fresh manager (next app start) does not look at the cache again
+    with mock.patch.object(ModelManager, '_resolve_model_path', side_effect=AssertionError('scanned')):
+        restarted = ModelManager(cache_dir=str(manager.cache_dir), residency=ModelResidencyManager())
+        assert restarted.is_model_downloaded('kazakh_tts')
+    assert restarted.get_download_status()['kazakh_tts']['path'] == str(snapshot)
+
+
+def test_missing_model_is_not_recorded(manager):
+    assert not manager.is_model_downloaded('translator')
+    assert manager.manifest.get('translator') is None
+
+
+def test_verify_records_hashes(manager):
+    _hf_snapshot(manager)
+
+    assert manager.verify_model('kazakh_tts')
+    entry = manager.manifest.get('kazakh_tts')
+    assert entry['hashed']
+    assert entry['source'] == 'verify'
+
+
+def test_changed_file_fails_verification(manager):
+    snapshot = _hf_snapshot(manager)
+    assert manager.verify_model('kazakh_tts')
+
+    # Same size, different content: only the recorded hash can tell
+    weights = snapshot / 'model.safetensors'
+    weights.write_bytes(b'W' * weights.stat().st_size)
+
+    assert not manager.verify_model('kazakh_tts')
+    assert 'model.safetensors' in manager.manifest.get('kazakh_tts')['invalid']
+    assert not manager.is_model_downloaded('kazakh_tts')
+
+
+def test_removed_file_fails_verification(manager):
+    snapshot = _hf_snapshot(manager)
+    manager.is_model_downloaded('kazakh_tts')
+
+    (snapshot / 'config.json').unlink()
+
+    assert not manager.verify_model('kazakh_tts')
+    assert not manager.is_model_downloaded('kazakh_tts')
+
+
+def test_deleted_model_is_forgotten(manager):
+    snapshot = _hf_snapshot(manager)
+    manager.is_model_downloaded('kazakh_tts')
+
+    for file in snapshot.iterdir():
+        file.unlink()
+
+    assert not manager.verify_model('kazakh_tts')
+    assert manager.manifest.get('kazakh_tts') is None
@@ -0,0 +1,186 @@
+"""
+Tests for model residency: LRU victim selection under a memory budget and idle reaping
+Run with: python -m pytest test_model_residency.py
+"""
+
+import threading
+import time
+
+from utils.model_residency import ModelResidencyManager, estimate_model_bytes
+
+MB = 1024 * 1024
+
+
+def _load(residency, key, size):
+    # object() cannot be measured, so the fallback size is recorded
+    return residency.record_loaded(key, object(), fallback_bytes=size)
+
+
+def test_admission_unloads_least_recently_used_first():
+    residency = ModelResidencyManager(memory_budget_bytes=100 * MB)
+    _load(residency, 'whisper', 40 * MB)
+    _load(residency, 'translator', 30 * MB)
+    _load(residency, 'kazakh_tts', 20 * MB)
+    residency.touch('whisper')  # LRU order is now translator, kazakh_tts, whisper
+
+    assert residency.plan_admission('new', 5 * MB) == []
+    assert residency.plan_admission('new', 20 * MB) == ['translator']
+    assert residency.plan_admission('new', 50 * MB) == ['translator', 'kazakh_tts']
+
+
+def test_admission_skips_pinned_and_reloading_models():
+    residency = ModelResidencyManager(memory_budget_bytes=100 * MB)
+    _load(residency, 'whisper', 40 * MB)
+    _load(residency, 'translator', 30 * MB)
+    _load(residency, 'kazakh_tts', 20 * MB)
+    residency.pin('whisper')
+
+    assert residency.plan_admission('translator', 30 * MB) == ['kazakh_tts']
+    assert residency.plan_admission('new', 60 * MB) == ['translator', 'kazakh_tts']
+
+    residency.unpin('whisper')
+    assert residency.plan_admission('new', 60 * MB) == ['whisper', 'translator']
+
+
+def test_admission_uses_measured_size_over_estimate():
+    import torch
+
+    residency = ModelResidencyManager(memory_budget_bytes=1000)
+    _load(residency, 'whisper', 600)
+    residency.record_loaded('translator', torch.nn.Embedding(75, 1))  # 300 bytes of float32
+    residency.record_unloaded('translator', 'budget')
+
+    # Measured at its last load, so the caller's larger estimate is ignored
+    assert residency.plan_admission('translator', 900) == []
+    assert residency.plan_admission('kazakh_tts', 900) == ['whisper']
+    assert residency.get_status()['evictions'] == {'budget': 1}
+
+
+def test_measured_load_over_budget_returns_victims():
+    residency = ModelResidencyManager(memory_budget_bytes=100 * MB)
+    _load(residency, 'whisper', 40 * MB)
+    _load(residency, 'translator', 30 * MB)
+
+    assert _load(residency, 'kazakh_tts', 50 * MB) == ['whisper']
+
+
+def test_no_budget_never_evicts():
+    residency = ModelResidencyManager()
+    _load(residency, 'whisper', 10 ** 12)
+
+    assert residency.plan_admission('translator', 10 ** 12) == []
+    assert _load(residency, 'translator', 10 ** 12) == []
+
+
+def test_estimate_counts_shared_storage_once():
+    import torch
+
+    model = torch.nn.Sequential(torch.nn.Embedding(10, 4), torch.nn.Linear(4, 10, bias=False))
+    model[1].weight = model[0].weight  # Tied, as in many language models
+
+    assert estimate_model_bytes(model) == 10 * 4 * 4
+    assert estimate_model_bytes({'pipeline': model, 'again': model}) == 10 * 4 * 4
+
+
+def test_idle_models_respect_timeouts_and_pins():
+    residency = ModelResidencyManager(idle_timeouts={'whisper': 0.05, 'translator': 0},
+                                      default_idle_timeout=None)
+    _load(residency, 'whisper', MB)
+    _load(residency, 'translator', MB)
+    _load(residency, 'kazakh_tts', MB)
+    time.sleep(0.1)
+
+    assert residency.idle_models() == ['whisper']
+    residency.touch('whisper')
+    assert residency.idle_models() == []
+    time.sleep(0.1)
+    residency.pin('whisper')
+    assert residency.idle_models() == []
+
+
+def test_reaper_unloads_idle_models():
+    residency = ModelResidencyManager(default_idle_timeout=0.05, reaper_interval=0.02)
+    unloaded = []
+    done = threading.Event()
+
+    def unload(key, reason):
+        unloaded.append((key, reason))
+        residency.record_unloaded(key, reason)
+        done.set()
+
+    _load(residency, 'whisper', MB)
+    residency.start_reaper(unload)
+    try:
+        assert done.wait(2)
+    finally:
+        residency.stop_reaper()
+
+    assert unloaded == [('whisper', 'idle')]
+    assert residency.get_status()['models'] == {}
+
+
+def test_reaper_not_started_without_timeouts():
+    residency = ModelResidencyManager(idle_timeouts={'whisper': 0})
+
+    residency.start_reaper(lambda key, reason: None)
+
+    assert residency._reaper is None
+
+
+def test_models_in_use_are_not_idle_or_evicted():
+    residency = ModelResidencyManager(memory_budget_bytes=100 * MB, default_idle_timeout=0.05)
+    _load(residency, 'whisper', 60 * MB)
+    _load(residency, 'translator', 30 * MB)
+    time.sleep(0.1)
+
+    with residency.in_use('whisper'):
+        assert residency.idle_models() == ['translator']
+        assert residency.plan_admission('kazakh_tts', 50 * MB) == ['translator']
+        assert not residency.claim_eviction('whisper', 'idle')
+        assert residency.get_status()['models']['whisper']['in_use'] == 1
+
+    # Finishing inference counts as a use
+    assert residency.idle_models() == ['translator']
+    assert residency.get_status()['models']['whisper']['in_use'] == 0
+    assert residency.claim_eviction('whisper', 'lru')
+    assert residency.get_status()['evictions'] == {'lru': 1}
+
+
+def test_in_use_is_counted_per_caller():
+    residency = ModelResidencyManager(default_idle_timeout=0.05)
+    _load(residency, 'whisper', MB)
+
+    with residency.in_use('whisper'):
+        with residency.in_use('whisper'):
+            pass
+        time.sleep(0.1)
+        assert residency.idle_models() == []
+    time.sleep(0.1)
+    assert residency.idle_models() == ['whisper']
+
+
+def test_concurrent_start_reaper_starts_one_thread(monkeypatch):
+    residency = ModelResidencyManager(default_idle_timeout=60, reaper_interval=60)
+    started = []
+    barrier = threading.Barrier(8)
+
+    class CountingThread(threading.Thread):
+        def start(self):
+            started.append(self)
+            super().start()
+
+    def start():
+        barrier.wait(5)
+        residency.start_reaper(lambda key, reason: None)
+
+    callers = [threading.Thread(target=start, daemon=True) for _ in range(8)]
+    monkeypatch.setattr(threading, 'Thread', CountingThread)
+    try:
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join(5)
+    finally:
+        residency.stop_reaper()
+
+    assert len(started) == 1
@@ -0,0 +1,151 @@
+"""
+Tests for the model server and its client: calls over a real connection,
+reply timeouts, authkey rejection and route parsing
+Run with: python -m pytest test_model_server.py
+"""
+
+import os
+import socket
+import threading
+import time
+from multiprocessing import AuthenticationError
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from utils.model_manager import ModelManager
+from utils.model_residency import ModelResidencyManager
+from utils.model_server import (SHM_MIN_BYTES, ModelClient, ModelServer, ModelServerError, RemoteTranslator,
+                                RemoteWhisperModel, pack_array, parse_server_routes, unpack_array)
+
+AUTHKEY = b'test-authkey-0123'
+
+
+class FakeWhisper:
+    def transcribe(self, audio, **options):
+        return {'text': f"{len(audio)} samples", 'language': options.get('language')}
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.delay = 0.0
+
+    def __call__(self, text, src_lang, tgt_lang):
+        time.sleep(self.delay)
+        if not text:
+            raise ValueError('nothing to translate')
+        return [{'translation_text': f"{tgt_lang}:{text}"}]
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A ModelServer on a free local port, hosting whisper and translator stand-ins"""
+    with mock.patch.dict(os.environ):
+        manager = ModelManager(cache_dir=str(tmp_path), residency=ModelResidencyManager())
+    manager.install_model('whisper', FakeWhisper())
+    manager.install_model('translator', FakeTranslator())
+    server = ModelServer(('127.0.0.1', 0), AUTHKEY, models=['whisper', 'translator'], manager=manager)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(500):
+        if server._listener is not None:
+            break
+        time.sleep(0.01)
+    yield server
+    server.close()
+
+
+def _client(server, authkey=AUTHKEY, timeout=5.0):
+    return ModelClient({'*': server._listener.address}, authkey, timeout=timeout)
+
+
+def test_remote_models_round_trip(server):
+    client = _client(server)
+
+    # Long enough to go through shared memory rather than inline
+    audio = np.zeros(SHM_MIN_BYTES // 4 + 1, dtype=np.float32)
+    assert RemoteWhisperModel(client).transcribe(audio, language='en') == {
+        'text': f"{len(audio)} samples", 'language': 'en'}
+    assert RemoteTranslator(client)('hello', src_lang='eng_Latn', tgt_lang='rus_Cyrl') == [
+        {'translation_text': 'rus_Cyrl:hello'}]
+    assert client.get_status()[f"127.0.0.1:{server._listener.address[1]}"]['models'] == ['whisper', 'translator']
+
+
+def test_server_errors_are_raised_and_connection_reused(server):
+    client = _client(server)
+
+    with pytest.raises(ModelServerError, match='ValueError: nothing to translate'):
+        client.translate('', 'eng_Latn', 'rus_Cyrl')
+    with pytest.raises(ModelServerError, match='does not host kazakh_tts'):
+        client.synthesize_kazakh('Сәлем')
+    assert client.translate('again', 'eng_Latn', 'kaz_Cyrl') == [{'translation_text': 'kaz_Cyrl:again'}]
+    assert client._pool(server._listener.address).qsize() == 1
+
+
+def test_slow_reply_times_out_and_is_not_read_later(server):
+    translator = server.manager.load_translator_model()
+    translator.delay = 0.5
+    client = _client(server, timeout=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(ConnectionError, match='did not answer translate within 0.1s'):
+        client.translate('slow', 'eng_Latn', 'rus_Cyrl')
+    assert time.monotonic() - started < 0.4
+    # The connection that would receive the late reply was dropped, not pooled
+    assert client._pool(server._listener.address).qsize() == 0
+
+    translator.delay = 0.0
+    time.sleep(0.5)
+    assert client.translate('fast', 'eng_Latn', 'rus_Cyrl') == [{'translation_text': 'rus_Cyrl:fast'}]
+
+
+def test_wrong_authkey_is_rejected(server):
+    with pytest.raises(AuthenticationError):
+        _client(server, authkey=b'wrong-authkey-000').translate('hi', 'eng_Latn', 'rus_Cyrl')
+
+    # The server keeps serving clients with the right key
+    assert _client(server).translate('hi', 'eng_Latn', 'rus_Cyrl') == [{'translation_text': 'rus_Cyrl:hi'}]
+
+
+def test_unreachable_server():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        address = probe.getsockname()
+    client = ModelClient({'*': address}, AUTHKEY, timeout=1.0)
+
+    with pytest.raises(ConnectionError, match='unavailable'):
+        client.translate('hi', 'eng_Latn', 'rus_Cyrl')
+    assert 'error' in client.get_status()[f"127.0.0.1:{address[1]}"]
+    assert not client.get_warmup_status()['ready']
+
+
+def test_pack_array_round_trip():
+    small = np.arange(10, dtype=np.float32)
+    spec, shm = pack_array(small)
+    assert shm is None
+    assert unpack_array(spec)[0] is spec['data']
+
+    large = np.arange(SHM_MIN_BYTES, dtype=np.int16).reshape(2, -1)
+    spec, shm = pack_array(large)
+    try:
+        array, attached = unpack_array(spec)
+        assert np.array_equal(array, large)
+        del array
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_parse_server_routes():
+    routes = parse_server_routes('127.0.0.1:7000, whisper@127.0.0.1:7001, translator+kazakh_tts@/tmp/models.sock')
+
+    assert routes == {
+        '*': ('127.0.0.1', 7000),
+        'whisper': ('127.0.0.1', 7001),
+        'translator': '/tmp/models.sock',
+        'kazakh_tts': '/tmp/models.sock'
+    }
+    with pytest.raises(ValueError):
+        parse_server_routes('vosk@127.0.0.1:7002')
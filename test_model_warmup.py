@@ -0,0 +1,140 @@
+"""
+Tests for startup warmup and readiness: warmup states, pinning, and warmup
+queuing on the same Whisper lock as requests
+Run with: python -m pytest test_model_warmup.py
+"""
+
+import os
+import sys
+import threading
+from unittest import mock
+
+import pytest
+
+from utils import model_warmup
+from utils.model_manager import ModelManager
+from utils.model_residency import ModelResidencyManager
+from utils.model_warmup import FAILED, NOT_LOADED, WARM, ModelWarmup, parse_warmup_models
+
+
+@pytest.fixture
+def manager(tmp_path):
+    # ModelManager points the HuggingFace and Whisper caches at its directory through os.environ
+    with mock.patch.dict(os.environ):
+        yield ModelManager(cache_dir=str(tmp_path), residency=ModelResidencyManager())
+
+
+def _install_step(monkeypatch, model_key, step):
+    monkeypatch.setitem(model_warmup.WARMUP_STEPS, model_key, step)
+
+
+def test_parse_warmup_models():
+    assert parse_warmup_models(None) == []
+    assert parse_warmup_models(' none ') == []
+    assert parse_warmup_models('all') == list(ModelManager.MODELS)
+    assert parse_warmup_models('whisper, translator,,') == ['whisper', 'translator']
+    assert parse_warmup_models('whisper,bogus') == ['whisper']
+
+
+def test_ready_once_every_model_is_warm_and_pinned(manager, monkeypatch):
+    for key in ('whisper', 'translator'):
+        _install_step(monkeypatch, key, lambda manager, key=key: manager.install_model(key, object()))
+    warmup = ModelWarmup(['whisper', 'translator'], manager=manager, preimport=False)
+    states = []
+    warmup.add_listener(lambda status: states.append(status['models']['whisper']['state']))
+
+    assert not warmup.is_ready()
+    assert warmup.get_status()['models']['whisper']['state'] == NOT_LOADED
+    warmup.run()
+
+    status = warmup.get_status()
+    assert warmup.is_ready() and status['ready']
+    assert status['models']['whisper']['state'] == WARM
+    assert status['models']['whisper']['required']
+    assert not status['models']['kazakh_tts']['required']
+    assert status['models']['kazakh_tts']['state'] == NOT_LOADED
+    assert states[0] == 'loading' and states[-1] == WARM
+    assert manager.get_residency_status()['models']['whisper']['pinned']
+
+
+def test_failed_warmup_is_reported_and_unpinned(manager, monkeypatch):
+    def fail(manager):
+        raise OSError('model files missing')
+
+    _install_step(monkeypatch, 'translator', fail)
+    warmup = ModelWarmup(['translator'], manager=manager, preimport=False)
+    warmup.run()
+
+    entry = warmup.get_status()['models']['translator']
+    assert entry['state'] == FAILED
+    assert entry['error'] == 'model files missing'
+    assert not warmup.is_ready()
+    assert 'translator' not in manager.residency._pinned
+
+
+def test_lazily_loaded_models_are_reported(manager):
+    manager.install_model('kazakh_tts', object())
+    warmup = ModelWarmup([], manager=manager, preimport=False)
+
+    status = warmup.get_status()
+    assert status['ready']
+    assert status['models']['kazakh_tts'] == dict(status['models']['kazakh_tts'], state=WARM, required=False)
+
+
+def test_whisper_warmup_holds_the_request_lock(manager):
+    seen = []
+
+    class FakeWhisper:
+        def transcribe(self, audio, **options):
+            seen.append(manager.whisper_lock.locked())
+            return {'text': ''}
+
+    manager.install_model('whisper', FakeWhisper())
+    model_warmup._warmup_whisper(manager)
+
+    assert seen == [True]
+
+
+def test_whisper_warmup_waits_for_a_running_request(manager):
+    calls = []
+
+    class FakeWhisper:
+        def transcribe(self, audio, **options):
+            calls.append('warmup')
+            return {'text': ''}
+
+    manager.install_model('whisper', FakeWhisper())
+    with manager.whisper_lock:
+        thread = threading.Thread(target=model_warmup._warmup_whisper, args=(manager,), daemon=True)
+        thread.start()
+        thread.join(0.2)
+        assert calls == []
+    thread.join(5)
+
+    assert calls == ['warmup']
+
+
+def test_readiness_endpoint(client, monkeypatch, manager):
+    app_module = sys.modules['app']
+    warmup = ModelWarmup(['translator'], manager=manager, preimport=False)
+    monkeypatch.setattr(app_module, 'get_model_warmup', lambda: warmup)
+
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.json['status'] == 'warming'
+
+    _install_step(monkeypatch, 'translator', lambda manager: manager.install_model('translator', object()))
+    warmup.run()
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert response.json['status'] == 'ready'
+    assert client.get('/health').json == {'status': 'ok'}
+
+
+def test_whisper_server_needs_concurrency_one():
+    from utils.model_server import check_concurrency
+
+    check_concurrency(['whisper'], 1)
+    check_concurrency(['translator', 'kazakh_tts'], 4)
+    with pytest.raises(ValueError, match='--model-concurrency 1'):
+        check_concurrency(['translator', 'whisper'], 2)
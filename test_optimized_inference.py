@@ -0,0 +1,96 @@
+"""
+Tests for optimized Whisper encoder execution: the TorchScript path against
+eager on a tiny model, and when a failing optimized call falls back to eager
+Run with: python -m pytest test_optimized_inference.py
+"""
+
+import pytest
+import torch
+from torch._dynamo.exc import TorchDynamoException
+
+from utils.optimized_inference import install_forward, optimize_whisper
+
+
+def _tiny_whisper():
+    from whisper.model import ModelDimensions, Whisper
+
+    torch.manual_seed(0)
+    # n_audio_ctx stays 1500: the encoder input is always a padded 30 s window
+    dims = ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=32, n_audio_head=2, n_audio_layer=1,
+                           n_vocab=51865, n_text_ctx=8, n_text_state=32, n_text_head=2, n_text_layer=1)
+    return Whisper(dims).eval()
+
+
+def test_script_encoder_matches_eager_for_batches(tmp_path):
+    model = _tiny_whisper()
+    mel = torch.randn(3, 80, 3000)
+    with torch.no_grad():
+        expected = model.encoder(mel)
+
+    assert optimize_whisper(model, 'script', tmp_path, 'test') == 'script'
+    with torch.no_grad():
+        batched = model.encoder(mel)
+        single = model.encoder(mel[1:2])
+
+    assert torch.allclose(batched, expected, atol=1e-5)
+    assert torch.allclose(single, expected[1:2], atol=1e-5)
+    assert [p.name for p in tmp_path.iterdir()] == ['whisper-encoder-test.pt']
+
+
+def test_cached_trace_is_reused(tmp_path):
+    optimize_whisper(_tiny_whisper(), 'script', tmp_path, 'test')
+    written = (tmp_path / 'whisper-encoder-test.pt').stat().st_mtime_ns
+
+    model = _tiny_whisper()
+    mel = torch.randn(2, 80, 3000)
+    with torch.no_grad():
+        expected = model.encoder(mel)
+    assert optimize_whisper(model, 'script', tmp_path, 'test') == 'script'
+    with torch.no_grad():
+        assert torch.allclose(model.encoder(mel), expected, atol=1e-5)
+    assert (tmp_path / 'whisper-encoder-test.pt').stat().st_mtime_ns == written
+
+
+class _Doubler(torch.nn.Module):
+    def forward(self, x):
+        return x * 2
+
+
+def _failing(error, calls):
+    def optimized(x):
+        calls.append(x)
+        raise error
+    return optimized
+
+
+def test_one_off_failure_falls_back_for_that_call_only():
+    module, calls = _Doubler(), []
+    install_forward(module, _failing(RuntimeError('CPU out of memory'), calls), 'test')
+
+    assert module(torch.tensor(2)) == 4
+    assert module(torch.tensor(3)) == 6
+    # Still trying the optimized path on every call
+    assert len(calls) == 2
+
+
+# TorchDynamoException is the base of dynamo's errors (BackendCompilerFailed, Unsupported, ...)
+@pytest.mark.parametrize('error', [
+    torch.jit.Error('The following operation failed in the TorchScript interpreter'),
+    TorchDynamoException('backend compiler failed: no C compiler'),
+], ids=['trace', 'compile'])
+def test_compile_or_trace_failure_switches_to_eager(error):
+    module, calls = _Doubler(), []
+    install_forward(module, _failing(error, calls), 'test')
+
+    assert module(torch.tensor(2)) == 4
+    assert module(torch.tensor(3)) == 6
+    assert len(calls) == 1
+
+
+def test_eager_mode_changes_nothing(tmp_path):
+    model = _tiny_whisper()
+    forward = model.encoder.forward
+
+    assert optimize_whisper(model, 'eager', tmp_path, 'test') == 'eager'
+    assert model.encoder.forward == forward
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,144 @@
+"""
+Tests for the request profiler's opt-in rules and the on-disk profile store
+Run with: python -m pytest test_profiling.py
+"""
+
+import os
+
+import pytest
+
+from utils.profiling import ProfileSession, ProfileStore, RequestProfiler, requested_mode
+
+
+@pytest.fixture
+def profiler(monkeypatch, tmp_path):
+    """RequestProfiler built from the environment, with profiling on"""
+    monkeypatch.setenv('VOICEFLOW_PROFILING', '1')
+    monkeypatch.setenv('VOICEFLOW_PROFILE_DIR', str(tmp_path))
+    monkeypatch.delenv('VOICEFLOW_PROFILING_TOKEN', raising=False)
+    monkeypatch.delenv('VOICEFLOW_PROFILE_SAMPLE_RATE', raising=False)
+
+    def build(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return RequestProfiler()
+
+    return build
+
+
+def _save(store, mode='sample', label='POST /stt'):
+    session = ProfileSession(mode, label, interval=0.001)
+    session.start()
+    session.stop()
+    store.save(session)
+    return session.id
+
+
+def test_requested_mode():
+    assert requested_mode('1') == 'sample'
+    assert requested_mode('sample') == 'sample'
+    assert requested_mode('trace') == 'trace'
+    for value in (None, '', '0', 'fast', 'accurate', 'SAMPLE', 'true'):
+        assert requested_mode(value) is None
+
+
+def test_opt_in_modes(profiler):
+    profiler = profiler()
+
+    assert profiler.wants_profile('1', None, False) == 'sample'
+    assert profiler.wants_profile('trace', None, False) == 'trace'
+    assert profiler.wants_profile(None, None, True) is None
+
+
+def test_other_values_do_not_opt_in(profiler):
+    profiler = profiler()
+
+    # e.g. a decoding profile name from another feature's query field
+    for value in ('fast', 'balanced', 'accurate', 'yes'):
+        assert profiler.wants_profile(value, None, False) is None
+
+
+def test_disabled_profiler_never_profiles(profiler):
+    profiler = profiler(VOICEFLOW_PROFILING='0', VOICEFLOW_PROFILE_SAMPLE_RATE='1')
+
+    assert profiler.wants_profile('sample', None, True) is None
+
+
+def test_token_required_when_configured(profiler):
+    profiler = profiler(VOICEFLOW_PROFILING_TOKEN='s3cret')
+
+    assert profiler.wants_profile('sample', None, False) is None
+    assert profiler.wants_profile('sample', 'wrong', False) is None
+    assert profiler.wants_profile('trace', 's3cret', False) == 'trace'
+    assert not profiler.authorized(None)
+    assert profiler.authorized('s3cret')
+
+
+def test_open_access_without_token(profiler):
+    assert profiler().authorized(None)
+
+
+def test_random_sampling_only_on_sampled_endpoints(profiler):
+    profiler = profiler(VOICEFLOW_PROFILE_SAMPLE_RATE='1')
+
+    assert profiler.wants_profile(None, None, True) == 'sample'
+    assert profiler.wants_profile('fast', None, True) == 'sample'
+    assert profiler.wants_profile(None, None, False) is None
+
+
+def test_concurrent_profiles_are_capped(profiler):
+    profiler = profiler(VOICEFLOW_PROFILE_MAX_CONCURRENT='1')
+
+    first = profiler.begin('sample', 'first')
+    try:
+        assert profiler.begin('sample', 'second') is None
+    finally:
+        profiler.end(first)
+    profiler.end(profiler.begin('sample', 'third'))
+
+
+def test_store_round_trip(tmp_path):
+    store = ProfileStore(tmp_path)
+    profile_id = _save(store, label='POST /tts')
+
+    profile = store.get(profile_id)
+    assert profile['label'] == 'POST /tts'
+    assert profile['mode'] == 'sample'
+    assert 'folded' in profile
+    assert [entry['id'] for entry in store.list()] == [profile_id]
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_trace_profiles_keep_pstats(tmp_path):
+    store = ProfileStore(tmp_path)
+    traced = _save(store, mode='trace')
+    sampled = _save(store, mode='sample')
+
+    # Python 3.12+ may fall back to sampling when another cProfile is active
+    if store.get(traced)['mode'] == 'trace':
+        assert store.pstats_path(traced).exists()
+    assert store.pstats_path(sampled) is None
+
+
+def test_store_keeps_most_recent(tmp_path):
+    store = ProfileStore(tmp_path, keep=2)
+    ids = []
+    for index in range(4):
+        ids.append(_save(store))
+        # Distinct mtimes, oldest first
+        os.utime(tmp_path / f"{ids[-1]}.json", (index, index))
+
+    _save(ProfileStore(tmp_path, keep=2))  # Pruning runs on save
+
+    remaining = {path.stem for path in tmp_path.glob('*.json')}
+    assert len(remaining) == 2
+    assert not remaining & set(ids[:3])
+
+
+@pytest.mark.parametrize('profile_id', ['../secret', 'a/b', 'abc.json', '', '..'])
+def test_store_rejects_non_alphanumeric_ids(tmp_path, profile_id):
+    (tmp_path.parent / 'secret.json').write_text('{"leaked": true}')
+    store = ProfileStore(tmp_path)
+
+    assert store.get(profile_id) is None
+    assert store.pstats_path(profile_id) is None
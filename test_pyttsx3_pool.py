@@ -0,0 +1,194 @@
+"""
+Tests for the pyttsx3 worker pool: a worker that crashes, hangs or cannot
+start is replaced, and requests wait for a free worker only so long
+Run with: python -m pytest test_pyttsx3_pool.py
+"""
+
+import itertools
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from utils import pyttsx3_pool
+from utils.metrics import Counter
+from utils.pyttsx3_pool import Pyttsx3Pool, Pyttsx3WorkerError
+
+WAV = b'RIFF-test'
+
+
+class FakeWorker:
+    """Stands in for _Worker; each one follows the next plan in `plans`"""
+
+    pids = itertools.count(1000)
+    plans = []
+    created = []
+
+    def __init__(self, ctx):
+        self.created.append(self)
+        self.process = type('Process', (), {'pid': next(self.pids)})()
+        self.plan = self.plans.pop(0) if self.plans else 'ok'
+        self.release = threading.Event()
+        self.jobs = []
+        self.killed = False
+
+    def call(self, job, timeout):
+        self.jobs.append(job)
+        if self.plan == 'crash':
+            raise EOFError()
+        if self.plan == 'hang':
+            raise TimeoutError()
+        if self.plan == 'start_failed':
+            raise Pyttsx3WorkerError('Could not start pyttsx3: no espeak')
+        if self.plan == 'error':
+            return ('error', 'Failed to generate audio')
+        if self.plan == 'busy':
+            self.release.wait(5)
+        return ('ok', WAV, {'voice_used': f"voice {self.process.pid}", 'gender_found': False}, 'memory')
+
+    def kill(self):
+        self.killed = True
+
+    def close(self):
+        self.killed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """pool(*plans, size=2, **timeouts): a Pyttsx3Pool whose workers follow the given plans"""
+    monkeypatch.setattr(pyttsx3_pool, '_Worker', FakeWorker)
+    monkeypatch.setattr(FakeWorker, 'plans', [])
+    monkeypatch.setattr(FakeWorker, 'created', [])
+    restarts = Counter('restarts', 'Restarts', ('reason',))
+    monkeypatch.setattr(pyttsx3_pool, 'WORKER_RESTARTS', restarts)
+
+    def make(*plans, size=2, **timeouts):
+        FakeWorker.plans.extend(plans)
+        created = Pyttsx3Pool(size, **timeouts)
+        created.restarts = restarts
+        return created
+
+    return make
+
+
+def _restarts(pool):
+    return {key[0]: value for key, value in pool.restarts.snapshot()['values']}
+
+
+def test_crashed_worker_is_replaced_and_job_retried(pool):
+    workers = pool('crash', 'ok')
+
+    wav, info = workers.synthesize('hello', 'english')
+
+    assert wav == WAV
+    crashed, replacement = FakeWorker.created
+    assert _restarts(workers) == {'crash': 1}
+    assert crashed.killed
+    assert workers._workers == [replacement]
+    assert replacement.jobs == [('hello', 'english', 'any')]
+    assert info['voice_used'] == f"voice {replacement.process.pid}"
+    # The new worker goes back to the idle queue for the next request
+    assert list(workers._idle.queue) == [replacement]
+
+
+def test_second_crash_fails_the_job_but_keeps_a_worker(pool):
+    workers = pool('crash', 'crash', 'ok')
+
+    with pytest.raises(Pyttsx3WorkerError, match='crashed'):
+        workers.synthesize('hello', 'english')
+
+    assert _restarts(workers) == {'crash': 2}
+    assert len(workers._workers) == 1
+    assert workers.synthesize('again', 'english')[0] == WAV
+
+
+def test_hung_worker_is_killed_and_replaced(pool):
+    workers = pool('hang', 'ok', job_timeout=2)
+
+    with pytest.raises(Pyttsx3WorkerError, match='did not finish within 2s'):
+        workers.synthesize('hello', 'english')
+
+    hung, replacement = FakeWorker.created
+    assert _restarts(workers) == {'timeout': 1}
+    assert hung.killed
+    assert workers._workers == [replacement]
+    assert replacement.plan == 'ok' and not replacement.jobs
+    # A hang is not retried: the job may have been the cause
+    assert workers.synthesize('next', 'english')[0] == WAV
+    assert replacement.jobs == [('next', 'english', 'any')]
+
+
+def test_start_failure_keeps_a_fresh_worker_for_the_next_request(pool):
+    workers = pool('start_failed', 'ok')
+
+    with pytest.raises(Pyttsx3WorkerError, match='Could not start'):
+        workers.synthesize('hello', 'english')
+
+    assert _restarts(workers) == {'start_failed': 1}
+    assert workers.synthesize('hello', 'english')[0] == WAV
+
+
+def test_driver_error_keeps_the_worker(pool):
+    workers = pool('error')
+
+    with pytest.raises(RuntimeError, match='Failed to generate audio'):
+        workers.synthesize('hello', 'english')
+
+    assert _restarts(workers) == {}
+    worker, = workers._workers
+    assert not worker.killed
+    assert list(workers._idle.queue) == [worker]
+
+
+def test_idle_worker_is_reused(pool):
+    workers = pool(size=2)
+
+    workers.synthesize('one', 'english')
+    workers.synthesize('two', 'english')
+
+    # The idle worker is reused rather than a second one started
+    assert len(workers._workers) == 1
+
+
+def test_busy_pool_times_out_waiting_for_a_worker(pool):
+    workers = pool('busy', size=1, acquire_timeout=0.1)
+    thread = threading.Thread(target=workers.synthesize, args=('long', 'english'), daemon=True)
+    thread.start()
+    for _ in range(500):
+        if workers._workers and workers._workers[0].jobs:
+            break
+        time.sleep(0.01)
+
+    with pytest.raises(TimeoutError, match='all 1 pyttsx3 workers stayed busy'):
+        workers.synthesize('waiting', 'english')
+
+    workers._workers[0].release.set()
+    thread.join(5)
+    assert workers.synthesize('after', 'english')[0] == WAV
+
+
+def test_closed_pool_refuses_jobs(pool):
+    workers = pool()
+    workers.synthesize('hello', 'english')
+    worker, = workers._workers
+
+    workers.close()
+
+    assert worker.killed
+    with pytest.raises(Pyttsx3WorkerError, match='closed'):
+        workers.synthesize('hello', 'english')
+
+
+def test_dead_worker_pipe_is_a_crash_not_a_hang():
+    # A worker that exits closes its end of the pipe; poll() returns at once and recv() fails
+    parent, child = multiprocessing.Pipe()
+    child.close()
+    worker = pyttsx3_pool._Worker.__new__(pyttsx3_pool._Worker)
+    worker.conn = parent
+
+    started = time.monotonic()
+    with pytest.raises(EOFError):
+        worker._receive(timeout=30)
+    assert time.monotonic() - started < 5
+    parent.close()
@@ -0,0 +1,80 @@
+"""
+Tests for output format validation and sample-rate/channel conversion
+Run with: python -m pytest test_resample.py
+"""
+
+import io
+
+import numpy as np
+import pytest
+import scipy.io.wavfile
+
+from utils.resample import CHANNEL_COUNTS, SAMPLE_RATES, check_output_format, convert_wav, wav_format
+
+
+def _tone(rate=22050, seconds=0.5, frequency=440.0, channels=1):
+    t = np.arange(int(rate * seconds)) / rate
+    pcm = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    scipy.io.wavfile.write(buffer, rate, pcm)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('sample_rate, channels, expected', [
+    (None, None, (None, None)),
+    ('', '', (None, None)),
+    (8000, 1, (8000, 1)),
+    ('48000', '2', (48000, 2)),
+    (None, 2, (None, 2)),
+    (16000.0, None, (16000, None)),
+])
+def test_accepted_formats(sample_rate, channels, expected):
+    assert check_output_format(sample_rate, channels) == expected
+
+
+@pytest.mark.parametrize('sample_rate, channels, message', [
+    (12345, None, 'sample_rate must be one of'),
+    (96000, None, 'sample_rate must be one of'),
+    (None, 3, 'channels must be one of'),
+    (None, 0, 'channels must be one of'),
+    ('fast', None, 'must be integers'),
+    (8000.5, None, 'must be integers'),
+    (None, True, 'must be integers'),
+    ([8000], None, 'must be integers'),
+])
+def test_rejected_formats(sample_rate, channels, message):
+    with pytest.raises(ValueError, match=message):
+        check_output_format(sample_rate, channels)
+
+
+def test_every_listed_format_is_accepted():
+    for rate in SAMPLE_RATES:
+        for channels in CHANNEL_COUNTS:
+            assert check_output_format(str(rate), str(channels)) == (rate, channels)
+
+
+@pytest.mark.parametrize('rate', [8000, 44100, 48000])
+def test_resampled_clip_keeps_length_and_pitch(rate):
+    wav = convert_wav(_tone(), sample_rate=rate)
+
+    out_rate, data = scipy.io.wavfile.read(io.BytesIO(wav))
+    assert out_rate == rate
+    assert data.dtype == np.int16
+    assert abs(len(data) - rate // 2) <= 1
+    spectrum = np.abs(np.fft.rfft(data.astype(np.float32)))
+    assert abs(np.argmax(spectrum) * rate / len(data) - 440.0) < 5
+
+
+def test_channel_conversion():
+    stereo = convert_wav(_tone(), channels=2)
+    assert wav_format(stereo) == (22050, 2)
+    _rate, data = scipy.io.wavfile.read(io.BytesIO(stereo))
+    assert np.array_equal(data[:, 0], data[:, 1])
+
+    assert wav_format(convert_wav(_tone(channels=2), sample_rate=8000, channels=1)) == (8000, 1)
+
+
+def test_wav_format_of_unreadable_data():
+    assert wav_format(b'not a wav file') == (None, None)
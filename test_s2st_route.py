@@ -0,0 +1,129 @@
+"""
+Tests for /s2st: sentence splitting, the NDJSON event stream, and how a
+failed translation or synthesis of one sentence is reported
+Run with: python -m pytest test_s2st_route.py
+"""
+
+import base64
+import json
+import queue
+import threading
+
+import pytest
+
+from benchmarks.standins import SCRIPTED_TEXT
+from routes import s2st_route
+from utils.text_translator import split_sentences
+
+PCM = 'audio/pcm;rate=16000'
+
+
+def _events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def _s2st(client, speech, **params):
+    query = '&'.join(f"{name}={value}" for name, value in params.items())
+    return client.post(f'/s2st?{query}', data=speech(3), content_type=PCM)
+
+
+def test_split_sentences():
+    assert split_sentences(' One. Two!  Three?\nFour… Five') == ['One.', 'Two!', 'Three?', 'Four…', 'Five']
+    assert split_sentences('Сәлем. Қалың қалай?') == ['Сәлем.', 'Қалың қалай?']
+    assert split_sentences('v1.2 is out') == ['v1.2 is out']
+    assert split_sentences('  \n ') == []
+
+
+def test_events_are_streamed_per_sentence(client, speech):
+    response = _s2st(client, speech, src_language='english', tgt_language='kazakh')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = _events(response)
+    transcript, *audio, done = events
+    assert transcript['type'] == 'transcript'
+    assert transcript['text'] == SCRIPTED_TEXT.strip()
+    assert transcript['language'] == 'english'
+    assert transcript['translated_by'] is None
+    assert transcript['sentences'] == len(split_sentences(SCRIPTED_TEXT)) == 2
+
+    assert [event['type'] for event in audio] == ['audio', 'audio']
+    assert [event['index'] for event in audio] == [0, 1]
+    assert [event['text'] for event in audio] == split_sentences(SCRIPTED_TEXT)
+    for event in audio:
+        assert event['mimetype'] == 'audio/wav'
+        assert base64.b64decode(event['audio'])[:4] == b'RIFF'
+
+    assert done['type'] == 'done'
+    assert done['language_selected'] == 'kaz_Cyrl'
+    assert done['translated_text'] == ' '.join(event['translated_text'] for event in audio)
+
+
+def test_failed_translation_speaks_the_source_sentence(client, speech, monkeypatch):
+    def fail(text, src_lang, tgt_lang, route='tts'):
+        raise RuntimeError('translator offline')
+
+    monkeypatch.setattr(s2st_route, 'translate', fail)
+
+    audio = [event for event in _events(_s2st(client, speech, src_language='english', tgt_language='kazakh'))
+             if event['type'] == 'audio']
+
+    assert [event['translated_text'] for event in audio] == split_sentences(SCRIPTED_TEXT)
+
+
+def test_failed_synthesis_is_reported_and_the_rest_continue(client, speech, monkeypatch):
+    synthesize_wav = s2st_route.synthesize_wav
+    calls = []
+
+    def fail_first(text, tgt_language, gender_preference='any', route='tts'):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError('no voice')
+        return synthesize_wav(text, tgt_language, gender_preference, route)
+
+    monkeypatch.setattr(s2st_route, 'synthesize_wav', fail_first)
+
+    events = _events(_s2st(client, speech, src_language='english', tgt_language='kazakh'))
+
+    assert [event['type'] for event in events] == ['transcript', 'error', 'audio', 'done']
+    assert events[1] == {'type': 'error', 'index': 0, 'error': 'TTS Error: no voice'}
+    assert events[2]['index'] == 1
+
+
+def test_cancelled_translation_stops_between_sentences(monkeypatch):
+    cancelled = threading.Event()
+    translated = []
+
+    def translate(text, src_lang, tgt_lang, route='tts'):
+        translated.append(text)
+        cancelled.set()
+        return text.upper()
+
+    monkeypatch.setattr(s2st_route, 'translate', translate)
+    results = queue.Queue()
+
+    s2st_route._translate_sentences(['one.', 'two.', 'three.'], 'eng_Latn', 'kaz_Cyrl', results, cancelled)
+
+    assert translated == ['one.']
+    assert results.get_nowait() == (0, 'one.', 'ONE.')
+    assert results.get_nowait() is None
+
+
+@pytest.mark.parametrize('params, error', [
+    ({'src_language': 'german', 'tgt_language': 'kazakh'}, 'Unsupported language'),
+    ({'src_language': 'english', 'tgt_language': 'german'}, 'Unsupported language'),
+    ({'src_language': 'russian', 'tgt_language': 'english', 'translation': 'google'}, 'translation must be'),
+    ({'src_language': 'english', 'tgt_language': 'kazakh', 'decoding_profile': 'sample'}, 'fast, balanced'),
+])
+def test_bad_requests(client, speech, params, error):
+    response = _s2st(client, speech, **params)
+
+    assert response.status_code == 400
+    assert error in response.json['error']
+
+
+def test_other_pcm_formats_are_rejected(client, speech):
+    response = client.post('/s2st?src_language=english&tgt_language=kazakh', data=speech(3),
+                           content_type='audio/pcm;rate=8000')
+
+    assert response.status_code == 415
@@ -0,0 +1,156 @@
+"""
+Tests for /stt/batch: NDJSON framing, ZIP archives and their limits, and
+per-file errors, on the stand-in Whisper model
+Run with: python -m pytest test_stt_batch_route.py
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from routes import stt_batch_route
+
+
+def _events(response):
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _by_filename(events):
+    return {event['filename']: event for event in events if event['type'] in ('result', 'error')}
+
+
+def test_multipart_batch_framing(client, speech):
+    response = client.post('/stt/batch', data={
+        'language': 'english',
+        'audio': [(io.BytesIO(speech(3, as_wav=True)), 'a.wav', 'audio/wav'),
+                  (io.BytesIO(speech(4, silence=1, as_wav=True)), 'b.wav', 'audio/wav')]
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    events = _events(response)
+    assert events[0] == {'type': 'accepted', 'files': 2}
+    assert events[-1]['type'] == 'done'
+    assert events[-1]['files'] == 2
+    assert events[-1]['errors'] == 0
+    results = _by_filename(events[1:-1])
+    assert set(results) == {'a.wav', 'b.wav'}
+    assert sorted(result['index'] for result in results.values()) == [0, 1]
+    assert results['b.wav']['duration_seconds'] == 6.0
+    assert results['b.wav']['speech_seconds'] < 6.0
+    assert all(result['type'] == 'result' and result['text'] for result in results.values())
+
+
+def test_bad_file_is_reported_and_batch_continues(client, speech):
+    response = client.post('/stt/batch', data={
+        'audio': [(io.BytesIO(b'not audio at all'), 'broken.wav', 'audio/wav'),
+                  (io.BytesIO(speech(3, as_wav=True)), 'good.wav', 'audio/wav')]
+    }, content_type='multipart/form-data')
+
+    events = _events(response)
+    results = _by_filename(events)
+    assert results['broken.wav']['type'] == 'error'
+    assert results['broken.wav']['error']
+    assert results['good.wav']['type'] == 'result'
+    assert events[-1]['errors'] == 1
+
+
+def test_unsupported_pcm_format_is_a_per_file_error(client, speech):
+    response = client.post('/stt/batch', data={
+        'audio': [(io.BytesIO(speech(3)), 'clip.pcm', 'audio/pcm;rate=16000;channels=2'),
+                  (io.BytesIO(speech(3)), 'mono.pcm', 'audio/pcm;rate=16000')]
+    }, content_type='multipart/form-data')
+
+    results = _by_filename(_events(response))
+    assert results['clip.pcm']['type'] == 'error'
+    assert results['mono.pcm']['type'] == 'result'
+
+
+def test_raw_zip_body_skips_metadata(client, speech):
+    body = _zip({
+        'clips/one.wav': speech(3, as_wav=True),
+        'clips/two.wav': speech(3, as_wav=True),
+        '__MACOSX/clips/._one.wav': b'\x00' * 64,
+        'clips/.DS_Store': b'\x00' * 64,
+    })
+    response = client.post('/stt/batch?language=english&decoding_profile=fast', data=body,
+                           content_type='application/zip')
+
+    events = _events(response)
+    assert events[0] == {'type': 'accepted', 'files': 2}
+    results = _by_filename(events)
+    assert set(results) == {'clips/one.wav', 'clips/two.wav'}
+    assert {result['decoding_profile'] for result in results.values()} == {'fast'}
+
+
+def test_zip_inside_multipart_is_expanded(client, speech):
+    archive = _zip({'one.wav': speech(3, as_wav=True), 'two.wav': speech(3, as_wav=True)})
+    response = client.post('/stt/batch', data={
+        'audio': [(io.BytesIO(archive), 'clips.zip', 'application/zip'),
+                  (io.BytesIO(speech(3, as_wav=True)), 'three.wav', 'audio/wav')]
+    }, content_type='multipart/form-data')
+
+    assert set(_by_filename(_events(response))) == {'one.wav', 'two.wav', 'three.wav'}
+
+
+def test_zip_member_over_upload_limit_is_rejected_before_decoding(client, speech, monkeypatch):
+    monkeypatch.setattr(stt_batch_route, 'MAX_UPLOAD_BYTES', 50_000)
+    body = _zip({'small.wav': speech(1, as_wav=True), 'large.wav': speech(3, as_wav=True)})
+    response = client.post('/stt/batch', data=body, content_type='application/zip')
+
+    results = _by_filename(_events(response))
+    assert results['large.wav']['type'] == 'error'
+    assert 'limit' in results['large.wav']['error']
+    assert results['small.wav']['type'] == 'result'
+
+
+def test_too_many_files(client, speech, monkeypatch):
+    monkeypatch.setattr(stt_batch_route, 'MAX_BATCH_FILES', 2)
+    body = _zip({f'{index}.wav': speech(1, as_wav=True) for index in range(3)})
+    response = client.post('/stt/batch', data=body, content_type='application/zip')
+
+    assert response.status_code == 400
+    assert 'at most 2 files' in response.json['error']
+
+
+def test_batch_size_limit(client, speech, monkeypatch):
+    monkeypatch.setattr(stt_batch_route, 'MAX_BATCH_BYTES', 1024)
+    response = client.post('/stt/batch', data=_zip({'one.wav': speech(1, as_wav=True)}),
+                           content_type='application/zip')
+
+    assert response.status_code == 413
+
+
+def test_batch_may_exceed_single_upload_limit(client, speech, monkeypatch):
+    # Flask's MAX_CONTENT_LENGTH is the single-upload limit; batches get their own
+    monkeypatch.setitem(client.application.config, 'MAX_CONTENT_LENGTH', 50_000)
+    body = _zip({'one.wav': speech(3, as_wav=True), 'two.wav': speech(3, as_wav=True)})
+    assert len(body) > 50_000
+
+    response = client.post('/stt/batch', data=body, content_type='application/zip')
+
+    assert response.status_code == 200
+    assert _events(response)[-1]['errors'] == 0
+
+
+@pytest.mark.parametrize('query, body, content_type, error', [
+    ('', b'not a zip', 'application/zip', 'Not a valid ZIP archive'),
+    ('', _zip({'notes/': b''}), 'application/zip', 'No audio files received'),
+    ('?language=klingon', _zip({'one.wav': b'RIFF'}), 'application/zip', 'Unsupported language'),
+    ('?decoding_profile=sample', _zip({'one.wav': b'RIFF'}), 'application/zip', 'fast, balanced, accurate'),
+], ids=['not-zip', 'no-files', 'language', 'decoding-profile'])
+def test_rejected_batches(client, query, body, content_type, error):
+    response = client.post('/stt/batch' + query, data=body, content_type=content_type)
+
+    assert response.status_code == 400
+    assert error in response.json['error']
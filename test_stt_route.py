@@ -0,0 +1,172 @@
+"""
+Tests for the /stt and /s2st request handling, on the stand-in Whisper model
+Run with: python -m pytest test_stt_route.py
+"""
+
+import io
+import json
+
+import pytest
+
+from benchmarks.standins import SCRIPTED_TEXT
+from routes import s2st_route, stt_route
+from utils import profiling
+from utils.decoding_profiles import DEFAULT_PROFILE
+
+PCM = 'audio/pcm;rate=16000'
+
+
+def _events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+@pytest.fixture
+def profiling_on(monkeypatch, tmp_path):
+    """Profiling enabled without a token, so any request may opt in"""
+    monkeypatch.setenv('VOICEFLOW_PROFILING', '1')
+    monkeypatch.setenv('VOICEFLOW_PROFILE_DIR', str(tmp_path))
+    monkeypatch.delenv('VOICEFLOW_PROFILING_TOKEN', raising=False)
+    monkeypatch.delenv('VOICEFLOW_PROFILE_SAMPLE_RATE', raising=False)
+    monkeypatch.setattr(profiling, '_request_profiler', profiling.RequestProfiler())
+    return tmp_path
+
+
+def test_decoding_profile_and_profiler_opt_in_are_separate(client, speech, profiling_on):
+    response = client.post('/stt?language=english&decoding_profile=accurate&profile=sample',
+                           data=speech(5), content_type=PCM)
+
+    assert response.status_code == 200
+    assert response.json['decoding_profile'] == 'accurate'
+    profile_id = response.headers['X-VoiceFlow-Profile-Id']
+    assert (profiling_on / f'{profile_id}.json').exists()
+
+
+def test_decoding_profile_name_does_not_start_profiling(client, speech, profiling_on):
+    response = client.post('/stt?language=english&profile=fast', data=speech(5), content_type=PCM)
+
+    # Not a decoding profile request either: the server picks one
+    assert response.status_code == 200
+    assert response.json['decoding_profile'] == DEFAULT_PROFILE
+    assert 'X-VoiceFlow-Profile-Id' not in response.headers
+    assert not list(profiling_on.glob('*.json'))
+
+
+def test_profiler_mode_is_not_a_decoding_profile(client, speech, profiling_on):
+    response = client.post('/stt?language=english&profile=trace&decoding_profile=fast',
+                           data=speech(5), content_type=PCM)
+
+    assert response.status_code == 200
+    assert response.json['decoding_profile'] == 'fast'
+    assert 'X-VoiceFlow-Profile-Id' in response.headers
+
+
+def test_decoding_profile_in_multipart_form(client, speech):
+    response = client.post('/stt', data={
+        'language': 'english',
+        'decoding_profile': 'fast',
+        'audio': (io.BytesIO(speech(5, as_wav=True)), 'clip.wav', 'audio/wav')
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.json['decoding_profile'] == 'fast'
+
+
+def test_unknown_decoding_profile_is_rejected(client, speech):
+    response = client.post('/stt?language=english&decoding_profile=sample', data=speech(5), content_type=PCM)
+
+    assert response.status_code == 400
+    assert 'fast, balanced, accurate' in response.json['error']
+
+
+def test_s2st_takes_decoding_profile(client, speech, profiling_on):
+    response = client.post('/s2st?src_language=english&tgt_language=english&decoding_profile=fast&profile=sample',
+                           data=speech(5), content_type=PCM)
+
+    events = _events(response)
+    assert events[0]['type'] == 'transcript'
+    assert events[0]['decoding_profile'] == 'fast'
+    assert events[-1]['type'] == 'done'
+    assert 'X-VoiceFlow-Profile-Id' in response.headers
+
+
+@pytest.mark.parametrize('src, tgt, mode, task', [
+    ('russian', 'english', 'whisper', 'translate'),
+    ('kazakh', 'english', 'whisper', 'translate'),
+    ('russian', 'english', 'nllb', 'transcribe'),
+    ('english', 'english', 'whisper', 'transcribe'),
+    ('russian', 'kazakh', 'whisper', 'transcribe'),
+    ('russian', None, 'whisper', 'transcribe'),
+])
+def test_whisper_task(src, tgt, mode, task):
+    assert stt_route.whisper_task(src, tgt, mode) == task
+
+
+@pytest.fixture
+def tasks(monkeypatch):
+    """Records the Whisper task of every transcription in /stt and /s2st"""
+    calls = []
+    transcribe = stt_route.transcribe
+
+    def record(model, audio, language, route='stt', task='transcribe', profile=None):
+        calls.append(task)
+        return transcribe(model, audio, language, route=route, task=task, profile=profile)
+
+    monkeypatch.setattr(stt_route, 'transcribe', record)
+    monkeypatch.setattr(s2st_route, 'transcribe', record)
+    return calls
+
+
+def test_stt_into_english_uses_whisper_translate(client, speech, tasks):
+    response = client.post('/stt?language=russian&tgt_language=english', data=speech(3), content_type=PCM)
+
+    assert response.status_code == 200
+    assert response.json['translated_by'] == 'whisper'
+    assert response.json['language'] == 'english'
+    assert response.json['text'] == SCRIPTED_TEXT.strip()
+    assert tasks == ['translate']
+
+
+def test_stt_nllb_mode_transcribes_then_translates(client, speech, tasks):
+    response = client.post('/stt?language=russian&tgt_language=english&translation=nllb',
+                           data=speech(3), content_type=PCM)
+
+    assert response.status_code == 200
+    assert response.json['translated_by'] == 'nllb'
+    assert tasks == ['transcribe']
+
+
+def test_stt_without_target_is_not_translated(client, speech, tasks):
+    response = client.post('/stt?language=russian', data=speech(3), content_type=PCM)
+
+    assert 'translated_by' not in response.json
+    assert tasks == ['transcribe']
+
+
+@pytest.mark.parametrize('query, error', [
+    ('language=russian&tgt_language=kazakh', 'only translate to English'),
+    ('language=russian&tgt_language=english&translation=google', 'translation must be'),
+])
+def test_stt_translation_bad_requests(client, speech, query, error):
+    response = client.post(f'/stt?{query}', data=speech(3), content_type=PCM)
+
+    assert response.status_code == 400
+    assert error in response.json['error']
+
+
+def test_s2st_into_english_skips_nllb_for_the_sentences(client, speech, tasks, monkeypatch):
+    translated = []
+
+    def translate(text, src_lang, tgt_lang, route='tts'):
+        translated.append((src_lang, tgt_lang))
+        return text
+
+    monkeypatch.setattr(s2st_route, 'translate', translate)
+
+    response = client.post('/s2st?src_language=russian&tgt_language=english', data=speech(3), content_type=PCM)
+
+    transcript = _events(response)[0]
+    assert transcript['language'] == 'english'
+    assert transcript['translated_by'] == 'whisper'
+    assert tasks == ['translate']
+    # Sentences are passed through as English to English, which translate() returns unchanged
+    assert translated and set(translated) == {('eng_Latn', 'eng_Latn')}
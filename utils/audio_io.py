@@ -0,0 +1,297 @@
+"""
+Audio decoding helpers for VoiceFlow
+Decodes uploads to the 16 kHz mono float32 arrays Whisper expects, without
+importing torch or whisper, so HTTP worker processes can preprocess audio
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Iterable, Optional, Union
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Upload limits; MAX_UPLOAD_BYTES is also Flask's MAX_CONTENT_LENGTH
+MAX_UPLOAD_BYTES = int(float(os.environ.get('VOICEFLOW_MAX_UPLOAD_MB', '50')) * 1024 * 1024)
+MAX_AUDIO_SECONDS = float(os.environ.get('VOICEFLOW_MAX_AUDIO_SECONDS', '600'))
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Containers that may keep their index at the end of the file; ffmpeg needs to seek, so they are spooled
+SEEKABLE_FORMATS = ('.mp4', '.m4a', '.mov', '.3gp')
+
+# Raw capture from the browser's AudioWorklet: 16 kHz mono little-endian PCM16 with no
+# container, already what Whisper needs, so it is converted without starting ffmpeg
+PCM_MIMETYPE = 'audio/pcm'
+PCM_SUFFIX = '.pcm'
+
+
+class AudioLimitExceeded(ValueError):
+    """An upload is larger, or decodes to longer audio, than the configured limits allow"""
+
+
+class UnsupportedAudioFormat(ValueError):
+    """An upload declares a format that cannot be decoded"""
+
+
+def check_pcm_format(mimetype_params) -> None:
+    """
+    Validate the parameters of an audio/pcm upload ('rate', 'channels')
+
+    Raises:
+        UnsupportedAudioFormat: Unless the audio is WHISPER_SAMPLE_RATE mono
+    """
+    rate = mimetype_params.get('rate', str(WHISPER_SAMPLE_RATE))
+    channels = mimetype_params.get('channels', '1')
+    if rate != str(WHISPER_SAMPLE_RATE) or channels != '1':
+        raise UnsupportedAudioFormat(
+            f"Raw PCM uploads must be {WHISPER_SAMPLE_RATE} Hz mono 16-bit little-endian "
+            f"(got rate={rate}, channels={channels})"
+        )
+
+
+def ffmpeg_executable() -> str:
+    """Return the ffmpeg binary on PATH, or the one bundled with imageio-ffmpeg"""
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception as exc:
+        raise RuntimeError(f"ffmpeg not available: {exc}")
+
+
+def _decoder_command(source: str, sample_rate: int, max_seconds: Optional[float] = None) -> list:
+    cmd = [ffmpeg_executable(), '-hide_banner', '-threads', '0', '-i', source]
+    if max_seconds:
+        # Decode just past the limit so over-long audio is detected without decoding all of it
+        cmd += ['-t', str(max_seconds + 1)]
+    return cmd + ['-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-']
+
+
+def _check_duration(samples: int, sample_rate: int, max_seconds: Optional[float]):
+    if max_seconds and samples > max_seconds * sample_rate:
+        raise AudioLimitExceeded(f"Audio is longer than the {max_seconds:g}s limit")
+
+
+def decode_audio(source: Union[str, bytes, os.PathLike], sample_rate: int = WHISPER_SAMPLE_RATE,
+                 max_seconds: Optional[float] = None):
+    """
+    Decode an audio file (any format ffmpeg reads) to mono float32 PCM
+
+    Mirrors whisper.audio.load_audio, so results are interchangeable.
+
+    Args:
+        source: Path to an audio file, or the encoded bytes themselves
+        sample_rate: Target sample rate
+        max_seconds: Reject audio longer than this
+
+    Returns:
+        1-D numpy float32 array in [-1, 1]
+
+    Raises:
+        RuntimeError: If ffmpeg is missing or cannot decode the input
+        AudioLimitExceeded: If the audio is longer than max_seconds
+    """
+    import numpy as np
+
+    from_stdin = isinstance(source, (bytes, bytearray, memoryview))
+    cmd = _decoder_command('-' if from_stdin else os.fspath(source), sample_rate, max_seconds)
+    if not from_stdin:
+        cmd.insert(1, '-nostdin')
+    try:
+        out = subprocess.run(
+            cmd,
+            input=bytes(source) if from_stdin else None,
+            capture_output=True,
+            check=True
+        ).stdout
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"Failed to decode audio: {exc.stderr.decode(errors='replace')[-500:]}")
+
+    _check_duration(len(out) // 2, sample_rate, max_seconds)
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def iter_chunks(stream, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterable[bytes]:
+    """Read a file-like object in bounded chunks"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _limit_chunks(chunks: Iterable[bytes], max_bytes: Optional[int]) -> Iterable[bytes]:
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        if max_bytes and received > max_bytes:
+            raise AudioLimitExceeded(f"Upload is larger than the {max_bytes // (1024 * 1024)} MB limit")
+        yield chunk
+
+
+def decode_pcm16_stream(chunks: Iterable[bytes], max_seconds: Optional[float] = None,
+                        max_bytes: Optional[int] = None):
+    """
+    Convert raw 16 kHz mono PCM16 chunks to float32 without ffmpeg
+
+    Args:
+        chunks: Iterable of little-endian 16-bit samples
+        max_seconds: Stop and reject once the audio passes this length
+        max_bytes: Stop and reject once the upload passes this size
+
+    Returns:
+        1-D numpy float32 array in [-1, 1]
+
+    Raises:
+        AudioLimitExceeded: If either limit is exceeded
+    """
+    import numpy as np
+
+    max_pcm_bytes = int(max_seconds * WHISPER_SAMPLE_RATE) * 2 if max_seconds else None
+    pcm = bytearray()
+    for chunk in _limit_chunks(chunks, max_bytes):
+        pcm += chunk
+        if max_pcm_bytes and len(pcm) > max_pcm_bytes:
+            _check_duration(len(pcm) // 2, WHISPER_SAMPLE_RATE, max_seconds)
+    if len(pcm) % 2:
+        # A truncated final sample
+        del pcm[-1]
+    return np.frombuffer(pcm, '<i2').astype(np.float32) / 32768.0
+
+
+def decode_audio_stream(chunks: Iterable[bytes], sample_rate: int = WHISPER_SAMPLE_RATE,
+                        max_seconds: Optional[float] = None, max_bytes: Optional[int] = None,
+                        suffix: str = ''):
+    """
+    Decode an upload while it is still being received
+
+    Chunks are piped into ffmpeg as they arrive and decoded PCM is read back
+    concurrently, so neither the encoded upload nor more than max_seconds of
+    decoded audio is ever held in memory. Formats that need seeking
+    (SEEKABLE_FORMATS) are spooled to a temporary file in chunks instead.
+    Raw PCM uploads (PCM_SUFFIX) at the Whisper rate skip ffmpeg entirely.
+
+    Args:
+        chunks: Iterable of encoded bytes, e.g. iter_chunks(request.stream)
+        sample_rate: Target sample rate
+        max_seconds: Stop and reject once the decoded audio passes this length
+        max_bytes: Stop and reject once the upload passes this size
+        suffix: File extension of the upload ('.webm', '.m4a', '.pcm', ...)
+
+    Returns:
+        1-D numpy float32 array in [-1, 1]
+
+    Raises:
+        RuntimeError: If ffmpeg is missing or cannot decode the input
+        AudioLimitExceeded: If either limit is exceeded
+    """
+    import numpy as np
+
+    if suffix.lower() == PCM_SUFFIX and sample_rate == WHISPER_SAMPLE_RATE:
+        return decode_pcm16_stream(chunks, max_seconds, max_bytes)
+
+    chunks = _limit_chunks(chunks, max_bytes)
+
+    if suffix.lower() in SEEKABLE_FORMATS:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+            try:
+                for chunk in chunks:
+                    spool.write(chunk)
+            except BaseException:
+                spool.close()
+                os.unlink(spool.name)
+                raise
+        try:
+            return decode_audio(spool.name, sample_rate, max_seconds)
+        finally:
+            os.unlink(spool.name)
+
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            _decoder_command('pipe:0', sample_rate),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr
+        )
+        feed_error = []
+
+        def feed():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its status is checked below
+            except BaseException as exc:
+                feed_error.append(exc)
+                process.kill()
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        # Feeding runs on its own thread so a full stdout pipe can never block the upload
+        feeder = threading.Thread(target=feed, name='audio-feed', daemon=True)
+        feeder.start()
+
+        max_pcm_bytes = int(max_seconds * sample_rate) * 2 if max_seconds else None
+        pcm = bytearray()
+        too_long = False
+        while True:
+            block = process.stdout.read(STREAM_CHUNK_BYTES)
+            if not block:
+                break
+            pcm += block
+            if max_pcm_bytes and len(pcm) > max_pcm_bytes:
+                too_long = True
+                process.kill()
+                break
+        process.stdout.close()
+        returncode = process.wait()
+        feeder.join()
+
+        if feed_error:
+            raise feed_error[0]
+        if too_long:
+            _check_duration(len(pcm) // 2, sample_rate, max_seconds)
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"Failed to decode audio: {stderr.read().decode(errors='replace')[-500:]}")
+
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def trim_silence(audio, sample_rate: int = WHISPER_SAMPLE_RATE, threshold_db: float = -45.0,
+                 frame_seconds: float = 0.03, padding_seconds: float = 0.2):
+    """
+    Cut leading and trailing silence using frame energy
+
+    Silence inside the clip is kept; Whisper handles pauses itself.
+
+    Args:
+        audio: 1-D float32 array in [-1, 1]
+        threshold_db: Frames quieter than this RMS level (dBFS) count as silence
+        frame_seconds: Analysis frame length
+        padding_seconds: Audio kept on either side of the first and last voiced frame
+
+    Returns:
+        A view of the voiced part, empty if no frame passes the threshold
+    """
+    import numpy as np
+
+    frame = max(1, int(sample_rate * frame_seconds))
+    frames = len(audio) // frame
+    if frames == 0:
+        return audio
+    blocks = audio[:frames * frame].reshape(frames, frame)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float32), axis=1))
+    voiced = np.flatnonzero(rms > 10 ** (threshold_db / 20))
+    if not voiced.size:
+        return audio[:0]
+    pad = int(sample_rate * padding_seconds)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(audio), (voiced[-1] + 1) * frame + pad)
+    return audio[start:end]
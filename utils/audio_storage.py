@@ -0,0 +1,416 @@
+"""
+Storage for generated audio
+Clips are written to a local directory (default) or an S3-compatible object
+store, so that any node behind a load balancer can serve any clip. The S3
+backend keeps a size-bounded local read-through cache and talks to the store
+with signed HTTP requests, without needing boto3.
+"""
+
+import datetime
+import hashlib
+import hmac
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'audio')
+
+CHUNK_BYTES = 1024 * 1024
+
+# Clip names are generated by the app; anything else (paths, '..') is refused before it reaches a backend
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def check_name(name: str) -> str:
+    if not _NAME_PATTERN.match(name or ''):
+        raise ValueError(f"Invalid audio name: {name!r}")
+    return name
+
+
+class AudioStorage:
+    """Where generated clips live; subclasses implement one backend"""
+
+    def staging_path(self, name: str) -> str:
+        """Local path a new clip should be written to before commit()"""
+        raise NotImplementedError
+
+    def commit(self, name: str) -> None:
+        """Make a clip written to staging_path() available to every node"""
+        raise NotImplementedError
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Local file holding the clip, fetching it if needed; None if it does not exist"""
+        raise NotImplementedError
+
+    @contextmanager
+    def local_copy(self, name: str):
+        """local_path() for reading a clip in a block: the file is not removed until the block ends"""
+        yield self.local_path(name)
+
+    def url(self, name: str, download: bool = False) -> Optional[str]:
+        """Direct URL for a clip, or None when the app's own /audio route should serve it"""
+        return None
+
+    def delete(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class LocalAudioStorage(AudioStorage):
+    """Clips in one local directory; only the node that wrote a clip can serve it"""
+
+    def __init__(self, directory: str = DEFAULT_AUDIO_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def staging_path(self, name: str) -> str:
+        return os.path.join(self.directory, check_name(name))
+
+    def commit(self, name: str) -> None:
+        pass  # Already in place
+
+    def local_path(self, name: str) -> Optional[str]:
+        path = os.path.join(self.directory, check_name(name))
+        return path if os.path.isfile(path) else None
+
+    def delete(self, name: str) -> None:
+        try:
+            os.unlink(os.path.join(self.directory, check_name(name)))
+        except FileNotFoundError:
+            pass
+
+
+class S3Client:
+    """
+    Minimal S3 client: path-style object requests signed with AWS Signature V4
+
+    Works with AWS S3 and S3-compatible stores (MinIO, Ceph, R2, ...).
+    Payloads are sent as UNSIGNED-PAYLOAD so uploads stream from disk
+    without being hashed first.
+    """
+
+    def __init__(self, endpoint: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = 'us-east-1', timeout: float = 30.0):
+        self.endpoint = endpoint.rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+        self.host = urllib.parse.urlsplit(self.endpoint).netloc
+
+    def _path(self, key: str) -> str:
+        return '/' + self.bucket + '/' + key
+
+    def _signing_key(self, datestamp: str) -> bytes:
+        key = ('AWS4' + self.secret_key).encode()
+        for part in (datestamp, self.region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        return key
+
+    def sign(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+             payload_hash: str, amz_date: str, host: Optional[str] = None) -> str:
+        """
+        Signature V4 signature for a request
+
+        Args:
+            path: Unencoded request path ('/bucket/key')
+            query: Query parameters, unencoded
+            headers: Headers to sign; must include host
+            payload_hash: Hex SHA-256 of the body, or 'UNSIGNED-PAYLOAD'
+            amz_date: Request time as YYYYMMDDTHHMMSSZ
+
+        Returns:
+            Hex signature
+        """
+        canonical_query = '&'.join(
+            f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}"
+            for k, v in sorted(query.items())
+        )
+        lowered = {k.lower(): ' '.join(str(v).split()) for k, v in headers.items()}
+        signed_headers = ';'.join(sorted(lowered))
+        canonical_request = '\n'.join([
+            method,
+            urllib.parse.quote(path, safe='/-_.~'),
+            canonical_query,
+            ''.join(f"{k}:{lowered[k]}\n" for k in sorted(lowered)),
+            signed_headers,
+            payload_hash
+        ])
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        return hmac.new(self._signing_key(amz_date[:8]), string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+    def request(self, method: str, key: str, body=None, headers: Optional[Dict[str, str]] = None):
+        """
+        Send a signed request for an object
+
+        Args:
+            body: bytes or a file object; file objects are streamed, and need
+                a Content-Length header
+
+        Returns:
+            The open urllib response; the caller closes it
+
+        Raises:
+            urllib.error.HTTPError: For error statuses (404 for missing objects)
+        """
+        amz_date = self._now()
+        headers = dict(headers or {}, **{
+            'host': self.host,
+            'x-amz-date': amz_date,
+            'x-amz-content-sha256': 'UNSIGNED-PAYLOAD'
+        })
+        path = self._path(key)
+        signature = self.sign(method, path, {}, headers, 'UNSIGNED-PAYLOAD', amz_date)
+        headers['Authorization'] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request, "
+            f"SignedHeaders={';'.join(sorted(k.lower() for k in headers if k != 'Authorization'))}, "
+            f"Signature={signature}"
+        )
+        del headers['host']  # urllib sets it
+        request = urllib.request.Request(
+            self.endpoint + urllib.parse.quote(path, safe='/-_.~'),
+            data=body, method=method, headers=headers
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def presign(self, method: str, key: str, expires: int = 3600,
+                params: Optional[Dict[str, str]] = None, amz_date: Optional[str] = None) -> str:
+        """URL that allows one method on an object until it expires, without credentials"""
+        amz_date = amz_date or self._now()
+        query = dict(params or {}, **{
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires),
+            'X-Amz-SignedHeaders': 'host'
+        })
+        path = self._path(key)
+        query['X-Amz-Signature'] = self.sign(method, path, query, {'host': self.host},
+                                             'UNSIGNED-PAYLOAD', amz_date)
+        return (self.endpoint + urllib.parse.quote(path, safe='/-_.~') + '?'
+                + urllib.parse.urlencode(query, quote_via=urllib.parse.quote, safe='-_.~'))
+
+
+class ReadThroughCache:
+    """Local copies of remote clips, trimmed to a byte budget, least recently used first"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Per-file sizes, so a file written again under the same name is not counted twice
+        self._sizes = {p.name: p.stat().st_size for p in self._files()}
+        self._size = sum(self._sizes.values())
+        self._pins = {}  # name -> readers that need the file to stay
+
+    def _files(self):
+        # Dot files are downloads and writes still in progress
+        return [p for p in self.directory.iterdir() if p.is_file() and not p.name.startswith('.')]
+
+    def path(self, name: str) -> Path:
+        return self.directory / check_name(name)
+
+    def get(self, name: str) -> Optional[str]:
+        path = self.path(name)
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        return str(path)
+
+    @contextmanager
+    def pinned(self, name: str):
+        """Keep a file out of trimming while the block runs"""
+        with self._lock:
+            self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[name] -= 1
+                if not self._pins[name]:
+                    del self._pins[name]
+
+    def added(self, name: str):
+        """Account for a file just placed at path(name) and trim if over budget"""
+        with self._lock:
+            size = self.path(name).stat().st_size
+            self._size += size - self._sizes.get(name, 0)
+            self._sizes[name] = size
+            if self._size <= self.max_bytes:
+                return
+            files = sorted(self._files(), key=lambda p: p.stat().st_mtime)
+            self._sizes = {p.name: p.stat().st_size for p in files}
+            self._size = sum(self._sizes.values())
+            # Trim to 90% so the next few clips do not each trigger a scan
+            for old in files:
+                if self._size <= self.max_bytes * 0.9:
+                    break
+                if old.name == name or old.name in self._pins:
+                    continue
+                old.unlink(missing_ok=True)
+                self._size -= self._sizes.pop(old.name)
+
+    def discard(self, name: str):
+        path = self.path(name)
+        with self._lock:
+            path.unlink(missing_ok=True)
+            self._size -= self._sizes.pop(name, 0)
+
+
+class S3AudioStorage(AudioStorage):
+    """
+    Clips in an S3-compatible bucket; every node can serve every clip
+
+    New clips are written into the local cache, uploaded from there in
+    chunks, and stay cached, so the node that made a clip serves it without
+    a round trip. Other nodes download a clip into their cache on first request.
+    """
+
+    URL_MODES = ('proxy', 'signed', 'public')
+
+    def __init__(self, client: S3Client, cache: ReadThroughCache, prefix: str = 'audio/',
+                 url_mode: str = 'proxy', url_expires: int = 3600, public_url: Optional[str] = None):
+        """
+        Args:
+            url_mode: 'proxy' - clips are served through this app's /audio route (stable URLs);
+                'signed' - clients get presigned URLs straight to the store;
+                'public' - clients get public_url + key, for public buckets or a CDN
+        """
+        if url_mode not in self.URL_MODES:
+            raise ValueError(f"url_mode must be one of {', '.join(self.URL_MODES)}")
+        if url_mode == 'public' and not public_url:
+            raise ValueError("url_mode 'public' needs a public URL")
+        self.client = client
+        self.cache = cache
+        self.prefix = prefix
+        self.url_mode = url_mode
+        self.url_expires = url_expires
+        self.public_url = (public_url or '').rstrip('/')
+
+    def _key(self, name: str) -> str:
+        return self.prefix + check_name(name)
+
+    def staging_path(self, name: str) -> str:
+        return str(self.cache.path(name))
+
+    def commit(self, name: str) -> None:
+        path = self.cache.path(name)
+        with open(path, 'rb') as f:
+            self.client.request('PUT', self._key(name), body=f, headers={
+                'Content-Length': str(path.stat().st_size),
+                'Content-Type': 'audio/wav'
+            }).close()
+        self.cache.added(name)
+
+    def local_path(self, name: str) -> Optional[str]:
+        cached = self.cache.get(name)
+        if cached:
+            return cached
+        path = self.cache.path(name)
+        fd, tmp_path = tempfile.mkstemp(prefix='.fetch-', dir=self.cache.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                try:
+                    with self.client.request('GET', self._key(name)) as response:
+                        shutil.copyfileobj(response, f, CHUNK_BYTES)
+                except urllib.error.HTTPError as exc:
+                    if exc.code == 404:
+                        return None
+                    raise
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.cache.added(name)
+        return str(path)
+
+    @contextmanager
+    def local_copy(self, name: str):
+        # Pinned before fetching, so trimming for other clips cannot remove it mid-read
+        with self.cache.pinned(check_name(name)):
+            yield self.local_path(name)
+
+    def url(self, name: str, download: bool = False) -> Optional[str]:
+        if self.url_mode == 'signed':
+            params = {'response-content-disposition': f'attachment; filename="{name}"'} if download else None
+            return self.client.presign('GET', self._key(name), self.url_expires, params)
+        if self.url_mode == 'public' and not download:
+            return f"{self.public_url}/{urllib.parse.quote(self._key(name))}"
+        return None
+
+    def delete(self, name: str) -> None:
+        try:
+            self.client.request('DELETE', self._key(name)).close()
+        except urllib.error.HTTPError as exc:
+            if exc.code != 404:
+                raise
+        self.cache.discard(name)
+
+
+def storage_from_env() -> AudioStorage:
+    """
+    Build the storage backend from VOICEFLOW_AUDIO_STORAGE ('local' or 's3')
+
+    Raises:
+        ValueError: Unknown backend or missing S3 settings
+    """
+    backend = os.environ.get('VOICEFLOW_AUDIO_STORAGE', 'local').strip().lower()
+    if backend == 'local':
+        return LocalAudioStorage(os.environ.get('VOICEFLOW_AUDIO_DIR', DEFAULT_AUDIO_DIR))
+    if backend != 's3':
+        raise ValueError(f"Unknown VOICEFLOW_AUDIO_STORAGE={backend!r}; use 'local' or 's3'")
+
+    bucket = os.environ.get('VOICEFLOW_S3_BUCKET')
+    access_key = os.environ.get('AWS_ACCESS_KEY_ID')
+    secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
+    if not (bucket and access_key and secret_key):
+        raise ValueError("S3 audio storage needs VOICEFLOW_S3_BUCKET, AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
+    region = os.environ.get('VOICEFLOW_S3_REGION', os.environ.get('AWS_REGION', 'us-east-1'))
+    client = S3Client(
+        os.environ.get('VOICEFLOW_S3_ENDPOINT', f'https://s3.{region}.amazonaws.com'),
+        bucket, access_key, secret_key, region
+    )
+    cache = ReadThroughCache(
+        os.environ.get('VOICEFLOW_AUDIO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'voiceflow-audio-cache')),
+        int(float(os.environ.get('VOICEFLOW_AUDIO_CACHE_MB', '500')) * 1024 * 1024)
+    )
+    return S3AudioStorage(
+        client, cache,
+        prefix=os.environ.get('VOICEFLOW_S3_PREFIX', 'audio/'),
+        url_mode=os.environ.get('VOICEFLOW_AUDIO_URL_MODE', 'proxy').strip().lower(),
+        url_expires=int(os.environ.get('VOICEFLOW_AUDIO_URL_EXPIRES', '3600')),
+        public_url=os.environ.get('VOICEFLOW_AUDIO_PUBLIC_URL')
+    )
+
+
+# Global instance
+_audio_storage = None
+_audio_storage_lock = threading.Lock()
+
+
+def get_audio_storage() -> AudioStorage:
+    """Get or create the global AudioStorage configured from the environment"""
+    global _audio_storage
+    if _audio_storage is None:
+        with _audio_storage_lock:
+            if _audio_storage is None:
+                _audio_storage = storage_from_env()
+    return _audio_storage
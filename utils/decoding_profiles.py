@@ -0,0 +1,109 @@
+"""
+Whisper decoding profiles for VoiceFlow
+Named sets of decoding options, from a greedy single pass to beam search
+with temperature fallback, and the rule that picks one per request
+"""
+
+import os
+from typing import Optional, Tuple
+
+from utils.metrics import MODEL_IN_FLIGHT, REGISTRY
+
+# Whisper's fallback schedule: a segment is decoded again at the next temperature
+# while its output looks repetitive (compression ratio) or unlikely (avg logprob)
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+DECODING_PROFILES = {
+    # One greedy pass per segment, no re-decodes and no prompt from the previous segment
+    'fast': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': 0.0,
+        'condition_on_previous_text': False,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6
+    },
+    # whisper.transcribe() defaults: greedy, re-decoded with sampling on low-confidence segments
+    'balanced': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': FALLBACK_TEMPERATURES,
+        'condition_on_previous_text': True,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6
+    },
+    # Beam search, with five samples per fallback temperature (the whisper CLI defaults)
+    'accurate': {
+        'beam_size': 5,
+        'best_of': 5,
+        'temperature': FALLBACK_TEMPERATURES,
+        'condition_on_previous_text': True,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6
+    }
+}
+
+# Used when a request does not ask for a profile
+DEFAULT_PROFILE = os.environ.get('VOICEFLOW_WHISPER_PROFILE', 'balanced').strip().lower()
+# Used instead of the default once this many Whisper requests are already waiting or running
+LOAD_PROFILE = os.environ.get('VOICEFLOW_WHISPER_LOAD_PROFILE', 'fast').strip().lower()
+LOAD_THRESHOLD = int(os.environ.get('VOICEFLOW_WHISPER_LOAD_THRESHOLD', '2'))
+# Clips this short (voice commands) take the greedy path; 0 disables
+SHORT_AUDIO_SECONDS = float(os.environ.get('VOICEFLOW_SHORT_AUDIO_SECONDS', '4'))
+
+for _name in (DEFAULT_PROFILE, LOAD_PROFILE):
+    if _name not in DECODING_PROFILES:
+        raise ValueError(f"Unknown Whisper decoding profile {_name!r}; use one of {', '.join(DECODING_PROFILES)}")
+
+PROFILE_CHOICES = REGISTRY.counter(
+    'voiceflow_whisper_profile_total', 'Whisper decoding profile used, and why it was picked', ('profile', 'reason'))
+
+
+def check_profile(name: Optional[str]) -> Optional[str]:
+    """
+    Validate a requested profile name
+
+    Raises:
+        ValueError: If the name is not a known profile
+    """
+    if name is None or name == '':
+        return None
+    name = name.strip().lower()
+    if name not in DECODING_PROFILES:
+        raise ValueError(f"profile must be one of {', '.join(DECODING_PROFILES)}")
+    return name
+
+
+def choose_profile(requested: Optional[str], audio_seconds: float) -> Tuple[str, str]:
+    """
+    Pick the decoding profile for one transcription
+
+    A requested profile always wins. Otherwise short clips use 'fast', and
+    the server default drops to LOAD_PROFILE while Whisper is busy.
+
+    Args:
+        requested: Profile named by the request, or None
+        audio_seconds: Length of the decoded audio
+
+    Returns:
+        (profile name, reason: 'requested', 'short_audio', 'load' or 'default')
+    """
+    requested = check_profile(requested)
+    if requested:
+        profile, reason = requested, 'requested'
+    elif SHORT_AUDIO_SECONDS and audio_seconds <= SHORT_AUDIO_SECONDS:
+        profile, reason = 'fast', 'short_audio'
+    elif LOAD_THRESHOLD and MODEL_IN_FLIGHT.value(model='whisper') >= LOAD_THRESHOLD:
+        profile, reason = LOAD_PROFILE, 'load'
+    else:
+        profile, reason = DEFAULT_PROFILE, 'default'
+    PROFILE_CHOICES.inc(profile=profile, reason=reason)
+    return profile, reason
+
+
+def decoding_options(profile: str) -> dict:
+    """whisper transcribe() keyword arguments for a profile"""
+    return dict(DECODING_PROFILES[profile])
@@ -0,0 +1,113 @@
+"""
+Link-or-copy helpers for placing bundled model files in the cache
+Tries copy-on-write reflinks, hardlinks and symlinks before falling back to a real copy
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Iterable
+
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'symlink', 'copy')
+
+# Linux FICLONE ioctl: share extents between two files on btrfs/XFS/overlay-capable filesystems
+_FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path):
+    if sys.platform.startswith('linux'):
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            except OSError:
+                fdst.close()
+                dst.unlink(missing_ok=True)
+                raise
+        shutil.copystat(src, dst)
+    elif sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL('libc.dylib', use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            raise OSError(ctypes.get_errno(), 'clonefile failed', str(src))
+    else:
+        raise OSError(f'reflink not supported on {sys.platform}')
+
+
+def _hardlink(src: Path, dst: Path):
+    os.link(src, dst)
+
+
+def _symlink(src: Path, dst: Path):
+    os.symlink(src, dst)
+
+
+def _copy(src: Path, dst: Path):
+    shutil.copy2(src, dst)
+
+
+_STRATEGIES = {
+    'reflink': _reflink,
+    'hardlink': _hardlink,
+    'symlink': _symlink,
+    'copy': _copy
+}
+
+
+def _strategies_for(mode: str) -> Iterable[str]:
+    if mode == 'auto':
+        return ('reflink', 'hardlink', 'symlink', 'copy')
+    if mode not in _STRATEGIES:
+        raise ValueError(f"Unknown link mode: {mode}")
+    # An explicit mode still falls back to copying rather than failing bootstrap
+    return (mode, 'copy') if mode != 'copy' else ('copy',)
+
+
+def link_tree(src: Path, dst: Path, mode: str = 'auto') -> Dict[str, int]:
+    """
+    Mirror every file under src into dst without duplicating data where possible
+
+    Symlinked files in src (the HuggingFace blob layout) are linked to their
+    real target. Files that already exist in dst with the same size are kept.
+
+    Args:
+        src: Source directory (e.g. bundled_models/huggingface)
+        dst: Destination directory in the model cache
+        mode: 'auto' tries reflink, hardlink, symlink, then copy; or one of those names
+
+    Returns:
+        Count of files placed per strategy, e.g. {'hardlink': 12, 'skipped': 3}
+    """
+    src, dst = Path(src), Path(dst)
+    counts = {}
+    if not src.exists():
+        return counts
+
+    # Remember the first strategy that fails so each file does not retry it
+    unavailable = set()
+    for root, _dirs, files in os.walk(src, followlinks=True):
+        rel_root = Path(root).relative_to(src)
+        for name in files:
+            source = (Path(root) / name).resolve()
+            target = dst / rel_root / name
+            if target.exists() and target.stat().st_size == source.stat().st_size:
+                counts['skipped'] = counts.get('skipped', 0) + 1
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.is_symlink() or target.exists():
+                target.unlink()
+
+            for strategy in _strategies_for(mode):
+                if strategy in unavailable:
+                    continue
+                try:
+                    _STRATEGIES[strategy](source, target)
+                except (OSError, NotImplementedError, AttributeError):
+                    if strategy == 'copy':
+                        raise
+                    unavailable.add(strategy)
+                    continue
+                counts[strategy] = counts.get(strategy, 0) + 1
+                break
+    return counts
@@ -1,34 +1,47 @@
 from utils.model_manager import get_model_manager
 
 
-kazakh_tts_model = None
-kazakh_tts_tokenizer = None
-
 def init_kk_tokenizer():
     """Get Kazakh TTS tokenizer from ModelManager"""
-    global kazakh_tts_tokenizer
-
-    if not kazakh_tts_tokenizer:
-        manager = get_model_manager()
-        loaded = manager.load_kazakh_tts_model()
-        kazakh_tts_tokenizer = loaded['tokenizer']
-    
-    return kazakh_tts_tokenizer
+    manager = get_model_manager()
+    return manager.load_kazakh_tts_model()['tokenizer']
 
 def init_kk_model():
     """Get Kazakh TTS model from ModelManager"""
-    global kazakh_tts_model
-
-    if not kazakh_tts_model:
-        manager = get_model_manager()
-        loaded = manager.load_kazakh_tts_model()
-        kazakh_tts_model = loaded['model']
-
-    return kazakh_tts_model
+    manager = get_model_manager()
+    return manager.load_kazakh_tts_model()['model']
 
 def init_kazakh_model():
     """Initialize Kazakh TTS model using ModelManager (downloads if needed)"""
     print("Loading Kazakh TTS model...")
     init_kk_tokenizer()
     init_kk_model()
-    print("Kazakh TTS model loaded successfully!")
\ No newline at end of file
+    print("Kazakh TTS model loaded successfully!")
+
+def synthesize_kazakh_local(manager, text):
+    """Synthesize Kazakh speech with the model loaded in this process"""
+    import torch
+    from utils.metrics import stage
+    from utils.profiling import profile_ops
+
+    with manager.model_in_use('kazakh_tts'):
+        loaded = manager.load_kazakh_tts_model()
+        with stage('tts', 'tokenize'):
+            inputs = loaded['tokenizer'](text, return_tensors="pt")
+        with stage('tts', 'inference'), profile_ops('kazakh_tts'), torch.no_grad():
+            output = loaded['model'](**inputs).waveform
+    return loaded['model'].config.sampling_rate, output.cpu().numpy().squeeze()
+
+def synthesize_kazakh(text):
+    """
+    Synthesize Kazakh speech, on the model server when one is configured
+
+    Returns:
+        (sampling_rate, float32 numpy waveform)
+    """
+    from utils.model_server import get_model_client
+
+    client = get_model_client()
+    if client is not None and client.serves('kazakh_tts'):
+        return client.synthesize_kazakh(text)
+    return synthesize_kazakh_local(get_model_manager(), text)
@@ -0,0 +1,367 @@
+"""
+In-process metrics for VoiceFlow in the Prometheus text format
+Counters, gauges and histograms are cheap enough (one lock and a bisect per
+observation) to stay on in production. Values from other processes (HTTP
+workers, model servers) are merged in through JSON snapshots.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans a fast translate call up to a long transcription
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _snapshot_values(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def snapshot(self) -> dict:
+        return {
+            'type': self.kind,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'values': self._snapshot_values()
+        }
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        """Current value in this process"""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, the +Inf bucket last, then sum and count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _snapshot_values(self) -> list:
+        with self._lock:
+            return [[list(key), [list(entry[0]), entry[1], entry[2]]] for key, entry in self._values.items()]
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data['buckets'] = list(self.buckets)
+        return data
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Sum snapshots from several processes; families with the same name are combined by label set"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(family, values={})
+            values = target['values']
+            for labels, value in family['values']:
+                key = tuple(labels)
+                if family['type'] == 'histogram':
+                    current = values.get(key)
+                    if current is None or len(current[0]) != len(value[0]):
+                        values[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    values[key] = values.get(key, 0.0) + value
+    for family in merged.values():
+        family['values'] = [[list(key), value] for key, value in family['values'].items()]
+    return merged
+
+
+def render_snapshot(snapshot: dict) -> str:
+    """Render a (merged) snapshot in the Prometheus text exposition format"""
+    lines = []
+    for name in sorted(snapshot):
+        family = snapshot[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labelnames = family['labelnames']
+        for labels, value in sorted(family['values'], key=lambda item: item[0]):
+            if family['type'] == 'histogram':
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(family['buckets']) + [float('inf')], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+            else:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class Registry:
+    """Holds metrics and collectors; renders and shares them across processes"""
+
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        """
+        Initialize Registry
+
+        Args:
+            multiprocess_dir: Directory where each process drops a snapshot so
+                any one of them can serve totals for all (e.g. gunicorn workers)
+        """
+        self.multiprocess_dir = multiprocess_dir
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_write = 0.0
+        self._pending_write = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Dict[str, dict]]):
+        """
+        Register a callable evaluated at scrape time
+
+        It returns snapshot-shaped families: {name: {'type', 'help', 'labelnames', 'values'}}.
+        Used for state that is already tracked elsewhere (load stats, queues),
+        so the hot path pays nothing.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """Snapshot of every metric and collector in this process"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        snapshots = [{metric.name: metric.snapshot() for metric in metrics}]
+        for collector in collectors:
+            try:
+                snapshots.append(collector())
+            except Exception as exc:
+                print(f"Metrics collector failed: {exc}")
+        return merge_snapshots(snapshots)
+
+    def write_snapshot(self, min_interval: float = 1.0):
+        """
+        Publish this process's snapshot for the others
+
+        Writes at most once per min_interval. A write skipped by the limit is
+        made up by a trailing one, so the state after the last request (e.g.
+        in-flight back at zero) always reaches the peers.
+        """
+        if not self.multiprocess_dir:
+            return
+        with self._write_lock:
+            wait = self._last_write + min_interval - time.monotonic()
+            if wait > 0:
+                if self._pending_write is None:
+                    self._pending_write = threading.Timer(wait, self._trailing_write)
+                    self._pending_write.daemon = True
+                    self._pending_write.start()
+                return
+            self._last_write = time.monotonic()
+        self._write_snapshot_file()
+
+    def _trailing_write(self):
+        with self._write_lock:
+            self._pending_write = None
+            self._last_write = time.monotonic()
+        self._write_snapshot_file()
+
+    def _write_snapshot_file(self):
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        # Per thread, since a trailing write can overlap one from a request
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _peer_snapshots(self) -> List[dict]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+            pid = int(os.path.basename(path).split('.')[0])
+            if pid == os.getpid():
+                continue
+            if not _pid_alive(pid):
+                # Its counters reset like any restarted process; Prometheus handles that
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self, extra_snapshots: Iterable[dict] = ()) -> str:
+        """
+        Render all metrics as Prometheus text
+
+        Args:
+            extra_snapshots: Snapshots fetched from other processes (model servers)
+        """
+        snapshots = [self.snapshot(), *extra_snapshots]
+        if self.multiprocess_dir and os.path.isdir(self.multiprocess_dir):
+            snapshots.extend(self._peer_snapshots())
+        return render_snapshot(merge_snapshots(snapshots))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+REGISTRY = Registry(os.environ.get('VOICEFLOW_METRICS_DIR') or None)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'voiceflow_http_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'method', 'status'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'voiceflow_http_request_seconds', 'HTTP request latency by endpoint', ('endpoint',))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'voiceflow_http_requests_in_flight', 'HTTP requests currently being handled')
+STAGE_SECONDS = REGISTRY.histogram(
+    'voiceflow_stage_seconds', 'Time spent in each request stage', ('route', 'stage'))
+ERRORS = REGISTRY.counter(
+    'voiceflow_errors_total', 'Errors by route and exception type', ('route', 'type'))
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    'voiceflow_model_load_seconds', 'Model load time', ('model',),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0))
+MODEL_IN_FLIGHT = REGISTRY.gauge(
+    'voiceflow_model_requests_in_flight', 'Requests waiting on or running inference per model', ('model',))
+
+
+def stage(route: str, name: str):
+    """Time one stage of a request, e.g. with stage('stt', 'decode'): ..."""
+    return STAGE_SECONDS.time(route=route, stage=name)
+
+
+def inference(model_key: str):
+    """Count a request as in flight for the model while it waits on inference (local or remote)"""
+    return MODEL_IN_FLIGHT.track_inprogress(model=model_key)
+
+
+def record_error(route: str, exc: BaseException):
+    ERRORS.inc(route=route, type=type(exc).__name__)
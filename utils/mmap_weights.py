@@ -0,0 +1,271 @@
+"""
+Memory-mapped model weights for VoiceFlow
+Saves a loaded torch module's tensors once in safetensors format and restores
+them later as views into a private file mapping, so weights are backed by the
+page cache and shared by every process on the host that maps the same file
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+_DTYPE_NAMES = {
+    'float64': 'F64',
+    'float32': 'F32',
+    'float16': 'F16',
+    'bfloat16': 'BF16',
+    'int64': 'I64',
+    'int32': 'I32',
+    'int16': 'I16',
+    'int8': 'I8',
+    'uint8': 'U8',
+    'bool': 'BOOL'
+}
+
+
+def _torch_dtype(name: str):
+    import torch
+    reverse = {value: key for key, value in _DTYPE_NAMES.items()}
+    return getattr(torch, reverse[name])
+
+
+@contextmanager
+def parameters_on_meta():
+    """
+    Build modules with parameters on the meta device and buffers on CPU
+
+    Skips allocating and randomly initializing weights that are about to be
+    replaced. Unlike torch.device('meta'), buffers computed in __init__
+    (masks, sparse alignment heads) still work.
+    """
+    import torch
+
+    original = torch.nn.Module.register_parameter
+
+    def register_parameter(module, name, param):
+        original(module, name, param)
+        if param is not None and not param.is_meta:
+            module._parameters[name] = torch.nn.Parameter(
+                param.to('meta'), requires_grad=param.requires_grad
+            )
+
+    torch.nn.Module.register_parameter = register_parameter
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = original
+
+
+def _module_tensors(module):
+    """Yield (name, tensor, is_parameter) for every parameter and buffer, aliases included"""
+    for name, param in module.named_parameters(remove_duplicate=False):
+        yield name, param, True
+    for name, buffer in module.named_buffers(remove_duplicate=False):
+        if buffer is not None:
+            yield name, buffer, False
+
+
+def save_module_tensors(module, path: Path, metadata: Optional[dict] = None):
+    """
+    Write all parameters and buffers of a module to a safetensors file
+
+    Non-persistent buffers are included so a skeleton built under
+    parameters_on_meta() can be fully restored. Tensors are ordered by element size so
+    every tensor starts at an offset aligned to its dtype, which lets the
+    loader create zero-copy views.
+
+    Args:
+        module: A torch.nn.Module with real (non-meta) tensors
+        path: Destination .safetensors file, written atomically
+        metadata: Extra string metadata to store in the header
+    """
+    import torch
+
+    path = Path(path)
+    entries = []
+    aliases = {}
+    sparse = []
+    seen = {}
+    for name, tensor, is_parameter in _module_tensors(module):
+        if id(tensor) in seen:
+            aliases[name] = seen[id(tensor)]
+            continue
+        seen[id(tensor)] = name
+        if tensor.is_sparse:
+            sparse.append(name)
+            tensor = tensor.to_dense()
+        tensor = tensor.detach().to('cpu').contiguous()
+        entries.append((name, tensor, is_parameter))
+
+    entries.sort(key=lambda entry: -entry[1].element_size())
+
+    header = {}
+    offset = 0
+    for name, tensor, is_parameter in entries:
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {
+            'dtype': _DTYPE_NAMES[str(tensor.dtype).replace('torch.', '')],
+            'shape': list(tensor.shape),
+            'data_offsets': [offset, offset + nbytes]
+        }
+        offset += nbytes
+
+    header['__metadata__'] = dict(metadata or {})
+    header['__metadata__'].update({
+        'voiceflow.aliases': json.dumps(aliases),
+        'voiceflow.sparse': json.dumps(sparse),
+        'voiceflow.parameters': json.dumps([name for name, _, is_param in entries if is_param])
+    })
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad the header so the data section starts 8-byte aligned
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A temp file of its own: other processes may be converting the same model
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.' + path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for _name, tensor, _is_param in entries:
+                if tensor.numel():
+                    f.write(memoryview(tensor.view(-1).view(torch.uint8).numpy()))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def read_metadata(path: Path) -> dict:
+    """Return the __metadata__ dict of a safetensors file"""
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    return header.get('__metadata__', {})
+
+
+def load_module_tensors(module, path: Path):
+    """
+    Point a module's parameters and buffers at a memory-mapped safetensors file
+
+    The module is usually built under parameters_on_meta() so no memory is
+    spent on random initialization. The mapping is copy-on-write: pages stay shared
+    with the page cache (and other processes) unless a weight is modified.
+
+    Args:
+        module: torch.nn.Module with the same structure the file was saved from
+        path: File written by save_module_tensors
+
+    Returns:
+        The module, switched to eval mode
+
+    Raises:
+        ValueError: If a tensor is missing or the module still has meta tensors
+    """
+    import torch
+
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+        data_start = 8 + header_len
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    metadata = header.pop('__metadata__', {})
+    aliases = json.loads(metadata.get('voiceflow.aliases', '{}'))
+    sparse = set(json.loads(metadata.get('voiceflow.sparse', '[]')))
+    parameters = set(json.loads(metadata.get('voiceflow.parameters', '[]')))
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = _torch_dtype(info['dtype'])
+        begin, end = info['data_offsets']
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        if count:
+            # frombuffer keeps a reference to the mapping for the tensor's lifetime
+            tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + begin)
+        else:
+            tensor = torch.empty(0, dtype=dtype)
+        tensor = tensor.view(info['shape'])
+        tensors[name] = tensor.to_sparse() if name in sparse else tensor
+    for name, original in aliases.items():
+        tensors[name] = tensors[original]
+
+    for name, tensor in tensors.items():
+        owner_name, _, leaf = name.rpartition('.')
+        owner = module.get_submodule(owner_name) if owner_name else module
+        if name in parameters or leaf in owner._parameters:
+            owner._parameters[leaf] = torch.nn.Parameter(tensor, requires_grad=False)
+        else:
+            owner._buffers[leaf] = tensor
+
+    leftover = [name for name, tensor, _ in _module_tensors(module) if tensor.is_meta]
+    if leftover:
+        raise ValueError(f"{path.name} has no data for {', '.join(leftover[:5])}")
+    return module.eval()
+
+
+@contextmanager
+def conversion_lock(path: Path):
+    """
+    Exclusive, non-blocking lock on converting one file, shared by all processes
+
+    Yields:
+        True if this caller holds the lock, False if another process is converting
+    """
+    path = Path(path)
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): converters may duplicate work, but each writes its own temp file
+        yield True
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + '.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def convert_in_background(module, path: Path, metadata: Optional[dict] = None) -> threading.Thread:
+    """
+    Write a module's mmap file from a background thread
+
+    The caller keeps serving with the eagerly loaded module; later loads
+    (and other worker processes) pick up the converted file. When several
+    workers load the same model cold, one converts and the others skip.
+
+    Returns:
+        The started thread
+    """
+    path = Path(path)
+
+    def convert():
+        try:
+            with conversion_lock(path) as acquired:
+                if not acquired or path.exists():
+                    return
+                # Drop files converted from an older checkpoint of the same model
+                for stale in path.parent.glob(path.name.split('-')[0] + '-*.safetensors'):
+                    if stale != path:
+                        stale.unlink(missing_ok=True)
+                save_module_tensors(module, path, metadata)
+            print(f"✔ Converted weights to memory-mappable {path.name}")
+        except Exception as exc:
+            print(f"Failed to convert weights to {path.name}: {exc}")
+
+    thread = threading.Thread(target=convert, name='weight-convert', daemon=True)
+    thread.start()
+    return thread
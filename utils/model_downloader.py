@@ -0,0 +1,436 @@
+"""
+Download engine for VoiceFlow models
+Fetches model files in parallel with ranged, resumable HTTP requests, reports
+real byte progress and verifies checksums before files are committed
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+class DownloadError(Exception):
+    """A model file could not be downloaded or failed verification"""
+
+
+def file_digest(path: Path, algorithm: str, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """
+    Hash a file with 'sha256' or 'git_sha1' (the blob id git and HuggingFace use for small files)
+    """
+    if algorithm == 'git_sha1':
+        digest = hashlib.sha1(f"blob {path.stat().st_size}\0".encode())
+    else:
+        digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConnectionShare:
+    """
+    HTTP connection slots shared by all downloads of one ModelDownloader
+
+    While several models download at once, each may hold at most an equal
+    share of the slots, so bandwidth is split between them instead of going
+    to whichever started first. Slots are taken per segment, so a new
+    download gets its share as soon as segments of the others finish.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max(1, max_connections)
+        self._condition = threading.Condition()
+        self._held = {}  # download -> connections in use
+
+    def register(self, download):
+        with self._condition:
+            self._held.setdefault(download, 0)
+            self._condition.notify_all()
+
+    def unregister(self, download):
+        with self._condition:
+            self._held.pop(download, None)
+            self._condition.notify_all()
+
+    def _fair_share(self) -> int:
+        return -(-self.max_connections // max(1, len(self._held)))
+
+    @contextmanager
+    def slot(self, download):
+        """Hold one connection for the duration of the block"""
+        with self._condition:
+            while (sum(self._held.values()) >= self.max_connections
+                   or self._held[download] >= self._fair_share()):
+                self._condition.wait()
+            self._held[download] += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._held[download] -= 1
+                self._condition.notify_all()
+
+
+class DownloadProgress:
+    """Thread-safe byte counter shared by all segments of one download"""
+
+    # Transfer rate (and so the ETA) is measured over this many recent seconds
+    RATE_WINDOW = 5.0
+
+    def __init__(self, total_bytes: int, label: str,
+                 progress_callback: Optional[Callable] = None, interval: float = 0.25,
+                 telemetry_callback: Optional[Callable] = None):
+        self.total_bytes = total_bytes
+        self.label = label
+        self.progress_callback = progress_callback
+        self.telemetry_callback = telemetry_callback
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self.done_bytes = 0
+        self.session_bytes = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+        self._samples = deque([(self.started, 0)])
+        self.files = {}
+
+    def set_file_state(self, name: str, state: str, size: Optional[int] = None):
+        with self._lock:
+            entry = self.files.setdefault(name, {'state': state, 'size': size, 'done_bytes': 0})
+            entry['state'] = state
+            if size is not None:
+                entry['size'] = size
+        if self.telemetry_callback:
+            self.report()
+
+    def add(self, nbytes: int, resumed: bool = False, name: Optional[str] = None):
+        """Count bytes; resumed bytes (already on disk) do not count towards throughput"""
+        with self._lock:
+            self.done_bytes += nbytes
+            if name is not None:
+                entry = self.files.setdefault(name, {'state': 'downloading', 'size': None, 'done_bytes': 0})
+                entry['done_bytes'] += nbytes
+            if not resumed:
+                self.session_bytes += nbytes
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+            self._samples.append((now, self.session_bytes))
+            while len(self._samples) > 2 and now - self._samples[1][0] >= self.RATE_WINDOW:
+                self._samples.popleft()
+        self.report()
+
+    def rate(self) -> float:
+        """Bytes per second over the last RATE_WINDOW seconds of this session"""
+        now = time.monotonic()
+        with self._lock:
+            since, bytes_then = self._samples[0]
+            session_bytes = self.session_bytes
+        elapsed = now - since
+        return (session_bytes - bytes_then) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Seconds until done at the current rate, None while unknown"""
+        rate = self.rate()
+        if not self.total_bytes or rate <= 0:
+            return None
+        return max(0.0, (self.total_bytes - self.done_bytes) / rate)
+
+    def snapshot(self) -> dict:
+        """
+        Telemetry for progress displays
+
+        Returns:
+            {'label', 'done_bytes', 'total_bytes', 'rate_bytes_per_sec', 'eta_seconds',
+             'files': {name: {'state', 'size', 'done_bytes'}}}
+            File states: 'downloading', 'verifying', 'done', 'failed'
+        """
+        rate = self.rate()
+        eta = self.eta()
+        with self._lock:
+            return {
+                'label': self.label,
+                'done_bytes': self.done_bytes,
+                'total_bytes': self.total_bytes,
+                'rate_bytes_per_sec': rate,
+                'eta_seconds': eta,
+                'files': {name: dict(entry) for name, entry in self.files.items()}
+            }
+
+    def report(self, message: Optional[str] = None):
+        if self.telemetry_callback:
+            self.telemetry_callback(self.snapshot())
+        if not self.progress_callback:
+            return
+        if message is None:
+            message = (
+                f"Downloading {self.label}: {self.done_bytes / 1e6:.1f}/"
+                f"{self.total_bytes / 1e6:.1f} MB at {self.rate() / 1e6:.1f} MB/s"
+            )
+        self.progress_callback(self.done_bytes, self.total_bytes, message)
+
+
+class ModelDownloader:
+    """Parallel, resumable, checksum-verified HTTP file downloader"""
+
+    def __init__(self, max_workers: int = 4, segment_size: int = 64 * 1024 * 1024,
+                 chunk_size: int = 1024 * 1024, timeout: float = 30.0, retries: int = 3):
+        """
+        Initialize ModelDownloader
+
+        Args:
+            max_workers: Concurrent HTTP connections across all files, shared
+                fairly between downloads running at the same time
+            segment_size: Files larger than this are fetched as parallel byte ranges
+            chunk_size: Read size per network call
+            timeout: Socket timeout in seconds
+            retries: Retries per segment before giving up
+        """
+        self.max_workers = max_workers
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.connections = ConnectionShare(max_workers)
+
+    def download(self, files: List[dict], progress_callback: Optional[Callable] = None,
+                 label: str = 'model', headers: Optional[Dict[str, str]] = None,
+                 telemetry_callback: Optional[Callable] = None) -> None:
+        """
+        Download files, resuming partial downloads left by earlier attempts
+
+        Each file is written to '<dest>.part' and only renamed into place once
+        its checksum matches, so a final path never holds unverified data.
+
+        Args:
+            files: [{'url': str, 'dest': Path, 'size': int or None,
+                     'sha256': str or None, 'git_sha1': str or None}]
+            progress_callback: Optional callback function(current_bytes, total_bytes, status_msg)
+            label: Name used in progress messages
+            headers: Extra request headers. Authorization is not forwarded on redirects
+            telemetry_callback: Optional callback function(snapshot) with byte counts,
+                rate, ETA and per-file state (see DownloadProgress.snapshot)
+
+        Raises:
+            DownloadError: If any file cannot be fetched or fails verification
+        """
+        files = [dict(spec, dest=Path(spec['dest']), headers=headers or {}) for spec in files]
+        for spec in files:
+            if not spec.get('size'):
+                spec['size'], spec['ranges'] = self._probe(spec)
+            else:
+                spec.setdefault('ranges', True)
+
+        progress = DownloadProgress(sum(spec['size'] or 0 for spec in files), label, progress_callback,
+                                    telemetry_callback=telemetry_callback)
+        pending = []
+        for spec in files:
+            if self._is_complete(spec):
+                progress.set_file_state(spec['dest'].name, 'done', spec.get('size'))
+                progress.add(spec['size'] or 0, resumed=True, name=spec['dest'].name)
+            else:
+                pending.append(spec)
+        progress.report(f"Downloading {label}...")
+
+        self.connections.register(progress)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = []
+                for spec in pending:
+                    futures.extend(self._submit_file(pool, spec, progress))
+                errors = []
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        errors.append(exc)
+        finally:
+            self.connections.unregister(progress)
+        if errors:
+            raise DownloadError(f"Failed to download {label}: {errors[0]}") from errors[0]
+
+        progress.report(f"{label} downloaded and verified")
+
+    def _request(self, spec: dict, method: str = 'GET', start: Optional[int] = None,
+                 end: Optional[int] = None):
+        request = urllib.request.Request(spec['url'], method=method)
+        for name, value in spec['headers'].items():
+            if name.lower() == 'authorization':
+                # Redirect targets (CDNs, presigned URLs) must not see the token
+                request.add_unredirected_header(name, value)
+            else:
+                request.add_header(name, value)
+        if start is not None:
+            request.add_header('Range', f"bytes={start}-{'' if end is None else end}")
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _probe(self, spec: dict):
+        """Return (size, accepts_ranges) from a HEAD request, (None, False) if unknown"""
+        try:
+            with self._request(spec, method='HEAD') as response:
+                size = response.headers.get('Content-Length')
+                ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+                return (int(size) if size else None), ranges
+        except (urllib.error.URLError, OSError, ValueError):
+            return None, False
+
+    def _is_complete(self, spec: dict) -> bool:
+        dest = spec['dest']
+        if not dest.exists():
+            return False
+        if spec.get('size') and dest.stat().st_size != spec['size']:
+            return False
+        return self._verify(dest, spec)
+
+    def _verify(self, path: Path, spec: dict) -> bool:
+        if spec.get('sha256'):
+            return file_digest(path, 'sha256') == spec['sha256']
+        if spec.get('git_sha1'):
+            return file_digest(path, 'git_sha1') == spec['git_sha1']
+        return True
+
+    def _submit_file(self, pool: ThreadPoolExecutor, spec: dict, progress: DownloadProgress):
+        dest = spec['dest']
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part_path = dest.with_name(dest.name + '.part')
+        state_path = dest.with_name(dest.name + '.part.json')
+        size = spec.get('size')
+
+        segments = self._load_segments(part_path, state_path, size)
+        if segments is None:
+            if size and spec.get('ranges'):
+                bounds = range(0, size, self.segment_size)
+                segments = [[start, min(start + self.segment_size, size) - 1, 0] for start in bounds]
+            else:
+                segments = [[0, (size - 1) if size else None, 0]]
+            # Preallocate so segments can write at their offsets
+            with open(part_path, 'wb') as f:
+                if size:
+                    f.truncate(size)
+
+        progress.set_file_state(dest.name, 'downloading', size)
+        resumed = sum(segment[2] for segment in segments)
+        if resumed:
+            progress.add(resumed, resumed=True, name=dest.name)
+
+        file_state = {
+            'lock': threading.Lock(),
+            'segments': segments,
+            'size': size,
+            'remaining': len(segments),
+            'part_path': part_path,
+            'state_path': state_path,
+            'failed': False
+        }
+        self._save_segments(file_state)
+        return [
+            pool.submit(self._run_segment, spec, file_state, index, progress)
+            for index in range(len(segments))
+        ]
+
+    def _load_segments(self, part_path: Path, state_path: Path, size: Optional[int]):
+        """Return saved segment progress for a partial download, None to start fresh"""
+        if not part_path.exists() or not state_path.exists():
+            return None
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('size') != size:
+            return None
+        return state['segments']
+
+    def _save_segments(self, file_state: dict):
+        with file_state['lock']:
+            data = {'size': file_state['size'], 'segments': file_state['segments']}
+            tmp_path = file_state['state_path'].with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, file_state['state_path'])
+
+    def _run_segment(self, spec: dict, file_state: dict, index: int, progress: DownloadProgress):
+        segment = file_state['segments'][index]
+        attempt = 0
+        while True:
+            try:
+                with self.connections.slot(progress):
+                    self._fetch_segment(spec, file_state, segment, progress)
+                break
+            except (urllib.error.URLError, OSError) as exc:
+                attempt += 1
+                self._save_segments(file_state)
+                if attempt > self.retries:
+                    file_state['failed'] = True
+                    progress.set_file_state(spec['dest'].name, 'failed')
+                    raise DownloadError(f"{spec['url']}: {exc}") from exc
+                time.sleep(min(2 ** attempt, 10))
+
+        # Saved before counting the segment done, so the last segment's commit
+        # cannot be followed by another segment rewriting the state file
+        self._save_segments(file_state)
+        with file_state['lock']:
+            file_state['remaining'] -= 1
+            last = file_state['remaining'] == 0 and not file_state['failed']
+        if last:
+            self._commit(spec, file_state, progress)
+
+    def _fetch_segment(self, spec: dict, file_state: dict, segment: list, progress: DownloadProgress):
+        start, end, done = segment
+        if end is not None and start + done > end:
+            return
+
+        with self._request(spec, start=start + done, end=end) as response:
+            if start + done > 0 and response.status != 206:
+                # Server ignored the range: only a single whole-file segment can recover
+                if len(file_state['segments']) > 1:
+                    raise DownloadError(f"{spec['url']} does not support range requests")
+                progress.add(-done, resumed=True, name=spec['dest'].name)
+                segment[2] = done = 0
+
+            saved_at = done
+            with open(file_state['part_path'], 'r+b') as f:
+                f.seek(start + done)
+                while True:
+                    limit = self.chunk_size
+                    if end is not None:
+                        limit = min(limit, end - (start + done) + 1)
+                        if limit <= 0:
+                            break
+                    chunk = response.read(limit)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    done += len(chunk)
+                    segment[2] = done
+                    progress.add(len(chunk), name=spec['dest'].name)
+                    if done - saved_at >= 16 * self.chunk_size:
+                        f.flush()
+                        self._save_segments(file_state)
+                        saved_at = done
+
+        if end is not None and start + done <= end:
+            raise OSError(f"connection closed after {done} of {end - start + 1} bytes")
+
+    def _commit(self, spec: dict, file_state: dict, progress: DownloadProgress):
+        dest = spec['dest']
+        part_path = file_state['part_path']
+        progress.set_file_state(dest.name, 'verifying')
+        if not self._verify(part_path, spec):
+            part_path.unlink(missing_ok=True)
+            file_state['state_path'].unlink(missing_ok=True)
+            progress.set_file_state(dest.name, 'failed')
+            raise DownloadError(f"Checksum mismatch for {dest.name}")
+        os.replace(part_path, dest)
+        file_state['state_path'].unlink(missing_ok=True)
+        progress.set_file_state(dest.name, 'done')
@@ -3,13 +3,26 @@ Model Manager for VoiceFlow Desktop App
 Handles downloading, caching, and loading of AI models with progress tracking
 """
 
+import hashlib
+import json
 import os
 import sys
-import shutil
+import time
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Optional, Callable
 import threading
 
+from utils.file_links import LINK_MODES, link_tree
+from utils.model_downloader import ModelDownloader
+from utils.model_manifest import ModelManifest, scan_model_files
+from utils.mmap_weights import (convert_in_background, load_module_tensors,
+                                parameters_on_meta, read_metadata)
+from utils.model_residency import ModelResidencyManager, release_memory
+from utils.metrics import MODEL_LOAD_SECONDS, REGISTRY
+from utils.optimized_inference import (artifact_key, inference_mode_from_env,
+                                       optimize_vits, optimize_whisper)
+
 
 class ModelManager:
     """Manages AI model downloads and caching for offline use"""
@@ -39,12 +52,14 @@ class ModelManager:
         }
     }
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None,
+                 residency: Optional[ModelResidencyManager] = None):
         """
         Initialize ModelManager
         
         Args:
             cache_dir: Custom cache directory. If None, uses %APPDATA%/VoiceFlowApp/models
+            residency: Memory budget / idle eviction policy. If None, read from VOICEFLOW_* env vars
         """
         if cache_dir is None:
             # Use Windows AppData for model storage
@@ -56,10 +71,47 @@ class ModelManager:
         
         # Set environment variables for HuggingFace and Whisper
         self._setup_cache_paths()
+
+        # How bundled models reach the cache: link modes from file_links, or
+        # 'direct' to load them in place from the read-only bundle
+        self.bootstrap_mode = os.environ.get('VOICEFLOW_BOOTSTRAP_MODE', 'auto').strip().lower()
+        if self.bootstrap_mode not in LINK_MODES + ('direct',):
+            print(f"Unknown VOICEFLOW_BOOTSTRAP_MODE={self.bootstrap_mode!r}, using 'auto'")
+            self.bootstrap_mode = 'auto'
+
+        # Persistent record of downloaded models, so status checks never scan the cache
+        self.manifest = ModelManifest(self.cache_dir / 'manifest.json')
+
+        # 'mmap' converts checkpoints once and maps them on later loads
+        # (page-cache backed, shared across processes); 'original' disables it
+        self.weight_format = os.environ.get('VOICEFLOW_WEIGHT_FORMAT', 'mmap').strip().lower()
+
+        # Execution mode for the torch models ('eager', 'script', 'compile'),
+        # requested per model and the mode actually in effect after loading
+        self.inference_modes = {key: inference_mode_from_env(key) for key in ('whisper', 'kazakh_tts')}
+        self._active_inference_modes = {}
+
+        self.downloader = ModelDownloader(
+            max_workers=int(os.environ.get('VOICEFLOW_DOWNLOAD_WORKERS', '4'))
+        )
         
         # Track loaded models
         self._loaded_models = {}
         self._download_locks = {}
+
+        # Single-flight loading: one loader per model key, other callers
+        # wait on the same future instead of starting their own load
+        self._load_lock = threading.Lock()
+        self._pending_loads = {}
+        self._load_stats = {}
+
+        # whisper's transcribe() installs kv-cache hooks on the shared model, so
+        # concurrent calls corrupt each other. Everything that runs the local
+        # Whisper model (routes, warmup, model server) holds this lock
+        self.whisper_lock = threading.Lock()
+
+        # Decides which models stay resident (RAM budget, idle timeout, LRU)
+        self.residency = residency or ModelResidencyManager.from_env(self.MODELS)
     
     def _setup_cache_paths(self):
         """Configure cache paths for model libraries"""
@@ -74,6 +126,17 @@ class ModelManager:
         os.environ['WHISPER_CACHE'] = whisper_cache
         Path(whisper_cache).mkdir(parents=True, exist_ok=True)
 
+    def _huggingface_headers(self) -> dict:
+        """Authorization header for gated HuggingFace repos, if a token is configured"""
+        token = os.environ.get('HF_TOKEN')
+        if not token:
+            try:
+                from huggingface_hub import get_token
+                token = get_token()
+            except Exception:
+                token = None
+        return {'Authorization': f'Bearer {token}'} if token else {}
+
     def _get_app_root(self) -> Path:
         """Resolve app root for bundled assets"""
         if getattr(sys, 'frozen', False):
@@ -89,52 +152,87 @@ class ModelManager:
         bundled_dir = self.get_bundled_models_dir()
         return (bundled_dir / 'whisper').exists() or (bundled_dir / 'huggingface').exists()
 
-    def _copy_dir_contents(self, src: Path, dst: Path):
-        """Copy directory contents while keeping existing files"""
-        if not src.exists():
-            return
-        dst.mkdir(parents=True, exist_ok=True)
-        for item in src.iterdir():
-            target = dst / item.name
-            if item.is_dir():
-                shutil.copytree(item, target, dirs_exist_ok=True)
-            else:
-                shutil.copy2(item, target)
+    def _model_layers(self) -> list:
+        """
+        Return (whisper_dir, huggingface_dir) pairs to search, highest priority first
+
+        In 'direct' bootstrap mode the read-only bundle is searched before the cache.
+        """
+        layers = []
+        if self.bootstrap_mode == 'direct':
+            bundled_dir = self.get_bundled_models_dir().resolve()
+            layers.append((bundled_dir / 'whisper', bundled_dir / 'huggingface'))
+        layers.append((
+            Path(os.environ.get('WHISPER_CACHE', self.cache_dir / 'whisper')),
+            Path(os.environ.get('TRANSFORMERS_CACHE', self.cache_dir / 'huggingface'))
+        ))
+        return layers
 
     def bootstrap_bundled_models(self) -> bool:
-        """Copy bundled models into cache when missing"""
+        """
+        Make bundled models available from the cache when missing
+        
+        Files are reflinked, hardlinked or symlinked where the filesystem
+        allows it and only copied as a last resort (VOICEFLOW_BOOTSTRAP_MODE).
+        In 'direct' mode nothing is placed in the cache; models are loaded
+        from the bundle itself.
+        
+        Returns:
+            True if any bundled model was made available
+        """
         bundled_dir = self.get_bundled_models_dir().resolve()
         if not bundled_dir.exists():
             return False
 
-        copied_any = False
+        if self.bootstrap_mode == 'direct':
+            found_any = False
+            for key in self.MODELS:
+                path = self._resolve_model_path(key)
+                if path is None or bundled_dir not in path.parents:
+                    continue
+                entry = self.manifest.get(key)
+                if entry is None or entry['path'] != str(path):
+                    self.manifest.record(key, self.MODELS[key]['model_id'], path,
+                                         scan_model_files(path), 'bundled')
+                found_any = True
+            return found_any
+
+        linked_any = False
 
         whisper_src = bundled_dir / 'whisper'
-        if not self._check_whisper_model() and whisper_src.exists():
+        if not self.is_model_downloaded('whisper') and whisper_src.exists():
             try:
-                self._copy_dir_contents(whisper_src, self.cache_dir / 'whisper')
-                copied_any = True
+                counts = link_tree(whisper_src, self.cache_dir / 'whisper', self.bootstrap_mode)
+                print(f"Bundled Whisper model placed in cache: {counts}")
+                self._record_model('whisper', source='bootstrap')
+                linked_any = True
             except OSError as exc:
-                print(f"Failed to copy bundled Whisper model: {exc}")
+                print(f"Failed to place bundled Whisper model: {exc}")
 
         hf_src = bundled_dir / 'huggingface'
         need_hf = (
-            not self._check_huggingface_model(self.MODELS['kazakh_tts']['model_id'])
-            or not self._check_huggingface_model(self.MODELS['translator']['model_id'])
+            not self.is_model_downloaded('kazakh_tts')
+            or not self.is_model_downloaded('translator')
         )
         if need_hf and hf_src.exists():
             try:
-                self._copy_dir_contents(hf_src, self.cache_dir / 'huggingface')
-                copied_any = True
+                counts = link_tree(hf_src, self.cache_dir / 'huggingface', self.bootstrap_mode)
+                print(f"Bundled HuggingFace models placed in cache: {counts}")
+                self._record_model('kazakh_tts', source='bootstrap')
+                self._record_model('translator', source='bootstrap')
+                linked_any = True
             except OSError as exc:
-                print(f"Failed to copy bundled HuggingFace models: {exc}")
+                print(f"Failed to place bundled HuggingFace models: {exc}")
 
-        return copied_any
+        return linked_any
     
     def is_model_downloaded(self, model_key: str) -> bool:
         """
         Check if a model is already downloaded
         
+        Answered from the model manifest. Only models the manifest does not
+        know yet are looked up on disk, and are recorded once found.
+        
         Args:
             model_key: One of 'whisper', 'kazakh_tts', 'translator'
         
@@ -144,71 +242,161 @@ class ModelManager:
         if model_key not in self.MODELS:
             raise ValueError(f"Unknown model: {model_key}")
         
+        entry = self.manifest.get(model_key)
+        if entry is not None:
+            return not entry.get('invalid')
+        
+        # Cache populated outside ModelManager (older version, manual copy)
+        return self._record_model(model_key, source='scan') is not None
+    
+    def _resolve_model_path(self, model_key: str) -> Optional[Path]:
+        """Return the checkpoint file or snapshot directory of a model, None if missing"""
         model_info = self.MODELS[model_key]
         
-        if model_info['type'] == 'whisper':
-            return self._check_whisper_model()
-        elif model_info['type'] == 'huggingface':
-            return self._check_huggingface_model(model_info['model_id'])
+        for whisper_dir, hf_dir in self._model_layers():
+            if model_info['type'] == 'whisper':
+                path = self._check_whisper_model(whisper_dir)
+            elif model_info['type'] == 'huggingface':
+                path = self._check_huggingface_model(model_info['model_id'], hf_dir)
+            else:
+                path = None
+            if path is not None:
+                return path
         
-        return False
+        return None
     
-    def _check_whisper_model(self) -> bool:
-        """Check if Whisper medium model exists"""
-        whisper_cache = Path(os.environ.get('WHISPER_CACHE', ''))
-        if not whisper_cache.exists():
-            return False
+    def _model_path(self, model_key: str) -> Optional[Path]:
+        """Path to load a model from: the manifest entry if still present, else a fresh lookup"""
+        entry = self.manifest.get(model_key)
+        if entry and not entry.get('invalid') and os.path.exists(entry['path']):
+            return Path(entry['path'])
+        return self._resolve_model_path(model_key)
+    
+    def _record_model(self, model_key: str, source: str, hash_files: bool = False,
+                      known_sha256: Optional[dict] = None) -> Optional[dict]:
+        """
+        Resolve a model on disk and store it in the manifest
         
-        # Whisper saves models as medium.pt
-        model_file = whisper_cache / 'medium.pt'
-        return model_file.exists() and model_file.stat().st_size > 1_000_000_000  # > 1GB
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+            source: Recorded as how the model got into the cache
+            hash_files: Compute SHA256 of every file (slow for multi-GB models)
+            known_sha256: {relative_path: sha256} already verified, not hashed again
+        
+        Returns:
+            The manifest entry, or None if the model is not on disk
+        """
+        path = self._resolve_model_path(model_key)
+        if path is None:
+            return None
+        files = scan_model_files(path, hash_files=hash_files, known_sha256=known_sha256)
+        return self.manifest.record(model_key, self.MODELS[model_key]['model_id'], path, files, source)
     
-    def _check_huggingface_model(self, model_id: str) -> bool:
-        """Check if HuggingFace model exists in cache"""
-        hf_cache = Path(os.environ.get('TRANSFORMERS_CACHE', ''))
-        if not hf_cache.exists():
+    def verify_model(self, model_key: str) -> bool:
+        """
+        Deep-check a model against the manifest
+        
+        Re-resolves the model on disk and hashes every file. A model that
+        disappeared is removed from the manifest; files whose recorded size
+        or hash no longer match flag the entry invalid. Either way the model
+        shows as not downloaded until it is downloaded again.
+        
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+        
+        Returns:
+            True if the model is present and intact
+        """
+        if model_key not in self.MODELS:
+            raise ValueError(f"Unknown model: {model_key}")
+        
+        previous = self.manifest.get(model_key)
+        path = self._resolve_model_path(model_key)
+        if path is None:
+            self.manifest.remove(model_key)
             return False
         
-        # HuggingFace uses hash-based folders, check if any model files exist
-        model_folders = list(hf_cache.glob('models--*'))
+        files = scan_model_files(path, hash_files=True)
+        if previous and previous['path'] == str(path):
+            for rel, info in previous['files'].items():
+                current = files.get(rel)
+                if current is None or current['size'] != info['size'] or (
+                        info.get('sha256') and current['sha256'] != info['sha256']):
+                    print(f"Model {model_key} failed verification: {rel} changed or missing")
+                    self.manifest.mark_invalid(model_key, f"{rel} changed or missing")
+                    return False
         
+        self.manifest.record(model_key, self.MODELS[model_key]['model_id'], path, files, 'verify')
+        return True
+    
+    def _check_whisper_model(self, whisper_dir: Path) -> Optional[Path]:
+        """Return the Whisper medium checkpoint in a directory if it exists"""
+        # Whisper saves models as medium.pt
+        model_file = whisper_dir / 'medium.pt'
+        try:
+            if model_file.stat().st_size > 1_000_000_000:  # > 1GB
+                return model_file
+        except OSError:
+            pass
+        return None
+    
+    def _check_huggingface_model(self, model_id: str, hf_cache: Path) -> Optional[Path]:
+        """Return the snapshot directory of a HuggingFace model in a cache if it exists"""
         # Convert model_id to folder format: facebook/mms-tts-kaz -> models--facebook--mms-tts-kaz
-        normalized_id = model_id.replace('/', '--')
-        expected_folder = f'models--{normalized_id}'
-        
-        for folder in model_folders:
-            if expected_folder in str(folder):
-                # Check if snapshots exist
-                snapshots = folder / 'snapshots'
-                if snapshots.exists() and any(snapshots.iterdir()):
-                    return True
+        model_folder = hf_cache / f"models--{model_id.replace('/', '--')}"
+        snapshots = model_folder / 'snapshots'
         
-        return False
+        # Prefer the revision refs/main points at, else any non-empty snapshot
+        try:
+            revision = (model_folder / 'refs' / 'main').read_text().strip()
+            snapshot = snapshots / revision
+            if revision and snapshot.is_dir() and any(snapshot.iterdir()):
+                return snapshot
+        except OSError:
+            pass
+        try:
+            for snapshot in sorted(snapshots.iterdir()):
+                if snapshot.is_dir() and any(snapshot.iterdir()):
+                    return snapshot
+        except OSError:
+            pass
+        return None
     
     def get_download_status(self) -> dict:
         """
         Get download status of all models
         
         Returns:
-            Dict with model status: {model_key: {'downloaded': bool, 'name': str, 'size': str}}
+            Dict with model status: {model_key: {'downloaded': bool, 'name': str, 'size': str,
+            'model_id': str, 'path': str, 'verified_at': str}}
         """
         status = {}
         for key, info in self.MODELS.items():
+            downloaded = self.is_model_downloaded(key)
+            entry = self.manifest.get(key)
             status[key] = {
-                'downloaded': self.is_model_downloaded(key),
+                'downloaded': downloaded,
                 'name': info['name'],
                 'size': info['size'],
-                'model_id': info['model_id']
+                'model_id': info['model_id'],
+                'path': entry['path'] if entry else None,
+                'verified_at': entry['verified_at'] if entry else None
             }
         return status
     
-    def download_model(self, model_key: str, progress_callback: Optional[Callable] = None) -> bool:
+    def download_model(self, model_key: str, progress_callback: Optional[Callable] = None,
+                       telemetry_callback: Optional[Callable] = None) -> bool:
         """
         Download a model with progress tracking
         
+        Several models can download at once; they share the downloader's
+        connections equally.
+        
         Args:
             model_key: One of 'whisper', 'kazakh_tts', 'translator'
             progress_callback: Optional callback function(current, total, status_msg)
+            telemetry_callback: Optional callback function(snapshot) with bytes, rate, ETA
+                and per-file state (see DownloadProgress.snapshot)
         
         Returns:
             True if download successful
@@ -227,10 +415,10 @@ class ModelManager:
             return True
         
         # Prevent concurrent downloads of same model
-        if model_key not in self._download_locks:
-            self._download_locks[model_key] = threading.Lock()
+        with self._load_lock:
+            download_lock = self._download_locks.setdefault(model_key, threading.Lock())
         
-        if not self._download_locks[model_key].acquire(blocking=False):
+        if not download_lock.acquire(blocking=False):
             if progress_callback:
                 progress_callback(0, 100, "Download already in progress")
             return False
@@ -242,145 +430,471 @@ class ModelManager:
                 progress_callback(0, 100, f"Starting download of {model_info['name']}...")
             
             if model_info['type'] == 'whisper':
-                return self._download_whisper(progress_callback)
+                digests = self._download_whisper(progress_callback, telemetry_callback)
             elif model_info['type'] == 'huggingface':
-                return self._download_huggingface(model_info['model_id'], progress_callback)
+                digests = self._download_huggingface(model_info['model_id'], progress_callback,
+                                                     telemetry_callback)
+            else:
+                digests = None
             
-            return False
+            if digests is None:
+                return False
+            if progress_callback:
+                progress_callback(100, 100, f"Verifying {model_info['name']}...")
+            # The downloader already checked every large file's SHA256; only the
+            # small files it checked by git blob id are hashed here
+            return self._record_model(model_key, source='download', hash_files=True,
+                                      known_sha256=digests) is not None
         finally:
-            self._download_locks[model_key].release()
+            download_lock.release()
     
-    def _download_whisper(self, progress_callback: Optional[Callable] = None) -> bool:
-        """Download Whisper model"""
+    def _download_whisper(self, progress_callback: Optional[Callable] = None,
+                          telemetry_callback: Optional[Callable] = None) -> Optional[dict]:
+        """
+        Download the Whisper checkpoint without loading it
+
+        Returns:
+            {file name: verified sha256}, or None if the download failed
+        """
         try:
-            import whisper
-            from whisper import _download
-            
-            if progress_callback:
-                progress_callback(10, 100, "Downloading Whisper model...")
+            from whisper import _MODELS
             
-            # Download with custom progress tracking
-            whisper_cache = os.environ.get('WHISPER_CACHE')
-            model = whisper.load_model("medium", download_root=whisper_cache)
+            # Whisper encodes the checkpoint SHA256 in its download URL
+            url = _MODELS['medium']
+            expected_sha256 = url.split('/')[-2]
+            whisper_cache = Path(os.environ.get('WHISPER_CACHE'))
             
-            if progress_callback:
-                progress_callback(100, 100, "Whisper model downloaded successfully")
-            
-            return True
+            self.downloader.download(
+                [{'url': url, 'dest': whisper_cache / 'medium.pt', 'sha256': expected_sha256}],
+                progress_callback,
+                label='Whisper model',
+                telemetry_callback=telemetry_callback
+            )
+            return {'medium.pt': expected_sha256}
         except Exception as e:
             if progress_callback:
                 progress_callback(0, 100, f"Error downloading Whisper: {str(e)}")
             print(f"Error downloading Whisper model: {e}")
-            return False
+            return None
     
-    def _download_huggingface(self, model_id: str, progress_callback: Optional[Callable] = None) -> bool:
-        """Download HuggingFace model with progress tracking"""
+    def _download_huggingface(self, model_id: str, progress_callback: Optional[Callable] = None,
+                              telemetry_callback: Optional[Callable] = None) -> Optional[dict]:
+        """
+        Download HuggingFace model files straight into the HF cache layout
+
+        Returns:
+            {path in the snapshot: verified sha256} for the LFS files, or None if the download failed
+        """
         try:
-            from huggingface_hub import snapshot_download
+            from huggingface_hub import HfApi, hf_hub_url
             
             if progress_callback:
-                progress_callback(10, 100, f"Downloading {model_id}...")
+                progress_callback(0, 100, f"Fetching file list for {model_id}...")
             
-            # Download model files
-            snapshot_download(
-                repo_id=model_id,
-                cache_dir=os.environ.get('TRANSFORMERS_CACHE'),
-                resume_download=True,
-                local_files_only=False
-            )
+            info = HfApi().model_info(model_id, files_metadata=True)
+            model_folder = Path(os.environ.get('TRANSFORMERS_CACHE')) / f"models--{model_id.replace('/', '--')}"
+            snapshot = model_folder / 'snapshots' / info.sha
             
-            if progress_callback:
-                progress_callback(100, 100, f"{model_id} downloaded successfully")
+            files = []
+            for sibling in info.siblings:
+                lfs = sibling.lfs
+                sha256 = lfs.get('sha256') if isinstance(lfs, dict) else getattr(lfs, 'sha256', None)
+                files.append({
+                    'url': hf_hub_url(model_id, sibling.rfilename, revision=info.sha),
+                    'dest': snapshot / sibling.rfilename,
+                    'size': sibling.size,
+                    'sha256': sha256,
+                    # Small files are plain git blobs, identified by their git SHA1
+                    'git_sha1': None if sha256 else sibling.blob_id
+                })
             
-            return True
+            self.downloader.download(
+                files,
+                progress_callback,
+                label=model_id,
+                headers=self._huggingface_headers(),
+                telemetry_callback=telemetry_callback
+            )
+            
+            # Point refs/main at the snapshot so transformers resolves it offline
+            (model_folder / 'refs').mkdir(parents=True, exist_ok=True)
+            (model_folder / 'refs' / 'main').write_text(info.sha)
+            return {
+                spec['dest'].relative_to(snapshot).as_posix(): spec['sha256']
+                for spec in files if spec['sha256']
+            }
         except Exception as e:
             if progress_callback:
                 progress_callback(0, 100, f"Error downloading {model_id}: {str(e)}")
             print(f"Error downloading {model_id}: {e}")
-            return False
+            return None
     
+    def _load_once(self, model_key: str, loader: Callable):
+        """
+        Load a model exactly once, even under concurrent first requests
+
+        The first caller for a model key runs the loader; callers arriving
+        while it is in flight wait on the same future. A failed load is not
+        cached, so the next call starts a fresh attempt.
+
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+            loader: Zero-argument callable returning the loaded model
+
+        Returns:
+            The loaded model object
+        """
+        with self._load_lock:
+            stats = self._load_stats.setdefault(model_key, {
+                'loads': 0,
+                'failures': 0,
+                'hits': 0,
+                'waiters': 0,
+                'last_load_seconds': None,
+                'total_load_seconds': 0.0,
+                'last_error': None
+            })
+            if model_key in self._loaded_models:
+                stats['hits'] += 1
+                self.residency.touch(model_key)
+                return self._loaded_models[model_key]
+
+            future = self._pending_loads.get(model_key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._pending_loads[model_key] = future
+            else:
+                stats['waiters'] += 1
+
+        if not is_owner:
+            return future.result()
+
+        started = time.perf_counter()
+        try:
+            # Make room before loading so peak memory stays within budget. Inside
+            # the try: a failure here must still release the waiters
+            expected_bytes = self.MODELS.get(model_key, {}).get('size_bytes', 0)
+            for victim in self.residency.plan_admission(model_key, expected_bytes):
+                self.unload_model(victim, reason='lru')
+
+            started = time.perf_counter()
+            model = loader()
+        except BaseException as exc:
+            elapsed = time.perf_counter() - started
+            with self._load_lock:
+                stats['failures'] += 1
+                stats['last_load_seconds'] = elapsed
+                stats['last_error'] = str(exc)
+                del self._pending_loads[model_key]
+            future.set_exception(exc)
+            raise
+
+        elapsed = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.observe(elapsed, model=model_key)
+        with self._load_lock:
+            self._loaded_models[model_key] = model
+            stats['loads'] += 1
+            stats['last_load_seconds'] = elapsed
+            stats['total_load_seconds'] += elapsed
+            stats['last_error'] = None
+            del self._pending_loads[model_key]
+        future.set_result(model)
+        print(f"✔ {model_key} model loaded in {elapsed:.2f}s")
+
+        # The measured size may be larger than the estimate
+        for victim in self.residency.record_loaded(model_key, model, expected_bytes):
+            self.unload_model(victim, reason='lru')
+        self.residency.start_reaper(self.unload_model)
+        return model
+
+    def get_load_stats(self) -> dict:
+        """
+        Get model load metrics
+
+        Returns:
+            Dict keyed by model: {'loads', 'failures', 'hits', 'waiters',
+            'last_load_seconds', 'total_load_seconds', 'last_error', 'loading',
+            'inference_mode'}
+        """
+        with self._load_lock:
+            return {
+                key: dict(stats, loading=key in self._pending_loads,
+                          inference_mode=self._active_inference_modes.get(key, 'eager'))
+                for key, stats in self._load_stats.items()
+            }
+
+    def is_model_loaded(self, model_key: str) -> bool:
+        """Check if a model is currently held in memory"""
+        return model_key in self._loaded_models
+
+    def install_model(self, model_key: str, model):
+        """
+        Hold an already-built model as if it had been loaded
+
+        Used by the benchmarks to run the app against stand-in models.
+        Residency is tracked as usual, but the idle reaper is not started,
+        so an installed model is only replaced by an explicit unload.
+
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+            model: Object with the same interface the loader would return
+        """
+        if model_key not in self.MODELS:
+            raise ValueError(f"Unknown model: {model_key}")
+        with self._load_lock:
+            self._loaded_models[model_key] = model
+        for victim in self.residency.record_loaded(model_key, model, 0):
+            self.unload_model(victim, reason='lru')
+
+    def _source_fingerprint(self, model_path: Path) -> str:
+        """Identify a checkpoint version, so derived files are rebuilt when it changes"""
+        if model_path.is_file():
+            stat = model_path.stat()
+            return f"{model_path}:{stat.st_size}:{stat.st_mtime_ns}"
+        # HF snapshot directories are named after the commit hash
+        return str(model_path)
+
+    def _mmap_weights_path(self, model_key: str, model_path: Path) -> Path:
+        """Converted weights file, keyed by the checkpoint it was made from"""
+        fingerprint = hashlib.sha1(f"v1:{self._source_fingerprint(model_path)}".encode()).hexdigest()[:12]
+        return self.cache_dir / 'mmap' / f"{model_key}-{fingerprint}.safetensors"
+
+    def _optimize(self, model_key: str, model):
+        """
+        Switch a freshly loaded torch model to its configured inference mode
+
+        Compiled artifacts live under cache_dir/compiled, keyed by model,
+        checkpoint version and torch version. Any failure leaves the model eager.
+
+        Args:
+            model_key: 'whisper' or 'kazakh_tts'
+            model: The loader's return value
+
+        Returns:
+            The same model object
+        """
+        mode = self.inference_modes.get(model_key, 'eager')
+        if mode != 'eager':
+            model_path = self._model_path(model_key)
+            source = self._source_fingerprint(model_path) if model_path else self.MODELS[model_key]['model_id']
+            compiled_dir = self.cache_dir / 'compiled'
+            if model_key == 'whisper':
+                mode = optimize_whisper(model, mode, compiled_dir, artifact_key(model_key, source, mode))
+            else:
+                mode = optimize_vits(model['model'], mode, compiled_dir)
+            print(f"✔ {model_key} inference mode: {mode}")
+        with self._load_lock:
+            self._active_inference_modes[model_key] = mode
+        return model
+
+    def _load_weights(self, model_key: str, model_path: Optional[Path],
+                      load_eager: Callable, build_skeleton: Callable, describe: Callable):
+        """
+        Load a torch module from its memory-mapped copy, converting it on first use
+        
+        Args:
+            model_key: Model being loaded
+            model_path: Resolved checkpoint; None means not downloaded, so always load eagerly
+            load_eager: Zero-argument callable doing the library's normal load
+            build_skeleton: Callable(metadata) building the module under parameters_on_meta()
+            describe: Callable(module) returning the metadata build_skeleton needs
+        
+        Returns:
+            The loaded module
+        """
+        if self.weight_format != 'mmap' or model_path is None:
+            return load_eager()
+        
+        mmap_path = self._mmap_weights_path(model_key, model_path)
+        if mmap_path.exists():
+            try:
+                started = time.perf_counter()
+                model = load_module_tensors(build_skeleton(read_metadata(mmap_path)), mmap_path)
+                print(f"✔ {model_key} weights mapped from {mmap_path.name} "
+                      f"in {time.perf_counter() - started:.2f}s")
+                return model
+            except Exception as exc:
+                print(f"Memory-mapped load failed for {model_key}, using original weights: {exc}")
+                mmap_path.unlink(missing_ok=True)
+        
+        model = load_eager()
+        convert_in_background(model, mmap_path, describe(model))
+        return model
+
     def load_whisper_model(self):
         """Load Whisper model (downloads if not cached)"""
-        if 'whisper' in self._loaded_models:
-            return self._loaded_models['whisper']
-        
+        return self._load_once('whisper', lambda: self._optimize('whisper', self._load_whisper()))
+
+    def _load_whisper(self):
         try:
             import whisper
             
             print("Loading Whisper model...")
-            whisper_cache = os.environ.get('WHISPER_CACHE')
-            model = whisper.load_model("medium", download_root=whisper_cache)
+            model_path = self._model_path('whisper')
+            if model_path is None:
+                whisper_cache = os.environ.get('WHISPER_CACHE')
+                return whisper.load_model("medium", download_root=whisper_cache)
+            
+            def load_eager():
+                # Loading by path skips whisper's re-hash of the 1.5GB checkpoint,
+                # but also its alignment heads, so set them as load_model("medium") would
+                model = whisper.load_model(str(model_path))
+                model.set_alignment_heads(whisper._ALIGNMENT_HEADS['medium'])
+                return model
+            
+            def build_skeleton(metadata):
+                from whisper.model import Whisper, ModelDimensions
+                with parameters_on_meta():
+                    return Whisper(ModelDimensions(**json.loads(metadata['dims'])))
             
-            self._loaded_models['whisper'] = model
-            print("✔ Whisper model loaded successfully")
-            return model
+            return self._load_weights(
+                'whisper', model_path, load_eager, build_skeleton,
+                describe=lambda model: {'dims': json.dumps(vars(model.dims))}
+            )
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
             raise
     
     def load_kazakh_tts_model(self):
         """Load Kazakh TTS model (downloads if not cached)"""
-        if 'kazakh_tts' in self._loaded_models:
-            return self._loaded_models['kazakh_tts']
-        
+        return self._load_once('kazakh_tts', lambda: self._optimize('kazakh_tts', self._load_kazakh_tts()))
+
+    def _load_kazakh_tts(self):
         try:
             from transformers import VitsModel, AutoTokenizer
             
             print("Loading Kazakh TTS model...")
-            model_id = self.MODELS['kazakh_tts']['model_id']
+            model_path = self._model_path('kazakh_tts')
+            model_id = str(model_path) if model_path else self.MODELS['kazakh_tts']['model_id']
             
             tokenizer = AutoTokenizer.from_pretrained(model_id)
-            model = VitsModel.from_pretrained(model_id)
             
-            self._loaded_models['kazakh_tts'] = {
+            def build_skeleton(metadata):
+                from transformers import VitsConfig
+                config = VitsConfig.from_dict(json.loads(metadata['config']))
+                with parameters_on_meta():
+                    return VitsModel(config)
+            
+            model = self._load_weights(
+                'kazakh_tts', model_path,
+                load_eager=lambda: VitsModel.from_pretrained(model_id),
+                build_skeleton=build_skeleton,
+                describe=lambda model: {'config': model.config.to_json_string()}
+            )
+            
+            return {
                 'model': model,
                 'tokenizer': tokenizer
             }
-            
-            print("✔ Kazakh TTS model loaded successfully")
-            return self._loaded_models['kazakh_tts']
         except Exception as e:
             print(f"Error loading Kazakh TTS model: {e}")
             raise
     
     def load_translator_model(self):
         """Load translation model (downloads if not cached)"""
-        if 'translator' in self._loaded_models:
-            return self._loaded_models['translator']
-        
+        return self._load_once('translator', self._load_translator)
+
+    def _load_translator(self):
         try:
             from transformers import pipeline
             
             print("Loading translation model...")
-            model_id = self.MODELS['translator']['model_id']
-            
-            translator = pipeline("translation", model=model_id)
+            model_path = self._model_path('translator')
+            model_id = str(model_path) if model_path else self.MODELS['translator']['model_id']
             
-            self._loaded_models['translator'] = translator
-            print("✔ Translation model loaded successfully")
-            return translator
+            return pipeline("translation", model=model_id)
         except Exception as e:
             print(f"Error loading translation model: {e}")
             raise
     
-    def unload_model(self, model_key: str):
-        """Unload a model from memory"""
-        if model_key in self._loaded_models:
-            del self._loaded_models[model_key]
-            print(f"✔ {model_key} model unloaded from memory")
+    def unload_model(self, model_key: str, reason: Optional[str] = None):
+        """
+        Unload a model from memory
+
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+            reason: Why it was unloaded ('idle', 'lru'), counted in residency status.
+                Evictions with a reason skip models that are pinned or running inference
+        """
+        with self._load_lock:
+            if reason and not self.residency.claim_eviction(model_key, reason):
+                return
+            model = self._loaded_models.pop(model_key, None)
+            if not reason:
+                self.residency.record_unloaded(model_key)
+        if model is not None:
+            # Drop the last manager-held reference before collecting;
+            # requests still using the model keep it alive until they finish
+            del model
+            release_memory()
+            suffix = f" ({reason})" if reason else ""
+            print(f"✔ {model_key} model unloaded from memory{suffix}")
     
     def unload_all_models(self):
         """Unload all models from memory"""
-        self._loaded_models.clear()
+        with self._load_lock:
+            keys = list(self._loaded_models)
+            self._loaded_models.clear()
+            for key in keys:
+                self.residency.record_unloaded(key)
+        release_memory()
         print("✔ All models unloaded from memory")
 
+    def model_in_use(self, model_key: str):
+        """Context manager that keeps a model from being unloaded while inference runs on it"""
+        return self.residency.in_use(model_key)
+
+    def get_residency_status(self) -> dict:
+        """Get memory budget, resident model sizes and eviction counts"""
+        return self.residency.get_status()
+
+    def collect_metrics(self) -> dict:
+        """Metric families for the metrics registry, built from existing load and residency state"""
+        load_stats = self.get_load_stats()
+        residency = self.get_residency_status()
+        cache_requests = []
+        for key, stats in load_stats.items():
+            for result, field in (('hit', 'hits'), ('load', 'loads'), ('wait', 'waiters'), ('failure', 'failures')):
+                cache_requests.append([[key, result], stats[field]])
+        return {
+            'voiceflow_model_cache_requests_total': {
+                'type': 'counter',
+                'help': 'Model lookups by result (hit: already loaded, wait: joined an in-flight load)',
+                'labelnames': ['model', 'result'],
+                'values': cache_requests
+            },
+            'voiceflow_model_loaded': {
+                'type': 'gauge',
+                'help': 'Whether the model is loaded in memory',
+                'labelnames': ['model'],
+                'values': [[[key], 1 if self.is_model_loaded(key) else 0] for key in self.MODELS]
+            },
+            'voiceflow_model_resident_bytes': {
+                'type': 'gauge',
+                'help': 'Estimated memory held by each loaded model',
+                'labelnames': ['model'],
+                'values': [[[key], entry['size_bytes']] for key, entry in residency['models'].items()]
+            },
+            'voiceflow_model_evictions_total': {
+                'type': 'counter',
+                'help': 'Models unloaded by reason',
+                'labelnames': ['reason'],
+                'values': [[[reason], count] for reason, count in residency['evictions'].items()]
+            }
+        }
+
 
 # Global instance
 _model_manager = None
+_model_manager_lock = threading.Lock()
 
 def get_model_manager() -> ModelManager:
     """Get or create global ModelManager instance"""
     global _model_manager
     if _model_manager is None:
-        _model_manager = ModelManager()
+        with _model_manager_lock:
+            if _model_manager is None:
+                _model_manager = ModelManager()
+                REGISTRY.add_collector(_model_manager.collect_metrics)
     return _model_manager
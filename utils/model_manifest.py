@@ -0,0 +1,135 @@
+"""
+Persistent model manifest for VoiceFlow
+Records where each downloaded model lives, its files, sizes, hashes and when it was last verified
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_VERSION = 1
+
+
+def sha256_file(path: Path, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """Return the hex SHA256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_model_files(path: Path, hash_files: bool = False, known_sha256: Optional[dict] = None) -> dict:
+    """
+    List the files that make up a model
+
+    Args:
+        path: A single checkpoint file or a model directory (symlinks are followed)
+        hash_files: Also compute SHA256 for every file
+        known_sha256: {relative_path: sha256} already verified (e.g. by the
+            downloader); used as is instead of reading those files again
+
+    Returns:
+        {relative_path: {'size': int, 'sha256': str or None}}
+    """
+    path = Path(path)
+    known_sha256 = known_sha256 or {}
+    if path.is_file():
+        candidates = [(path.name, path)]
+    else:
+        candidates = [
+            (file.relative_to(path).as_posix(), file)
+            for file in sorted(path.rglob('*'))
+            if file.is_file()
+        ]
+
+    files = {}
+    for rel, file in candidates:
+        sha256 = known_sha256.get(rel)
+        if sha256 is None and hash_files:
+            sha256 = sha256_file(file)
+        files[rel] = {'size': file.stat().st_size, 'sha256': sha256}
+    return files
+
+
+class ModelManifest:
+    """JSON manifest of downloaded models, kept in memory for O(1) status lookups"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = self._read()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            print(f"Ignoring unreadable model manifest {self.path}: {exc}")
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('models', {})
+
+    def _write(self):
+        # Write to a temp file and rename so a crash never leaves half a manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'models': self._entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, model_key: str) -> Optional[dict]:
+        """Return the manifest entry for a model, or None if not recorded"""
+        with self._lock:
+            entry = self._entries.get(model_key)
+            return dict(entry) if entry else None
+
+    def record(self, model_key: str, model_id: str, path: Path, files: dict, source: str) -> dict:
+        """
+        Record a model as present and verified now
+
+        Args:
+            model_key: One of 'whisper', 'kazakh_tts', 'translator'
+            model_id: Upstream model id
+            path: Resolved checkpoint file or snapshot directory
+            files: Output of scan_model_files
+            source: How the model got here ('download', 'bootstrap', 'scan', 'verify')
+
+        Returns:
+            The stored entry
+        """
+        entry = {
+            'model_id': model_id,
+            'path': str(path),
+            'size_bytes': sum(info['size'] for info in files.values()),
+            'files': files,
+            'hashed': all(info.get('sha256') for info in files.values()),
+            'source': source,
+            'verified_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        }
+        with self._lock:
+            self._entries[model_key] = entry
+            self._write()
+        return dict(entry)
+
+    def mark_invalid(self, model_key: str, reason: str):
+        """Keep a model's entry but flag it as failing verification"""
+        with self._lock:
+            entry = self._entries.get(model_key)
+            if entry is not None:
+                entry['invalid'] = reason
+                entry['verified_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+                self._write()
+
+    def remove(self, model_key: str):
+        """Forget a model that is no longer on disk"""
+        with self._lock:
+            if self._entries.pop(model_key, None) is not None:
+                self._write()
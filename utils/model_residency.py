@@ -0,0 +1,341 @@
+"""
+Model residency tracking for VoiceFlow
+Decides which loaded models stay in memory: RAM budget, idle timeouts and LRU eviction
+"""
+
+import ctypes
+import gc
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Ignoring invalid {name}={value!r}")
+        return None
+
+
+def estimate_model_bytes(obj, _seen=None) -> int:
+    """
+    Estimate the in-memory size of a loaded model
+
+    Walks torch modules (parameters and buffers), HuggingFace pipelines
+    (their ``model`` attribute) and the dicts ModelManager stores, counting
+    each tensor storage once.
+
+    Returns:
+        Size in bytes, or 0 if nothing measurable was found
+    """
+    if _seen is None:
+        _seen = set()
+    if obj is None or id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, dict):
+        return sum(estimate_model_bytes(value, _seen) for value in obj.values())
+
+    if hasattr(obj, 'parameters') and hasattr(obj, 'buffers'):
+        total = 0
+        try:
+            tensors = list(obj.parameters()) + list(obj.buffers())
+        except Exception:
+            return 0
+        for tensor in tensors:
+            try:
+                key = tensor.untyped_storage().data_ptr()
+            except Exception:
+                key = id(tensor)
+            if ('storage', key) in _seen:
+                continue
+            _seen.add(('storage', key))
+            total += tensor.numel() * tensor.element_size()
+        return total
+
+    inner = getattr(obj, 'model', None)
+    if inner is not None:
+        return estimate_model_bytes(inner, _seen)
+
+    return 0
+
+
+def release_memory():
+    """Run garbage collection and hand freed memory back to the allocator"""
+    gc.collect()
+
+    # Only touch torch if something already imported it
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+    # glibc keeps freed arenas mapped; malloc_trim returns them to the OS
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL('libc.so.6').malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class ModelResidencyManager:
+    """Tracks model sizes and usage and picks models to unload"""
+
+    def __init__(self, memory_budget_bytes: Optional[int] = None,
+                 idle_timeouts: Optional[Dict[str, float]] = None,
+                 default_idle_timeout: Optional[float] = None,
+                 reaper_interval: float = 30.0):
+        """
+        Initialize ModelResidencyManager
+
+        Args:
+            memory_budget_bytes: Max total size of resident models. None or 0 means unlimited
+            idle_timeouts: Per-model idle timeout in seconds, overriding the default
+            default_idle_timeout: Idle timeout for models without their own. None or 0 disables
+            reaper_interval: Seconds between idle checks
+        """
+        self.memory_budget_bytes = memory_budget_bytes or None
+        self.idle_timeouts = dict(idle_timeouts or {})
+        self.default_idle_timeout = default_idle_timeout or None
+        self.reaper_interval = reaper_interval
+
+        self._lock = threading.Lock()
+        # model_key -> {'size_bytes', 'last_used', 'loaded_at'}, least recently used first
+        self._resident = OrderedDict()
+        self._known_sizes = {}
+        self._pinned = set()
+        # model_key -> number of callers running inference on it right now
+        self._in_use = {}
+        self._evictions = {}
+
+        self._reaper = None
+        self._stop_reaper = threading.Event()
+
+    @classmethod
+    def from_env(cls, model_keys: Iterable[str]) -> 'ModelResidencyManager':
+        """
+        Build from environment variables
+
+        VOICEFLOW_MODEL_MEMORY_BUDGET_MB  total RAM budget for loaded models
+        VOICEFLOW_MODEL_IDLE_TIMEOUT      default idle timeout in seconds
+        VOICEFLOW_<KEY>_IDLE_TIMEOUT      per-model idle timeout, e.g. VOICEFLOW_WHISPER_IDLE_TIMEOUT
+        """
+        budget_mb = _env_float('VOICEFLOW_MODEL_MEMORY_BUDGET_MB')
+        idle_timeouts = {}
+        for key in model_keys:
+            timeout = _env_float(f'VOICEFLOW_{key.upper()}_IDLE_TIMEOUT')
+            if timeout is not None:
+                idle_timeouts[key] = timeout
+        return cls(
+            memory_budget_bytes=int(budget_mb * 1024 * 1024) if budget_mb else None,
+            idle_timeouts=idle_timeouts,
+            default_idle_timeout=_env_float('VOICEFLOW_MODEL_IDLE_TIMEOUT')
+        )
+
+    def idle_timeout_for(self, model_key: str) -> Optional[float]:
+        """Return the idle timeout in seconds for a model, None if it never expires"""
+        timeout = self.idle_timeouts.get(model_key, self.default_idle_timeout)
+        return timeout if timeout and timeout > 0 else None
+
+    def touch(self, model_key: str):
+        """Mark a resident model as just used"""
+        with self._lock:
+            entry = self._resident.get(model_key)
+            if entry is not None:
+                entry['last_used'] = time.monotonic()
+                self._resident.move_to_end(model_key)
+
+    def pin(self, model_key: str):
+        """Exclude a model from idle and LRU eviction"""
+        with self._lock:
+            self._pinned.add(model_key)
+
+    def unpin(self, model_key: str):
+        """Make a pinned model evictable again"""
+        with self._lock:
+            self._pinned.discard(model_key)
+
+    @contextmanager
+    def in_use(self, model_key: str):
+        """
+        Keep a model from being unloaded while a caller runs inference on it
+
+        Unloading a model mid-inference frees nothing (the caller still holds
+        it) and makes the next request load a second copy. Leaving the block
+        counts as a use for the idle timeout.
+        """
+        with self._lock:
+            self._in_use[model_key] = self._in_use.get(model_key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._in_use[model_key] == 1:
+                    del self._in_use[model_key]
+                else:
+                    self._in_use[model_key] -= 1
+                entry = self._resident.get(model_key)
+                if entry is not None:
+                    entry['last_used'] = time.monotonic()
+                    self._resident.move_to_end(model_key)
+
+    def _evictable(self, model_key: str) -> bool:
+        return model_key not in self._pinned and model_key not in self._in_use
+
+    def plan_admission(self, model_key: str, expected_bytes: int) -> List[str]:
+        """
+        Pick least recently used models to unload so a new model fits the budget
+
+        Args:
+            model_key: Model about to be loaded
+            expected_bytes: Fallback size estimate if the model was never measured
+
+        Returns:
+            Model keys to unload, oldest first (may be empty)
+        """
+        if not self.memory_budget_bytes:
+            return []
+        with self._lock:
+            needed = self._known_sizes.get(model_key, expected_bytes)
+            return self._pick_victims(needed, exclude=model_key)
+
+    def record_loaded(self, model_key: str, model, fallback_bytes: int = 0) -> List[str]:
+        """
+        Register a freshly loaded model and measure its size
+
+        Args:
+            model_key: Model that was loaded
+            model: The loaded object, measured with estimate_model_bytes
+            fallback_bytes: Size to assume if the model cannot be measured
+
+        Returns:
+            Model keys to unload because the measured size went over budget
+        """
+        size = estimate_model_bytes(model)
+        now = time.monotonic()
+        with self._lock:
+            if size:
+                self._known_sizes[model_key] = size
+            self._resident[model_key] = {
+                'size_bytes': size or self._known_sizes.get(model_key, fallback_bytes),
+                'last_used': now,
+                'loaded_at': now
+            }
+            self._resident.move_to_end(model_key)
+            if not self.memory_budget_bytes:
+                return []
+            return self._pick_victims(0, exclude=model_key)
+
+    def record_unloaded(self, model_key: str, reason: Optional[str] = None):
+        """Forget a model that was removed from memory"""
+        with self._lock:
+            if self._resident.pop(model_key, None) is not None and reason:
+                self._evictions[reason] = self._evictions.get(reason, 0) + 1
+
+    def claim_eviction(self, model_key: str, reason: str) -> bool:
+        """
+        Forget a model picked for eviction, unless it was pinned or went into use since
+
+        Returns:
+            True if the caller should unload the model
+        """
+        with self._lock:
+            if not self._evictable(model_key):
+                return False
+            if self._resident.pop(model_key, None) is not None:
+                self._evictions[reason] = self._evictions.get(reason, 0) + 1
+            return True
+
+    def _pick_victims(self, needed: int, exclude: str) -> List[str]:
+        used = sum(entry['size_bytes'] for entry in self._resident.values())
+        victims = []
+        for key, entry in self._resident.items():
+            if used + needed <= self.memory_budget_bytes:
+                break
+            if key == exclude or not self._evictable(key):
+                continue
+            victims.append(key)
+            used -= entry['size_bytes']
+        return victims
+
+    def idle_models(self) -> List[str]:
+        """Return resident models whose idle timeout has expired"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                key for key, entry in self._resident.items()
+                if self._evictable(key)
+                and self.idle_timeout_for(key) is not None
+                and now - entry['last_used'] >= self.idle_timeout_for(key)
+            ]
+
+    def has_idle_timeouts(self) -> bool:
+        return bool(self.default_idle_timeout) or any(
+            timeout and timeout > 0 for timeout in self.idle_timeouts.values()
+        )
+
+    def start_reaper(self, unload: Callable[[str, str], None]):
+        """
+        Start the background thread that unloads idle models
+
+        Args:
+            unload: Callback(model_key, reason) that actually drops the model
+        """
+        if not self.has_idle_timeouts():
+            return
+
+        def reap():
+            while not self._stop_reaper.wait(self.reaper_interval):
+                for key in self.idle_models():
+                    try:
+                        unload(key, 'idle')
+                    except Exception as exc:
+                        print(f"Failed to unload idle model {key}: {exc}")
+
+        # Every load calls this, possibly from several threads at once
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=reap, name='model-reaper', daemon=True)
+            self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop_reaper.set()
+
+    def get_status(self) -> dict:
+        """
+        Get residency status
+
+        Returns:
+            Dict with budget, used bytes, per-model size/idle time/pinned flag/in-use count and eviction counts
+        """
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                key: {
+                    'size_bytes': entry['size_bytes'],
+                    'idle_seconds': now - entry['last_used'],
+                    'idle_timeout': self.idle_timeout_for(key),
+                    'pinned': key in self._pinned,
+                    'in_use': self._in_use.get(key, 0)
+                }
+                for key, entry in self._resident.items()
+            }
+            return {
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'used_bytes': sum(m['size_bytes'] for m in models.values()),
+                'models': models,
+                'evictions': dict(self._evictions)
+            }
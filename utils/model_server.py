@@ -0,0 +1,532 @@
+"""
+Model server for VoiceFlow's multi-process serving mode
+A model server process owns the loaded models. HTTP worker processes call it
+over local IPC (multiprocessing.connection). Large audio inputs are passed
+through shared memory instead of being pickled through the socket.
+"""
+
+import os
+import threading
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from queue import Empty, LifoQueue
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from utils.metrics import REGISTRY
+from utils.model_manager import ModelManager, get_model_manager
+
+# Arrays smaller than this are sent inline; shared memory setup costs more than pickling them
+SHM_MIN_BYTES = 256 * 1024
+
+# Seconds a worker waits for an inference reply before giving up on the call
+REQUEST_TIMEOUT = float(os.environ.get('VOICEFLOW_MODEL_SERVER_TIMEOUT', '300'))
+# Status and metrics calls never wait for a model, so a server that is this slow to answer is stuck
+STATUS_TIMEOUT = 10.0
+
+Address = Union[str, Tuple[str, int]]
+
+
+class ModelServerError(RuntimeError):
+    """An operation failed inside the model server"""
+
+
+def parse_address(value: str) -> Address:
+    """'host:port' becomes a TCP address; anything else is a Unix socket or Windows pipe path"""
+    value = value.strip()
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit() and not value.startswith('\\\\'):
+        return (host or '127.0.0.1', int(port))
+    return value
+
+
+def format_address(address: Address) -> str:
+    if isinstance(address, tuple):
+        return f"{address[0]}:{address[1]}"
+    return address
+
+
+def parse_server_routes(value: str) -> Dict[str, Address]:
+    """
+    Parse a VOICEFLOW_MODEL_SERVER value into a model_key -> address map
+
+    A bare address serves every model. 'models@address' entries split models
+    across servers, e.g. 'whisper@127.0.0.1:6001,translator+kazakh_tts@127.0.0.1:6002'.
+    The key '*' holds the default address.
+    """
+    routes = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        models, sep, address = entry.rpartition('@')
+        if not sep:
+            routes['*'] = parse_address(entry)
+            continue
+        for key in models.split('+'):
+            key = key.strip()
+            if key not in ModelManager.MODELS:
+                raise ValueError(f"Unknown model in VOICEFLOW_MODEL_SERVER: {key}")
+            routes[key] = parse_address(address)
+    return routes
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a segment owned by the other process without adopting it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attach with the resource tracker, which
+        # would unlink the caller's segment when this process exits
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _close_shared_memory(shm: Optional[shared_memory.SharedMemory], unlink: bool = False):
+    if shm is None:
+        return
+    try:
+        shm.close()
+    except BufferError:
+        # A view is still alive somewhere; the mapping goes away with it
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def pack_array(array) -> Tuple[dict, Optional[shared_memory.SharedMemory]]:
+    """
+    Describe a numpy array for sending to another process
+
+    Returns:
+        (spec, shm) - shm is the segment the caller must close and unlink
+        once the other side has answered, or None for inline arrays
+    """
+    import numpy as np
+
+    array = np.ascontiguousarray(array)
+    if array.nbytes < SHM_MIN_BYTES:
+        return {'data': array}, None
+    shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return {'shm': shm.name, 'shape': array.shape, 'dtype': array.dtype.str}, shm
+
+
+def unpack_array(spec: dict):
+    """
+    Rebuild an array sent with pack_array
+
+    Returns:
+        (array, shm) - the array is a zero-copy view when shm is not None;
+        drop it before closing shm
+    """
+    import numpy as np
+
+    if 'data' in spec:
+        return spec['data'], None
+    shm = _attach_shared_memory(spec['shm'])
+    return np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=shm.buf), shm
+
+
+def check_concurrency(models: Iterable[str], concurrency: int):
+    """
+    Whisper runs one call at a time (its kv-cache hooks live on the shared
+    model), so a server hosting it cannot be asked for more
+
+    Raises:
+        ValueError: concurrency above 1 with whisper among the models
+    """
+    if concurrency > 1 and 'whisper' in models:
+        raise ValueError("Whisper runs one transcription at a time, so a model server hosting it "
+                         "needs --model-concurrency 1")
+
+
+class ModelServer:
+    """Serves model inference to HTTP workers over multiprocessing.connection"""
+
+    OPERATION_MODELS = {
+        'transcribe': 'whisper',
+        'translate': 'translator',
+        'synthesize_kazakh': 'kazakh_tts'
+    }
+
+    def __init__(self, address: Address, authkey: bytes, models: Optional[Iterable[str]] = None,
+                 manager: Optional[ModelManager] = None, concurrency: int = 1):
+        """
+        Initialize ModelServer
+
+        Args:
+            address: (host, port) or a Unix socket / Windows pipe path
+            authkey: Shared secret; connections without it are rejected
+            models: Model keys this server hosts. Defaults to all
+            manager: ModelManager that owns the models. Defaults to the global one
+            concurrency: Inference calls allowed to run at once per model; more
+                requests wait in line instead of oversubscribing the CPU
+
+        Raises:
+            ValueError: concurrency above 1 for a server hosting Whisper
+        """
+        self.address = address
+        self.authkey = authkey
+        self.models = list(models or ModelManager.MODELS)
+        check_concurrency(self.models, concurrency)
+        self.manager = manager or get_model_manager()
+        self.warmup = None
+
+        self._slots = {key: threading.BoundedSemaphore(max(1, concurrency)) for key in self.models}
+        self._queue_lock = threading.Lock()
+        self._queues = {key: {'waiting': 0, 'active': 0} for key in self.models}
+        self._listener = None
+        self._closed = False
+
+    def serve_forever(self):
+        """Accept connections until close() is called; one thread per connection"""
+        self._listener = Listener(self.address, authkey=self.authkey)
+        print(f"Model server listening on {format_address(self.address)} for {', '.join(self.models)}")
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except Exception as exc:
+                if self._closed:
+                    break
+                print(f"Model server rejected a connection: {exc}")
+                continue
+            threading.Thread(target=self._handle_connection, args=(conn,),
+                             name='model-server-conn', daemon=True).start()
+
+    def close(self):
+        self._closed = True
+        if self._listener is not None:
+            self._listener.close()
+
+    def _handle_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ('ok', self._dispatch(op, payload))
+                except Exception as exc:
+                    reply = ('error', type(exc).__name__, str(exc))
+                try:
+                    conn.send(reply)
+                except (OSError, ValueError):
+                    return
+
+    def _run(self, model_key: str, func):
+        with self._queue_lock:
+            self._queues[model_key]['waiting'] += 1
+        with self._slots[model_key]:
+            with self._queue_lock:
+                self._queues[model_key]['waiting'] -= 1
+                self._queues[model_key]['active'] += 1
+            try:
+                return func()
+            finally:
+                with self._queue_lock:
+                    self._queues[model_key]['active'] -= 1
+
+    def _transcribe(self, model, audio, options: dict):
+        # Background warmup runs the same model, outside the inference slots
+        with self.manager.whisper_lock:
+            return model.transcribe(audio, **options)
+
+    def _dispatch(self, op: str, payload: dict):
+        if op == 'ping':
+            return {'pid': os.getpid(), 'models': self.models}
+        if op == 'status':
+            return self.get_status()
+        if op == 'metrics':
+            return REGISTRY.snapshot()
+
+        model_key = self.OPERATION_MODELS.get(op)
+        if model_key is None:
+            raise ModelServerError(f"Unknown operation: {op}")
+        if model_key not in self._slots:
+            raise ModelServerError(f"This model server does not host {model_key}")
+
+        if op == 'transcribe':
+            audio, shm = unpack_array(payload['audio'])
+            try:
+                with self.manager.model_in_use(model_key):
+                    model = self.manager.load_whisper_model()
+                    return self._run(model_key, lambda: self._transcribe(model, audio, payload.get('options', {})))
+            finally:
+                del audio
+                _close_shared_memory(shm)
+
+        if op == 'translate':
+            with self.manager.model_in_use(model_key):
+                translator = self.manager.load_translator_model()
+                return self._run(model_key, lambda: translator(
+                    payload['text'], src_lang=payload['src_lang'], tgt_lang=payload['tgt_lang']
+                ))
+
+        from utils.kk_speech_model import synthesize_kazakh_local
+        sampling_rate, waveform = self._run(
+            model_key, lambda: synthesize_kazakh_local(self.manager, payload['text'])
+        )
+        # Waveforms are small next to uploads and the client cannot tell when
+        # to release a segment this process created, so they go back inline
+        return {'sampling_rate': sampling_rate, 'waveform': waveform}
+
+    def collect_metrics(self) -> dict:
+        """Queue depth per model for the metrics registry"""
+        with self._queue_lock:
+            values = [
+                [[key, state], count]
+                for key, queue in self._queues.items()
+                for state, count in queue.items()
+            ]
+        return {
+            'voiceflow_model_queue_depth': {
+                'type': 'gauge',
+                'help': 'Model server calls waiting for or holding an inference slot',
+                'labelnames': ['model', 'state'],
+                'values': values
+            }
+        }
+
+    def get_status(self) -> dict:
+        """
+        Get server status
+
+        Returns:
+            {'pid', 'models', 'queues': {model_key: {'waiting', 'active'}}, 'warmup', 'load_stats'}
+        """
+        with self._queue_lock:
+            queues = {key: dict(value) for key, value in self._queues.items()}
+        warmup = self.warmup.get_status() if self.warmup is not None else None
+        return {
+            'pid': os.getpid(),
+            'models': self.models,
+            'queues': queues,
+            'warmup': warmup,
+            'load_stats': self.manager.get_load_stats()
+        }
+
+
+def run_model_server(address: Address, authkey: bytes, models: Optional[Iterable[str]] = None,
+                     warmup_models: Optional[Iterable[str]] = None, concurrency: int = 1):
+    """
+    Process entry point: warm the hosted models, then serve forever
+
+    Warmup runs in the background, so workers can connect right away and early
+    requests simply wait on the single-flight load.
+
+    Args:
+        address: Address to listen on
+        authkey: Shared secret
+        models: Model keys to host. Defaults to all
+        warmup_models: Hosted models to warm at startup. Defaults to all hosted models
+        concurrency: Concurrent inference calls per model
+    """
+    from utils.model_warmup import ModelWarmup
+
+    server = ModelServer(address, authkey, models=models, concurrency=concurrency)
+    REGISTRY.add_collector(server.collect_metrics)
+    keys = server.models if warmup_models is None else [k for k in warmup_models if k in server.models]
+    server.warmup = ModelWarmup(keys, manager=server.manager, preimport=False)
+    server.warmup.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+class ModelClient:
+    """Client side of ModelServer, safe to share between request threads"""
+
+    def __init__(self, routes: Dict[str, Address], authkey: bytes, pool_size: int = 8,
+                 timeout: float = REQUEST_TIMEOUT):
+        """
+        Initialize ModelClient
+
+        Args:
+            routes: model_key -> server address, with '*' as the default (see parse_server_routes)
+            authkey: Shared secret matching the servers'
+            pool_size: Idle connections kept per server
+            timeout: Seconds to wait for a server's reply
+        """
+        self.routes = dict(routes)
+        self.authkey = authkey
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def serves(self, model_key: str) -> bool:
+        """True when a model server is configured for this model"""
+        return model_key in self.routes or '*' in self.routes
+
+    def _address(self, model_key: str) -> Address:
+        address = self.routes.get(model_key, self.routes.get('*'))
+        if address is None:
+            raise ModelServerError(f"No model server configured for {model_key}")
+        return address
+
+    def _pool(self, address: Address) -> LifoQueue:
+        with self._pools_lock:
+            return self._pools.setdefault(format_address(address), LifoQueue())
+
+    def _request(self, address: Address, op: str, payload: dict, timeout: Optional[float] = None):
+        """
+        Send one operation to a server and wait for its reply
+
+        Raises:
+            ConnectionError: The server is unreachable, or did not reply within the timeout
+            ModelServerError: The operation failed in the server
+        """
+        timeout = self.timeout if timeout is None else timeout
+        pool = self._pool(address)
+        # A pooled connection may belong to a server that has restarted: retry once on a fresh one
+        for attempt in range(2):
+            try:
+                conn = pool.get_nowait()
+            except Empty:
+                conn = None
+            pooled = conn is not None
+            try:
+                if conn is None:
+                    conn = Client(address, authkey=self.authkey)
+                conn.send((op, payload))
+                answered = conn.poll(timeout)
+                reply = conn.recv() if answered else None
+            except (EOFError, OSError) as exc:
+                if conn is not None:
+                    conn.close()
+                if pooled and attempt == 0:
+                    continue
+                raise ConnectionError(f"Model server at {format_address(address)} is unavailable: {exc}")
+            if not answered:
+                # A late reply would be read by the next call on this connection, so it is dropped
+                conn.close()
+                raise ConnectionError(
+                    f"Model server at {format_address(address)} did not answer {op} within {timeout:g}s")
+
+            if pool.qsize() < self.pool_size:
+                pool.put(conn)
+            else:
+                conn.close()
+            if reply[0] == 'error':
+                raise ModelServerError(f"{reply[1]}: {reply[2]}")
+            return reply[1]
+
+    def _call(self, model_key: str, op: str, payload: dict):
+        return self._request(self._address(model_key), op, payload)
+
+    def transcribe(self, audio, **options) -> dict:
+        """Run whisper's transcribe() remotely on a 16 kHz float32 array"""
+        import numpy as np
+
+        spec, shm = pack_array(np.asarray(audio, dtype=np.float32))
+        try:
+            return self._call('whisper', 'transcribe', {'audio': spec, 'options': options})
+        finally:
+            _close_shared_memory(shm, unlink=True)
+
+    def translate(self, text: str, src_lang: str, tgt_lang: str) -> list:
+        """Translate remotely; returns the pipeline's [{'translation_text': ...}] list"""
+        return self._call('translator', 'translate', {'text': text, 'src_lang': src_lang, 'tgt_lang': tgt_lang})
+
+    def synthesize_kazakh(self, text: str):
+        """Synthesize Kazakh speech remotely; returns (sampling_rate, float32 waveform)"""
+        result = self._call('kazakh_tts', 'synthesize_kazakh', {'text': text})
+        return result['sampling_rate'], result['waveform']
+
+    def get_status(self) -> dict:
+        """Status of every configured server, keyed by address"""
+        statuses = {}
+        for address in {format_address(a): a for a in self.routes.values()}.values():
+            try:
+                statuses[format_address(address)] = self._request(address, 'status', {}, STATUS_TIMEOUT)
+            except (ConnectionError, ModelServerError) as exc:
+                statuses[format_address(address)] = {'error': str(exc)}
+        return statuses
+
+    def get_metrics_snapshots(self) -> list:
+        """Metrics snapshots from every reachable server"""
+        snapshots = []
+        for address in {format_address(a): a for a in self.routes.values()}.values():
+            try:
+                snapshots.append(self._request(address, 'metrics', {}, STATUS_TIMEOUT))
+            except (ConnectionError, ModelServerError) as exc:
+                print(f"Could not collect metrics from {format_address(address)}: {exc}")
+        return snapshots
+
+    def get_warmup_status(self) -> dict:
+        """
+        Readiness across all servers, in ModelWarmup.get_status() shape
+
+        Each model is reported by the server that hosts it. The result is ready
+        only when every server answers and is ready.
+        """
+        ready = True
+        models = {}
+        for address, status in self.get_status().items():
+            warmup = status.get('warmup')
+            if warmup is None:
+                ready = ready and 'error' not in status
+                continue
+            ready = ready and warmup['ready']
+            for key in status['models']:
+                if self.serves(key) and format_address(self._address(key)) == address:
+                    models[key] = warmup['models'][key]
+        return {'ready': ready, 'models': models}
+
+
+class RemoteWhisperModel:
+    """Stands in for a loaded Whisper model; decoding happens in the calling process"""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def transcribe(self, audio, **options) -> dict:
+        if not hasattr(audio, 'dtype'):
+            from utils.audio_io import decode_audio
+            audio = decode_audio(audio)
+        return self.client.transcribe(audio, **options)
+
+
+class RemoteTranslator:
+    """Stands in for the translation pipeline"""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def __call__(self, text: str, src_lang: str, tgt_lang: str, **_kwargs) -> list:
+        return self.client.translate(text, src_lang, tgt_lang)
+
+
+# Global instance
+_model_client = None
+_model_client_lock = threading.Lock()
+
+def get_model_client() -> Optional[ModelClient]:
+    """
+    Get the global ModelClient, or None when models are loaded in-process
+
+    Configured by VOICEFLOW_MODEL_SERVER (see parse_server_routes) and the
+    hex-encoded VOICEFLOW_MODEL_SERVER_AUTHKEY.
+    """
+    global _model_client
+    spec = os.environ.get('VOICEFLOW_MODEL_SERVER', '').strip()
+    if not spec:
+        return None
+    if _model_client is None:
+        with _model_client_lock:
+            if _model_client is None:
+                authkey = os.environ.get('VOICEFLOW_MODEL_SERVER_AUTHKEY', '')
+                if not authkey:
+                    raise ValueError("VOICEFLOW_MODEL_SERVER_AUTHKEY must be set when VOICEFLOW_MODEL_SERVER is")
+                _model_client = ModelClient(parse_server_routes(spec), bytes.fromhex(authkey))
+    return _model_client
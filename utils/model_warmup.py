@@ -0,0 +1,243 @@
+"""
+Startup warmup for VoiceFlow models
+Preloads the configured models in the background, runs one dummy inference
+through each and tracks per-model state for the readiness endpoint
+"""
+
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from utils.model_manager import ModelManager, get_model_manager
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+WARM = 'warm'
+FAILED = 'failed'
+
+
+def _warmup_whisper(manager: ModelManager):
+    import numpy as np
+
+    model = manager.load_whisper_model()
+    # One second of silence is enough to build the decoder kernels. Warmup can
+    # overlap the first requests, so it queues for the model like they do
+    with manager.whisper_lock:
+        model.transcribe(np.zeros(16000, dtype=np.float32), language='en', fp16=False)
+
+
+def _warmup_kazakh_tts(manager: ModelManager):
+    import torch
+
+    loaded = manager.load_kazakh_tts_model()
+    inputs = loaded['tokenizer']("Сәлем", return_tensors="pt")
+    with torch.no_grad():
+        loaded['model'](**inputs)
+
+
+def _warmup_translator(manager: ModelManager):
+    translator = manager.load_translator_model()
+    translator("Hello", src_lang='eng_Latn', tgt_lang='rus_Cyrl')
+
+
+WARMUP_STEPS = {
+    'whisper': _warmup_whisper,
+    'kazakh_tts': _warmup_kazakh_tts,
+    'translator': _warmup_translator
+}
+
+# Libraries the routes import lazily; importing them in the background after
+# startup keeps the cost off both app startup and the first request
+PREIMPORT_MODULES = ('torch', 'scipy.io.wavfile', 'transformers', 'whisper')
+
+
+def parse_warmup_models(value: Optional[str]) -> List[str]:
+    """
+    Parse a VOICEFLOW_WARMUP_MODELS value
+
+    Accepts a comma-separated list of model keys, 'all', or ''/'none'.
+    """
+    value = (value or '').strip().lower()
+    if value in ('', 'none', '0', 'false'):
+        return []
+    if value == 'all':
+        return list(ModelManager.MODELS)
+
+    keys = []
+    for key in value.split(','):
+        key = key.strip()
+        if not key:
+            continue
+        if key not in ModelManager.MODELS:
+            print(f"Ignoring unknown warmup model: {key}")
+            continue
+        keys.append(key)
+    return keys
+
+
+class ModelWarmup:
+    """Loads and warms a set of models in the background"""
+
+    def __init__(self, model_keys: Iterable[str], manager: Optional[ModelManager] = None,
+                 concurrency: int = 1, preimport: bool = True):
+        """
+        Initialize ModelWarmup
+
+        Args:
+            model_keys: Models that must be warm before the app reports ready
+            manager: ModelManager to load through. Defaults to the global one
+            concurrency: How many models to load at once (each load is multi-GB)
+            preimport: Import PREIMPORT_MODULES in the background before warming models
+        """
+        self.model_keys = list(model_keys)
+        self.manager = manager or get_model_manager()
+        self.concurrency = max(1, concurrency)
+        self.preimport = preimport
+        self.preimport_seconds = {}
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._listeners = []
+        self._state = {
+            key: {
+                'state': NOT_LOADED,
+                'load_seconds': None,
+                'warmup_seconds': None,
+                'error': None
+            }
+            for key in self.model_keys
+        }
+
+    def start(self):
+        """Start warming models in a background thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None or not (self.model_keys or self.preimport):
+                return
+            self._thread = threading.Thread(target=self.run, name='model-warmup', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Warm all configured models, blocking until done"""
+        if self.preimport:
+            self._preimport()
+        if not self.model_keys:
+            return
+        print(f"Warming up models: {', '.join(self.model_keys)}")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self._warm_model, self.model_keys))
+
+    def _preimport(self):
+        for name in PREIMPORT_MODULES:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as exc:
+                print(f"Preimport skipped {name}: {exc}")
+                continue
+            self.preimport_seconds[name] = round(time.perf_counter() - started, 3)
+
+    def _warm_model(self, model_key: str):
+        self._update(model_key, state=LOADING, error=None)
+        # Warm models must stay resident for readiness to mean anything
+        self.manager.residency.pin(model_key)
+        try:
+            started = time.perf_counter()
+            WARMUP_STEPS[model_key](self.manager)
+            total = time.perf_counter() - started
+
+            load_seconds = self.manager.get_load_stats().get(model_key, {}).get('last_load_seconds')
+            self._update(
+                model_key,
+                state=WARM,
+                load_seconds=load_seconds,
+                warmup_seconds=total - (load_seconds or 0.0)
+            )
+            print(f"✔ {model_key} warm after {total:.2f}s")
+        except Exception as exc:
+            self.manager.residency.unpin(model_key)
+            self._update(model_key, state=FAILED, error=str(exc))
+            print(f"Warmup failed for {model_key}: {exc}")
+
+    def _update(self, model_key: str, **fields):
+        with self._lock:
+            self._state[model_key].update(fields)
+            listeners = list(self._listeners)
+        if listeners:
+            status = self.get_status()
+            for callback in listeners:
+                try:
+                    callback(status)
+                except Exception as exc:
+                    print(f"Warmup listener failed: {exc}")
+
+    def add_listener(self, callback):
+        """
+        Call callback(status) on every model state change
+
+        Callbacks run on the warmup threads and get the same dict as
+        get_status(); GUI code should hand it to its own thread.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def is_ready(self) -> bool:
+        """True when every configured model is warm"""
+        with self._lock:
+            return all(entry['state'] == WARM for entry in self._state.values())
+
+    def get_status(self) -> dict:
+        """
+        Get warmup status for all known models
+
+        Returns:
+            {'ready': bool, 'models': {model_key: {'state', 'required', 'load_seconds', 'warmup_seconds', 'error',
+             'inference_mode'}},
+             'preimport_seconds': {module: seconds}}
+        """
+        load_stats = self.manager.get_load_stats()
+        models = {}
+        with self._lock:
+            for key in ModelManager.MODELS:
+                if key in self._state:
+                    entry = dict(self._state[key], required=True)
+                else:
+                    # Not part of warmup: report what lazy loading has done so far
+                    stats = load_stats.get(key, {})
+                    if self.manager.is_model_loaded(key):
+                        state = WARM
+                    elif stats.get('loading'):
+                        state = LOADING
+                    else:
+                        state = NOT_LOADED
+                    entry = {
+                        'state': state,
+                        'required': False,
+                        'load_seconds': stats.get('last_load_seconds'),
+                        'warmup_seconds': None,
+                        'error': stats.get('last_error')
+                    }
+                entry['inference_mode'] = load_stats.get(key, {}).get('inference_mode', 'eager')
+                models[key] = entry
+            ready = all(entry['state'] == WARM for entry in self._state.values())
+        return {'ready': ready, 'models': models, 'preimport_seconds': dict(self.preimport_seconds)}
+
+
+# Global instance
+_model_warmup = None
+_model_warmup_lock = threading.Lock()
+
+def get_model_warmup() -> ModelWarmup:
+    """Get or create the global ModelWarmup configured from the environment"""
+    global _model_warmup
+    if _model_warmup is None:
+        with _model_warmup_lock:
+            if _model_warmup is None:
+                _model_warmup = ModelWarmup(
+                    parse_warmup_models(os.environ.get('VOICEFLOW_WARMUP_MODELS')),
+                    concurrency=int(os.environ.get('VOICEFLOW_WARMUP_CONCURRENCY', '1')),
+                    preimport=os.environ.get('VOICEFLOW_PREIMPORT', '1').lower() not in ('0', 'false', 'no')
+                )
+    return _model_warmup
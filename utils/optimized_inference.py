@@ -0,0 +1,180 @@
+"""
+Optimized execution for VoiceFlow's torch models
+Runs the Whisper encoder and the MMS-TTS VITS model through TorchScript or
+torch.compile instead of eager PyTorch, with compiled artifacts cached on
+disk and a fallback to eager mode when an optimized call fails
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+# 'script': TorchScript trace, saved to disk. Only the Whisper encoder, whose input is
+#           always padded 30 s mel windows (one per clip in a batch); VITS output length
+#           depends on the input values
+# 'compile': torch.compile (inductor). Compiled kernels are cached on disk, so only
+#           the first process pays the full compile, during warmup or the first request
+INFERENCE_MODES = ('eager', 'script', 'compile')
+
+
+def inference_mode_from_env(model_key: str) -> str:
+    """VOICEFLOW_<MODEL>_INFERENCE_MODE, else VOICEFLOW_INFERENCE_MODE, else 'eager'"""
+    mode = os.environ.get(f'VOICEFLOW_{model_key.upper()}_INFERENCE_MODE',
+                          os.environ.get('VOICEFLOW_INFERENCE_MODE', 'eager')).strip().lower()
+    if mode not in INFERENCE_MODES:
+        print(f"Unknown inference mode {mode!r} for {model_key}, using 'eager'")
+        return 'eager'
+    return mode
+
+
+def artifact_key(model_key: str, source: str, mode: str) -> str:
+    """Cache key for a compiled artifact: model, checkpoint version, torch version and mode"""
+    import torch
+    return hashlib.sha1(f"{model_key}:{source}:{torch.__version__}:{mode}".encode()).hexdigest()[:12]
+
+
+def _optimization_failed(exc: Exception) -> bool:
+    """Whether an error means the optimized forward cannot work at all, rather than failing one call"""
+    if isinstance(exc, MemoryError) or 'out of memory' in str(exc).lower():
+        return False
+    import torch
+
+    errors = [torch.jit.Error]
+    try:
+        from torch._dynamo.exc import TorchDynamoException
+        errors.append(TorchDynamoException)
+    except ImportError:
+        pass
+    return isinstance(exc, tuple(errors))
+
+
+def install_forward(module, optimized_forward: Callable, label: str):
+    """
+    Route a module's calls through optimized_forward
+
+    A call that fails in optimized_forward is retried eagerly. A compile or
+    TorchScript failure puts the eager forward back for good; other errors
+    (running out of memory on one large batch) only affect that call. The
+    module's parameters and state_dict are untouched.
+    """
+    eager_forward = module.forward
+
+    def forward(*args, **kwargs):
+        try:
+            return optimized_forward(*args, **kwargs)
+        except Exception as exc:
+            if _optimization_failed(exc):
+                print(f"Optimized {label} failed, falling back to eager mode: {exc}")
+                module.forward = eager_forward
+            else:
+                print(f"Optimized {label} call failed, running it eagerly: {exc}")
+            return eager_forward(*args, **kwargs)
+
+    module.forward = forward
+
+
+def _share_tensors(scripted, module):
+    """Point a loaded TorchScript module at the eager module's parameters so weights are not held twice"""
+    tensors = dict(module.named_parameters())
+    tensors.update(module.named_buffers())
+    for name, tensor in list(scripted.named_parameters()) + list(scripted.named_buffers()):
+        if name not in tensors or tensors[name].shape != tensor.shape:
+            raise ValueError(f"traced module does not match the model ({name})")
+        tensor.data = tensors[name].data
+
+
+def _script_whisper_encoder(encoder, n_mels: int, path: Path):
+    import torch
+    from whisper.audio import N_FRAMES
+
+    if path.exists():
+        try:
+            scripted = torch.jit.load(str(path), map_location='cpu')
+            _share_tensors(scripted, encoder)
+            return scripted
+        except Exception as exc:
+            print(f"Cached TorchScript encoder unusable, tracing again: {exc}")
+            path.unlink(missing_ok=True)
+
+    with torch.no_grad():
+        scripted = torch.jit.trace(encoder, torch.zeros(1, n_mels, N_FRAMES), check_trace=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A temp file of its own: other worker processes may be tracing the same encoder
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.' + path.name + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        scripted.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return scripted
+
+
+def _use_inductor_cache(cache_dir: Path):
+    # Inductor reads this on each compile; a user-set location wins
+    os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', str(cache_dir / 'inductor'))
+
+
+def optimize_whisper(model, mode: str, cache_dir: Path, key: str) -> str:
+    """
+    Run a Whisper model's audio encoder in an optimized mode
+
+    The decoder is left eager: transcribe() installs kv-cache hooks on it
+    and calls it with a different token count at every step.
+
+    Args:
+        model: whisper Whisper model
+        mode: One of INFERENCE_MODES
+        cache_dir: Directory for compiled artifacts
+        key: artifact_key() for this checkpoint
+
+    Returns:
+        The mode in effect ('eager' if setting up the optimized mode failed)
+    """
+    if mode == 'eager':
+        return 'eager'
+    encoder = model.encoder
+    try:
+        if mode == 'script':
+            optimized = _script_whisper_encoder(encoder, model.dims.n_mels,
+                                                cache_dir / f"whisper-encoder-{key}.pt")
+        else:
+            import torch
+            _use_inductor_cache(cache_dir)
+            # Every input is padded to 30 s, but batched transcription (transcribe_batch)
+            # varies the batch size. dynamic=None compiles the first shape statically and,
+            # when another batch size arrives, recompiles once with that dimension dynamic
+            optimized = torch.compile(encoder.forward, dynamic=None)
+    except Exception as exc:
+        print(f"Could not prepare {mode} Whisper encoder, using eager mode: {exc}")
+        return 'eager'
+    install_forward(encoder, optimized, f'Whisper encoder ({mode})')
+    return mode
+
+
+def optimize_vits(model, mode: str, cache_dir: Path) -> str:
+    """
+    Run a transformers VitsModel through torch.compile
+
+    Text length varies per call, so the graph is compiled with dynamic shapes.
+
+    Returns:
+        The mode in effect ('eager' for modes VITS does not support)
+    """
+    if mode == 'eager':
+        return 'eager'
+    if mode == 'script':
+        print("TorchScript does not support VITS (output length depends on the input); using eager mode")
+        return 'eager'
+    try:
+        import torch
+        _use_inductor_cache(cache_dir)
+        optimized = torch.compile(model.forward, dynamic=True)
+    except Exception as exc:
+        print(f"Could not prepare compiled VITS model, using eager mode: {exc}")
+        return 'eager'
+    install_forward(model, optimized, f'VITS model ({mode})')
+    return mode
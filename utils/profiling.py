@@ -0,0 +1,322 @@
+"""
+On-demand request profiling for VoiceFlow
+Runs a single request under a stack-sampling profiler (folded stacks for
+flame graphs) or cProfile, records torch operator timings for inference
+calls made during the request, and stores the result for later download
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+PROFILE_MODES = ('sample', 'trace')
+
+_current = threading.local()
+
+
+def requested_mode(value: Optional[str]) -> Optional[str]:
+    """Profile mode a client's opt-in value asks for ('1' means 'sample'), or None"""
+    if value == '1':
+        return 'sample'
+    return value if value in PROFILE_MODES else None
+
+
+def _env_flag(name: str, default: str = '0') -> bool:
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class ProfilingConfig:
+    """Profiling switches, read from the environment"""
+
+    def __init__(self):
+        # Master switch: nothing is profiled and /profiles is hidden unless this is on
+        self.enabled = _env_flag('VOICEFLOW_PROFILING')
+        # When set, opt-in requests must send this value in X-VoiceFlow-Profile
+        self.token = os.environ.get('VOICEFLOW_PROFILING_TOKEN', '')
+        # Fraction of /tts and /stt requests profiled without opting in
+        self.sample_rate = float(os.environ.get('VOICEFLOW_PROFILE_SAMPLE_RATE', '0') or 0)
+        self.interval = float(os.environ.get('VOICEFLOW_PROFILE_INTERVAL_MS', '5')) / 1000.0
+        self.directory = Path(os.environ.get('VOICEFLOW_PROFILE_DIR')
+                              or Path(tempfile.gettempdir()) / 'voiceflow-profiles')
+        self.keep = int(os.environ.get('VOICEFLOW_PROFILE_KEEP', '50'))
+        # Bounds the overhead when sampling is combined with a burst of traffic
+        self.max_concurrent = int(os.environ.get('VOICEFLOW_PROFILE_MAX_CONCURRENT', '2'))
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into folded-stack counts"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            folded = ';'.join(reversed(stack))
+            self.counts[folded] = self.counts.get(folded, 0) + 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded format: 'frame;frame;frame count' per line"""
+        return '\n'.join(f"{stack} {count}" for stack, count in sorted(self.counts.items())) + '\n'
+
+
+class ProfileSession:
+    """Profiles the calling thread between start() and stop()"""
+
+    def __init__(self, mode: str, label: str, interval: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.label = label
+        self.interval = interval
+        self.torch_ops = []
+        self._sampler = None
+        self._profiler = None
+        self._started = None
+        self.duration = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.mode == 'sample':
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time per process; sample instead
+                self._profiler = None
+                self.mode = 'sample'
+                self._sampler = StackSampler(threading.get_ident(), self.interval)
+                self._sampler.start()
+        _current.session = self
+
+    def stop(self):
+        _current.session = None
+        self.duration = time.perf_counter() - self._started
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._profiler is not None:
+            self._profiler.disable()
+
+    def result(self) -> dict:
+        """Profile as a JSON-serializable dict"""
+        data = {
+            'id': self.id,
+            'label': self.label,
+            'mode': self.mode,
+            'created_at': time.time(),
+            'duration_seconds': self.duration,
+            'torch_ops': self.torch_ops
+        }
+        if self._sampler is not None:
+            data['interval_seconds'] = self.interval
+            data['samples'] = self._sampler.samples
+            data['folded'] = self._sampler.folded()
+        if self._profiler is not None:
+            data['functions'] = self._top_functions()
+        return data
+
+    def _top_functions(self, limit: int = 50) -> List[dict]:
+        import pstats
+
+        stats = pstats.Stats(self._profiler)
+        rows = []
+        for (filename, line, name), (_cc, calls, tottime, cumtime, _callers) in stats.stats.items():
+            rows.append({
+                'function': f"{name} ({os.path.basename(filename)}:{line})",
+                'calls': calls,
+                'self_seconds': tottime,
+                'cumulative_seconds': cumtime
+            })
+        rows.sort(key=lambda row: -row['cumulative_seconds'])
+        return rows[:limit]
+
+    def dump_pstats(self, path: Path):
+        if self._profiler is not None:
+            self._profiler.dump_stats(str(path))
+
+
+def current_session() -> Optional[ProfileSession]:
+    """The profile session running on this thread, if any"""
+    return getattr(_current, 'session', None)
+
+
+@contextmanager
+def profile_ops(label: str, limit: int = 25):
+    """
+    Record torch operator timings for an inference call when the request is profiled
+
+    A no-op (one attribute lookup) for requests that are not being profiled.
+    Models served by a separate model server are not covered.
+    """
+    session = current_session()
+    # Without torch already imported the model runs elsewhere (model server); don't pay the import here
+    if session is None or 'torch' not in sys.modules:
+        yield
+        return
+
+    import torch
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]) as prof:
+        yield
+    ops = sorted(prof.key_averages(), key=lambda event: -event.self_cpu_time_total)
+    session.torch_ops.append({
+        'label': label,
+        'ops': [
+            {
+                'name': event.key,
+                'calls': event.count,
+                'self_cpu_ms': event.self_cpu_time_total / 1000.0,
+                'cpu_total_ms': event.cpu_time_total / 1000.0
+            }
+            for event in ops[:limit]
+        ]
+    })
+
+
+class ProfileStore:
+    """Keeps the most recent profiles on disk, shared by all worker processes"""
+
+    def __init__(self, directory: Path, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, session: ProfileSession) -> dict:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = session.result()
+        path = self.directory / f"{session.id}.json"
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        session.dump_pstats(self.directory / f"{session.id}.pstats")
+        self._prune()
+        return data
+
+    def _prune(self):
+        profiles = sorted(self.directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for stale in profiles[:-self.keep] if self.keep > 0 else profiles:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix('.pstats').unlink(missing_ok=True)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if not profile_id.isalnum():
+            return None
+        path = self.directory / f"{profile_id}.json"
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def pstats_path(self, profile_id: str) -> Optional[Path]:
+        path = self.directory / f"{profile_id}.pstats"
+        return path if profile_id.isalnum() and path.exists() else None
+
+    def list(self) -> List[dict]:
+        summaries = []
+        for path in sorted(self.directory.glob('*.json'), key=lambda p: -p.stat().st_mtime):
+            data = self.get(path.stem)
+            if data:
+                summaries.append({key: data.get(key) for key in ('id', 'label', 'mode', 'created_at', 'duration_seconds')})
+        return summaries
+
+
+class RequestProfiler:
+    """Decides which requests to profile and runs them under a ProfileSession"""
+
+    def __init__(self, config: Optional[ProfilingConfig] = None):
+        self.config = config or ProfilingConfig()
+        self.store = ProfileStore(self.config.directory, self.config.keep)
+        self._slots = threading.BoundedSemaphore(max(1, self.config.max_concurrent))
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether a client may opt in and read profiles: always without VOICEFLOW_PROFILING_TOKEN"""
+        if not self.config.token:
+            return True
+        return hmac.compare_digest((token or '').encode(), self.config.token.encode())
+
+    def wants_profile(self, requested: Optional[str], token: Optional[str], sampled_endpoint: bool) -> Optional[str]:
+        """
+        Decide whether to profile a request
+
+        Args:
+            requested: Mode asked for by the client ('1'/'sample', 'trace'); other values are
+                not an opt-in, so unrelated query fields named 'profile' cannot start one
+            token: Value of the opt-in header, checked against VOICEFLOW_PROFILING_TOKEN
+            sampled_endpoint: Whether the endpoint takes part in random sampling
+
+        Returns:
+            The profile mode to use, or None
+        """
+        if not self.config.enabled:
+            return None
+        mode = requested_mode(requested)
+        if mode:
+            return mode if self.authorized(token) else None
+        if sampled_endpoint and self.config.sample_rate > 0 and random.random() < self.config.sample_rate:
+            return 'sample'
+        return None
+
+    def begin(self, mode: str, label: str) -> Optional[ProfileSession]:
+        """Start profiling the calling thread; None when too many profiles are running"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        session = ProfileSession(mode, label, self.config.interval)
+        session.start()
+        return session
+
+    def end(self, session: ProfileSession) -> dict:
+        try:
+            session.stop()
+            return self.store.save(session)
+        finally:
+            self._slots.release()
+
+
+# Global instance
+_request_profiler = None
+_request_profiler_lock = threading.Lock()
+
+def get_request_profiler() -> RequestProfiler:
+    """Get or create the global RequestProfiler configured from the environment"""
+    global _request_profiler
+    if _request_profiler is None:
+        with _request_profiler_lock:
+            if _request_profiler is None:
+                _request_profiler = RequestProfiler()
+    return _request_profiler
@@ -0,0 +1,423 @@
+"""
+pyttsx3 worker pool for VoiceFlow
+pyttsx3 drivers are not thread-safe and block in runAndWait(), so system-voice
+synthesis runs in separate worker processes, each with its own engine. A
+worker that crashes or hangs is killed and replaced.
+"""
+
+import atexit
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+import wave
+from typing import Tuple
+
+from utils.detect_voice import detect_voice_gender
+from utils.metrics import REGISTRY
+
+# Seconds one synthesis may take before its worker is treated as hung
+JOB_TIMEOUT = float(os.environ.get('VOICEFLOW_PYTTSX3_TIMEOUT', '30'))
+# Seconds a new worker may take to start its engine
+START_TIMEOUT = float(os.environ.get('VOICEFLOW_PYTTSX3_START_TIMEOUT', '30'))
+# Seconds a request may wait for an idle worker when all of them are busy
+ACQUIRE_TIMEOUT = float(os.environ.get('VOICEFLOW_PYTTSX3_QUEUE_TIMEOUT', '30'))
+
+SPEECH_RATE = 150
+
+# espeak always produces 22.05 kHz; SAPI5 is asked for the same
+PCM_RATE = 22050
+SAPI_FORMAT_22KHZ_16BIT_MONO = 22
+
+WORKER_RESTARTS = REGISTRY.counter(
+    'voiceflow_pyttsx3_worker_restarts_total', 'pyttsx3 workers replaced after a crash or hang', ('reason',))
+SYNTHESIS_OUTPUT = REGISTRY.counter(
+    'voiceflow_pyttsx3_synthesis_total', 'pyttsx3 syntheses by how the audio left the driver', ('path',))
+
+
+class Pyttsx3WorkerError(RuntimeError):
+    """A pyttsx3 worker crashed, hung or could not start"""
+
+
+def _wav_bytes(pcm: bytes, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def select_voice(voices, tgt_language: str, gender_preference: str = 'any'):
+    """
+    Pick a pyttsx3 voice for a language and gender preference
+
+    Returns:
+        (voice or None, whether a voice of the preferred gender was found)
+    """
+    if not voices:
+        return None, False
+
+    selected_voice = voices[0]  # Default English
+    gender_found = False
+
+    if tgt_language == 'russian':
+        # Look for Russian voice with gender preference
+        matching_voices = [
+            voice for voice in voices
+            if 'ru' in voice.id.lower() or 'russian' in voice.name.lower()
+        ]
+        if matching_voices:
+            selected_voice = matching_voices[0]
+            # Try to match gender preference
+            if gender_preference != 'any':
+                for voice in matching_voices:
+                    if detect_voice_gender(voice) == gender_preference:
+                        selected_voice = voice
+                        gender_found = True
+                        break
+        elif len(voices) > 1:
+            selected_voice = voices[1]
+
+    elif tgt_language == 'english':
+        # Filter English voices by gender
+        if gender_preference != 'any':
+            for voice in voices:
+                if detect_voice_gender(voice) == gender_preference:
+                    selected_voice = voice
+                    gender_found = True
+                    break
+
+    return selected_voice, gender_found
+
+
+class Synthesizer:
+    """
+    One pyttsx3 engine and the fastest way to get audio out of its driver
+
+    espeak and SAPI5 hand back samples in memory; other drivers go through
+    save_to_file(). Not thread-safe: use one per process, from one thread.
+    """
+
+    def __init__(self):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('volume', 1.0)
+        self.voices = self.engine.getProperty('voices')
+        self.driver = self.engine.proxy._driver
+        self.driver_name = type(self.driver).__module__.rsplit('.', 1)[-1]
+        # How the last synthesis got its audio: 'memory' or 'file'
+        self.last_output = None
+        self._espeak_pcm = []
+        self._espeak_done = threading.Event()
+        if self.driver_name == 'espeak':
+            from pyttsx3.drivers import _espeak
+            # Replaces the driver's callback, which only writes files or plays audio
+            _espeak.SetSynthCallback(self._on_espeak_synth)
+
+    def synthesize(self, text: str, tgt_language: str, gender_preference: str = 'any') -> Tuple[bytes, dict]:
+        """
+        Synthesize text with the voice select_voice() picks
+
+        Returns:
+            (WAV bytes, dict with 'voice_used' and 'gender_found')
+
+        Raises:
+            RuntimeError: If the driver produced no audio
+        """
+        selected_voice, gender_found = select_voice(self.voices, tgt_language, gender_preference)
+        if selected_voice is not None:
+            self.engine.setProperty('voice', selected_voice.id)
+        self.engine.setProperty('rate', SPEECH_RATE)
+
+        if self.driver_name == 'espeak':
+            wav, path = self._synthesize_espeak(text), 'memory'
+        elif self.driver_name == 'sapi5':
+            try:
+                wav, path = self._synthesize_sapi5(text), 'memory'
+            except Exception as exc:
+                print(f"SAPI5 memory stream failed, using a file: {exc}")
+                wav, path = self._synthesize_file(text), 'file'
+        else:
+            wav, path = self._synthesize_file(text), 'file'
+
+        if not wav:
+            raise RuntimeError('Failed to generate audio')
+        self.last_output = path
+        return wav, {
+            'voice_used': selected_voice.name if selected_voice is not None else 'Default Voice',
+            'gender_found': gender_found
+        }
+
+    def _on_espeak_synth(self, wav, numsamples, events):
+        import ctypes
+        from pyttsx3.drivers import _espeak
+
+        if numsamples > 0:
+            self._espeak_pcm.append(ctypes.string_at(wav, numsamples * ctypes.sizeof(ctypes.c_short)))
+        i = 0
+        while events[i].type != _espeak.EVENT_LIST_TERMINATED:
+            if events[i].type == _espeak.EVENT_MSG_TERMINATED:
+                self._espeak_done.set()
+            i += 1
+        return 0
+
+    def _synthesize_espeak(self, text: str) -> bytes:
+        from pyttsx3.drivers import _espeak
+
+        self._espeak_pcm = []
+        self._espeak_done.clear()
+        _espeak.Synth(str(text).encode('utf-8'), flags=_espeak.ENDPAUSE | _espeak.CHARS_UTF8)
+        # Synthesis runs on espeak's own thread
+        if not self._espeak_done.wait(JOB_TIMEOUT):
+            _espeak.Cancel()
+            raise RuntimeError(f"espeak did not finish within {JOB_TIMEOUT:.0f}s")
+        return _wav_bytes(b''.join(self._espeak_pcm), PCM_RATE) if self._espeak_pcm else b''
+
+    def _synthesize_sapi5(self, text: str) -> bytes:
+        import comtypes.client
+
+        audio_format = comtypes.client.CreateObject('SAPI.SpAudioFormat')
+        audio_format.Type = SAPI_FORMAT_22KHZ_16BIT_MONO
+        stream = comtypes.client.CreateObject('SAPI.SpMemoryStream')
+        stream.Format = audio_format
+        tts = self.driver._tts
+        previous = tts.AudioOutputStream
+        tts.AudioOutputStream = stream
+        try:
+            tts.Speak(str(text))
+        finally:
+            tts.AudioOutputStream = previous
+        pcm = bytes(bytearray(stream.GetData()))
+        return _wav_bytes(pcm, PCM_RATE) if pcm else b''
+
+    def _synthesize_file(self, text: str) -> bytes:
+        fd, path = tempfile.mkstemp(suffix='.wav', prefix='voiceflow-tts-')
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _worker_main(conn):
+    """Worker process entry point: start an engine, then serve jobs until told to stop"""
+    try:
+        synthesizer = Synthesizer()
+    except Exception as exc:
+        conn.send(('error', f"Could not start pyttsx3: {exc}"))
+        return
+    conn.send(('ready', synthesizer.driver_name))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            wav, info = synthesizer.synthesize(*job)
+            conn.send(('ok', wav, info, synthesizer.last_output))
+        except Exception as exc:
+            conn.send(('error', str(exc)))
+
+
+class _Worker:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,),
+                                   name='voiceflow-pyttsx3', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.started = time.monotonic()
+        self.ready = False
+
+    def _receive(self, timeout: float):
+        # poll() returns early when the worker dies, so a crash is not mistaken for a hang
+        if not self.conn.poll(timeout):
+            raise TimeoutError()
+        return self.conn.recv()
+
+    def call(self, job: tuple, timeout: float):
+        if not self.ready:
+            status, detail = self._receive(max(0.0, START_TIMEOUT - (time.monotonic() - self.started)))
+            if status != 'ready':
+                raise Pyttsx3WorkerError(detail)
+            self.ready = True
+        self.conn.send(job)
+        return self._receive(timeout)
+
+    def close(self, timeout: float = 2.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        self.conn.close()
+
+
+class Pyttsx3Pool:
+    """
+    Fixed-size pool of pyttsx3 worker processes
+
+    Request threads take an idle worker, send it one job over its pipe and
+    wait for the WAV bytes, so up to `size` syntheses run in parallel on
+    separate cores. A worker that dies is replaced and the job retried once
+    on the new one; a worker that hangs past the timeout is killed and
+    replaced, and the job fails.
+    """
+
+    def __init__(self, size: int, job_timeout: float = JOB_TIMEOUT, acquire_timeout: float = ACQUIRE_TIMEOUT):
+        import multiprocessing
+
+        self.size = size
+        self.job_timeout = job_timeout
+        self.acquire_timeout = acquire_timeout
+        # spawn: forking a process that holds Flask threads and torch state is unsafe
+        self._ctx = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start_worker(self) -> _Worker:
+        worker = _Worker(self._ctx)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker, reason: str) -> _Worker:
+        WORKER_RESTARTS.inc(reason=reason)
+        print(f"pyttsx3 worker {worker.process.pid} {reason}, starting a new one")
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        return self._start_worker()
+
+    def _acquire(self) -> _Worker:
+        """
+        Raises:
+            TimeoutError: Every worker stayed busy for acquire_timeout seconds
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        # Workers start on demand, up to `size`
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = _Worker(self._ctx)
+                self._workers.append(worker)
+                return worker
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"all {self.size} pyttsx3 workers stayed busy for {self.acquire_timeout:.0f}s")
+
+    def synthesize(self, text: str, tgt_language: str, gender_preference: str = 'any') -> Tuple[bytes, dict]:
+        """
+        Synthesize speech in a worker process
+
+        Returns:
+            (WAV bytes, dict with 'voice_used' and 'gender_found')
+
+        Raises:
+            RuntimeError: If the driver produced no audio or failed
+            Pyttsx3WorkerError: If the worker crashed twice, hung or could not start
+            TimeoutError: If no worker became free in time
+        """
+        if self._closed:
+            raise Pyttsx3WorkerError('pyttsx3 pool is closed')
+        job = (text, tgt_language, gender_preference)
+        worker = self._acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    reply = worker.call(job, self.job_timeout)
+                except TimeoutError:
+                    worker = self._replace(worker, 'timeout')
+                    raise Pyttsx3WorkerError(f"pyttsx3 did not finish within {self.job_timeout:.0f}s")
+                except (EOFError, OSError):
+                    worker = self._replace(worker, 'crash')
+                    if attempt:
+                        raise Pyttsx3WorkerError('pyttsx3 worker crashed')
+                    continue
+                except Pyttsx3WorkerError:
+                    # Engine failed to start: keep a fresh worker so the next request tries again
+                    worker = self._replace(worker, 'start_failed')
+                    raise
+                if reply[0] == 'error':
+                    raise RuntimeError(reply[1])
+                status, wav, info, output = reply
+                SYNTHESIS_OUTPUT.inc(path=output)
+                return wav, info
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """Stop every worker"""
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+class _InProcessSynthesizer:
+    """VOICEFLOW_PYTTSX3_WORKERS=0: one engine in this process, one synthesis at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._synthesizer = None
+
+    def synthesize(self, text: str, tgt_language: str, gender_preference: str = 'any') -> Tuple[bytes, dict]:
+        with self._lock:
+            if self._synthesizer is None:
+                self._synthesizer = Synthesizer()
+            result = self._synthesizer.synthesize(text, tgt_language, gender_preference)
+            SYNTHESIS_OUTPUT.inc(path=self._synthesizer.last_output)
+            return result
+
+    def close(self):
+        pass
+
+
+# Global instance
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pyttsx3_pool():
+    """
+    Get or create the global pyttsx3 pool
+
+    VOICEFLOW_PYTTSX3_WORKERS sets the number of worker processes
+    (default: CPU count, at most 4). 0 synthesizes in this process instead.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size = int(os.environ.get('VOICEFLOW_PYTTSX3_WORKERS', str(min(4, os.cpu_count() or 1))))
+                _pool = Pyttsx3Pool(size) if size > 0 else _InProcessSynthesizer()
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,170 @@
+"""
+Sample-rate and channel conversion for generated audio
+Resamples TTS waveforms in-process with a polyphase filter (scipy's
+resample_poly), so clips can be served at the rate and channel layout a
+client asks for, e.g. 8 kHz mono for telephony or 48 kHz for browsers
+"""
+
+import io
+import math
+import wave
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Output rates clients can ask for: telephony, wideband, the common TTS rates and CD/browser rates.
+# A fixed set bounds how many converted copies of a clip can exist
+SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+CHANNEL_COUNTS = (1, 2)
+
+# Same design resample_poly uses by default: Kaiser-windowed sinc, 10 taps per phase each side
+_KAISER_BETA = 5.0
+_HALF_TAPS = 10
+
+
+def _as_int(value) -> Optional[int]:
+    # int() would quietly truncate 8000.5 from a JSON body, and accept true as 1
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def check_output_format(sample_rate=None, channels=None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Validate a requested output format; None leaves that part as synthesized
+
+    Returns:
+        (sample_rate, channels) as ints or None
+
+    Raises:
+        ValueError: Rate or channel count not supported
+    """
+    try:
+        sample_rate, channels = _as_int(sample_rate), _as_int(channels)
+    except (TypeError, ValueError):
+        raise ValueError('sample_rate and channels must be integers')
+    if sample_rate is not None and sample_rate not in SAMPLE_RATES:
+        raise ValueError(f'sample_rate must be one of {", ".join(map(str, SAMPLE_RATES))}')
+    if channels is not None and channels not in CHANNEL_COUNTS:
+        raise ValueError(f'channels must be one of {", ".join(map(str, CHANNEL_COUNTS))}')
+    return sample_rate, channels
+
+
+@lru_cache(maxsize=32)
+def _polyphase_filter(up: int, down: int):
+    """Anti-aliasing FIR for one up/down ratio; designed once, reused for every clip at that ratio"""
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    return firwin(2 * _HALF_TAPS * max_rate + 1, 1.0 / max_rate, window=('kaiser', _KAISER_BETA))
+
+
+def resample(waveform, orig_rate: int, target_rate: int):
+    """
+    Resample a float numpy waveform, shaped (samples,) or (samples, channels)
+
+    Returns:
+        float32 waveform at target_rate
+    """
+    # Deferred like scipy: the app imports this module at startup
+    import numpy as np
+
+    if orig_rate == target_rate:
+        return waveform.astype(np.float32, copy=False)
+    from scipy.signal import resample_poly
+
+    divisor = math.gcd(orig_rate, target_rate)
+    up, down = target_rate // divisor, orig_rate // divisor
+    return resample_poly(waveform, up, down, axis=0, window=_polyphase_filter(up, down)).astype(np.float32)
+
+
+def set_channels(waveform, channels: int):
+    """Downmix to mono by averaging, or copy mono into every channel"""
+    import numpy as np
+
+    current = 1 if waveform.ndim == 1 else waveform.shape[1]
+    if current == channels:
+        return waveform
+    mono = waveform if waveform.ndim == 1 else waveform.mean(axis=1)
+    if channels == 1:
+        return mono
+    return np.repeat(mono[:, None], channels, axis=1)
+
+
+def to_float(data):
+    """Integer PCM samples (as scipy.io.wavfile reads them) to float32 in [-1, 1]"""
+    import numpy as np
+
+    if data.dtype == np.uint8:
+        return (data.astype(np.float32) - 128) / 128
+    if np.issubdtype(data.dtype, np.integer):
+        return data.astype(np.float32) / -np.iinfo(data.dtype).min
+    return data.astype(np.float32, copy=False)
+
+
+def convert(waveform, rate: int, sample_rate: Optional[int] = None, channels: Optional[int] = None) -> tuple:
+    """
+    Bring a float waveform to the requested rate and channel count
+
+    Returns:
+        (rate, waveform)
+    """
+    if channels == 1:
+        # Downmix first so fewer channels go through the filter
+        waveform = set_channels(waveform, 1)
+    if sample_rate is not None:
+        waveform = resample(waveform, rate, sample_rate)
+        rate = sample_rate
+    if channels is not None:
+        waveform = set_channels(waveform, channels)
+    return rate, waveform
+
+
+def wav_bytes(rate: int, waveform) -> bytes:
+    """16-bit PCM WAV file contents, the format every client can play"""
+    import numpy as np
+    import scipy.io.wavfile
+
+    pcm = (np.clip(waveform, -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    scipy.io.wavfile.write(buffer, rate, pcm)
+    return buffer.getvalue()
+
+
+def convert_wav(source, sample_rate: Optional[int] = None, channels: Optional[int] = None) -> bytes:
+    """
+    Convert a WAV file (path or bytes) to the requested rate and channel count
+
+    Returns:
+        16-bit PCM WAV file contents
+
+    Raises:
+        ValueError: The source is not a WAV file scipy can read
+    """
+    import scipy.io.wavfile
+
+    rate, data = scipy.io.wavfile.read(io.BytesIO(source) if isinstance(source, bytes) else source)
+    rate, waveform = convert(to_float(data), rate, sample_rate, channels)
+    return wav_bytes(rate, waveform)
+
+
+def wav_format(source) -> Tuple[Optional[int], Optional[int]]:
+    """(sample rate, channels) of a WAV file (path or bytes), or (None, None) if it cannot be read"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        with wave.open(source) as f:
+            return f.getframerate(), f.getnchannels()
+    except (wave.Error, EOFError):
+        pass
+    # Float WAVs, which the wave module does not parse
+    import scipy.io.wavfile
+
+    try:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        rate, data = scipy.io.wavfile.read(source, mmap=False)
+        return rate, 1 if data.ndim == 1 else data.shape[1]
+    except ValueError:
+        return None, None
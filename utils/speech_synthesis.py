@@ -0,0 +1,79 @@
+"""
+Speech synthesis for VoiceFlow
+Shared by /tts and /s2st: Kazakh goes through the MMS-TTS model (on the
+model server when one is configured), English and Russian through the
+system's pyttsx3 voices in the pyttsx3 worker pool
+"""
+
+import io
+from utils.kk_speech_model import synthesize_kazakh
+from utils.metrics import inference, stage
+from utils.pyttsx3_pool import get_pyttsx3_pool
+
+KAZAKH_VOICE_NAME = 'Kazakh MMS-TTS Model'
+
+
+def _synthesize_kazakh(text: str, route: str):
+    with stage(route, 'synthesize'), inference('kazakh_tts'):
+        return synthesize_kazakh(text)
+
+
+def _synthesize_system_voice(text: str, tgt_language: str, gender_preference: str, route: str):
+    with stage(route, 'synthesize'):
+        return get_pyttsx3_pool().synthesize(text, tgt_language, gender_preference)
+
+
+def synthesize_to_file(text: str, tgt_language: str, path: str,
+                       gender_preference: str = 'any', route: str = 'tts') -> dict:
+    """
+    Synthesize speech into a WAV file
+
+    Args:
+        text: Text in the target language
+        tgt_language: 'english', 'russian' or 'kazakh'
+        path: Where to write the WAV file
+        gender_preference: 'male', 'female' or 'any' (pyttsx3 voices only)
+        route: Route label for the stage metrics
+
+    Returns:
+        Dict with 'voice_used' and 'gender_found'
+
+    Raises:
+        RuntimeError: If the synthesizer produced no audio
+    """
+    if tgt_language == 'kazakh':
+        # Deferred so the app starts without scipy
+        import scipy.io.wavfile
+
+        # Generate speech (on the model server when one is configured)
+        sampling_rate, waveform = _synthesize_kazakh(text, route)
+        with stage(route, 'file_write'):
+            scipy.io.wavfile.write(path, rate=sampling_rate, data=waveform)
+        return {'voice_used': KAZAKH_VOICE_NAME, 'gender_found': True}
+
+    wav, info = _synthesize_system_voice(text, tgt_language, gender_preference, route)
+    with stage(route, 'file_write'):
+        with open(path, 'wb') as f:
+            f.write(wav)
+    return info
+
+
+def synthesize_wav(text: str, tgt_language: str, gender_preference: str = 'any', route: str = 'tts'):
+    """
+    Synthesize speech and return the WAV file contents, without touching disk
+
+    Returns:
+        (WAV bytes, dict with 'voice_used' and 'gender_found')
+
+    Raises:
+        RuntimeError: If the synthesizer produced no audio
+    """
+    if tgt_language == 'kazakh':
+        import scipy.io.wavfile
+
+        sampling_rate, waveform = _synthesize_kazakh(text, route)
+        buffer = io.BytesIO()
+        scipy.io.wavfile.write(buffer, rate=sampling_rate, data=waveform)
+        return buffer.getvalue(), {'voice_used': KAZAKH_VOICE_NAME, 'gender_found': True}
+
+    return _synthesize_system_voice(text, tgt_language, gender_preference, route)
@@ -1,15 +1,49 @@
+import re
+from contextlib import nullcontext
 from utils.model_manager import get_model_manager
+from utils.metrics import inference, stage
+from utils.profiling import profile_ops
+
+# Sentence ends (Latin and Cyrillic text share punctuation), or line breaks
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
 
-translator = None
 
 def init_translator():
     """Initialize translation model using ModelManager (downloads if needed)"""
-    global translator
+    from utils.model_server import RemoteTranslator, get_model_client
+
+    client = get_model_client()
+    if client is not None and client.serves('translator'):
+        return RemoteTranslator(client)
+    # ModelManager keeps the loaded pipeline and serializes the first load,
+    # so there is no module-level copy to race on here
+    manager = get_model_manager()
+    return manager.load_translator_model()
+
+
+def translate(text, src_lang, tgt_lang, route='tts'):
+    """
+    Translate text between NLLB language codes
+
+    Args:
+        text: Text to translate
+        src_lang: Source NLLB code, e.g. 'eng_Latn'
+        tgt_lang: Target NLLB code
+        route: Route label for the stage metrics
+
+    Returns:
+        The translated text, or the input unchanged when the codes match
+    """
+    if src_lang == tgt_lang:
+        return text
+    from utils.model_server import RemoteTranslator
 
-    if not translator:
-        print("Translation Model is initializing for the first time...")
-        manager = get_model_manager()
-        translator = manager.load_translator_model()
-        print("✔ Translation Model has been initialized.")
+    translator = init_translator()
+    in_use = nullcontext() if isinstance(translator, RemoteTranslator) else get_model_manager().model_in_use('translator')
+    with stage(route, 'translate'), inference('translator'), profile_ops('translator'), in_use:
+        response = translator(text, src_lang=src_lang, tgt_lang=tgt_lang)
+    return response[0]["translation_text"]
 
-    return translator
\ No newline at end of file
+def split_sentences(text):
+    """Split text into sentences, the unit /s2st translates and synthesizes"""
+    return [part.strip() for part in _SENTENCE_BOUNDARY.split(text) if part.strip()]